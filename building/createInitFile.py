@@ -86,9 +86,10 @@ __build_platform__ = '{platform}'
 __all__ = ["gui", "misc", "visual", "core",
            "event", "data", "sound", "microphone"]
 
+
 # for developers the following allows access to the current git sha from
 # their repository
-if __git_sha__ == 'n/a':
+def _getGitSha():
     from subprocess import check_output, PIPE
     # see if we're in a git repo and fetch from there
     try:
@@ -97,8 +98,39 @@ if __git_sha__ == 'n/a':
                               cwd=thisFileLoc, stderr=PIPE)
     except Exception:
         output = False
-    if output:
-        __git_sha__ = output.strip()  # remove final linefeed
+    if not output:
+        return 'n/a'
+    return output.strip().decode('utf-8')  # remove final linefeed
+
+
+# starting a git subprocess is slow so (where the interpreter supports module
+# __getattr__) only look up the sha when someone actually asks for it
+_lazyAttribs = ('useVersion', 'ensureMinimal')
+if __git_sha__ == 'n/a':
+    if sys.version_info >= (3, 7):
+        del __git_sha__
+        _lazyAttribs += ('__git_sha__',)
+    else:
+        __git_sha__ = _getGitSha()
+
+
+# resolve the attributes that are slow to create on first access
+def __getattr__(name):
+    if name == '__git_sha__':
+        value = _getGitSha()
+    elif name in ('useVersion', 'ensureMinimal'):
+        from psychopy.tools import versionchooser
+        value = getattr(versionchooser, name)
+    else:
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazyAttribs))
+
 
 # update preferences and the user paths
 if 'installing' not in locals():
@@ -106,7 +138,11 @@ if 'installing' not in locals():
     for pathName in prefs.general['paths']:
         sys.path.append(pathName)
 
-    from psychopy.tools.versionchooser import useVersion, ensureMinimal
+    # logging has to be imported before clock (they import each other)
+    from psychopy import logging
+
+    if sys.version_info < (3, 7):
+        from psychopy.tools.versionchooser import useVersion, ensureMinimal
 
 # import readline here to get around an issue with sounddevice
 # issues GH-2230 GH-2344 GH-2662
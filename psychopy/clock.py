@@ -97,6 +97,89 @@ else:
     getTime = timeit.default_timer
 
 
+# Sleeping until an absolute deadline. On Linux, clock_nanosleep with
+# TIMER_ABSTIME on CLOCK_MONOTONIC is used, so the sleep ends when the
+# deadline is reached (plus the time the OS takes to wake the process up),
+# rather than after a relative time that can be lengthened by the time taken
+# to start the sleep, or restarted after a signal.
+_clockNanosleep = None
+if sys.platform.startswith('linux'):
+    try:
+        import ctypes
+        import ctypes.util
+        import errno
+
+        class _timespec(ctypes.Structure):
+            _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        _clockNanosleep = _libc.clock_nanosleep
+        _clockNanosleep.argtypes = [ctypes.c_int, ctypes.c_int,
+                                    ctypes.POINTER(_timespec),
+                                    ctypes.POINTER(_timespec)]
+        _clockGettime = _libc.clock_gettime
+        _clockGettime.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+        _CLOCK_MONOTONIC = 1
+        _TIMER_ABSTIME = 1
+    except (OSError, AttributeError, TypeError):
+        _clockNanosleep = None
+
+#: The final part of a wait() (in seconds) spent checking the clock in a loop
+#: rather than sleeping, so that waits end on time despite the time the OS
+#: takes to wake a process up. If absolute deadline sleeps are available
+#: this can be small; set it from measureWakeLatency() on the computer
+#: running the experiment for the shortest waits that are still on time.
+waitSpinPeriod = 0.0005 if _clockNanosleep else 0.2
+
+
+def sleepUntil(deadline, timer=None):
+    """Sleep (without using the CPU) until `deadline`, a time given by
+    `timer` (default :func:`getTime`). Returns straight away if the deadline
+    has passed.
+
+    The sleep can end after the deadline, by the time the OS takes to wake
+    the process up (see :func:`measureWakeLatency`); use :func:`wait` for
+    waits that need to end on time.
+    """
+    remaining = deadline - (timer or getTime)()
+    if remaining <= 0:
+        return
+    if _clockNanosleep is None:
+        time.sleep(remaining)
+        return
+    ts = _timespec()
+    _clockGettime(_CLOCK_MONOTONIC, ctypes.byref(ts))
+    end = ts.tv_sec + ts.tv_nsec * 1e-9 + remaining
+    ts.tv_sec = int(end)
+    ts.tv_nsec = int((end - ts.tv_sec) * 1e9)
+    # interrupted sleeps are restarted with the same deadline
+    while _clockNanosleep(_CLOCK_MONOTONIC, _TIMER_ABSTIME, ctypes.byref(ts),
+                          None) == errno.EINTR:
+        pass
+
+
+def measureWakeLatency(samples=100, duration=0.001, percentile=99.0):
+    """Measure how late :func:`sleepUntil` returns on this computer.
+
+    :param samples: the number of sleeps to time
+    :param duration: how long each sleep is
+    :param percentile: the percentile of the latencies to return, e.g. 99 for
+        the time that 99% of sleeps end within
+
+    :return: the latency, in seconds. Setting
+        `psychopy.clock.waitSpinPeriod` to this makes wait() spin for only
+        as long as needed to end on time.
+    """
+    latencies = []
+    for i in range(samples):
+        deadline = getTime() + duration
+        sleepUntil(deadline)
+        latencies.append(getTime() - deadline)
+    latencies.sort()
+    index = int(round((len(latencies) - 1) * percentile / 100.0))
+    return max(latencies[index], 0.0)
+
+
 class MonotonicClock(object):
     """A convenient class to keep track of time in your experiments using a
     sub-millisecond timer.
@@ -275,6 +358,7 @@ class StaticPeriod(object):
         """
         self.status = FINISHED
         timeRemaining = self.countdown.getTime()
+        deadline = getTime() + timeRemaining
         if self.win:
             self.win.recordFrameIntervals = self._winWasRecordingIntervals
         if timeRemaining < 0:
@@ -284,17 +368,20 @@ class StaticPeriod(object):
             psychopy.logging.warn(msg % vals)
             return 0
         else:
-            wait(timeRemaining)
+            waitUntil(deadline)
             return 1
 
 
-def wait(secs, hogCPUperiod=0.2):
+def wait(secs, hogCPUperiod=None):
     """Wait for a given time period.
 
-    If secs=10 and hogCPU=0.2 then for 9.8s python's time.sleep function
-    will be used, which is not especially precise, but allows the cpu to
+    If secs=10 and hogCPU=0.2 then for 9.8s the process sleeps (see
+    :func:`sleepUntil`), which is not especially precise, but allows the cpu to
     perform housekeeping. In the final hogCPUperiod the more precise
     method of constantly polling the clock is used for greater precision.
+    By default hogCPUperiod is `psychopy.clock.waitSpinPeriod`: 0.5 msec on
+    Linux, where the sleep ends at the right time give or take the time the
+    OS takes to wake the process, and 0.2s elsewhere.
 
     If you want to obtain key-presses during the wait, be sure to use
     pyglet and to hogCPU for the entire time, and then call
@@ -312,22 +399,32 @@ def wait(secs, hogCPUperiod=0.2):
 
     This will preserve terminal-window focus during command line usage.
     """
+    waitUntil(getTime() + secs, hogCPUperiod)
+
+
+def waitUntil(deadline, hogCPUperiod=None):
+    """Wait until the :func:`getTime` time `deadline`, as :func:`wait` does.
+    Waiting for a deadline rather than a duration means time taken before the
+    wait (e.g. drawing stimuli) doesn't make it end late.
+    """
     from . import core
 
+    if hogCPUperiod is None:
+        hogCPUperiod = waitSpinPeriod
+
     # initial relaxed period, using sleep (better for system resources etc)
-    if secs > hogCPUperiod:
-        time.sleep(secs - hogCPUperiod)
-        secs = hogCPUperiod  # only this much is now left
+    if deadline - getTime() > hogCPUperiod:
+        sleepUntil(deadline - hogCPUperiod)
 
     # hog the cpu, checking time
-    t0 = getTime()
-    while (getTime() - t0) < secs:
-        if not (core.havePyglet and core.checkPygletDuringWait):
+    checkPyglet = core.havePyglet and core.checkPygletDuringWait
+    while getTime() < deadline:
+        if not checkPyglet:
             continue
         # let's see if pyglet collected any event in meantime
         try:
             # this takes focus away from command line terminal window:
-            if parse_version(pyglet.version) < parse_version('1.2'):
+            if _oldPyglet():
                 # events for sounds/video should run independently of wait()
                 pyglet.media.dispatch_events()
         except AttributeError:
@@ -343,6 +440,16 @@ def wait(secs, hogCPUperiod=0.2):
                 win.winHandle.dispatch_events()  # pump events
 
 
+def _oldPyglet():
+    """True for pyglet < 1.2, whose media events need dispatching"""
+    global _isOldPyglet
+    if _isOldPyglet is None:
+        _isOldPyglet = parse_version(pyglet.version) < parse_version('1.2')
+    return _isOldPyglet
+
+_isOldPyglet = None
+
+
 def getAbsTime():
     """Return unix time (i.e., whole seconds elapsed since Jan 1, 1970).
 
@@ -17,11 +17,11 @@ if sys.version_info.major == 3 and sys.version_info.minor >= 6:
 
 from .utils import (checkValidFilePath, isValidVariableName, importTrialTypes,
                     sliceFromString, indicesFromString, importConditions,
-                    createFactorialTrialList, bootStraps, functionFromStaircase,
-                    getDateStr)
+                    createFactorialTrialList, bootStraps, iterBootStraps,
+                    functionFromStaircase, getDateStr)
 
 from .fit import (FitFunction, FitCumNormal, FitLogistic, FitNakaRushton,
-                  FitWeibull)
+                  FitWeibull, bootStrapFit)
 
 try:
     # import openpyxl
@@ -25,7 +25,6 @@ from psychopy import logging
 from psychopy.tools.filetools import (openOutputFile, genDelimiter,
                                       genFilenameFromDelimiter, pathToString)
 from psychopy.tools.fileerrortools import handleFileCollision
-from psychopy.tools.arraytools import extendArr
 from .utils import _getExcelCellName
 
 try:
@@ -455,6 +454,11 @@ class DataHandler(_ComparisonMixin, dict):
     to a standard (not masked) numpy array with dtype='O' and where missing
     entries have value = "--".
 
+    If data are added beyond the current `dataShape` the arrays for all
+    data types are extended. Storage grows by doubling, so the values
+    remain views onto a larger buffer and repeated extension costs
+    amortized constant time per value.
+
     Attributes:
         - ['key']=data arrays containing values for that key
             (e.g. data['accuracy']=...)
@@ -462,10 +466,16 @@ class DataHandler(_ComparisonMixin, dict):
         - dataTypes=list of keys as strings
 
     """
+    # storage buffers and repetition counts are bookkeeping only; keeping
+    # them in slots means they are neither pickled nor compared
+    __slots__ = ('_stores', '_repCounts')
+
     def __init__(self, dataTypes=None, trials=None, dataShape=None):
         self.trials = trials
         self.dataTypes = []  # names will be added during addDataType
         self.isNumeric = {}
+        self._stores = {}
+        self._repCounts = {}
         # if given dataShape use it - otherwise guess!
         if dataShape:
             self.dataShape = dataShape
@@ -478,6 +488,10 @@ class DataHandler(_ComparisonMixin, dict):
             for thisType in dataTypes:
                 self.addDataType(thisType)
 
+    def __getstate__(self):
+        # storage buffers are rebuilt from the arrays themselves on demand
+        return self.__dict__
+
     def __eq__(self, other):
         # We ignore an attached TrialHandler object, otherwise we will end up
         # in an infinite loop, as this DataHandler is attached to the
@@ -531,38 +545,116 @@ class DataHandler(_ComparisonMixin, dict):
             self.addDataType(thisType)
         if position is None:
             # 'ran' is always the first thing to update
-            repN = sum(self['ran'][self.trials.thisIndex])
+            repN = self.getRepCount(self.trials.thisIndex)
             if thisType != 'ran':
                 # because it has already been updated
                 repN -= 1
             # make a list where 1st digit is trial number
             position = [self.trials.thisIndex]
             position.append(repN)
+        row, col = position[0], int(position[1])
 
         # check whether data falls within bounds
-        posArr = np.asarray(position)
-        shapeArr = np.asarray(self.dataShape)
-        if not np.alltrue(posArr < shapeArr):
-            # array isn't big enough
-            logging.warning('need a bigger array for: ' + thisType)
-            # not implemented yet!
-            self[thisType] = extendArr(self[thisType], posArr)
+        shape = self[thisType].shape
+        if row >= shape[0] or col >= shape[1]:
+            self._extend((row, col))
         # check for ndarrays with more than one value and for non-numeric data
         if (self.isNumeric[thisType] and
                 ((type(value) == np.ndarray and len(value) > 1) or
                      (type(value) not in [float, int]))):
             self._convertToObjectArray(thisType)
+        # keep the count of repetitions up to date
+        if thisType == 'ran' and row in self._getRepCounts():
+            previous = self['ran'][row, col]
+            if previous is np.ma.masked:
+                previous = 0
+            self._repCounts[row] += int(value - previous)
         # insert the value
-        self[thisType][position[0], int(position[1])] = value
+        self[thisType][row, col] = value
+
+    def getRepCount(self, index):
+        """Return the number of times that the trial with this index
+        (the first dimension of the data arrays) has been run, i.e.
+        ``sum(self['ran'][index])``.
+
+        The count is kept up to date as 'ran' values are added so it
+        doesn't need to sum across repetitions for every new trial.
+        """
+        repCounts = self._getRepCounts()
+        if index not in repCounts:
+            repCounts[index] = int(np.ma.sum(self['ran'][index]))
+        return repCounts[index]
+
+    def _getRepCounts(self):
+        try:
+            return self._repCounts
+        except AttributeError:  # unpickled or copied without bookkeeping
+            self._repCounts = {}
+            return self._repCounts
+
+    def _getStore(self, thisType):
+        """Return the buffer holding the data for this type. The array in
+        the dict is either the buffer itself or a view onto its first rows
+        and columns.
+        """
+        try:
+            stores = self._stores
+        except AttributeError:  # unpickled or copied without bookkeeping
+            stores = self._stores = {}
+        arr = self[thisType]
+        store = stores.get(thisType)
+        if store is None or not np.may_share_memory(np.ma.getdata(store),
+                                                     np.ma.getdata(arr)):
+            # the array was created (or replaced) without spare capacity
+            store = stores[thisType] = arr
+        return store
+
+    def _extend(self, position):
+        """Extend the arrays of all data types so that `position` fits,
+        doubling the allocated storage along any dimension that runs out.
+        """
+        msg = 'extending data arrays to fit position {} (was {})'
+        logging.debug(msg.format(list(position), list(self.dataShape)))
+        for thisType in list(self.keys()):
+            store = self._getStore(thisType)
+            shape = [max(n, int(pos) + 1)
+                     for n, pos in zip(self[thisType].shape, position)]
+            if any(n > size for n, size in zip(shape, store.shape)):
+                capacity = [size if n <= size else max(n, 2 * size)
+                            for n, size in zip(shape, store.shape)]
+                store = self._reallocate(thisType, store, capacity)
+                self._stores[thisType] = store
+            view = tuple(slice(0, n) for n in shape)
+            self[thisType] = store[view]
+        self.dataShape = [max(n, int(pos) + 1)
+                          for n, pos in zip(self.dataShape, position)]
+
+    def _reallocate(self, thisType, store, capacity):
+        """Create a buffer of the given capacity containing the values of
+        `store`, where new entries are missing values
+        """
+        filled = tuple(slice(0, n) for n in store.shape)
+        if isinstance(store, np.ma.MaskedArray):
+            newStore = np.ma.zeros(capacity, store.dtype)
+            # 'ran' is a bool with all entries valid, others start missing
+            newStore.mask = thisType != 'ran'
+            newStore[filled] = store
+        else:
+            newStore = np.empty(capacity, dtype=store.dtype)
+            newStore.fill('--')
+            newStore[filled] = store
+        return newStore
 
     def _convertToObjectArray(self, thisType):
         """Convert this datatype from masked numeric array to unmasked
         object array
         """
-        dat = self[thisType]
-        # create an array of Object type
-        self[thisType] = np.array(dat.data, dtype='O')
+        shape = self[thisType].shape
+        dat = self._getStore(thisType)
         # masked vals should be "--", others keep data
-        # we have to repeat forcing to 'O' or text gets truncated to 4chars
-        self[thisType] = np.where(dat.mask, '--', dat).astype('O')
+        # we have to force to 'O' or text gets truncated to 4chars
+        store = np.where(dat.mask, '--', dat).astype('O')
+        self._stores[thisType] = store
+        self[thisType] = store[tuple(slice(0, n) for n in shape)]
         self.isNumeric[thisType] = False
+
@@ -4,6 +4,9 @@
 from __future__ import absolute_import, division, print_function
 
 from builtins import object
+from builtins import range
+from collections import deque
+
 import numpy as np
 # from scipy import optimize  # DON'T. It's slow and crashes on some machines
 
@@ -249,3 +252,140 @@ class FitFunction(object):
     def __init__(self, *args, **kwargs):
         raise DeprecationWarning("FitFunction is now fully DEPRECATED: use"
                                  " FitLogistic, FitWeibull etc instead")
+
+
+def bootStrapFit(fitType, intensities, responses, n=1000, expectedMin=0.5,
+                 guess=None, optimize_kws=None, chunkSize=1000, nJobs=1,
+                 seed=None):
+    """Estimate the distribution of the parameters of a psychometric
+    function by refitting bootstrapped resamples of the trials.
+
+    usage::
+
+        params = bootStrapFit(FitWeibull, intensities, responses, n=10000)
+        ci = np.nanpercentile(params, [2.5, 97.5], axis=0)
+
+    where:
+            fitType
+                the fit class to use (e.g. `FitWeibull`, `FitCumNormal`)
+
+            intensities, responses
+                the trial-by-trial data as for `functionFromStaircase`
+
+            n
+                number of resamples to fit
+
+            expectedMin, guess, optimize_kws
+                passed to the fit class. If no `guess` is given the fit to
+                the original data is used as the starting point for each
+                resample
+
+            chunkSize
+                resamples are drawn and binned (by unique intensity) this
+                many at a time, which bounds the memory needed
+
+            nJobs
+                number of processes used for fitting (1 fits in this
+                process)
+
+            seed
+                seed for the random resampling
+
+            params
+                an array with shape (n, nParams). Rows are NaN where the
+                fit to that resample failed
+    """
+    from .utils import functionFromStaircase
+
+    intensities = np.asarray(intensities, dtype=float).ravel()
+    responses = np.asarray(responses, dtype=float).ravel()
+    if len(intensities) != len(responses):
+        raise ValueError("intensities and responses must be the same "
+                         "length")
+    if guess is None:
+        xx, yy, nPoints = functionFromStaircase(intensities, responses,
+                                                'unique')
+        guess = fitType(xx, yy, expectedMin=expectedMin, display=0,
+                        optimize_kws=optimize_kws).params
+    guess = list(guess)
+
+    # bin all resamples by the unique intensities of the original data
+    uniqueInten, binIndex = np.unique(np.round(intensities, decimals=8),
+                                      return_inverse=True)
+    binIndex = binIndex.ravel()
+    nBins = len(uniqueInten)
+    nTrials = len(intensities)
+    rng = np.random.RandomState(seed=seed)
+
+    def binnedChunks():
+        for firstN in range(0, n, chunkSize):
+            nSamples = min(chunkSize, n - firstN)
+            indices = rng.randint(nTrials, size=(nSamples, nTrials))
+            # one bincount for the whole chunk, offsetting each resample
+            flatBins = (np.arange(nSamples)[:, np.newaxis] * nBins +
+                        binIndex[indices]).ravel()
+            counts = np.bincount(flatBins, minlength=nSamples * nBins)
+            sums = np.bincount(flatBins, weights=responses[indices].ravel(),
+                               minlength=nSamples * nBins)
+            counts = counts.reshape(nSamples, nBins)
+            sums = sums.reshape(nSamples, nBins)
+            chunk = []
+            for thisCounts, thisSums in zip(counts, sums):
+                used = thisCounts > 0
+                chunk.append((fitType, uniqueInten[used],
+                              thisSums[used] / thisCounts[used],
+                              expectedMin, guess, optimize_kws))
+            yield chunk
+
+    if nJobs == 1:
+        params = [_fitResample(args)
+                  for chunk in binnedChunks() for args in chunk]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        def parts():
+            # each chunk is shared between the processes
+            for chunk in binnedChunks():
+                partSize = -(-len(chunk) // nJobs)
+                for first in range(0, len(chunk), partSize):
+                    yield chunk[first:first + partSize]
+
+        params = []
+        with ProcessPoolExecutor(max_workers=nJobs) as pool:
+            # only a couple of chunks are drawn ahead of the fits
+            for partParams in _imapBounded(pool, _fitResamples, parts(),
+                                           2 * nJobs):
+                params.extend(partParams)
+    return np.array(params, dtype=float).reshape(n, len(guess))
+
+
+def _imapBounded(pool, func, items, nAhead):
+    """Like `pool.map(func, items)`, but only taking up to `nAhead` items
+    from `items` ahead of the results given, rather than all of them at once
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(func, item))
+        if len(pending) >= nAhead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _fitResamples(argsList):
+    """`_fitResample` for each of a list of resamples"""
+    return [_fitResample(args) for args in argsList]
+
+
+def _fitResample(args):
+    """Fit a single resample for `bootStrapFit` (module-level so that it can
+    be sent to worker processes)
+    """
+    fitType, xx, yy, expectedMin, guess, optimize_kws = args
+    try:
+        fit = fitType(xx, yy, expectedMin=expectedMin, guess=guess,
+                      display=0, optimize_kws=optimize_kws)
+    except (RuntimeError, TypeError, ValueError):
+        # e.g. no convergence or fewer intensities than parameters
+        return [np.nan] * len(guess)
+    return list(fit.params)
@@ -1527,8 +1527,8 @@ class TrialHandlerExt(TrialHandler):
         # if there's no trial weights, then the current position is simply
         # [trialIndex, nRepetition]
         if self.trialWeights is None:
-            repN = sum(self['ran'][self.trials.thisIndex]) - 1
-            position = [self.trials.thisIndex, repN]
+            repN = self.data.getRepCount(self.thisIndex) - 1
+            position = [self.thisIndex, repN]
         else:
             # if there are trial weights, the situation is slightly more
             # involved, because the same index can be repeated for a number
@@ -1550,8 +1550,9 @@ class TrialHandlerExt(TrialHandler):
 
             # get the number of the trial presented by summing in ran for the
             # rows above and all columns
-            nThisTrialPresented = np.sum(
-                self.data['ran'][firstRowIndex:lastRowIndex, :])
+            nThisTrialPresented = sum(
+                self.data.getRepCount(row)
+                for row in range(firstRowIndex, lastRowIndex))
 
             _tw = self.trialWeights[self.thisIndex]
             dataRowThisTrial = firstRowIndex + (nThisTrialPresented - 1) % _tw
@@ -1565,8 +1566,8 @@ class TrialHandlerExt(TrialHandler):
         # if there's no trial weights, then the current position is
         # simply [trialIndex, nRepetition]
         if self.trialWeights is None:
-            repN = sum(self['ran'][self.trials.thisIndex])
-            position = [self.trials.thisIndex, repN]
+            repN = self.data.getRepCount(self.thisIndex)
+            position = [self.thisIndex, repN]
         else:
             # if there are trial weights, the situation is slightly more
             # involved, because the same index can be repeated for a
@@ -1580,8 +1581,9 @@ class TrialHandlerExt(TrialHandler):
 
             # get the number of the trial presented by summing in ran for the
             # rows above and all columns
-            nThisTrialPresented = np.sum(
-                self.data['ran'][firstRowIndex:lastRowIndex, :])
+            nThisTrialPresented = sum(
+                self.data.getRepCount(row)
+                for row in range(firstRowIndex, lastRowIndex))
 
             _tw = self.trialWeights[self.thisIndex]
             dataRowThisTrial = firstRowIndex + nThisTrialPresented % _tw
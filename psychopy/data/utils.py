@@ -11,6 +11,7 @@ from past.builtins import basestring
 import os
 import re
 import ast
+import copy
 import pickle
 import time
 import codecs
@@ -192,6 +193,115 @@ def listFromString(val):
     return asList
 
 
+# parsed conditions files, keyed by path, size and modification time
+_conditionsCache = OrderedDict()
+_conditionsCacheSize = 32
+_scalarTypes = (basestring, int, float, bool, type(None))
+
+
+def _conditionsCacheKey(fileName):
+    stat = os.stat(fileName)
+    return (os.path.abspath(fileName), stat.st_size, stat.st_mtime)
+
+
+def _copyConditions(trialList, mutableFields):
+    """Copy a cached trialList so that callers can modify it freely
+    """
+    trialList = [thisTrial.copy() for thisTrial in trialList]
+    if mutableFields:
+        for thisTrial in trialList:
+            for fieldName in mutableFields:
+                thisTrial[fieldName] = _copyValue(thisTrial[fieldName])
+    return trialList
+
+
+def _copyValue(val):
+    """Copy a value from a conditions file, avoiding deepcopy for the
+    common case of a flat list"""
+    if type(val) == list and all(isinstance(item, _scalarTypes)
+                                 for item in val):
+        return list(val)
+    return copy.deepcopy(val)
+
+
+def clearConditionsCache():
+    """Forget all the conditions files that have been parsed by
+    :func:`importConditions`. Files are re-read anyway whenever they
+    change on disk so this is rarely needed.
+    """
+    _conditionsCache.clear()
+
+
+def _evalListString(val):
+    """Convert a string that looks like a list into a list"""
+    try:
+        return ast.literal_eval(val)
+    except (ValueError, SyntaxError):
+        # not a plain literal, e.g. "[1, 2*3]"
+        return eval(val)
+
+
+def _conditionsColumn(values, coerceText=False):
+    """Convert one column of a pandas dataframe into a list of values
+    suitable for the conditions of a TrialHandler.
+
+    Missing values become None, escaped newlines are replaced and strings
+    that look like lists are evaluated. If `coerceText` then strings that
+    are numbers with either decimal separator become floats. Conversions
+    of text are computed once per distinct value.
+    """
+    column = list(values)
+    kind = values.dtype.kind
+    if kind == 'f':
+        for ii in np.flatnonzero(np.isnan(values)):
+            column[ii] = None
+        return column
+    elif kind in 'mM':
+        for ii in np.flatnonzero(np.isnat(values)):
+            column[ii] = None
+        return column
+    elif kind != 'O':
+        return column  # ints and bools need no conversion
+
+    series = pd.Series(values, dtype=object)
+    for ii in np.flatnonzero(series.isna().to_numpy()):
+        column[ii] = None
+    replacements = {}
+    listLike = []
+    for val in pd.unique(values):
+        if not isinstance(val, basestring):
+            continue
+        newVal = val
+        if isinstance(newVal, bytes):
+            newVal = newVal.decode('utf-8-sig')
+        if coerceText:
+            try:
+                newVal = float(newVal.replace(",", "."))
+                if np.isnan(newVal):
+                    newVal = None
+                replacements[val] = newVal
+                continue
+            except ValueError:
+                pass
+        newVal = newVal.replace('\\n', '\n')
+        if newVal.startswith('[') and newVal.endswith(']'):
+            listLike.append(val)
+        elif newVal != val or type(newVal) != type(val):
+            replacements[val] = newVal
+    if replacements:
+        for ii in np.flatnonzero(series.isin(list(replacements)).to_numpy()):
+            column[ii] = replacements[column[ii]]
+    if listLike:
+        # parse each distinct string once; every trial gets its own copy
+        parsed = {}
+        for val in listLike:
+            text = val.decode('utf-8-sig') if isinstance(val, bytes) else val
+            parsed[val] = _evalListString(text.replace('\\n', '\n'))
+        for ii in np.flatnonzero(series.isin(listLike).to_numpy()):
+            column[ii] = _copyValue(parsed[column[ii]])
+    return column
+
+
 def importConditions(fileName, returnFieldNames=False, selection=""):
     """Imports a list of conditions from an .xlsx, .csv, or .pkl file
 
@@ -241,26 +351,22 @@ def importConditions(fileName, returnFieldNames=False, selection=""):
         if fileName.endswith(('.csv', '.tsv')):
             trialsArr = pd.read_csv(fileName, encoding='utf-8-sig',
                                     sep=sep, decimal=dec)
-            for col in trialsArr.columns:
-                for row, cell in enumerate(trialsArr[col]):
-                    if isinstance(cell, str):
-                        tryVal = cell.replace(",", ".")
-                        try:
-                            trialsArr[col][row] = float(tryVal)
-                        except ValueError:
-                            pass
             logging.debug(u"Read csv file with pandas: {}".format(fileName))
+            # text cells may still be numbers with eu style decimals
+            coerceText = True
         elif fileName.endswith(('.xlsx', '.xlsm')):
             trialsArr = pd.read_excel(fileName, engine='openpyxl')
             logging.debug(u"Read Excel file with pandas: {}".format(fileName))
+            coerceText = False
         elif fileName.endswith('.xls'):
             trialsArr = pd.read_excel(fileName, engine='xlrd')
             logging.debug(u"Read Excel file with pandas: {}".format(fileName))
+            coerceText = False
         # then try to convert array to trialList and fieldnames
         unnamed = trialsArr.columns.to_series().str.contains('^Unnamed: ')
         trialsArr = trialsArr.loc[:, ~unnamed]  # clear unnamed cols
         logging.debug(u"Clearing unnamed columns from {}".format(fileName))
-        trialList, fieldNames = pandasToDictList(trialsArr)
+        trialList, fieldNames = pandasToDictList(trialsArr, coerceText)
 
         return trialList, fieldNames
 
@@ -290,47 +396,31 @@ def importConditions(fileName, returnFieldNames=False, selection=""):
         msg = 'Conditions file not found: %s'
         raise ValueError(msg % os.path.abspath(fileName))
 
-    def pandasToDictList(dataframe):
+    def pandasToDictList(dataframe, coerceText=False):
         """Convert a pandas dataframe to a list of dicts.
         This helper function is used by csv or excel imports via pandas
         """
-        # convert the resulting dataframe to a numpy recarray
-        trialsArr = dataframe.to_records(index=False)
-        # Check for new line characters in strings, and replace escaped characters
-        for record in trialsArr:
-            for idx, element in enumerate(record):
-                if isinstance(element, str):
-                    record[idx] = element.replace('\\n', '\n')
-        if trialsArr.shape == ():
-            # convert 0-D to 1-D with one element:
-            trialsArr = trialsArr[np.newaxis]
-        fieldNames = list(trialsArr.dtype.names)
+        fieldNames = [str(name) for name in dataframe.columns]
         _assertValidVarNames(fieldNames, fileName)
 
-        # convert the record array into a list of dicts
-        trialList = []
-        for trialN, trialType in enumerate(trialsArr):
-            thisTrial = OrderedDict()
-            for fieldN, fieldName in enumerate(fieldNames):
-                val = trialsArr[trialN][fieldN]
-
-                if isinstance(val, basestring):
-                    if val.startswith('[') and val.endswith(']'):
-                        # val = eval('%s' %unicode(val.decode('utf8')))
-                        val = eval(val)
-                elif type(val) == np.string_:
-                    val = str(val.decode('utf-8-sig'))
-                    # if it looks like a list, convert it:
-                    if val.startswith('[') and val.endswith(']'):
-                        # val = eval('%s' %unicode(val.decode('utf8')))
-                        val = eval(val)
-                elif np.isnan(val):
-                    val = None
-                thisTrial[fieldName] = val
-            trialList.append(thisTrial)
+        # convert column by column then assemble the trials
+        columns = [_conditionsColumn(dataframe.iloc[:, colN].to_numpy(),
+                                     coerceText=coerceText)
+                   for colN in range(len(fieldNames))]
+        trialList = [OrderedDict(zip(fieldNames, row))
+                     for row in zip(*columns)]
         return trialList, fieldNames
 
-    if (fileName.endswith(('.csv', '.tsv'))
+    # reuse the parsed file if it hasn't changed since it was last imported
+    cacheKey = _conditionsCacheKey(fileName)
+    isCached = cacheKey in _conditionsCache
+    if isCached:
+        trialList, fieldNames, mutableFields = _conditionsCache[cacheKey]
+        _conditionsCache.move_to_end(cacheKey)
+        trialList = _copyConditions(trialList, mutableFields)
+        fieldNames = list(fieldNames)
+        logging.debug(u"Using cached conditions from {}".format(fileName))
+    elif (fileName.endswith(('.csv', '.tsv'))
             or (fileName.endswith(('.xlsx', '.xls', '.xlsm')) and haveXlrd)):
         if fileName.endswith(('.csv', '.tsv', '.dlm')):  # delimited text file
             for sep, dec in [ (',', '.'), (';', ','),  # most common in US, EU
@@ -384,11 +474,12 @@ def importConditions(fileName, returnFieldNames=False, selection=""):
         _assertValidVarNames(fieldNames, fileName)
 
         # loop trialTypes
+        oldOpenpyxl = parse_version(openpyxl.__version__) < parse_version('2.0')
         trialList = []
         for rowN in range(1, nRows):  # skip header first row
             thisTrial = {}
             for colN in rangeCols:
-                if parse_version(openpyxl.__version__) < parse_version('2.0'):
+                if oldOpenpyxl:
                     val = ws.cell(_getExcelCellName(col=colN, row=0)).value
                 else:
                     # From 2.0, cells are referenced with 1-indexing: A1 == cell(row=1, column=1)
@@ -441,6 +532,16 @@ def importConditions(fileName, returnFieldNames=False, selection=""):
         raise IOError('Your conditions file should be an '
                       'xlsx, csv, dlm, tsv or pkl file')
 
+    if not isCached:
+        mutableFields = [name for name in fieldNames
+                         if any(isinstance(thisTrial.get(name), (list, dict))
+                                for thisTrial in trialList)]
+        _conditionsCache[cacheKey] = (trialList, list(fieldNames),
+                                      mutableFields)
+        while len(_conditionsCache) > _conditionsCacheSize:
+            _conditionsCache.popitem(last=False)
+        trialList = _copyConditions(trialList, mutableFields)
+
     # if we have a selection then try to parse it
     if isinstance(selection, basestring) and len(selection) > 0:
         selection = indicesFromString(selection)
@@ -525,11 +626,9 @@ def createFactorialTrialList(factors):
     return trialList
 
 
-def bootStraps(dat, n=1):
+def bootStraps(dat, n=1, chunkSize=None):
     """Create a list of n bootstrapped resamples of the data
 
-    SLOW IMPLEMENTATION (Python for-loop)
-
     Usage:
         ``out = bootStraps(dat, n=1)``
 
@@ -539,6 +638,10 @@ def bootStraps(dat, n=1):
             column is a different trial)
         n
             number of bootstrapped resamples to create
+        chunkSize
+            if given, the random indices are generated for at most this
+            many resamples at a time, limiting the temporary memory needed
+            (see :func:`iterBootStraps` to avoid holding all the resamples)
 
         out
             - dim[0]=conditions
@@ -551,18 +654,43 @@ def bootStraps(dat, n=1):
         # adds a dimension (arraynow has shape (1,Ntrials))
         dat = np.array([dat])
 
-    nTrials = dat.shape[1]
     # initialise a matrix to store output
     resamples = np.zeros(dat.shape + (n,), dat.dtype)
-    rand = np.random.rand
-    for stimulusN in range(dat.shape[0]):
-        thisStim = dat[stimulusN, :]  # fetch data for this stimulus
-        for sampleN in range(n):
-            indices = np.floor(nTrials * rand(nTrials)).astype('i')
-            resamples[stimulusN, :, sampleN] = np.take(thisStim, indices)
+    sampleN = 0
+    for chunk in iterBootStraps(dat, n, chunkSize=chunkSize or max(n, 1)):
+        resamples[:, :, sampleN:sampleN + chunk.shape[2]] = chunk
+        sampleN += chunk.shape[2]
     return resamples
 
 
+def iterBootStraps(dat, n=1, chunkSize=1000):
+    """Generate n bootstrapped resamples of the data in chunks, so that
+    large numbers of resamples can be processed without holding them all
+    in memory at once.
+
+    Usage::
+
+        for chunk in iterBootStraps(dat, n=10000, chunkSize=1000):
+            means = chunk.mean(axis=1)  # shape (conditions, resamples)
+
+    Where dat and n are as for :func:`bootStraps` and each chunk is an
+    array with dims [conditions, trials, resamples] holding up to
+    `chunkSize` resamples. The indices for each chunk are drawn in a
+    single call to the random number generator.
+    """
+    dat = np.asarray(dat)
+    if len(dat.shape) == 1:
+        dat = np.array([dat])
+
+    nConds, nTrials = dat.shape[:2]
+    # used to pick the row of each index in the chunk
+    rows = np.arange(nConds)[:, np.newaxis, np.newaxis]
+    for firstN in range(0, n, chunkSize):
+        nSamples = min(chunkSize, n - firstN)
+        indices = np.random.randint(nTrials, size=(nConds, nTrials, nSamples))
+        yield dat[rows, indices]
+
+
 def functionFromStaircase(intensities, responses, bins=10):
     """Create a psychometric function by binning data from a staircase
     procedure. Although the default is 10 bins Jon now always uses 'unique'
@@ -605,34 +733,29 @@ def functionFromStaircase(intensities, responses, bins=10):
         intensities = np.array(intensities)
         responses = np.array(responses)
 
-    # sort the responses
-    sort_ii = np.argsort(intensities)
-    sortedInten = np.take(intensities, sort_ii)
-    sortedResp = np.take(responses, sort_ii)
-
-    binnedResp = []
-    binnedInten = []
-    nPoints = []
     if bins == 'unique':
         intensities = np.round(intensities, decimals=8)
-        uniqueIntens = np.unique(intensities)
-        for thisInten in uniqueIntens:
-            theseResps = responses[intensities == thisInten]
-            binnedInten.append(thisInten)
-            binnedResp.append(np.mean(theseResps))
-            nPoints.append(len(theseResps))
+        binnedInten, binIndex, nPoints = np.unique(
+            intensities, return_inverse=True, return_counts=True)
+        binnedResp = np.bincount(binIndex.ravel(), weights=responses,
+                                 minlength=len(binnedInten)) / nPoints
     else:
+        # sort the responses
+        sort_ii = np.argsort(intensities)
+        sortedInten = np.take(intensities, sort_ii)
+        sortedResp = np.take(responses, sort_ii)
+
         pointsPerBin = len(intensities)/bins
-        for binN in range(bins):
-            start = int(round(binN * pointsPerBin))
-            stop = int(round((binN + 1) * pointsPerBin))
-            thisResp = sortedResp[start:stop]
-            thisInten = sortedInten[start:stop]
-            binnedResp.append(np.mean(thisResp))
-            binnedInten.append(np.mean(thisInten))
-            nPoints.append(len(thisInten))
-
-    return binnedInten, binnedResp, nPoints
+        edges = np.round(np.arange(bins + 1) * pointsPerBin).astype(int)
+        nPoints = np.diff(edges)
+        # bin means from the differences of cumulative sums
+        cumInten = np.concatenate([[0], np.cumsum(sortedInten)])
+        cumResp = np.concatenate([[0], np.cumsum(sortedResp)])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            binnedInten = np.diff(cumInten[edges]) / nPoints
+            binnedResp = np.diff(cumResp[edges]) / nPoints
+
+    return binnedInten.tolist(), binnedResp.tolist(), nPoints.tolist()
 
 
 def getDateStr(format="%Y_%b_%d_%H%M"):
@@ -15,19 +15,29 @@ from past.builtins import basestring
 import os
 import glob
 import copy
+import json
 import shutil
+import hashlib
+import tempfile
 from os.path import join, dirname, abspath, split
 from importlib import import_module  # helps python 2.7 -> 3.x migration
 from ._base import BaseVisualComponent, BaseComponent
 from ..params import Param
 from psychopy.localization import _translate
 from psychopy.experiment import py2js
+from psychopy import prefs, logging
 
 excludeComponents = ['BaseComponent', 'BaseVisualComponent',  # templates only
                      'EyetrackerComponent']  # this one isn't ready yet
 
 pluginComponents = {}  # components registered by loaded plugins
 
+# Finding the components means scanning (and importing from) every component
+# folder, so the results are memoized in this process and an index of which
+# modules provide components is kept on disk, both keyed by folder mtimes
+_componentsCache = {}  # {folder: (signature, components)}
+componentIndexFile = join(prefs.paths['userPrefsDir'], 'componentIndex.json')
+
 # try to remove old pyc files in case they're detected as components
 pycFiles = glob.glob(join(split(__file__)[0], "*.pyc"))
 for filename in pycFiles:
@@ -129,31 +139,52 @@ def getComponents(folder=None, fetchIcons=True):
     if not pth in os.sys.path:
         os.sys.path.insert(0, pth)
 
+    # nothing has been added, removed or edited since we last looked? (and
+    # nothing failed to import, which might work now, e.g. once a missing
+    # dependency is installed)
+    signature = _folderSignature(folder)
+    if folder in _componentsCache:
+        cachedSignature, cachedComponents = _componentsCache[folder]
+        if cachedSignature == signature:
+            return dict(cachedComponents)
+
     components = {}
 
-    # go through components in directory
-    cfiles = glob.glob(os.path.join(folder, '*.py'))  # old-style: just comp.py
-    # new-style: directories w/ __init__.py
-    dfiles = [d for d in os.listdir(folder)
-              if os.path.isdir(os.path.join(folder, d))]
-    for cmpfile in cfiles + dfiles:
-        cmpfile = os.path.split(cmpfile)[1]
-        if cmpfile[0] in '_0123456789':  # __init__.py, _base.py, leading digit
-            continue
+    index = _loadComponentIndex()
+    if folder in index and index[folder]['signature'] == signature:
+        # we already know which modules provide components, and which ones
+        # to try again
+        modNames = index[folder]['modules'] + index[folder].get('failed', [])
+    else:
+        # go through components in directory
+        cfiles = glob.glob(os.path.join(folder, '*.py'))  # old-style: comp.py
+        # new-style: directories w/ __init__.py
+        dfiles = [d for d in os.listdir(folder)
+                  if os.path.isdir(os.path.join(folder, d))]
+        modNames = []
+        for cmpfile in cfiles + dfiles:
+            cmpfile = os.path.split(cmpfile)[1]
+            if cmpfile[0] in '_0123456789':  # __init__.py, _base.py, digit
+                continue
+            if cmpfile.endswith('.py'):
+                cmpfile = cmpfile[:-3]
+            modNames.append(cmpfile)
+    componentModules = []
+    failedModules = []
+    for modName in modNames:
         # can't use imp - breaks py2app:
         # module = imp.load_source(file[:-3], fullPath)
         # v1.83.00 used exec(implicit-relative), no go for python3:
         # exec('import %s as module' % file[:-3])
 
         # importlib.import_module eases 2.7 -> 3.x migration
-        if cmpfile.endswith('.py'):
-            explicit_rel_path = pkg + '.' + cmpfile[:-3]
-        else:
-            explicit_rel_path = pkg + '.' + cmpfile
+        explicit_rel_path = pkg + '.' + modName
         try:
             module = import_module(explicit_rel_path, package=pkg)
         except ImportError:
-            continue  # not a valid module (no __init__.py?)
+            # not a valid module (no __init__.py?) or missing a dependency
+            failedModules.append(modName)
+            continue
         # check for orphaned pyc files (__file__ is not a .py file)
         if hasattr(module, '__file__'):
             if not module.__file__:
@@ -174,6 +205,8 @@ def getComponents(folder=None, fetchIcons=True):
                     attrib not in excludeComponents):
                 name = attrib
                 components[attrib] = getattr(module, attrib)
+                if modName not in componentModules:
+                    componentModules.append(modName)
 
                 # skip if this class was imported, not defined here
                 if module.__name__ != components[attrib].__module__:
@@ -186,9 +219,84 @@ def getComponents(folder=None, fetchIcons=True):
                 # assign the module categories to the Component
                 if not hasattr(components[attrib], 'categories'):
                     components[attrib].categories = ['Custom']
+
+    if not failedModules:
+        _componentsCache[folder] = (signature, dict(components))
+    else:
+        _componentsCache.pop(folder, None)
+    folderIndex = {'signature': signature, 'modules': componentModules,
+                   'failed': failedModules}
+    if index.get(folder) != folderIndex:
+        index[folder] = folderIndex
+        _saveComponentIndex(index)
     return components
 
 
+def _folderSignature(folder):
+    """A hash of the modification times and sizes of a components folder and
+    everything in it (including the contents of new-style component folders),
+    which changes whenever a component is added, removed or edited
+    """
+    signature = hashlib.md5(repr(os.path.getmtime(folder)).encode('utf-8'))
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for entry in sorted(dirs) + sorted(files):
+            if entry.endswith('.pyc'):
+                continue  # these change when modules are imported
+            path = join(root, entry)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # e.g. a broken link
+            signature.update(repr(
+                (os.path.relpath(path, folder), stat.st_mtime, stat.st_size)
+            ).encode('utf-8'))
+    return signature.hexdigest()
+
+
+def _loadComponentIndex():
+    """Load the on-disk index of which modules provide components (in each
+    folder) or return an empty one if it's missing or unreadable
+    """
+    try:
+        with open(componentIndexFile, 'r') as f:
+            index = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if not isinstance(index, dict):
+        return {}
+    return index
+
+
+def _saveComponentIndex(index):
+    # write a new file and swap it in, so other processes never read half
+    # of one
+    try:
+        fd, tmpPath = tempfile.mkstemp(
+            prefix='componentIndex', suffix='.tmp',
+            dir=dirname(componentIndexFile))
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmpPath, componentIndexFile)
+        except Exception:
+            os.remove(tmpPath)
+            raise
+    except (IOError, OSError):
+        # no harm done, we'll just need to scan the folders again next time
+        logging.debug("Couldn't save the component index to {}"
+                      .format(componentIndexFile))
+
+
+def clearComponentsCache():
+    """Forget the components found so far (in this process and on disk), so
+    that the component folders are scanned again
+    """
+    _componentsCache.clear()
+    if os.path.isfile(componentIndexFile):
+        os.remove(componentIndexFile)
+
+
 
 def getInitVals(params, target="PsychoPy"):
     """Works out a suitable initial value for a parameter (e.g. to go into the
@@ -8,6 +8,7 @@ from builtins import range
 from past.builtins import basestring
 import sys
 import glob
+import importlib
 from itertools import chain
 from psychopy import logging
 
@@ -18,6 +19,27 @@ except ImportError:
 
 __all__ = ['forp', 'cedrus', 'minolta', 'pr', 'crs', 'iolab']
 
+# the device modules can be slow to import (and most need optional libs) so
+# they are only loaded when they are first accessed, e.g. `hardware.crs`
+_submodules = ['bbtk', 'brainproducts', 'cedrus', 'crs', 'egi', 'emotiv',
+               'emulator', 'forp', 'iolab', 'joystick', 'keyboard',
+               'labhackers', 'labjacks', 'minolta', 'pr', 'qmix',
+               'serialdevice']
+
+
+def __getattr__(name):
+    """Import the device modules on first access
+    """
+    if name not in _submodules:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    # importing a submodule also adds it to our namespace
+    return importlib.import_module('.' + name, __name__)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules))
+
 
 def getSerialPorts():
     """Finds the names of all (virtual) serial ports present on the system
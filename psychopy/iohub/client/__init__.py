@@ -12,6 +12,7 @@ import time
 import subprocess
 import json
 import signal
+from operator import itemgetter
 from weakref import proxy
 
 import psutil
@@ -31,6 +32,7 @@ from ..devices.computer import Computer
 from ..devices.experiment import MessageEvent, LogEvent
 from ..constants import DeviceConstants, EventConstants
 from psychopy import constants
+from psychopy import clock
 
 getTime = Computer.getTime
 
@@ -58,9 +60,20 @@ class DeviceRPC(object):
     def __call__(self, *args, **kwargs):
         # Send the device method call request to the ioHub Server and wait
         # for the method return value sent back from the ioHub Server.
-        r = self.sendToHub(('EXP_DEVICE', 'DEV_RPC', self.device_class,
-                            self.method_name, args, kwargs))
-        
+        r = self.sendToHub(self._request(args, kwargs))
+        return self._result(r, kwargs)
+
+    def _request(self, args, kwargs):
+        request = ('EXP_DEVICE', 'DEV_RPC', self.device_class,
+                   self.method_name, args, kwargs)
+        if self.method_name == 'getEvents':
+            # events come back in batches, read with numpy, by event type
+            request += (True,)
+        return request
+
+    def _result(self, r, kwargs):
+        """The device method's return value, from the ioHub Server's reply
+        to the method call request."""
         if r is None:
             # print("r is None:",('EXP_DEVICE', 'DEV_RPC', self.device_class,
             #                 self.method_name, args, kwargs))
@@ -82,6 +95,11 @@ class DeviceRPC(object):
         elif 'as_type' in kwargs:
             asType = kwargs['as_type']
 
+        from ..net import unpackEventBatches
+        if self.device_class != 'Experiment':
+            return unpackEventBatches(r, asType, EventConstants.getClass)
+
+        r = unpackEventBatches(r)
         conversionMethod = self._returnarg
         if asType == 'dict':
             conversionMethod = ioHubConnection.eventListToDict
@@ -90,9 +108,6 @@ class DeviceRPC(object):
         elif asType == 'namedtuple':
             conversionMethod = ioHubConnection.eventListToNamedTuple
 
-        if self.device_class != 'Experiment':
-            return [conversionMethod(el) for el in r]
-
         EVT_TYPE_IX = DeviceEvent.EVENT_TYPE_ID_INDEX
         LOG_EVT = LogEvent.EVENT_TYPE_ID
         toBeLogged = [el for el in r if el[EVT_TYPE_IX] == LOG_EVT]
@@ -227,6 +242,178 @@ class ioHubDevices(object):
     def getNames(self):
         return self._devicesByName.keys()
 
+class BatchedReply(object):
+    """
+    The reply to a call queued in a RequestBatch. Its result is available
+    once the batch has been sent.
+    """
+
+    def __init__(self, convert=None):
+        self._convert = convert
+        self._reply = None
+        self._received = False
+
+    def _setReply(self, reply):
+        self._reply = reply
+        self._received = True
+
+    @property
+    def received(self):
+        """True once the batch has been sent and the reply received."""
+        return self._received
+
+    @property
+    def result(self):
+        """The value the call would have returned if it had not been batched.
+        Raises an ioHubError if the ioHub Server replied with an error, or a
+        RuntimeError if the batch has not been sent yet."""
+        if not self._received:
+            raise RuntimeError("The request batch has not been sent yet.")
+        reply = self._reply
+        # the server replies to failed requests with an error str
+        if isinstance(reply, basestring) and reply.find('ERROR') >= 0:
+            raise ioHubError(reply)
+        if reply is not None and ioHubConnection._isErrorReply(reply):
+            raise ioHubError(reply)
+        if self._convert is None:
+            return reply
+        return self._convert(reply)
+
+
+class RequestBatch(object):
+    """
+    Queues ioHubConnection and device method calls, then sends them to the
+    ioHub Server in a single request, which the server handles in order,
+    sending back the replies to all of them together. This saves a UDP round
+    trip between the PsychoPy and ioHub processes for all but one of the
+    calls.
+
+    Calls that return a value (getTime(), getEvents(), call() ...) give a
+    BatchedReply, whose result is available once the batch is sent. Calls
+    that don't (sendMessageEvent(), clearEvents()) are fire and forget: a
+    batch of only those is sent without waiting for the ioHub Server at all.
+
+    Create batches with ioHubConnection.batch().
+    """
+
+    def __init__(self, hubClient):
+        self.hubClient = hubClient
+        self._requests = []
+        self._replies = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.send()
+
+    def __len__(self):
+        return len(self._requests)
+
+    def _queue(self, request, convert=None, reply_wanted=True):
+        self._requests.append(request)
+        reply = BatchedReply(convert) if reply_wanted else None
+        self._replies.append(reply)
+        return reply
+
+    def send(self):
+        """Send the queued calls to the ioHub Server, waiting for the replies
+        if any are wanted. The batch is then empty and can be used again.
+
+        Returns:
+            int: The number of calls sent.
+        """
+        requests, replies = self._requests, self._replies
+        self._requests, self._replies = [], []
+        if not requests:
+            return 0
+        hub = self.hubClient
+        if not any(replies):
+            hub.udp_client.sendTo(('BATCH', False, requests))
+            return len(requests)
+        r = hub._sendToHubServer(('BATCH', True, requests))
+        if not (isIterable(r) and len(r) == 2 and r[0] == 'BATCH_RESULT'):
+            raise ioHubError(r)
+        for reply, result in zip(replies, r[1]):
+            if reply is not None:
+                reply._setReply(result)
+        return len(requests)
+
+    def call(self, method, *args, **kwargs):
+        """Queue a call of an ioHub device method, e.g.
+        ``batch.call(mouse.getPosition)``.
+
+        Args:
+            method: the method of an ioHubDeviceView that is run by the ioHub
+                    Server (not a method of the device's client class).
+
+        Returns:
+            BatchedReply: the method's return value once sent.
+        """
+        return self._queueDeviceCall(method, args, kwargs)
+
+    def _queueDeviceCall(self, method, args, kwargs, convert=None):
+        if not isinstance(method, DeviceRPC):
+            raise TypeError("{} is not an ioHub Server device method".format(
+                method))
+
+        def result(r):
+            r = method._result(r, kwargs)
+            return r if convert is None else convert(r)
+
+        return self._queue(method._request(args, kwargs), result)
+
+    def getTime(self):
+        """Queue ioHubConnection.getTime()."""
+        return self._queue(('RPC', 'getTime'), itemgetter(2))
+
+    def setPriority(self, level='normal', disable_gc=False):
+        """Queue ioHubConnection.setPriority()."""
+        return self._queue(('RPC', 'setPriority', [level, disable_gc]),
+                           itemgetter(2))
+
+    def getEvents(self, device_label=None, as_type='namedtuple'):
+        """Queue ioHubConnection.getEvents()."""
+        hub = self.hubClient
+        if device_label is None:
+            return self._queue(
+                ('GET_EVENTS', True),
+                lambda r: hub._allEventsFromReply(r, as_type))
+        return self._queueDeviceCall(
+            hub.devices.getDevice(device_label).getEvents, (),
+            dict(as_type=as_type))
+
+    def clearEvents(self, device_label='all'):
+        """Queue ioHubConnection.clearEvents(), without waiting for a
+        reply."""
+        hub = self.hubClient
+        if device_label in [None, '', False] or device_label.lower() == 'all':
+            hub.allEvents = []
+            self._queue(('RPC', 'clearEventBuffer',
+                         [bool(device_label), ]), reply_wanted=False)
+            device = hub.devices.getDevice('keyboard')
+        else:
+            device = hub.devices.getDevice(device_label)
+            if not device:
+                return
+            self._queue(('EXP_DEVICE', 'DEV_RPC', device.device_class,
+                         'clearEvents', (), {}), reply_wanted=False)
+        if hasattr(device, '_clearLocalEvents'):
+            device._clearLocalEvents()
+
+    def sendMessageEvent(self, text, category='', offset=0.0, sec_time=None):
+        """Queue ioHubConnection.sendMessageEvent(), without waiting for a
+        reply. The message is time stamped now, not when the batch is
+        sent."""
+        msg_evt = MessageEvent._createAsList(text, # pylint: disable=protected-access
+                                             category=category,
+                                             msg_offset=offset,
+                                             sec_time=sec_time)
+        self._queue(('EXP_DEVICE', 'EVENT_TX', [msg_evt, ]),
+                    reply_wanted=False)
+
+
 class ioHubConnection(object):
     """ioHubConnection is responsible for creating, sending requests to, and
     reading replies from the ioHub Process. This class is also used to
@@ -255,6 +442,12 @@ class ioHubConnection(object):
         # >> mouse position:  [-211.0, 371.0]
     """
     ACTIVE_CONNECTION = None
+    # socket the ioHub Server sends event notifications to, created when
+    # first needed by _armEventNotification().
+    _event_notifier = None
+    # the most (msgpack'ed) bytes of buffered TrialHandler records sent in
+    # one request, so it fits in a UDP packet
+    _cv_rows_packet_size = 60000
 
     def __init__(self, ioHubConfig=None, ioHubConfigAbsPath=None):
         if ioHubConfig:
@@ -290,6 +483,8 @@ class ioHubConnection(object):
         self._iohub_server_config = None
         self._shutdown_attempted = False
         self._cv_order = None
+        self._cv_rows = []
+        self._cv_rows_size = 0
 
         self.iohub_status = self._startServer(ioHubConfig, ioHubConfigAbsPath)
         if self.iohub_status != 'OK':
@@ -364,18 +559,26 @@ class ioHubConnection(object):
         Returns:
             tuple: List of event objects; object type controlled by 'as_type'.
         """
-        r = None
         if device_label is None:
-            events = self._sendToHubServer(('GET_EVENTS',))[1]
-            if events is None:
-                r = self.allEvents
-            else:
-                self.allEvents.extend(events)
-                r = self.allEvents
-            self.allEvents = []
-        else:
-            r = self.devices.getDevice(device_label).getEvents()
+            # events come back in batches, read with numpy, by event type
+            return self._allEventsFromReply(
+                self._sendToHubServer(('GET_EVENTS', True)), as_type)
+        return self.devices.getDevice(device_label).getEvents(
+            as_type=as_type)
+
+    def _allEventsFromReply(self, reply, as_type):
+        """The events from a GET_EVENTS reply as_type, after any events
+        received earlier."""
+        from ..net import unpackEventBatches
+        r = self._convertEvents(self.allEvents, as_type)
+        self.allEvents = []
+        events = reply[1]
+        if events:
+            r.extend(unpackEventBatches(events, as_type,
+                                        EventConstants.getClass))
+        return r
 
+    def _convertEvents(self, r, as_type):
         if r:
             if as_type == 'list':
                 return r
@@ -470,6 +673,27 @@ class ioHubConnection(object):
         self._sendToHubServer(('EXP_DEVICE', 'EVENT_TX', [msg_evt, ]))
         return True
 
+    def batch(self):
+        """Create a RequestBatch, which sends several calls to the ioHub
+        Server in one request, rather than waiting for the reply to each call
+        in turn. The calls are sent when the batch is used as a context
+        manager and the `with` block ends, or when its send() method is
+        called.
+
+        For example, to send a message, clear the keyboard events and get the
+        events of all devices with one request::
+
+            with io.batch() as batch:
+                batch.sendMessageEvent('TRIAL_END')
+                batch.clearEvents('keyboard')
+                events = batch.getEvents()
+            print(events.result)
+
+        Returns:
+            RequestBatch: an empty request batch.
+        """
+        return RequestBatch(self)
+
     def getHubServerConfig(self):
         """Returns a dict containing the current ioHub Server configuration.
 
@@ -521,7 +745,8 @@ class ioHubConnection(object):
         # TODO: Integrate iohub event collection done in this version of wait
         # with psychopy wait() and deprecate this method.
         """Pause the experiment script execution for delay seconds.
-        time.sleep() is used for delays > 0.02 sec (20 msec)
+        The process sleeps until psychopy.clock.waitSpinPeriod before the end
+        of the delay, and checks the time in a loop for the rest of it.
 
         During the wait period, events are received from iohub every
         'check_hub_interval' seconds, being buffered so they can be accessed
@@ -549,10 +774,12 @@ class ioHubConnection(object):
         if check_hub_interval < 0:
             check_hub_interval = 0
 
+        spinPeriod = clock.waitSpinPeriod
         if check_hub_interval > 0:
             remainingSec = targetEndTime - Computer.getTime()
-            while remainingSec > check_hub_interval+0.025:
-                time.sleep(check_hub_interval)
+            while remainingSec > check_hub_interval + spinPeriod + 0.005:
+                clock.sleepUntil(Computer.getTime() + check_hub_interval,
+                                 getTime)
                 events = self.getEvents()
                 if events:
                     self.allEvents.extend(events)
@@ -561,7 +788,7 @@ class ioHubConnection(object):
                 win32MessagePump()
                 remainingSec = targetEndTime - Computer.getTime()
 
-        time.sleep(max(0.0, targetEndTime - Computer.getTime() - 0.02))
+        clock.sleepUntil(targetEndTime - spinPeriod, getTime)
 
         while (targetEndTime - Computer.getTime()) > 0.0:
             pass
@@ -635,14 +862,60 @@ class ioHubConnection(object):
         r = self._sendToHubServer(cvt_rpc)
         return r[2]
 
-    def addTrialHandlerRecord(self, cv_row):
+    def addTrialHandlerRecord(self, cv_row, buffered=False):
         """Adds the values from a TriaHandler row / record to the iohub data
         file for future data analysis use.
 
+        With buffered=True the row is kept, and sent to the ioHub Server
+        with the other buffered rows in a single request, and saved to the
+        file in one go, when enough for a request have been added or when
+        flushTrialHandlerRecords() is called (e.g. at the end of each block).
+        Otherwise it's sent straight away, after any buffered rows.
+
+        A ValueError is raised if the row doesn't have a value for each
+        variable of the table (see createTrialHandlerRecordTable()).
+
         :param cv_row:
+        :param buffered:
         :return: None
 
         """
+        data = self._trialHandlerRecordData(cv_row)
+        if buffered:
+            size = len(self.udp_client.pack(data))
+            if self._cv_rows and \
+                    self._cv_rows_size + size > self._cv_rows_packet_size:
+                self.flushTrialHandlerRecords()
+            self._cv_rows.append(data)
+            self._cv_rows_size += size
+            return None
+        self.flushTrialHandlerRecords()
+        cvt_rpc = ('RPC', 'extendConditionVariableTable',
+                   (self.experimentID, self.experimentSessionID, data))
+        r = self._sendToHubServer(cvt_rpc)
+        return r[2]
+
+    def flushTrialHandlerRecords(self):
+        """Sends the TrialHandler records added with
+        addTrialHandlerRecord(cv_row, buffered=True) to the ioHub Server, to
+        be saved.
+
+        :return: The number of records saved.
+
+        """
+        if not self._cv_rows:
+            return 0
+        cvt_rpc = ('RPC', 'extendConditionVariableTableRows',
+                   (self.experimentID, self.experimentSessionID,
+                    self._cv_rows))
+        r = self._sendToHubServer(cvt_rpc)
+        # only dropped once the server has them, so if sending fails they're
+        # sent again by the next flush
+        self._cv_rows = []
+        self._cv_rows_size = 0
+        return r[2]
+
+    def _trialHandlerRecordData(self, cv_row):
         data = []
         if isinstance(cv_row, (list, tuple)):
             data = list(cv_row)
@@ -651,15 +924,14 @@ class ioHubConnection(object):
                 data.append(cv_row[cv_name])
         else:
             data = list(cv_row.values())
+        if self._cv_order is not None and len(data) != len(self._cv_order):
+            raise ValueError('TrialHandler records need %d values, not %d: %r'
+                             % (len(self._cv_order), len(data), cv_row))
 
         for i, d in enumerate(data):
             if isinstance(d, unicode):
                 data[i] = d.encode('utf-8')
-
-        cvt_rpc = ('RPC', 'extendConditionVariableTable',
-                   (self.experimentID, self.experimentSessionID, data))
-        r = self._sendToHubServer(cvt_rpc)
-        return r[2]
+        return data
 
     def registerWindowHandles(self, *winHandles):
         """
@@ -1128,6 +1400,32 @@ class ioHubConnection(object):
                 r.append(i)
         return r
 
+    def _armEventNotification(self, event_types, timeout):
+        """Ask the ioHub Server to notify this process when an event of one
+        of event_types arrives, within timeout sec.msec. Wait for the
+        notification with _waitForEventNotification().
+
+        Returns True if such events are already available, False if they are
+        not, or None if the server can not send notifications.
+        """
+        if self._event_notifier is None:
+            from ..net import EventNotificationSocket
+            self._event_notifier = EventNotificationSocket()
+        # any notification already received is for an earlier request
+        self._event_notifier.drain()
+        r = self._sendToHubServer(('NOTIFY_ON_EVENTS',
+                                   self._event_notifier.port,
+                                   list(event_types), timeout))
+        if isIterable(r) and len(r) == 2 and r[0] == 'NOTIFY_ON_EVENTS_RESULT':
+            return bool(r[1])
+        return None
+
+    def _waitForEventNotification(self, timeout):
+        """Block for up to timeout sec.msec until the ioHub Server sends the
+        notification requested with _armEventNotification(). Returns True if
+        it did."""
+        return self._event_notifier.wait(timeout)
+
     def _sendToHubServer(self, tx_data):
         """General purpose local <-> iohub server process UDP based
         request - reply code. The method blocks until the request is fulfilled
@@ -1279,12 +1577,25 @@ class ioHubConnection(object):
 
             self._shutdown_attempted = True
             TimeoutError = psutil.TimeoutExpired
+            try:
+                if self.udp_client and self._cv_rows:
+                    self.flushTrialHandlerRecords()
+            except Exception:  # pylint: disable=broad-except
+                printExceptionDetailsToStdErr()
             try:
                 if self.udp_client:  # if it isn't already garbage-collected
                     self.udp_client.sendTo(('STOP_IOHUB_SERVER',))
                     self.udp_client.close()
+                if self._event_notifier:
+                    self._event_notifier.close()
+                    self._event_notifier = None
                 if Computer.iohub_process:
-                    r = Computer.iohub_process.wait(timeout=5)
+                    timeout = 5.0
+                    if self.experimentID is not None:
+                        # the DataStore file is indexed as it's closed
+                        timeout = (self._iohub_server_config or {}).get(
+                            'stop_process_timeout', 60.0)
+                    r = Computer.iohub_process.wait(timeout=timeout)
                     print('ioHub Server Process Completed With Code: ', r)
             except TimeoutError:
                 print('Warning: TimeoutExpired, Killing ioHub Server process.')
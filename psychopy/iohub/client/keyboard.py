@@ -7,7 +7,8 @@ from __future__ import division, absolute_import, print_function
 from builtins import str
 #from past.builtins import unicode
 from collections import deque
-import time
+import sys
+from psychopy.clock import sleepUntil
 from ..client import ioHubDeviceView, ioEvent, DeviceRPC
 from ..devices import DeviceEvent, Computer
 from ..util import win32MessagePump
@@ -201,6 +202,12 @@ class Keyboard(ioHubDeviceView):
     KEY_PRESS = EventConstants.KEYBOARD_PRESS
     KEY_RELEASE = EventConstants.KEYBOARD_RELEASE
     _type2class = {KEY_PRESS: KeyboardPress, KEY_RELEASE: KeyboardRelease}
+    # waitForKeys() blocks for event notifications for at most
+    # _notification_wait sec at a time (so windows messages can be pumped on
+    # Windows), and asks for a new notification every _rearm_interval sec.
+    _notification_wait = 0.02 if sys.platform == 'win32' else 0.25
+    _rearm_interval = 0.5
+
     def __init__(self, ioclient, dev_cls_name, dev_config):
         super(Keyboard, self).__init__(ioclient, dev_cls_name, dev_config)
         self._events = dict()
@@ -394,6 +401,11 @@ class Keyboard(ioHubDeviceView):
 
         Returned events are sorted by time.
 
+        While waiting, the method blocks until the ioHub Server notifies it
+        that new keyboard events have arrived, rather than repeatedly asking
+        the server for events, so it uses almost no CPU and responds to a key
+        within about a msec.
+
         :param maxWait: Maximum seconds method waits for >=1 matching event.
                         If <=0.0, method functions the same as getKeys().
                         If None, the methods blocks indefinitely.
@@ -406,19 +418,63 @@ class Keyboard(ioHubDeviceView):
                       or Keyboard.KEY_RELEASE.
         :param clear: True (default) = clear returned events from event buffer,
                       False = leave the keyboard event buffer unchanged.
-        :param checkInterval: The time between geyKeys() calls while waiting.
-                              The method sleeps between geyKeys() calls,
-                              up until checkInterval*2.0 sec prior to the
-                              maxWait. After that time, keyboard events are
-                              constantly checked until the method times out.
+        :param checkInterval: Only used if the ioHub Server can not send event
+                              notifications. The time between getKeys() calls
+                              while waiting. The method sleeps between
+                              getKeys() calls, up until checkInterval*2.0 sec
+                              prior to the maxWait. After that time, keyboard
+                              events are constantly checked until the method
+                              times out.
 
         :return: tuple of KeyboardEvent instances, or ()
         """
         start_time = getTime()
         if maxWait is None:
             maxWait = 60000.0
-
         timeout = start_time + maxWait
+
+        key = self.getKeys(keys, chars, mods, duration, etype, clear)
+        # Don't wait if maxWait is <= 0
+        if key or maxWait <= 0:
+            win32MessagePump()
+            return key
+
+        if etype is None:
+            event_types = (self.KEY_PRESS, self.KEY_RELEASE)
+        else:
+            event_types = (etype,)
+        hub = self.hubClient
+        notified = hub._armEventNotification(event_types,
+                                             timeout - getTime())
+        if notified is None:
+            # an ioHub Server that can't send notifications
+            return self._pollForKeys(timeout, keys, chars, mods, duration,
+                                     etype, clear, checkInterval)
+        armed_time = getTime()
+        while True:
+            remaining = timeout - getTime()
+            if notified:
+                key = self.getKeys(keys, chars, mods, duration, etype, clear)
+                if key or remaining <= 0:
+                    return key
+                # events that didn't match, so wait for the next ones
+            elif remaining <= 0:
+                break
+            elif getTime() - armed_time < self._rearm_interval:
+                win32MessagePump()
+                notified = hub._waitForEventNotification(
+                    min(remaining, self._notification_wait))
+                continue
+            # (re)arm; the reply also says if events arrived meanwhile, so a
+            # lost notification only delays things by _rearm_interval.
+            notified = hub._armEventNotification(event_types, remaining)
+            armed_time = getTime()
+        return self.getKeys(keys, chars, mods, duration, etype, clear)
+
+    def _pollForKeys(self, timeout, keys, chars, mods, duration, etype, clear,
+                     checkInterval):
+        """waitForKeys() for ioHub Servers without event notification:
+        getKeys() is called every checkInterval sec until timeout."""
         key = []
 
         def pumpKeys():
@@ -428,19 +484,13 @@ class Keyboard(ioHubDeviceView):
             win32MessagePump()
             return key
 
-        # Don't wait if maxWait is <= 0
-        if maxWait <= 0:
-            key = pumpKeys()
-            return key
-
         while getTime() < (timeout - checkInterval * 2):
             # Pump events on pyglet windows if they exist
             ltime = getTime()
             key = pumpKeys()
             if key:
                 return key
-            sleep_dur = max(checkInterval - (getTime() - ltime), 0.0001)
-            time.sleep(sleep_dur)
+            sleepUntil(max(ltime + checkInterval, getTime() + 0.0001), getTime)
 
         while getTime() < timeout:
             key = pumpKeys()
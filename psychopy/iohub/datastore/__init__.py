@@ -15,6 +15,7 @@ from pkg_resources import parse_version
 from ..server import DeviceEvent
 from ..constants import EventConstants
 from ..errors import ioHubError, printExceptionDetailsToStdErr, print2err
+from .util import indexEventTables
 
 
 import tables
@@ -82,6 +83,7 @@ class DataStoreFile(object):
 
         self.flushCounter = self.settings.get('flush_interval', 32)
         self._eventCounter = 0
+        self._EXP_COND_DTYPE = None
 
         self.TABLES = dict()
         self._eventGroupMappings = dict()
@@ -297,27 +299,7 @@ class DataStoreFile(object):
     def initConditionVariableTable(
             self, experiment_id, session_id, np_dtype):
         expcv_table = None
-        exp_session = [('EXPERIMENT_ID','i4'),('SESSION_ID','i4')]
-        exp_session.extend(np_dtype)
-        np_dtype = []
-        for npctype in exp_session:
-            if isinstance(npctype[0], str):
-                nv = [str(npctype[0]),]
-                nv.extend(npctype[1:])
-                np_dtype.append(tuple(nv))
-            else:
-                np_dtype.append(npctype)
-
-        np_dtype2=[]
-        for adtype in np_dtype:
-            adtype2=[]
-            for a in adtype:
-                if isinstance(a, bytes): 
-                    a = str(a, 'utf-8')
-                adtype2.append(a)
-            np_dtype2.append(tuple(adtype2))
-        np_dtype = np_dtype2    
-        self._EXP_COND_DTYPE = np.dtype(np_dtype)
+        self._EXP_COND_DTYPE = conditionVariableDtype(np_dtype)
         try:
             expCondTableName = "EXP_CV_%d"%(experiment_id)
             experimentConditionVariableTable = getattr(self.emrtFile.root.data_collection.condition_variables, _f_get_child)(expCondTableName)
@@ -341,22 +323,40 @@ class DataStoreFile(object):
 
 
     def extendConditionVariableTable(self, experiment_id, session_id, data):
-        if self._EXP_COND_DTYPE is None:
+        return self.extendConditionVariableTableRows(
+            experiment_id, session_id, [data]) == 1
+
+    def extendConditionVariableTableRows(self, experiment_id, session_id,
+                                         rows):
+        """Append rows of condition variable values to the table in one go,
+        flushing it to disk as events are (see bufferedFlush). Returns the
+        number of rows appended, or False.
+
+        Raises ValueError (appending nothing) if a row doesn't have a value
+        for each condition variable."""
+        dtype = self._EXP_COND_DTYPE
+        if dtype is None:
             return False
+        n_values = len(dtype.names) - 2
+        for row in rows:
+            if len(row) != n_values:
+                raise ValueError('Condition variable rows need %d values, '
+                                 'not %d: %r' % (n_values, len(row), row))
         if self.emrtFile and 'EXP_CV' in self.TABLES:
-            temp = [experiment_id,session_id]
-            temp.extend(data)
-            data = temp
             try:
                 etable = self.TABLES['EXP_CV']
-                for i, d in enumerate(data):
-                    if isinstance(d, (list, tuple)):
-                        data[i] = tuple(d)
-                np_array = np.array([tuple(data), ],
-                                    dtype=self._EXP_COND_DTYPE)
+                np_array = np.empty(len(rows), dtype=dtype)
+                np_array['EXPERIMENT_ID'] = experiment_id
+                np_array['SESSION_ID'] = session_id
+                # fill a column at a time, rather than converting each row
+                for name, values in zip(dtype.names[2:], zip(*rows)):
+                    if dtype[name].names:
+                        # nested fields; values from msgpack are lists
+                        values = [tuple(v) for v in values]
+                    np_array[name] = values
                 etable.append(np_array)
-                self.bufferedFlush()
-                return True
+                self.bufferedFlush(len(rows))
+                return len(rows)
             except Exception:
                 printExceptionDetailsToStdErr()
         return False
@@ -455,6 +455,14 @@ class DataStoreFile(object):
 
     def close(self):
         self.flush()
+        if self.emrtFile.isopen and self.settings.get('index_on_close', True):
+            # so reading events by time or session doesn't scan the tables
+            try:
+                indexEventTables(self.emrtFile)
+                self.flush()
+            except Exception:
+                print2err('Error indexing event tables:')
+                printExceptionDetailsToStdErr()
         self._activeRunTimeConditionVariableTable = None
         self.emrtFile.close()
 
@@ -466,6 +474,39 @@ class DataStoreFile(object):
 
 ## -------------------- Utility Functions ------------------------ ##
 
+_conditionVariableDtypes = dict()
+
+
+def conditionVariableDtype(fields):
+    """
+    The numpy dtype of an experiment's condition variable table: an
+    EXPERIMENT_ID and SESSION_ID column, then a column for each of fields,
+    numpy dtype field descriptions as sent by the ioHub client (so with lists
+    rather than tuples, and maybe bytes names). The dtypes are cached.
+    """
+    key = repr(fields)
+    dtype = _conditionVariableDtypes.get(key)
+    if dtype is None:
+        descr = [('EXPERIMENT_ID', 'i4'), ('SESSION_ID', 'i4')]
+        descr.extend(_fieldDescription(f) for f in fields)
+        dtype = _conditionVariableDtypes[key] = np.dtype(descr)
+    return dtype
+
+
+def _fieldDescription(field):
+    description = []
+    for item in field:
+        if isinstance(item, bytes):
+            item = str(item, 'utf-8')
+        elif isinstance(item, (list, tuple)):
+            if item and isinstance(item[0], (list, tuple)):
+                item = [_fieldDescription(f) for f in item]  # nested fields
+            else:
+                item = tuple(item)  # shape
+        description.append(item)
+    return tuple(description)
+
+
 
 def close_open_data_files(verbose):
     open_files = tables.file._open_files
@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Part of the psychopy.iohub library.
+# Copyright (C) 2012-2016 iSolver Software Solutions
+# Distributed under the terms of the GNU General Public License (GPL).
+"""
+Export the tables of an ioHub DataStore HDF5 file to Apache Parquet or
+Feather (Arrow IPC) files, one file per table, for analysis with pandas, R,
+Arrow or Spark without PyTables.
+
+Event tables are read and written a chunk of rows at a time, so files larger
+than memory can be exported. String columns are written as categoricals
+(dictionary encoded), and each event can be given the condition variables of
+the trial it happened in.
+
+Writing files needs the pyarrow package; iterEventTableFrames() and
+TrialLookup only need pandas.
+"""
+from __future__ import division, absolute_import, print_function
+
+import os
+from builtins import object
+from multiprocessing import Pool
+
+import numpy
+import pandas
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+    havePyarrow = True
+except ImportError:
+    havePyarrow = False
+
+from .util import open_file
+
+#: The file formats exportDataStore() can write, and their file extensions.
+EXPORT_FORMATS = {'parquet': '.parquet', 'feather': '.feather'}
+
+_EVENTS_GROUP = '/data_collection/events'
+_CV_GROUP = '/data_collection/condition_variables'
+
+
+def _stringCategories(table, name, chunk_size):
+    """The distinct values of string column name, sorted"""
+    categories = numpy.array([], dtype=table.coldtypes[name])
+    for start in range(0, table.nrows, chunk_size):
+        values = table.read(start, min(start + chunk_size, table.nrows),
+                            field=name)
+        categories = numpy.union1d(categories, values)
+    return categories
+
+
+def _categorical(values, categories):
+    """values of a bytes column as a pandas Categorical of (decoded)
+    categories, without decoding each value"""
+    codes = numpy.searchsorted(categories, values)
+    return pandas.Categorical.from_codes(
+        codes, [c.decode('utf-8', 'replace') for c in categories])
+
+
+def _toDataFrame(rows, string_categories):
+    frame = pandas.DataFrame(rows)
+    for name, categories in string_categories.items():
+        frame[name] = _categorical(rows[name], categories)
+    return frame
+
+
+def _readTableFrame(table):
+    """A whole (small) table as a DataFrame, strings as categoricals"""
+    rows = table.read()
+    string_categories = dict((name, numpy.unique(rows[name]))
+                             for name in table.colnames
+                             if table.coldtypes[name].kind == 'S')
+    return _toDataFrame(rows, string_categories)
+
+
+class TrialLookup(object):
+    """
+    Gives events the condition variables of the trial they happened in: the
+    row of the experiment's condition variable table, of the same session,
+    whose trial_start <= event time <= trial_end. Events between trials get
+    missing values (NaN).
+
+    Args:
+        conditions (DataFrame): The condition variable table, including its
+                                SESSION_ID column.
+        trial_start (str): The condition variable with the start time of
+                           each trial.
+        trial_end (str): The condition variable with the end time of each
+                         trial.
+    """
+
+    def __init__(self, conditions, trial_start, trial_end):
+        for name in (trial_start, trial_end):
+            if name not in conditions.columns:
+                raise KeyError('No condition variable named %s' % name)
+        self.trial_start = trial_start
+        self.trial_end = trial_end
+        conditions = conditions.reset_index(drop=True)
+        # the trials of each session, by start time
+        self._sessions = dict()
+        for session_id, rows in conditions.groupby('SESSION_ID').groups.items():
+            rows = numpy.asarray(rows)
+            starts = conditions[trial_start].values[rows]
+            order = numpy.argsort(starts, kind='mergesort')
+            self._sessions[session_id] = (starts[order],
+                                          conditions[trial_end].values[rows][
+                                              order],
+                                          rows[order])
+        # an extra row of missing values, for events that aren't in a trial
+        self._conditions = conditions.drop(
+            ['EXPERIMENT_ID', 'SESSION_ID'], axis=1).reindex(
+                range(len(conditions) + 1))
+
+    def trialRows(self, session_ids, times):
+        """The condition variable table row of the trial each event is in, or
+        -1 if it isn't in one."""
+        trial_rows = numpy.full(len(times), -1, dtype=numpy.int64)
+        for session_id in numpy.unique(session_ids):
+            if session_id not in self._sessions:
+                continue
+            starts, ends, rows = self._sessions[session_id]
+            events = numpy.flatnonzero(session_ids == session_id)
+            event_times = times[events]
+            trial = numpy.searchsorted(starts, event_times, 'right') - 1
+            in_trial = trial >= 0
+            in_trial[in_trial] = event_times[in_trial] <= \
+                ends[trial[in_trial]]
+            trial_rows[events[in_trial]] = rows[trial[in_trial]]
+        return trial_rows
+
+    def join(self, frame, time_column='time'):
+        """frame with the condition variables of each event's trial added,
+        prefixed with cv_ if frame already has a column of the same name"""
+        trial_rows = self.trialRows(frame['session_id'].values,
+                                    frame[time_column].values)
+        joined = self._conditions.iloc[trial_rows].reset_index(drop=True)
+        joined.columns = ['cv_' + c if c in frame.columns else c
+                          for c in joined.columns]
+        joined.index = frame.index
+        return pandas.concat([frame, joined], axis=1)
+
+
+def iterEventTableFrames(table, chunk_size=100000, trials=None):
+    """
+    The rows of an ioHub event table as pandas DataFrames of chunk_size rows,
+    with string columns as categoricals of the same categories in every
+    chunk. If trials is a TrialLookup, each event's trial condition
+    variables are added.
+    """
+    string_categories = dict((name, _stringCategories(table, name, chunk_size))
+                             for name in table.colnames
+                             if table.coldtypes[name].kind == 'S')
+    for start in range(0, table.nrows, chunk_size):
+        rows = table.read(start, min(start + chunk_size, table.nrows))
+        frame = _toDataFrame(rows, string_categories)
+        if trials is not None:
+            frame = trials.join(frame)
+        yield frame
+
+
+class _FileWriter(object):
+    """Writes DataFrames with the same columns to a Parquet or Feather file,
+    each as a row group / record batch."""
+
+    def __init__(self, path, file_format, compression):
+        self.path = path
+        self.file_format = file_format
+        self.compression = compression
+        self._writer = None
+        self._schema = None
+
+    def write(self, frame):
+        if self._writer is None:
+            arrow_table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            self._schema = arrow_table.schema
+            if self.file_format == 'parquet':
+                self._writer = pyarrow.parquet.ParquetWriter(
+                    self.path, self._schema,
+                    compression=self.compression or 'snappy')
+            else:
+                options = pyarrow.ipc.IpcWriteOptions(
+                    compression=self.compression)
+                self._writer = pyarrow.ipc.new_file(self.path, self._schema,
+                                                    options=options)
+        else:
+            arrow_table = pyarrow.Table.from_pandas(
+                frame, schema=self._schema, preserve_index=False)
+        self._writer.write_table(arrow_table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _writeFrames(frames, path, file_format, compression):
+    writer = _FileWriter(path, file_format, compression)
+    try:
+        for frame in frames:
+            writer.write(frame)
+    finally:
+        writer.close()
+    return path
+
+
+def _exportEventTable(args):
+    """Export one event table; run in a worker process if exporting in
+    parallel, so opens the HDF5 file itself."""
+    (hdf_file_path, table_path, path, file_format, compression, chunk_size,
+     trials) = args
+    hubFile = open_file(hdf_file_path, 'r')
+    try:
+        table = hubFile.get_node(table_path)
+        return _writeFrames(iterEventTableFrames(table, chunk_size, trials),
+                            path, file_format, compression)
+    finally:
+        hubFile.close()
+
+
+def exportDataStore(hdf_file_path, output_folder, file_format='parquet',
+                    event_tables=None, trial_start=None, trial_end=None,
+                    chunk_size=100000, processes=1, compression=None):
+    """
+    Export the tables of an ioHub DataStore HDF5 file to Parquet or Feather
+    files in output_folder, named after each table: each event table with at
+    least one event, the session meta data, and each experiment's condition
+    variables (EXP_CV_<experiment_id>).
+
+    Args:
+        hdf_file_path (str): The DataStore file.
+        output_folder (str): Where to save the files. Created if needed.
+        file_format (str): 'parquet' or 'feather'.
+        event_tables (list): Names of the event tables to export, e.g.
+                             ['MonocularEyeSampleEvent']. All by default.
+        trial_start (str): The condition variable with the start time of each
+                           trial. If given with trial_end, events get the
+                           condition variables of their trial.
+        trial_end (str): The condition variable with the end time of each
+                         trial.
+        chunk_size (int): The number of event rows read and written at once.
+        processes (int): The number of processes exporting event tables in
+                         parallel.
+        compression (str): The compression codec, by default 'snappy' for
+                           Parquet files and none for Feather files.
+
+    Returns:
+        (dict): The path of the file each table was exported to, by table
+        name.
+    """
+    if not havePyarrow:
+        raise ImportError('Exporting ioHub data to Parquet or Feather files '
+                          'needs the pyarrow package.')
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError('file_format must be one of %s, not %s' % (
+            sorted(EXPORT_FORMATS), file_format))
+    extension = EXPORT_FORMATS[file_format]
+    if not os.path.isdir(output_folder):
+        os.makedirs(output_folder)
+
+    def outputPath(table):
+        return os.path.join(output_folder, table.name + extension)
+
+    exported = dict()
+    event_jobs = []
+    hubFile = open_file(hdf_file_path, 'r')
+    try:
+        sessions = hubFile.get_node('/data_collection/session_meta_data')
+        exported[sessions.name] = _writeFrames(
+            [_readTableFrame(sessions)], outputPath(sessions), file_format,
+            compression)
+        trials = None
+        cv_frames = []
+        if _CV_GROUP in hubFile:
+            for table in hubFile.walk_nodes(_CV_GROUP, classname='Table'):
+                frame = _readTableFrame(table)
+                exported[table.name] = _writeFrames(
+                    [frame], outputPath(table), file_format, compression)
+                cv_frames.append(frame)
+        if trial_start and trial_end and cv_frames:
+            trials = TrialLookup(pandas.concat(cv_frames, ignore_index=True),
+                                 trial_start, trial_end)
+        for table in hubFile.walk_nodes(_EVENTS_GROUP, classname='Table'):
+            if table.nrows == 0:
+                continue
+            if event_tables is not None and table.name not in event_tables:
+                continue
+            event_jobs.append((hdf_file_path, table._v_pathname,
+                               outputPath(table), file_format, compression,
+                               chunk_size, trials))
+    finally:
+        hubFile.close()
+
+    names = [os.path.basename(job[1]) for job in event_jobs]
+    if processes > 1 and len(event_jobs) > 1:
+        pool = Pool(min(processes, len(event_jobs)))
+        try:
+            paths = pool.map(_exportEventTable, event_jobs)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        paths = [_exportEventTable(job) for job in event_jobs]
+    exported.update(zip(names, paths))
+    return exported
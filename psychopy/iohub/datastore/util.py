@@ -10,6 +10,7 @@ from builtins import next
 from past.builtins import basestring
 from builtins import object
 import numbers  # numbers.Integral is like (int, long) but supports Py3
+import numpy
 from tables import *
 import os
 from collections import namedtuple
@@ -35,6 +36,10 @@ else:
 
 _hubFiles = []
 
+#: Event table columns given a completely sorted index when an ioHub
+#: DataStore file is closed, see indexEventTables().
+INDEXED_EVENT_COLUMNS = ('time', 'session_id', 'device_time')
+
 def openHubFile(filepath, filename, mode):
     """
     Open an HDF5 DataStore file and register it so that it is closed even on interpreter crash.
@@ -45,6 +50,36 @@ def openHubFile(filepath, filename, mode):
     return hubFile
 
 
+def indexEventTables(hubFile, columns=INDEXED_EVENT_COLUMNS):
+    """
+    Give the columns of each event table in an open HDF5 DataStore file a
+    completely sorted index (CSI), if they don't have an up to date one
+    already. Queries on the columns then use the index rather than reading
+    the whole table, and the sorted values can be read directly from it
+    (see ExperimentDataAccessUtility.getEventWindows).
+
+    Returns the number of indexes created.
+    """
+    index_count = 0
+    if '/data_collection/events' not in hubFile:
+        return index_count
+    for table in hubFile.walk_nodes('/data_collection/events',
+                                    classname='Table'):
+        if table.nrows == 0:
+            continue
+        for name in columns:
+            if name not in table.colnames:
+                continue
+            col = table.cols._f_col(name)
+            if col.is_indexed:
+                if col.index.is_csi and not col.index.dirty:
+                    continue
+                col.remove_index()
+            col.create_csindex()
+            index_count += 1
+    return index_count
+
+
 def displayDataFileSelectionDialog(starting_dir=None):
     """Shows a FileDialog and lets you select a .hdf5 file to open for
     processing."""
@@ -146,6 +181,7 @@ class ExperimentDataAccessUtility(object):
         self._experimentCode = experimentCode
         self._sessionCodes = sessionCodes
         self._lastWhereClause = None
+        self._sortedTimes = dict()
 
         try:
             self.hdfFile = openHubFile(hdfFilePath, hdfFileName, mode)
@@ -267,7 +303,9 @@ class ExperimentDataAccessUtility(object):
                 return None
 
             result = []
-            where_cls = '(%s == b"%s") & (class_type_id == 1)'%(event_column, event_value)
+            if isinstance(event_value, basestring):
+                event_value = 'b"%s"' % event_value
+            where_cls = '(%s == %s) & (class_type_id == 1)'%(event_column, event_value)
             for row in klassTables.where(where_cls):
                 result.append(row.fetch_all_fields())
 
@@ -568,6 +606,142 @@ class ExperimentDataAccessUtility(object):
         """
         return self.getEventTable(event_type).iterrows()
 
+    def getEventChunkIterator(self, event_type, chunk_size=100000,
+                              condition=None, fields=None):
+        """
+        Iterate over the events of a type a chunk of rows at a time, so that
+        tables too large to read into memory can still be processed with
+        numpy.
+
+        Args:
+            event_type (int or str): The event type, as for getEventTable.
+            chunk_size (int): The number of table rows in each chunk.
+            condition (str): Optional PyTables condition, e.g.
+                             'session_id == 2', that events must match.
+                             Chunks are then smaller than chunk_size.
+            fields (list): Optional names of the event fields to get.
+
+        Returns:
+            (iterator): numpy structured arrays of the events in each chunk.
+        """
+        table = self._getEventTableOrRaise(event_type)
+        for start in range(0, table.nrows, chunk_size):
+            stop = min(start + chunk_size, table.nrows)
+            if condition is None:
+                chunk = table.read(start, stop)
+            else:
+                chunk = getattr(table, read_where)(condition, start=start,
+                                                   stop=stop)
+            if fields is not None:
+                chunk = chunk[list(fields)]
+            yield chunk
+
+    def getEventWindows(self, event_type, start_times, end_times,
+                        session_id=None, fields=None, time_column='time'):
+        """
+        Get the events of a type within each of a set of time windows, for
+        example the eye samples of each trial, without a query of the table
+        for each window.
+
+        The times of the events (of the session) are read once, in time
+        order, from the completely sorted index on the time column if it has
+        one, and kept for later calls. The windows are then found with
+        numpy.searchsorted, and the events in all of them read together.
+
+        Args:
+            event_type (int or str): The event type, as for getEventTable.
+            start_times (array): The start time of each window.
+            end_times (array): The end time of each window. Events at the
+                               start and end times are in the window.
+            session_id (int): Only get events of this session. If None, the
+                              events of all sessions are used.
+            fields (list): Optional names of the event fields to get.
+            time_column (str): The time field the windows are for, e.g.
+                               'device_time'.
+
+        Returns:
+            (list): numpy structured arrays of the events in each window, in
+            time order. They are views of a single array.
+        """
+        table = self._getEventTableOrRaise(event_type)
+        start_times = numpy.atleast_1d(numpy.asarray(start_times, float))
+        end_times = numpy.atleast_1d(numpy.asarray(end_times, float))
+        if start_times.shape != end_times.shape or start_times.ndim != 1:
+            raise ValueError('start_times and end_times must be 1D arrays of '
+                             'the same length')
+        times, rows = self._getSortedTimes(table, session_id, time_column)
+        lo = numpy.searchsorted(times, start_times, 'left')
+        hi = numpy.maximum(numpy.searchsorted(times, end_times, 'right'), lo)
+        lengths = hi - lo
+        offsets = numpy.zeros(len(lengths) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=offsets[1:])
+        # rows of all the windows, one after the other
+        positions = numpy.arange(offsets[-1]) + numpy.repeat(
+            lo - offsets[:-1], lengths)
+        coords = rows[positions]
+        if len(coords) == 0:
+            events = table.read(0, 0)
+        elif coords[-1] - coords[0] == len(coords) - 1 and \
+                (numpy.diff(coords) == 1).all():
+            events = table.read(coords[0], coords[-1] + 1)
+        else:
+            events = table.read_coordinates(coords)
+        if fields is not None:
+            events = events[list(fields)]
+        return [events[offsets[i]:offsets[i + 1]]
+                for i in range(len(lengths))]
+
+    def createIndexes(self, columns=INDEXED_EVENT_COLUMNS):
+        """
+        Index the event tables of a DataStore file opened with mode 'a', as
+        ioHub does when it closes a file, e.g. for files saved before it did
+        so. See indexEventTables.
+
+        Returns:
+            (int): The number of indexes created.
+        """
+        self._sortedTimes.clear()
+        return indexEventTables(self.hdfFile, columns)
+
+    def _getEventTableOrRaise(self, event_type):
+        table = self.getEventTable(event_type)
+        if table is None:
+            raise ExperimentDataAccessException(
+                'No event table for event_type {0}'.format(event_type))
+        return table
+
+    def _getSortedTimes(self, table, session_id, time_column):
+        """The times of the events in table (of session_id, or of all
+        sessions if None) in time order, and the table row of each."""
+        key = (table._v_pathname, session_id, time_column, table.nrows)
+        if key in self._sortedTimes:
+            return self._sortedTimes[key]
+        col = table.cols._f_col(time_column)
+        rows = None
+        if session_id is not None:
+            rows = table.get_where_list('session_id == %d' % session_id)
+            times = table.read_coordinates(rows, field=time_column)
+        elif col.is_indexed and col.index.is_csi and not col.index.dirty:
+            rows = col.index.read_indices()
+            times = col.index.read_sorted()
+            # events at the same time should be in table order, as they are
+            # otherwise, but the index doesn't keep them in any order
+            ties = times[1:] == times[:-1]
+            if (ties & (rows[1:] < rows[:-1])).any():
+                order = numpy.lexsort((rows, times))
+                times = times[order]
+                rows = rows[order]
+        else:
+            times = col[:]
+        if rows is None:
+            rows = numpy.arange(len(times))
+        if len(times) > 1 and not (times[1:] >= times[:-1]).all():
+            order = numpy.argsort(times, kind='mergesort')
+            times = times[order]
+            rows = rows[order]
+        self._sortedTimes[key] = times, rows
+        return times, rows
+
     def close(self):
         """Close the ExperimentDataAccessUtility and associated DataStore
         File."""
@@ -575,6 +749,7 @@ class ExperimentDataAccessUtility(object):
         if self.hdfFile in _hubFiles:
             _hubFiles.remove(self.hdfFile)
         self.hdfFile.close()
+        self._sortedTimes = dict()
 
         self.experimentCodes = None
         self.hdfFilePath = None
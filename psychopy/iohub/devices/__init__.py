@@ -9,7 +9,6 @@ from __future__ import division, absolute_import, print_function
 from builtins import zip
 from builtins import object
 import collections
-import copy
 import os
 from collections import deque
 from operator import itemgetter
@@ -560,7 +559,38 @@ class Device(ioObject):
                     evt_filter_ids = event_filter.input_event_types.get(
                         event_type_id, [])
                     if input_evt_filter_id in evt_filter_ids:
-                        event_filter._addInputEvent(copy.deepcopy(e))
+                        # filters change their events, so get a copy; the
+                        # event attributes are all immutable values
+                        event_filter._addInputEvent(list(e))
+
+    def _handleEvents(self, events):
+        """Handles a list of events of the same type, as _handleEvent()
+        handles one event, but with the event buffer and each filter's
+        interest in the event type looked up once, and each filter
+        processing all the events it wants together."""
+        if type(self)._handleEvent is not Device._handleEvent:
+            # a subclass handles events differently
+            for e in events:
+                self._handleEvent(e)
+            return
+        event_type_id = events[0][DeviceEvent.EVENT_TYPE_ID_INDEX]
+        self._iohub_event_buffer.setdefault(
+            event_type_id, deque(
+                maxlen=self.event_buffer_length)).extend(events)
+
+        filter_id_index = DeviceEvent.EVENT_FILTER_ID_INDEX
+        for event_filter in list(self._filters.values()):
+            if event_filter.enable is True:
+                current_filter_id = event_filter.filter_id
+                evt_filter_ids = event_filter.input_event_types.get(
+                    event_type_id)
+                if not evt_filter_ids:
+                    continue
+                filter_events = [list(e) for e in events
+                                 if e[filter_id_index] != current_filter_id
+                                 and e[filter_id_index] in evt_filter_ids]
+                if filter_events:
+                    event_filter._addInputEvents(filter_events)
 
     def _getNativeEventBuffer(self):
         return self._native_event_buffer
@@ -722,6 +752,39 @@ class Device(ioObject):
         """
         return False
 
+    def _getIOHubEventObjects(self, native_events):
+        """Called by the ioHub Process with all the native events received
+        since it last processed the device's events, returning their ioHub
+        Event representations (see _getIOHubEventObject).
+
+        By default each event is converted with _getIOHubEventObject. Devices
+        that receive events at a high rate (e.g. eye tracker samples) can
+        convert them all at once instead, e.g. as a numpy array.
+
+        The events have already been taken from the native event buffer, so
+        an error converting one of them is reported and only that event is
+        dropped. Overrides should also not raise for the whole batch.
+
+        Args:
+            native_events (list): the native events, in the order received.
+
+        Returns:
+            list: The ioHub Events in list form.
+
+        """
+        iohub_events = []
+        for native_event in native_events:
+            try:
+                evt = self._getIOHubEventObject(native_event)
+            except Exception:
+                print2err('Error converting native event of ', self, ': ',
+                          native_event)
+                printExceptionDetailsToStdErr()
+                continue
+            if evt:
+                iohub_events.append(evt)
+        return iohub_events
+
     def _getIOHubEventObject(self, native_event_data):
         """The _getIOHubEventObject method is called by the ioHub Process to
         convert new native device event objects that have been received to the
@@ -119,6 +119,12 @@ class DeviceEventFilter(object):
         self._input_events.append(evt)
         self.process()
 
+    def _addInputEvents(self, evts):
+        """Takes a list of events from parent device, processing them
+        together."""
+        self._input_events.extend(evts)
+        self.process()
+
     def _removeOutputEvents(self):
         """Called by the the iohub Server when processing device events."""
         oevts = self._output_events
@@ -67,11 +67,7 @@ def run(rootScriptPathDir, configFilePath):
 
         tlet = gevent.spawn(s.pumpMsgTasklet, msgpump_interval)
         glets.append(tlet)
-        for m in s.deviceMonitors:
-            m.start()
-            glets.append(m)
-
-        tlet = gevent.spawn(s.processEventsTasklet, 0.01)
+        tlet = gevent.spawn(s.pollDevicesTasklet, 0.01)
         glets.append(tlet)
 
         if Computer.psychopy_process:
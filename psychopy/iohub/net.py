@@ -5,8 +5,12 @@
 from __future__ import division, absolute_import
 
 import struct
+from collections import deque, OrderedDict
+from numbers import Integral
 from weakref import proxy
 
+import numpy
+
 from gevent import sleep, Greenlet
 import msgpack
 try:
@@ -17,12 +21,147 @@ except ImportError:
     print2err("Warning: msgpack_numpy could not be imported. ",
               "This may cause issues for iohub.")
 
-from .devices import Computer
+from .devices import Computer, DeviceEvent
 from .errors import print2err, printExceptionDetailsToStdErr
-from .util import NumPyRingBuffer as RingBuffer
 
 MAX_PACKET_SIZE = 64 * 1024
 
+# msgpack ExtType code of event batches, see packEventBatches()
+EVENT_BATCH_EXT_TYPE = 1
+
+
+def packEventBatches(events, eventClass):
+    """Packs a list of events (each an attribute list) as one event batch per
+    event type, for a GET_EVENTS reply to a client that asked for them.
+
+    Each batch is a msgpack ExtType holding the event type, the numpy dtype
+    and the raw bytes of a numpy record array of the events, so the client
+    can read the events with numpy.frombuffer rather than unpacking each
+    attribute. The dtype has the fields of the event class's NUMPY_DTYPE,
+    but so that the values are sent as they are, with nothing truncated,
+    floats are 64 bit, integers are the smallest type that holds the batch's
+    values and strings are utf-8 encoded and as long as the longest in the
+    batch.
+
+    Events of types without an event class (given by eventClass(type id)),
+    or that don't fit its dtype (including non-integer values of integer
+    fields), are left as lists. If no events could be
+    batched, events is returned as it is.
+    """
+    etype_index = DeviceEvent.EVENT_TYPE_ID_INDEX
+    by_type = OrderedDict()
+    for e in events:
+        by_type.setdefault(e[etype_index], []).append(e)
+
+    packed = []
+    batched = False
+    for etype, type_events in by_type.items():
+        try:
+            dtype = eventClass(etype).NUMPY_DTYPE
+            columns = list(zip(*type_events))
+            if len(columns) != len(dtype.names):
+                raise ValueError('events do not match their dtype')
+            fields = []
+            for i, name in enumerate(dtype.names):
+                ftype = dtype.fields[name][0]
+                if ftype.kind in 'SU':
+                    col = [v if isinstance(v, bytes) else
+                           str(v).encode('utf-8') for v in columns[i]]
+                    columns[i] = col
+                    ftype = numpy.dtype('S%d' % max(max(map(len, col)), 1))
+                elif ftype.kind == 'f':
+                    ftype = numpy.dtype(numpy.float64)
+                elif ftype.kind in 'iu':
+                    if not all(isinstance(v, Integral) for v in columns[i]):
+                        raise ValueError('%s values are not all integers'
+                                         % name)
+                    ftype = numpy.result_type(
+                        numpy.min_scalar_type(min(columns[i])),
+                        numpy.min_scalar_type(max(columns[i])))
+                fields.append((name, ftype.str))
+            batch = numpy.empty(len(type_events), dtype=fields)
+            for name, col in zip(dtype.names, columns):
+                batch[name] = col
+        except Exception: # pylint: disable=broad-except
+            packed.extend(type_events)
+            continue
+        packed.append(msgpack.ExtType(EVENT_BATCH_EXT_TYPE, msgpack.packb(
+            [etype, fields, batch.tobytes()], use_bin_type=True)))
+        batched = True
+    # the client only sorts replies with batches, so without any the events
+    # stay in time order
+    return packed if batched else events
+
+
+def unpackExtType(code, data):
+    """msgpack ext_hook that unpacks event batches as numpy record arrays."""
+    if code == EVENT_BATCH_EXT_TYPE:
+        _, fields, raw = msgpack.unpackb(data, raw=False)
+        dtype = numpy.dtype([(str(name), str(ftype))
+                             for name, ftype in fields])
+        return numpy.frombuffer(raw, dtype=dtype)
+    return msgpack.ExtType(code, data)
+
+
+# the event class method making an event of each as_type from its values
+_EVENT_MAKERS = {'namedtuple': 'createEventAsNamedTuple',
+                 'dict': 'createEventAsDict',
+                 'object': 'createEventAsClass'}
+
+
+def unpackEventBatches(events, as_type='list', eventClass=None):
+    """Converts a GET_EVENTS (or device getEvents) reply with event batches
+    to events in time order, as attribute lists (with str string attributes,
+    as for events that weren't batched) or, if as_type is 'namedtuple',
+    'dict' or 'object', as made by the event class (given by
+    eventClass(type id)).
+
+    The events of each batch are made straight from its columns, in one
+    pass rather than unpacking them all as lists to be converted. A reply without batches is
+    returned as it is if as_type is 'list' (or unknown).
+    """
+    make_name = _EVENT_MAKERS.get(as_type)
+    if make_name is None:
+        if not any(isinstance(e, numpy.ndarray) for e in events):
+            return events
+
+        def maker(etype):
+            return list
+    else:
+        def maker(etype):
+            return getattr(eventClass(etype), make_name)
+
+    etype_index = DeviceEvent.EVENT_TYPE_ID_INDEX
+    time_index = DeviceEvent.EVENT_HUB_TIME_INDEX
+    result = []
+    times = []
+    for batch in events:
+        if not isinstance(batch, numpy.ndarray):
+            result.append(maker(batch[etype_index])(batch))
+            times.append([batch[time_index]])
+            continue
+        if not len(batch):
+            continue
+        columns = []
+        for name in batch.dtype.names:
+            col = batch[name]
+            if col.dtype.kind == 'S':
+                col = numpy.char.decode(col, 'utf-8')
+            columns.append(col.tolist())
+        make = maker(columns[etype_index][0])
+        if make is list:
+            result.extend(map(list, zip(*columns)))
+        else:
+            # event classes can convert the values in place
+            result.extend(make(list(values)) for values in zip(*columns))
+        times.append(batch[batch.dtype.names[time_index]])
+    if len(times) < 2:
+        return result
+    # a stable sort, so events at the same time stay in the order sent
+    order = numpy.argsort(numpy.concatenate(times), kind='mergesort')
+    return [result[i] for i in order.tolist()]
+
+
 class SocketConnection(object): # pylint: disable=too-many-instance-attributes
     def __init__(
             self,
@@ -45,7 +184,8 @@ class SocketConnection(object): # pylint: disable=too-many-instance-attributes
 
         self.coder = msgpack
         self.packer = msgpack.Packer()
-        self.unpacker = msgpack.Unpacker(use_list=True)
+        self.unpacker = msgpack.Unpacker(use_list=True,
+                                         ext_hook=unpackExtType)
         self.pack = self.packer.pack
         self.feed = self.unpacker.feed
         self.unpack = self.unpacker.unpack
@@ -120,6 +260,44 @@ class UDPClientConnection(SocketConnection):
         self.sock.settimeout(timeout)
         self.sock.setblocking(blocking)
 
+class EventNotificationSocket(object):
+    """The experiment process end of event notifications from the ioHub
+    Server: a UDP socket the server sends a small 'EVENTS_AVAILABLE' datagram
+    to when events a client asked to be told about have arrived (see
+    ioServer.armEventNotification), so the client can block in select()
+    rather than repeatedly asking the server for events.
+    """
+
+    def __init__(self, host='127.0.0.1'):
+        import socket
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, 0))
+        self.sock.setblocking(0)
+        self.port = self.sock.getsockname()[1]
+
+    def wait(self, timeout):
+        """Wait up to timeout sec.msec for a notification. Returns True if
+        one was received."""
+        import select
+        readable, _, _ = select.select([self.sock], [], [], max(timeout, 0))
+        if readable:
+            self.drain()
+            return True
+        return False
+
+    def drain(self):
+        """Discard any notifications already received."""
+        count = 0
+        while True:
+            try:
+                self.sock.recv(MAX_PACKET_SIZE)
+                count += 1
+            except (IOError, OSError):
+                return count
+
+    def close(self):
+        self.sock.close()
+
 ##### TIME SYNC CLASS ######
 
 
@@ -143,6 +321,10 @@ class ioHubTimeSyncConnection(UDPClientConnection):
         self.sync_batch_size = 5
 
     def sync(self):
+        """Sends sync_batch_size time requests to the remote ioHub Server and
+        returns the round trip time, and the local and remote times, of the
+        request with the shortest round trip (the one least delayed in either
+        direction, so whose times most likely match)."""
         sync_count = self.sync_batch_size
         sync_data = ['SYNC_REQ', ]
 
@@ -165,18 +347,18 @@ class ioHubTimeSyncConnection(UDPClientConnection):
             sync_start = Computer.getTime()
             sendto(pack(sync_data), remote_address)
             sync_start2 = Computer.getTime()
+            sent_time = (sync_start + sync_start2) / 2.0
 
             # get reply
             feed(recvfrom(rcvBufferLength)[0])
             _, remote_time = unpack()
             sync_end = Computer.getTime()
-            rtt = sync_end - (sync_start + sync_start2) / 2.0
+            rtt = sync_end - sent_time
 
-            old_delay = min_delay
-            min_delay = min(min_delay, rtt)
-
-            if old_delay != min_delay:
-                min_local_time = (sync_end + sync_start) / 2.0
+            if rtt < min_delay:
+                min_delay = rtt
+                # the remote time is assumed to be half way through the trip
+                min_local_time = (sent_time + sync_end) / 2.0
                 min_remote_time = remote_time
             sync_count = sync_count - 1
 
@@ -213,9 +395,8 @@ class ioHubTimeGreenSyncManager(Greenlet):
 
     def _run(self): # pylint: disable=method-hidden
         self._running = True
-        while self._sync(False) is False:
+        while self._sync() is False:
             sleep(0.5)
-        self._sync(False)
         while self._running is True:
             sleep(self.initial_sync_interval)
             r = self._sync()
@@ -225,26 +406,10 @@ class ioHubTimeGreenSyncManager(Greenlet):
                         self._remote_address))
         self._close()
 
-    def _sync(self, calc_drift_and_offset=True):
+    def _sync(self):
         try:
             if self._sync_socket:
-                r = self._sync_socket.sync()
-                min_delay, min_local_time, min_remote_time = r
-                sync_state_target = self.sync_state_target
-                sync_state_target.RTTs.append(min_delay)
-                sync_state_target.L_times.append(min_local_time)
-                sync_state_target.R_times.append(min_remote_time)
-
-                if calc_drift_and_offset is True:
-                    l1 = sync_state_target.L_times[-2]
-                    l2 = sync_state_target.L_times[-1]
-                    r1 = sync_state_target.R_times[-2]
-                    r2 = sync_state_target.R_times[-1]
-                    self.sync_state_target.drifts.append((r2 - r1) / (l2 - l1))
-
-                    l = sync_state_target.L_times[-1]
-                    r = sync_state_target.R_times[-1]
-                    self.sync_state_target.offsets = (r - l)
+                self.sync_state_target.addSample(*self._sync_socket.sync())
         except Exception: # pylint: disable=broad-except
             return False
         return True
@@ -267,25 +432,9 @@ class ioHubTimeSyncManager(object):
         self._sync_socket = ioHubTimeSyncConnection(remote_address)
         self.sync_state_target = proxy(sync_state_target)
 
-    def sync(self, calc_drift_and_offset=True):
+    def sync(self):
         if self._sync_socket:
-            r = self._sync_socket.sync()
-            min_delay, min_local_time, min_remote_time = r
-            sync_state_target = self.sync_state_target
-            sync_state_target.RTTs.append(min_delay)
-            sync_state_target.L_times.append(min_local_time)
-            sync_state_target.R_times.append(min_remote_time)
-
-            if calc_drift_and_offset is True:
-                l1 = sync_state_target.L_times[-2]
-                l2 = sync_state_target.L_times[-1]
-                r1 = sync_state_target.R_times[-2]
-                r2 = sync_state_target.R_times[-1]
-                self.sync_state_target.drifts.append((r2 - r1) / (l2 - l1))
-
-                l = sync_state_target.L_times[-1]
-                r = sync_state_target.R_times[-1]
-                self.sync_state_target.offsets = (r - l)
+            self.sync_state_target.addSample(*self._sync_socket.sync())
 
     def close(self):
         if self._sync_socket:
@@ -299,39 +448,117 @@ class ioHubTimeSyncManager(object):
 class TimeSyncState(object):
     """Container class used by an ioHubSyncManager to hold the data necessary
     to calculate the current time base offset and drift between an ioHub Server
-    and a ioHubRemoteEventSubscriber client."""
-    RTTs = RingBuffer(10)
-    L_times = RingBuffer(10)
-    R_times = RingBuffer(10)
-    drifts = RingBuffer(20)
-    offsets = RingBuffer(20)
+    and a ioHubRemoteEventSubscriber client.
+
+    The remote time is modelled as drift * local time + offset, fitted to the
+    last window_size sync samples (round trip time, local time, remote time):
+
+    * Only the samples with the shortest round trips are used (those with a
+      round trip time up to 1.5 times the median, and at least the best
+      half), since the longer a sync request took, the more the remote time
+      can differ from the local time half way through the round trip (like
+      the clock filter used by NTP).
+    * A line is fitted to them (so the drift is the slope of the lower
+      envelope of the samples), and samples that are more than 3 median
+      absolute deviations from it are dropped before fitting it again.
+
+    Until there are at least two samples to fit, the drift is 1.0.
+    """
+
+    def __init__(self, window_size=64):
+        self.RTTs = deque(maxlen=window_size)
+        self.L_times = deque(maxlen=window_size)
+        self.R_times = deque(maxlen=window_size)
+        self._fit = None
+
+    def addSample(self, rtt, local_time, remote_time):
+        """Add a sync sample: the round trip time of a sync request, and the
+        local and remote times half way through it."""
+        self.RTTs.append(rtt)
+        self.L_times.append(local_time)
+        self.R_times.append(remote_time)
+        self._fit = None
+
+    def _getFit(self):
+        """Returns (drift, offset, accuracy), fitting them to the samples if
+        they have changed."""
+        if self._fit is None:
+            if not self.RTTs:
+                raise ValueError('TimeSyncState has no sync samples yet.')
+            self._fit = fitClockOffset(self.RTTs, self.L_times, self.R_times)
+        return self._fit
 
     def getDrift(self):
         """Current drift between two time bases."""
-        return self.drifts.mean()
+        return self._getFit()[0]
 
     def getOffset(self):
         """Current offset between two time bases."""
-        return self.offsets.mean()
+        return self._getFit()[1]
 
     def getAccuracy(self):
-        """Current accuracy of the time synchronization, as calculated as the.
-
-        average of the last 10 round trip time sync request - response delays
-        divided by two.
-
+        """Current accuracy of the time synchronization: the largest error a
+        remote time converted to local time is likely to have. This is half
+        the shortest round trip time (the most a sample's remote time could
+        be off by), plus the RMS error of the samples used from the fitted
+        drift and offset.
         """
-        return self.RTTs.mean() / 2.0
+        return self._getFit()[2]
 
     def local2RemoteTime(self, local_time=None):
-        """Converts a local time (sec.msec format) to the corresponding remote
-        computer time, using the current offset and drift measures."""
+        """Converts a local time (sec.msec format), or an array of them, to
+        the corresponding remote computer time, using the current offset and
+        drift measures."""
         if local_time is None:
             local_time = Computer.getTime()
-        return self.getDrift() * local_time + self.getOffset()
+        drift, offset, _ = self._getFit()
+        if numpy.ndim(local_time):
+            local_time = numpy.asarray(local_time, dtype=numpy.float64)
+        return drift * local_time + offset
 
     def remote2LocalTime(self, remote_time):
-        """Converts a remote computer time (sec.msec format) to the
-        corresponding local time, using the current offset and drift
-        measures."""
-        return (remote_time - self.getOffset()) / self.getDrift()
+        """Converts a remote computer time (sec.msec format), or an array of
+        them, to the corresponding local time, using the current offset and
+        drift measures."""
+        drift, offset, _ = self._getFit()
+        if numpy.ndim(remote_time):
+            remote_time = numpy.asarray(remote_time, dtype=numpy.float64)
+        return (remote_time - offset) / drift
+
+
+def fitClockOffset(rtts, local_times, remote_times):
+    """Fits remote time = drift * local time + offset to time sync samples,
+    see TimeSyncState. Returns (drift, offset, accuracy)."""
+    rtts = numpy.asarray(rtts, dtype=numpy.float64)
+    local_times = numpy.asarray(local_times, dtype=numpy.float64)
+    diffs = numpy.asarray(remote_times, dtype=numpy.float64) - local_times
+
+    # the samples with the shortest round trips
+    nbest = max(len(rtts) // 2, 1)
+    max_rtt = max(numpy.sort(rtts)[nbest - 1], 1.5 * numpy.median(rtts))
+    use = rtts <= max_rtt
+
+    # fit diff = a + b * (local - t0), so drift = 1 + b; t0 keeps it well
+    # conditioned when the times are large
+    t0 = local_times[use].mean()
+    for _ in range(2):
+        x = local_times[use] - t0
+        y = diffs[use]
+        if len(x) >= 2 and numpy.ptp(x) > 0:
+            b, a = numpy.polyfit(x, y, 1)
+        else:
+            a, b = numpy.median(y), 0.0
+        residuals = diffs - (a + b * (local_times - t0))
+        mad = numpy.median(numpy.abs(residuals[use]))
+        # drop samples that don't fit, unless that leaves too few
+        inliers = use & (numpy.abs(residuals) <= 3.0 * mad + 1e-9)
+        if inliers.sum() < max(2, use.sum() // 2):
+            break
+        use = inliers
+
+    residuals = residuals[use]
+    rms = numpy.sqrt(numpy.mean(residuals * residuals))
+    accuracy = rtts[use].min() / 2.0 + rms
+    drift = 1.0 + b
+    offset = a - b * t0
+    return drift, offset, accuracy
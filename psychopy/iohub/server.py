@@ -8,13 +8,16 @@ from past.builtins import xrange
 
 import os
 import sys
+import errno
+import socket
+import heapq
 from operator import itemgetter
 from collections import deque, OrderedDict
 
 import msgpack
 import gevent
 from gevent.server import DatagramServer
-from gevent import Greenlet
+from gevent.socket import wait_read
 
 try:
     import msgpack_numpy
@@ -27,7 +30,7 @@ from psychopy.constants import PY3
 from . import _pkgroot
 from . import IOHUB_DIRECTORY, EXP_SCRIPT_DIRECTORY, _DATA_STORE_AVAILABLE
 from .errors import print2err, printExceptionDetailsToStdErr, ioHubError
-from .net import MAX_PACKET_SIZE
+from .net import MAX_PACKET_SIZE, packEventBatches
 from .util import convertCamelToSnake, win32MessagePump
 from .util import yload, yLoader
 from .constants import DeviceConstants, EventConstants
@@ -38,6 +41,34 @@ getTime = Computer.getTime
 
 MAX_PACKET_SIZE = 64 * 1024
 
+# timerfd (Linux), for DeadlineTimer
+_libc = None
+if sys.platform.startswith('linux'):
+    try:
+        import ctypes
+        import ctypes.util
+
+        _CLOCK_MONOTONIC = 1
+        _TFD_NONBLOCK = os.O_NONBLOCK
+        _TFD_CLOEXEC = 0o2000000
+        _TFD_TIMER_ABSTIME = 1
+
+        class _timespec(ctypes.Structure):
+            _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+        class _itimerspec(ctypes.Structure):
+            _fields_ = [('it_interval', _timespec), ('it_value', _timespec)]
+
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        _libc.timerfd_create.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc.timerfd_settime.argtypes = [ctypes.c_int, ctypes.c_int,
+                                          ctypes.POINTER(_itimerspec),
+                                          ctypes.POINTER(_itimerspec)]
+        _libc.clock_gettime.argtypes = [ctypes.c_int,
+                                        ctypes.POINTER(_timespec)]
+    except (OSError, AttributeError, TypeError):
+        _libc = None
+
 # pylint: disable=protected-access
 # pylint: disable=broad-except
 
@@ -53,6 +84,15 @@ def convertByteStrings(rdict):
         result[k] = i
     return result
 
+class BatchReplies(list):
+    """Collects the replies to the requests of a BATCH request, passed to
+    the request handlers in place of the client's address."""
+
+    def __init__(self, address):
+        list.__init__(self)
+        self.address = address
+
+
 class udpServer(DatagramServer):
     client_proc_init_req = None
     def __init__(self, ioHubServer, address):
@@ -68,12 +108,25 @@ class udpServer(DatagramServer):
         self.feed = self.unpacker.feed
         DatagramServer.__init__(self, address)
 
+    def do_read(self):
+        # DatagramServer reads at most 8192 bytes of each request, which
+        # batched requests can be larger than.
+        try:
+            return self._socket.recvfrom(MAX_PACKET_SIZE)
+        except socket.error as err:
+            if err.args[0] == errno.EWOULDBLOCK:
+                return
+            raise
+
     def handle(self, request, replyTo):
         if self._running is False:
             return False
         self.feed(request)
         request = self.unpack()
         # print2err(">> Rx Packet: {}, {}".format(request, replyTo))
+        return self.handleRequest(request, replyTo)
+
+    def handleRequest(self, request, replyTo):
         request_type = request.pop(0)
         if not isinstance(request_type, unicode):
             request_type = unicode(request_type, 'utf-8') # convert bytes to string for compatibility
@@ -90,7 +143,11 @@ class udpServer(DatagramServer):
                                payload, replyTo], replyTo)
             return True
         elif request_type == 'GET_EVENTS':
-            return self.handleGetEvents(replyTo)
+            return self.handleGetEvents(request, replyTo)
+        elif request_type == 'NOTIFY_ON_EVENTS':
+            return self.handleNotifyOnEvents(request, replyTo)
+        elif request_type == 'BATCH':
+            return self.handleBatchRequest(request, replyTo)
         elif request_type == 'EXP_DEVICE':
             return self.handleExperimentDeviceRequest(request, replyTo)
         elif request_type == 'CUSTOM_TASK':
@@ -159,6 +216,33 @@ class udpServer(DatagramServer):
             self.sendResponse('RPC_NOT_CALLABLE_ERROR', replyTo)
             return False
 
+    def handleBatchRequest(self, request, replyTo):
+        """Handles each request of a client's request batch in order,
+        sending one BATCH_RESULT reply with the reply to each (None for
+        requests without one), or no reply at all if the client doesn't want
+        one."""
+        reply_wanted, requests = request
+        replies = BatchReplies(replyTo)
+        ok = True
+        for r in requests:
+            reply_count = len(replies)
+            try:
+                r = list(r)
+                if r and r[0] in ('BATCH', b'BATCH'):
+                    raise ValueError('BATCH requests can not be nested')
+                ok = self.handleRequest(r, replies) is not False and ok
+            except Exception:
+                print2err('IOHUB_BATCH_REQUEST_ERROR')
+                printExceptionDetailsToStdErr()
+                del replies[reply_count:]
+                replies.append('IOHUB_BATCH_REQUEST_ERROR')
+                ok = False
+            if len(replies) == reply_count:
+                replies.append(None)
+        if reply_wanted:
+            self.sendResponse(('BATCH_RESULT', list(replies)), replyTo)
+        return ok
+
     def handleCustomTaskRequest(self, request, replyTo):
         custom_tasks = self.iohub.custom_tasks
         subtype = request.pop(0)
@@ -202,8 +286,10 @@ class udpServer(DatagramServer):
         edata = ('CUSTOM_TASK_REPLY', request)
         self.sendResponse(edata, replyTo)
 
-    def handleGetEvents(self, replyTo):
+    def handleGetEvents(self, request, replyTo):
         try:
+            # clients that can read event batches ask for them
+            event_batches = bool(request and request[0])
             self.iohub.processDeviceEvents()
             currentEvents = list(self.iohub.eventBuffer)
             self.iohub.eventBuffer.clear()
@@ -212,6 +298,9 @@ class udpServer(DatagramServer):
                 currentEvents = sorted(
                     currentEvents, key=itemgetter(
                         DeviceEvent.EVENT_HUB_TIME_INDEX))
+                if event_batches:
+                    currentEvents = packEventBatches(currentEvents,
+                                                     EventConstants.getClass)
                 self.sendResponse(
                     ('GET_EVENTS_RESULT', currentEvents), replyTo)
             else:
@@ -223,6 +312,20 @@ class udpServer(DatagramServer):
             self.sendResponse('IOHUB_GET_EVENTS_ERROR', replyTo)
             return False
 
+    def handleNotifyOnEvents(self, request, replyTo):
+        try:
+            notify_port, event_types, timeout = request
+            address = (getattr(replyTo, 'address', replyTo)[0], notify_port)
+            available = self.iohub.armEventNotification(address, event_types,
+                                                        timeout)
+            self.sendResponse(('NOTIFY_ON_EVENTS_RESULT', available), replyTo)
+            return True
+        except Exception:
+            print2err('IOHUB_NOTIFY_ON_EVENTS_ERROR')
+            printExceptionDetailsToStdErr()
+            self.sendResponse('IOHUB_NOTIFY_ON_EVENTS_ERROR', replyTo)
+            return False
+
     def handleExperimentDeviceRequest(self, request, replyTo):
         request_type = request.pop(0)
         if not isinstance(request_type, unicode):
@@ -244,6 +347,9 @@ class udpServer(DatagramServer):
                 dmethod = unicode(dmethod, 'utf-8')
             args = None
             kwargs = None
+            # clients that can read event batches ask for getEvents results
+            # as them
+            event_batches = len(request) == 3 and bool(request.pop())
             if len(request) == 1:
                 args = request[0]
             elif len(request) == 2:
@@ -285,6 +391,8 @@ class udpServer(DatagramServer):
                     result = method(**convertByteStrings(kwargs))
                 else:
                     result = method()
+                if event_batches and dmethod == 'getEvents' and result:
+                    result = packEventBatches(result, EventConstants.getClass)
                 #print2err("DEV_RPC_RESULT: ", result)
                 self.sendResponse(('DEV_RPC_RESULT', result), replyTo)
                 return True
@@ -352,6 +460,9 @@ class udpServer(DatagramServer):
             return False
 
     def sendResponse(self, data, address):
+        if isinstance(address, BatchReplies):
+            address.append(data)
+            return
         reply_data_sz = -1
         max_pkt_sz = int(MAX_PACKET_SIZE / 2 - 20)
         pkt_cnt = -1
@@ -427,17 +538,8 @@ class udpServer(DatagramServer):
     def initConditionVariableTable(self, exp_id, sess_id, numpy_dtype):
         dsfile = self.iohub.dsfile
         if dsfile:
-            output = []
-            for a in numpy_dtype:
-                if isinstance(a[1], basestring):
-                    output.append(tuple(a))
-                else:
-                    temp = [a[0], []]
-                    for i in a[1]:
-                        temp[1].append(tuple(i))
-                    output.append(tuple(temp))
-
-            return dsfile.initConditionVariableTable(exp_id, sess_id, output)
+            return dsfile.initConditionVariableTable(exp_id, sess_id,
+                                                     numpy_dtype)
         return False
 
     def extendConditionVariableTable(self, exp_id, sess_id, data):
@@ -446,6 +548,13 @@ class udpServer(DatagramServer):
             return dsfile.extendConditionVariableTable(exp_id, sess_id, data)
         return False
 
+    def extendConditionVariableTableRows(self, exp_id, sess_id, rows):
+        dsfile = self.iohub.dsfile
+        if dsfile:
+            return dsfile.extendConditionVariableTableRows(exp_id, sess_id,
+                                                           rows)
+        return False
+
     def clearEventBuffer(self, clear_device_level_buffers=False):
         """
 
@@ -505,32 +614,240 @@ class udpServer(DatagramServer):
             sys.exit(1)
 
 
-class DeviceMonitor(Greenlet):
-    def __init__(self, device, sleep_interval):
-        Greenlet.__init__(self)
+class EventNotifier(object):
+    """Tells clients waiting for events of some types (for example in
+    Keyboard.waitForKeys) when they arrive, by sending an 'EVENTS_AVAILABLE'
+    datagram to the client's notification socket. This lets the client block
+    on that socket instead of asking for events every few msec.
+
+    A notification is armed by a NOTIFY_ON_EVENTS request. It is sent once,
+    the next time an event of one of the types is processed, and is dropped
+    if that doesn't happen before its timeout.
+    """
+    def __init__(self, sendTo):
+        self._sendTo = sendTo
+        self._armed = {}  # address: (event type ids, expiry time)
+        self.sent_count = 0
+
+    def __len__(self):
+        return len(self._armed)
+
+    def arm(self, address, event_types, timeout, available=()):
+        """Notify address about the next event of one of event_types, or
+        straight away if one of the types is already available. Returns
+        True if the notification was sent straight away."""
+        event_types = frozenset(event_types)
+        if event_types.intersection(available):
+            self._armed.pop(address, None)
+            self._send(address)
+            return True
+        self._armed[address] = (event_types, getTime() + timeout)
+        return False
+
+    def notify(self, event_types):
+        """Called with the types of the events that have just been
+        processed (which may be none, to drop expired notifications)."""
+        now = getTime()
+        for address, (armed_types, expiry) in list(self._armed.items()):
+            if armed_types.intersection(event_types):
+                del self._armed[address]
+                self._send(address)
+            elif expiry < now:
+                del self._armed[address]
+
+    def _send(self, address):
+        self.sent_count += 1
+        self._sendTo(('EVENTS_AVAILABLE',), address)
+
+
+class DeviceMonitor(object):
+    """Polls a device (calls its _poll() method) every sleep_interval
+    sec.msec, when run by a DevicePollScheduler.
+
+    If max_interval is longer than sleep_interval, the poll interval is
+    adaptive: each poll that finds no new events makes the interval
+    backoff times longer, up to max_interval, and a poll that finds events
+    sets it back to sleep_interval.
+
+    The difference between the time each poll was due and when it was done
+    (the poll jitter) is recorded, see getJitterStats().
+    """
+    backoff = 1.5
+
+    def __init__(self, device, sleep_interval, max_interval=None):
         self.device = device
         self.sleep_interval = sleep_interval
-        self.running = False
-
-    def _run(self):
+        if max_interval is None or max_interval < sleep_interval:
+            max_interval = sleep_interval
+        self.max_interval = max_interval
+        self.interval = sleep_interval
         self.running = True
-        ctime = Computer.getTime
-        while self.running is True:
-            stime = ctime()
-            self.device._poll()
-            i = self.sleep_interval - (ctime() - stime)
-            if i > 0.001:
-                gevent.sleep(i)
-            else:
-                gevent.sleep(0.001)
+        self.poll_count = 0
+        self._jitter_sum = 0.0
+        self._jitter_sq_sum = 0.0
+        self._jitter_max = 0.0
+
+    def poll(self, due_time, poll_time):
+        """Poll the device, which was due to be polled at due_time. Returns
+        True if it has new events."""
+        jitter = poll_time - due_time
+        self.poll_count += 1
+        self._jitter_sum += jitter
+        self._jitter_sq_sum += jitter * jitter
+        self._jitter_max = max(self._jitter_max, abs(jitter))
+
+        self.device._poll()
+        if self.device._getNativeEventBuffer():
+            self.interval = self.sleep_interval
+            return True
+        self.interval = min(self.interval * self.backoff, self.max_interval)
+        return False
+
+    def getJitterStats(self):
+        """Returns dict with the number of polls, the mean, standard
+        deviation and largest absolute difference, in sec.msec, between when
+        polls were due and when they were done, and the current interval."""
+        n = max(self.poll_count, 1)
+        mean = self._jitter_sum / n
+        var = max(self._jitter_sq_sum / n - mean * mean, 0.0)
+        return dict(count=self.poll_count, mean=mean, stdev=var ** 0.5,
+                    max=self._jitter_max, interval=self.interval)
 
     def __del__(self):
         self.device = None
 
 
+class DevicePollScheduler(object):
+    """Runs the polling of all polled devices and the processing of their
+    events from one greenlet, so the ioHub Server only wakes up when a poll
+    is due, rather than each device having its own timer.
+
+    DeviceMonitors are kept in a heap ordered by the time their next poll is
+    due. Each step() polls every device that is due (or due within
+    coalesce_window sec.msec, so devices with similar intervals share wake
+    ups), processes events straight away if any poll found some, and
+    otherwise every process_events_interval sec.msec (for devices that are
+    not polled). It returns how long to sleep until the next thing is due.
+    """
+    coalesce_window = 0.0005
+
+    def __init__(self, processEvents):
+        self._processEvents = processEvents
+        self._heap = []
+        self._count = 0  # tie breaker, so the heap never compares monitors
+        self._last_process_time = getTime()
+        self.start_time = getTime()
+        self.wakeup_count = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, monitor, due_time=None):
+        """Schedule monitor's next poll for due_time (default now)."""
+        if due_time is None:
+            due_time = getTime()
+        self._count += 1
+        heapq.heappush(self._heap, (due_time, self._count, monitor))
+
+    def step(self, process_events_interval):
+        """Do any polls and event processing that are due. Returns the
+        sec.msec until the next is due."""
+        self.wakeup_count += 1
+        heap = self._heap
+        found_events = False
+        while heap and heap[0][0] <= getTime() + self.coalesce_window:
+            due_time, _, monitor = heapq.heappop(heap)
+            if monitor.running is False:
+                continue
+            poll_time = getTime()
+            if monitor.poll(due_time, poll_time):
+                found_events = True
+            next_due = due_time + monitor.interval
+            if next_due < poll_time:
+                # fell behind, so don't try to catch up with extra polls
+                next_due = poll_time + monitor.interval
+            self.add(monitor, next_due)
+
+        now = getTime()
+        next_process = self._last_process_time + process_events_interval
+        if found_events or next_process <= now + self.coalesce_window:
+            self._processEvents()
+            now = getTime()
+            self._last_process_time = now
+            next_process = now + process_events_interval
+
+        if heap:
+            next_process = min(next_process, heap[0][0])
+        return max(next_process - now, 0.0)
+
+    def getStats(self):
+        """Returns a dict with the number of wake ups per second, and the
+        jitter stats of each device being polled."""
+        elapsed = getTime() - self.start_time
+        devices = dict()
+        for _, _, monitor in self._heap:
+            if monitor.device is not None:
+                dname = monitor.device.__class__.__name__
+                devices[dname] = monitor.getJitterStats()
+        return dict(wakeups_per_sec=self.wakeup_count / max(elapsed, 1e-9),
+                    devices=devices)
+
+
+class DeadlineTimer(object):
+    """Sleeps the calling greenlet until a getTime() deadline, with other
+    greenlets (e.g. handling client requests) running meanwhile.
+
+    gevent.sleep() ends at the event loop's next timeout, which is only msec
+    precise, so can be up to a msec late. On Linux a timerfd armed with the
+    absolute deadline is waited on instead, which wakes the event loop as
+    soon as it expires.
+    """
+
+    def __init__(self):
+        self._fd = None
+        if _libc is not None:
+            fd = _libc.timerfd_create(_CLOCK_MONOTONIC,
+                                      _TFD_NONBLOCK | _TFD_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+                self._now = _timespec()
+                self._spec = _itimerspec()
+
+    def sleepUntil(self, deadline):
+        remaining = deadline - getTime()
+        if remaining <= 0:
+            gevent.sleep(0)
+            return
+        if self._fd is None:
+            gevent.sleep(remaining)
+            return
+        _libc.clock_gettime(_CLOCK_MONOTONIC, ctypes.byref(self._now))
+        end = self._now.tv_sec + self._now.tv_nsec * 1e-9 + remaining
+        value = self._spec.it_value
+        value.tv_sec = int(end)
+        value.tv_nsec = int((end - value.tv_sec) * 1e9)
+        if _libc.timerfd_settime(self._fd, _TFD_TIMER_ABSTIME,
+                                 ctypes.byref(self._spec), None) != 0:
+            gevent.sleep(remaining)
+            return
+        wait_read(self._fd)
+        try:
+            os.read(self._fd, 8)  # the expiry count, so it's not readable
+        except OSError:
+            pass
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
 class ioServer(object):
     eventBuffer = None
+    eventNotifier = None
     deviceDict = {}
+    # processEventsTasklet interval while clients are waiting for events
+    notify_events_interval = 0.001
     _logMessageBuffer = deque(maxlen=128)
     _pyglet_window_hnds = []
     status = 'OFFLINE'
@@ -546,6 +863,7 @@ class ioServer(object):
         self.config = config
         self.devices = []
         self.deviceMonitors = []
+        self.pollScheduler = DevicePollScheduler(self.processDeviceEvents)
         self.custom_tasks = OrderedDict()
         self.sessionInfoDict = None
         self.experimentInfoList = None
@@ -560,6 +878,7 @@ class ioServer(object):
         self._running = True
         # start UDP service
         self.udpService = udpServer(self, ':%d' % config.get('udp_port', 9000))
+        self.eventNotifier = EventNotifier(self.udpService.sendResponse)
         self._initDataStore(config, rootScriptPathDir)
 
         self._addDevices(config)
@@ -765,14 +1084,12 @@ class ioServer(object):
                 if dev_cls_name not in self._hookDevice:
                     if dev_cls_name == 'Mouse':
                         dmouse = deviceDict['Mouse']
-                        mouseHookMonitor = DeviceMonitor(dmouse, 0.004)
-                        self.deviceMonitors.append(mouseHookMonitor)
+                        self.addDeviceMonitor(DeviceMonitor(dmouse, 0.004))
                         dmouse._CGEventTapEnable(dmouse._tap, True)
                         self._hookDevice.append('Mouse')
                     if dev_cls_name == 'Keyboard':
                         dkeyboard = deviceDict['Keyboard']
-                        kbHookMonitor = DeviceMonitor(dkeyboard, 0.004)
-                        self.deviceMonitors.append(kbHookMonitor)
+                        self.addDeviceMonitor(DeviceMonitor(dkeyboard, 0.004))
                         dkeyboard._CGEventTapEnable(dkeyboard._tap, True)
                         self._hookDevice.append('Keyboard')
 
@@ -841,9 +1158,12 @@ class ioServer(object):
 
             if 'device_timer' in dev_conf:
                 interval = dev_conf['device_timer'].get('interval', 0.001)
-                dPoller = DeviceMonitor(dev_instance, interval)
-                self.deviceMonitors.append(dPoller)
+                max_interval = dev_conf['device_timer'].get('max_interval')
+                self.addDeviceMonitor(DeviceMonitor(dev_instance, interval,
+                                                    max_interval))
                 ltxt = '%s timer period: %.3f' % (dev_cls_name, interval)
+                if max_interval:
+                    ltxt += ' (up to %.3f when idle)' % max_interval
                 self.log(ltxt)
 
             monitor_evt_ids = []
@@ -897,32 +1217,67 @@ class ioServer(object):
             pytablesfile.flush()
             pytablesfile.close()
 
-    def processEventsTasklet(self, sleep_interval):
-        while self._running:
-            stime = Computer.getTime()
-            self.processDeviceEvents()
-            dur = sleep_interval - (Computer.getTime() - stime)
-            gevent.sleep(max(0.001, dur))
+    def addDeviceMonitor(self, monitor):
+        self.deviceMonitors.append(monitor)
+        self.pollScheduler.add(monitor)
+
+    def pollDevicesTasklet(self, process_events_interval):
+        """Polls devices and processes device events, see
+        DevicePollScheduler."""
+        scheduler = self.pollScheduler
+        timer = DeadlineTimer()
+        try:
+            while self._running:
+                # while a client is waiting to be told about events, process
+                # them more often so it hears about them sooner
+                interval = process_events_interval
+                if self.eventNotifier:
+                    interval = min(interval, self.notify_events_interval)
+                timer.sleepUntil(getTime() + scheduler.step(interval))
+        finally:
+            timer.close()
+
+    def getDevicePollStats(self):
+        return self.pollScheduler.getStats()
+
+    def armEventNotification(self, address, event_types, timeout):
+        """Send a notification to address when an event of one of
+        event_types is available, for up to timeout sec.msec. Returns True if
+        one already is (and the notification has been sent)."""
+        self.processDeviceEvents()
+        available = set()
+        for device in self.devices:
+            for etype, events in device._iohub_event_buffer.items():
+                if events:
+                    available.add(etype)
+        return self.eventNotifier.arm(tuple(address), event_types, timeout,
+                                      available)
 
     def processDeviceEvents(self):
+        notifier = self.eventNotifier
+        processed_types = set() if notifier else None
         for device in self.devices:
             evt = []
             try:
                 events = device._getNativeEventBuffer()
-                while events:
-                    evt = device._getIOHubEventObject(events.popleft())
-                    if evt:
-                        etype = evt[DeviceEvent.EVENT_TYPE_ID_INDEX]
-                        for l in device._getEventListeners(etype):
-                            l._handleEvent(evt)
+                if events:
+                    # events can be added by other threads meanwhile
+                    native_events = [events.popleft()
+                                     for _ in range(len(events))]
+                    for evt in self._dispatchEvents(
+                            device, device._getIOHubEventObjects(
+                                native_events)):
+                        if processed_types is not None:
+                            processed_types.add(
+                                evt[DeviceEvent.EVENT_TYPE_ID_INDEX])
 
                 filtered_events = []
                 for efilter in device._filters.values():
                     filtered_events.extend(efilter._removeOutputEvents())
-                for evt in filtered_events:
-                    etype = evt[DeviceEvent.EVENT_TYPE_ID_INDEX]
-                    for l in device._getEventListeners(etype):
-                        l._handleEvent(evt)
+                for evt in self._dispatchEvents(device, filtered_events):
+                    if processed_types is not None:
+                        processed_types.add(
+                            evt[DeviceEvent.EVENT_TYPE_ID_INDEX])
 
             except Exception:
                 print2err('Error in processDeviceEvents: ', device,
@@ -933,10 +1288,35 @@ class ioServer(object):
                     print2err('Event type ID: ', etype, ' : ', ename)
                 printExceptionDetailsToStdErr()
                 print2err('--------------------------------------')
+        if processed_types is not None:
+            notifier.notify(processed_types)
+
+    @staticmethod
+    def _dispatchEvents(device, events):
+        """Passes events from device to the device's listeners for their
+        types, a list of events of one type at a time to listeners with a
+        _handleEvents method. Yields the first event of each type handled.
+        """
+        etype_index = DeviceEvent.EVENT_TYPE_ID_INDEX
+        by_type = OrderedDict()
+        for e in events:
+            by_type.setdefault(e[etype_index], []).append(e)
+        for etype, type_events in by_type.items():
+            yield type_events[0]
+            for l in device._getEventListeners(etype):
+                handleEvents = getattr(l, '_handleEvents', None)
+                if handleEvents is not None:
+                    handleEvents(type_events)
+                else:
+                    for e in type_events:
+                        l._handleEvent(e)
 
     def _handleEvent(self, event):
         self.eventBuffer.append(event)
 
+    def _handleEvents(self, events):
+        self.eventBuffer.extend(events)
+
     def clearEventBuffer(self, call_proc_events=True):
         if call_proc_events is True:
             self.processDeviceEvents()
@@ -9,12 +9,13 @@ import os
 import sys
 import platform
 from psychopy.constants import PY3
-from pkg_resources import parse_version
 import shutil
 import json
 
 try:
     import configobj
+    # pkg_resources is slow to import so only do so if we need to check
+    from pkg_resources import parse_version
     if (PY3 and sys.version_info.minor >= 7 and
             parse_version(configobj.__version__) < parse_version('5.1.0')):
         raise ImportError('Installed configobj does not support Python 3.7+')
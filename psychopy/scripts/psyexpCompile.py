@@ -8,6 +8,7 @@
 import io
 import sys
 import os
+import time
 import argparse
 import traceback
 from copy import deepcopy
@@ -18,9 +19,10 @@ from psychopy import __version__, logging
 
 # parse args for subprocess
 parser = argparse.ArgumentParser(description='Compile your python file from here')
-parser.add_argument('infile', help='The input (psyexp) file to be compiled')
+parser.add_argument('infile', nargs='+', help='The input (psyexp) file(s) to be compiled')
 parser.add_argument('--version', '-v', help='The PsychoPy version to use for compiling the script. e.g. 1.84.1')
 parser.add_argument('--outfile', '-o', help='The output (py) file to be generated (defaults to the ')
+parser.add_argument('--jobs', '-j', type=int, default=1, help='The number of processes to use when compiling several files')
 
 
 def generateScript(experimentPath, exp, target="PsychoPy"):
@@ -130,7 +132,8 @@ def compileScript(infile=None, version=None, outfile=None):
             The experiment object used for generating the experiment script
         """
         # import PsychoPy experiment and write script with useVersion active
-        from psychopy.app.builder import experiment
+        # (from psychopy rather than the app, to avoid loading the Builder)
+        from psychopy import experiment
         # Check infile type
         if isinstance(infile, experiment.Experiment):
             thisExp = infile
@@ -242,9 +245,88 @@ def compileScript(infile=None, version=None, outfile=None):
     _makeTarget(thisExp, outfile, targetOutput)
 
 
+def _compileTimed(args):
+    """Compile one script for compileScripts(), returning the time taken and
+    the error message (or None) rather than raising
+    """
+    infile, outfile = args
+    t0 = time.time()
+    try:
+        compileScript(infile=infile, outfile=outfile)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    return time.time() - t0, error
+
+
+def compileScripts(infiles, outfiles=None, nJobs=1):
+    """
+    Compile many .psyexp files in one go.
+
+    The components only need to be found once per process, rather than once
+    per file as when calling the compiler script for each experiment, so
+    this is much faster for compiling large numbers of experiments.
+
+    Parameters
+    ----------
+    infiles: list of str
+        The input (psyexp) files to be compiled
+    outfiles: list of str
+        The output file for each input (a .py or .js file). Defaults to the
+        input filename with the .psyexp extension replaced by .py
+    nJobs: int
+        The number of processes to compile with. With nJobs=1 everything is
+        compiled in the current process.
+
+    Returns
+    -------
+    list of (infile, outfile, seconds, error) tuples
+        One per input file, in the same order, where error is None or the
+        traceback (as a string) if the file couldn't be compiled.
+    """
+    if outfiles is None:
+        outfiles = [infile.replace(".psyexp", ".py") for infile in infiles]
+    if len(outfiles) != len(infiles):
+        raise ValueError("compileScripts needs one outfile per infile")
+    jobs = list(zip(infiles, outfiles))
+    if nJobs > 1 and len(jobs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=nJobs) as pool:
+            # each worker compiles several files so finds the components once
+            chunkSize = max(1, len(jobs) // (nJobs * 4))
+            outcomes = list(pool.map(_compileTimed, jobs,
+                                     chunksize=chunkSize))
+    else:
+        outcomes = [_compileTimed(job) for job in jobs]
+
+    results = []
+    for (infile, outfile), (secs, error) in zip(jobs, outcomes):
+        if error is None:
+            logging.info("Compiled {} in {:.3f}s".format(infile, secs))
+        else:
+            logging.error("Failed to compile {}:\n{}".format(infile, error))
+        results.append((infile, outfile, secs, error))
+    return results
+
+
 if __name__ == "__main__":
     # define args
     args = parser.parse_args()
-    if args.outfile is None:
-        args.outfile = args.infile.replace(".psyexp", ".py")
-    compileScript(args.infile, args.version, args.outfile)
+    if len(args.infile) == 1:
+        infile = args.infile[0]
+        if args.outfile is None:
+            args.outfile = infile.replace(".psyexp", ".py")
+        compileScript(infile, args.version, args.outfile)
+    else:
+        if args.outfile is not None or args.version is not None:
+            parser.error("--outfile and --version can only be used when "
+                         "compiling a single file")
+        t0 = time.time()
+        results = compileScripts(args.infile, nJobs=args.jobs)
+        for infile, outfile, secs, error in results:
+            status = 'ok' if error is None else 'FAILED'
+            print("{:8.3f}s  {:6s}  {}".format(secs, status, infile))
+        print("Compiled {} files in {:.3f}s".format(len(results),
+                                                   time.time() - t0))
+        if any(res[3] is not None for res in results):
+            sys.exit(1)
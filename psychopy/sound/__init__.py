@@ -41,10 +41,6 @@ import sys
 import os
 from psychopy import logging, prefs, exceptions, constants
 
-pyoSndServer = None
-Sound = None
-audioLib = None
-audioDriver = None
 bits32 = (sys.maxsize==4294967296)
 
 _audioLibs = ['PTB', 'sounddevice', 'pyo', 'pysoundcard', 'pygame']
@@ -56,63 +52,120 @@ if travisCI:
     # for sounddevice we built in some TravisCI protection but not in pyo
     prefs.hardware['audioLib'] = ['sounddevice']
 
-if isinstance(prefs.hardware['audioLib'], basestring):
-    prefs.hardware['audioLib'] = [prefs.hardware['audioLib']]
-for thisLibName in prefs.hardware['audioLib']:
-    try:
-        if thisLibName.lower() == 'ptb':
-            from . import backend_ptb as backend
-            Sound = backend.SoundPTB
-            audioDriver = backend.audioDriver
-        elif thisLibName == 'pyo':
-            from . import backend_pyo as backend
-            Sound = backend.SoundPyo
-            pyoSndServer = backend.pyoSndServer
-            audioDriver = backend.audioDriver
-        elif thisLibName == 'sounddevice':
-            from . import backend_sounddevice as backend
-            Sound = backend.SoundDeviceSound
-        elif thisLibName == 'pygame':
-            from . import backend_pygame as backend
-            Sound = backend.SoundPygame
-        elif thisLibName == 'pysoundcard':
-            from . import backend_pysound as backend
-            Sound = backend.SoundPySoundCard
+# Loading an audio lib is slow (and starts the audio engine) so it isn't done
+# until one of these attributes is first used, e.g. `sound.Sound`
+_backendAttribs = ['Sound', 'audioLib', 'audioDriver', 'pyoSndServer',
+                   'backend', 'init', 'getDevices', 'deviceNames']
+_backendLoaded = False
+
+
+def _loadBackend():
+    """Load the first of the audio libs in prefs.hardware['audioLib'] that
+    is available and set the device according to the user prefs
+    """
+    global _backendLoaded, Sound, audioLib, audioDriver, pyoSndServer
+    global backend, init, getDevices, deviceNames
+    if _backendLoaded:
+        return
+    Sound = audioLib = audioDriver = pyoSndServer = None
+
+    if isinstance(prefs.hardware['audioLib'], basestring):
+        prefs.hardware['audioLib'] = [prefs.hardware['audioLib']]
+    for thisLibName in prefs.hardware['audioLib']:
+        try:
+            if thisLibName.lower() == 'ptb':
+                from . import backend_ptb as backend
+                Sound = backend.SoundPTB
+                audioDriver = backend.audioDriver
+            elif thisLibName == 'pyo':
+                from . import backend_pyo as backend
+                Sound = backend.SoundPyo
+                pyoSndServer = backend.pyoSndServer
+                audioDriver = backend.audioDriver
+            elif thisLibName == 'sounddevice':
+                from . import backend_sounddevice as backend
+                Sound = backend.SoundDeviceSound
+            elif thisLibName == 'pygame':
+                from . import backend_pygame as backend
+                Sound = backend.SoundPygame
+            elif thisLibName == 'pysoundcard':
+                from . import backend_pysound as backend
+                Sound = backend.SoundPySoundCard
+            else:
+                msg = ("audioLib pref should be one of {!r}, not {!r}"
+                       .format(_audioLibs, thisLibName))
+                raise ValueError(msg)
+            # if we got this far we were successful in loading the lib
+            audioLib = thisLibName
+            init = backend.init
+            if hasattr(backend, 'getDevices'):
+                getDevices = backend.getDevices
+            logging.info('sound is using audioLib: %s' % audioLib)
+            break
+        except exceptions.DependencyError as e:
+            failed.append(thisLibName.lower())
+            msg = '%s audio lib was requested but not loaded: %s'
+            logging.warning(msg % (thisLibName, sys.exc_info()[1]))
+            continue  # to try next audio lib
+
+    if audioLib is None:
+        # so that we try again (and raise again) next time they're used
+        del Sound, audioLib, audioDriver, pyoSndServer
+        raise exceptions.DependencyError(
+                "No sound libs could be loaded. Tried: {}\n"
+                "Check whether the necessary sound libs are installed"
+                .format(prefs.hardware['audioLib']))
+    elif audioLib.lower() != 'ptb':
+        if constants.PY3 and not bits32 and 'ptb' not in failed:
+            # Could be running PTB, just aren't?
+            logging.warning("We strongly recommend you activate the PTB sound "
+                            "engine in PsychoPy prefs as the preferred audio "
+                            "engine. Its timing is vastly superior. Your prefs "
+                            "are currently set to use {} (in that order)."
+                            .format(prefs.hardware['audioLib']))
+        else:  # Can't run PTB anyway due to Py2 or 32bit system
+            logging.warning("For experiments that use audio stimuli, timing "
+                            "will be much better if you upgrade your PsychoPy "
+                            "installation to a 64bit Python3 installation and "
+                            "use the PTB backend.")
+    _backendLoaded = True
+
+    # Set the device according to user prefs (if current lib allows it)
+    deviceNames = []
+    if hasattr(backend, 'defaultOutput'):
+        pref = prefs.hardware['audioDevice']
+        # is it a list or a simple string?
+        if type(prefs.hardware['audioDevice'])==list:
+            # multiple options so use zeroth
+            dev = prefs.hardware['audioDevice'][0]
         else:
-            msg = ("audioLib pref should be one of {!r}, not {!r}"
-                   .format(_audioLibs, thisLibName))
-            raise ValueError(msg)
-        # if we got this far we were successful in loading the lib
-        audioLib = thisLibName
-        init = backend.init
-        if hasattr(backend, 'getDevices'):
-            getDevices = backend.getDevices
-        logging.info('sound is using audioLib: %s' % audioLib)
-        break
-    except exceptions.DependencyError as e:
-        failed.append(thisLibName.lower())
-        msg = '%s audio lib was requested but not loaded: %s'
-        logging.warning(msg % (thisLibName, sys.exc_info()[1]))
-        continue  # to try next audio lib
-
-if audioLib is None:
-    raise exceptions.DependencyError(
-            "No sound libs could be loaded. Tried: {}\n"
-            "Check whether the necessary sound libs are installed"
-            .format(prefs.hardware['audioLib']))
-elif audioLib.lower() != 'ptb':
-    if constants.PY3 and not bits32 and 'ptb' not in failed:  
-        # Could be running PTB, just aren't?
-        logging.warning("We strongly recommend you activate the PTB sound "
-                        "engine in PsychoPy prefs as the preferred audio "
-                        "engine. Its timing is vastly superior. Your prefs "
-                        "are currently set to use {} (in that order)."
-                        .format(prefs.hardware['audioLib']))
-    else:  # Can't run PTB anyway due to Py2 or 32bit system
-        logging.warning("For experiments that use audio stimuli, timing will "
-                        "be much better if you upgrade your PsychoPy "
-                        "installation to a 64bit Python3 installation and use "
-                        "the PTB backend.")
+            # a single option
+            dev = prefs.hardware['audioDevice']
+        # is it simply "default" (do nothing)
+        if dev=='default' or travisCI:
+            pass  # do nothing
+        elif dev not in backend.getDevices(kind='output'):
+            deviceNames = sorted(backend.getDevices(kind='output').keys())
+            logging.warn(u"Requested audio device '{}' that is not available on "
+                            "this hardware. The 'audioDevice' preference should be one of "
+                            "{}".format(dev, deviceNames))
+        else:
+            setDevice(dev, kind='output')
+
+
+def __getattr__(name):
+    """Load the audio lib when one of its attributes is first needed
+    """
+    if name in _backendAttribs and not _backendLoaded:
+        _loadBackend()
+        if name in globals():  # e.g. not all libs provide getDevices
+            return globals()[name]
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_backendAttribs))
 
 
 # function to set the device (if current lib allows it)
@@ -122,6 +175,7 @@ def setDevice(dev, kind=None):
     :param dev: the device to be used (name, index or sounddevice.device)
     :param kind: one of [None, 'output', 'input']
     """
+    _loadBackend()
     if not hasattr(backend, 'defaultOutput'):
         raise IOError("Attempting to SetDevice (audio) but not supported by "
                       "the current audio library ({!r})".format(audioLib))
@@ -140,24 +194,7 @@ def setDevice(dev, kind=None):
             raise TypeError("`kind` should be one of [None, 'output', 'input']"
                             "not {!r}".format(kind))
 
-# Set the device according to user prefs (if current lib allows it)
-deviceNames = []
-if hasattr(backend, 'defaultOutput'):
-    pref = prefs.hardware['audioDevice']
-    # is it a list or a simple string?
-    if type(prefs.hardware['audioDevice'])==list:
-        # multiple options so use zeroth
-        dev = prefs.hardware['audioDevice'][0]
-    else:
-        # a single option
-        dev = prefs.hardware['audioDevice']
-    # is it simply "default" (do nothing)
-    if dev=='default' or travisCI:
-        pass  # do nothing
-    elif dev not in backend.getDevices(kind='output'):
-        deviceNames = sorted(backend.getDevices(kind='output').keys())
-        logging.warn(u"Requested audio device '{}' that is not available on "
-                        "this hardware. The 'audioDevice' preference should be one of "
-                        "{}".format(dev, deviceNames))
-    else:
-        setDevice(dev, kind='output')
+
+if sys.version_info < (3, 7):
+    # no module __getattr__ (PEP 562) so the lib has to be loaded now
+    _loadBackend()
@@ -2,3 +2,33 @@
 # -*- coding: utf-8 -*-
 
 import pytest
+
+
+@pytest.fixture
+def reportBenchmark(record_property):
+    """For benchmarks (marked with `@pytest.mark.benchmark`) to report a
+    line of their results. These are listed at the end of the test session
+    (and kept with the test's properties, e.g. in junit xml), rather than
+    printed in the middle of the test output."""
+    def report(text):
+        record_property('benchmark', text)
+    return report
+
+
+def pytest_terminal_summary(terminalreporter):
+    results = []
+    for reports in terminalreporter.stats.values():
+        for report in reports:
+            if getattr(report, 'when', None) != 'call':
+                continue
+            lines = [value for name, value in report.user_properties
+                     if name == 'benchmark']
+            if lines:
+                results.append((report.nodeid, lines))
+    if not results:
+        return
+    terminalreporter.section('benchmark results')
+    for nodeid, lines in sorted(results):
+        terminalreporter.write_line(nodeid)
+        for line in lines:
+            terminalreporter.write_line('    ' + line)
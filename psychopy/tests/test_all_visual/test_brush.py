@@ -1,14 +1,59 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from __future__ import division
+from __future__ import division, print_function
 
+import numpy
 import pytest
 from psychopy.visual.window import Window
+from psychopy.visual import brush
 from psychopy.visual.brush import Brush
 from psychopy.visual.shape import ShapeStim
 
 
+class FakeMouse(object):
+    """Follows a path with the button pressed, then lifts it"""
+
+    def __init__(self, path):
+        self.path = list(path)
+
+    def getPressed(self):
+        return [int(len(self.path) > 0), 0, 0]
+
+    def getPos(self):
+        return numpy.array(self.path.pop(0))
+
+
+def drawStrokes(testBrush, nStrokes, nPoints):
+    """Draw strokes (of random points) with a fake mouse"""
+    rng = numpy.random.RandomState(0)
+    strokes = []
+    for ii in range(nStrokes):
+        stroke = rng.uniform(-60, 60, (nPoints, 2))
+        strokes.append(stroke)
+        testBrush.pointer = FakeMouse(stroke)
+        for jj in range(nPoints + 1):  # and once more for the button up
+            testBrush.draw()
+    return strokes
+
+
+class CountingGL(object):
+    """Passes GL calls on to pyglet, counting the draw calls"""
+
+    def __init__(self, gl):
+        self._gl = gl
+        self.nDrawCalls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._gl, name)
+        if name.startswith('glDraw') or name.startswith('glMultiDraw'):
+            def countedCall(*args):
+                self.nDrawCalls += 1
+                return attr(*args)
+            return countedCall
+        return attr
+
+
 class Test_Brush(object):
     """Test suite for Brush component"""
     def setup_class(self):
@@ -64,4 +109,47 @@ class Test_Brush(object):
         testBrush._createStroke()
         testBrush.reset()
         assert testBrush.shapes == []
-        assert testBrush.atStartPoint == False
\ No newline at end of file
+        assert testBrush.atStartPoint == False
+
+    def test_strokes(self):
+        testBrush = Brush(self.win, autoLog=False)
+        strokes = drawStrokes(testBrush, 3, 20)
+        for stroke, drawn in zip(strokes, testBrush.getStrokes()):
+            assert numpy.allclose(stroke, drawn)
+        assert len(testBrush.getStrokes()) == 3
+        assert testBrush.currentShape == 2
+        # the ShapeStims for each stroke are still available
+        assert numpy.allclose(testBrush.shapes[1].vertices, strokes[1])
+        self.win.flip()
+        testBrush.reset()
+        assert testBrush.getStrokes() == []
+
+    def test_shapesKept(self):
+        testBrush = Brush(self.win, autoLog=False)
+        drawStrokes(testBrush, 2, 5)
+        shapes = testBrush.shapes
+        assert testBrush.shapes == shapes
+        # a new stroke only adds a ShapeStim, which follows it as it grows
+        testBrush._createStroke()
+        testBrush._strokes.addVertex((0, 0))
+        newShapes = testBrush.shapes
+        assert newShapes[:2] == shapes and len(newShapes) == 3
+        testBrush._strokes.addVertex((10, 10))
+        assert numpy.allclose(testBrush.shapes[2].vertices,
+                              [(0, 0), (10, 10)])
+        testBrush.reset()
+        assert testBrush.shapes == []
+
+    def test_drawCalls(self, monkeypatch):
+        """Draw calls per frame with 500 strokes"""
+        testBrush = Brush(self.win, autoLog=False)
+        drawStrokes(testBrush, 250, 20)
+        testBrush.setLineWidth(3)  # a new width needs another call
+        drawStrokes(testBrush, 250, 20)
+        gl = CountingGL(brush.GL)
+        monkeypatch.setattr(brush, 'GL', gl)
+        nFrames = 20
+        for ii in range(nFrames):
+            testBrush._strokes.draw()
+        assert gl.nDrawCalls == 2 * nFrames
+        testBrush.reset()
\ No newline at end of file
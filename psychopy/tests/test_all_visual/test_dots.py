@@ -0,0 +1,99 @@
+"""Tests for the random dot updates of DotStim and the attributes used to draw
+its element with instancing (using a stand-in for the window, so no GPU is
+needed)"""
+from __future__ import print_function
+
+import numpy
+import pytest
+
+from psychopy.visual.dot import DotStim, _elementQuad
+
+
+class FakeWin(object):
+    """Just enough of a window for DotStim to work out its dots"""
+    units = 'pix'
+    size = numpy.array([400, 300])
+    useRetina = False
+    autoLog = False
+
+    def _setCurrent(self):
+        pass
+
+
+class FakeElement(object):
+    """A GratingStim-like element, with its vertices already in pixels"""
+
+    def __init__(self, win, units='pix', pos=(0, 0)):
+        self.win = win
+        self.units = units
+        self.pos = numpy.array(pos, dtype=float)
+        self.verticesPix = self.pos + [[5, -5], [-5, -5], [-5, 5], [5, 5]]
+        self._cycles = numpy.array([2.0, 2.0])
+        self.phase = numpy.array([0.25, 0.0])
+
+
+def makeDots(**kwargs):
+    params = dict(nDots=100, fieldSize=200, dotLife=5, coherence=0.5,
+                  signalDots='different', noiseDots='walk')
+    params.update(kwargs)
+    return DotStim(FakeWin(), **params)
+
+
+@pytest.mark.parametrize('noiseDots', ['direction', 'position', 'walk'])
+def test_seed(noiseDots):
+    dots = [makeDots(seed=7, noiseDots=noiseDots) for ii in range(2)]
+    other = makeDots(seed=8, noiseDots=noiseDots)
+    for frame in range(10):
+        for stim in dots + [other]:
+            stim._update_dotsXY()
+        assert numpy.array_equal(dots[0].verticesPix, dots[1].verticesPix)
+    assert not numpy.array_equal(dots[0].verticesPix, other.verticesPix)
+
+
+def test_injectedGenerator():
+    dots = [makeDots(seed=1, fieldShape='circle') for ii in range(2)]
+    rngs = [numpy.random.default_rng(42) for ii in range(2)]
+    for frame in range(10):
+        for stim, rng in zip(dots, rngs):
+            stim._update_dotsXY(rng=rng)
+        assert numpy.array_equal(dots[0].verticesPix, dots[1].verticesPix)
+    # a Generator can be given as the seed too
+    stim = makeDots(seed=rngs[0])
+    assert stim.rng is rngs[0]
+    # without a seed the dots come from numpy.random, as they always have
+    unseeded = []
+    for ii in range(2):
+        numpy.random.seed(3)
+        stim = makeDots()
+        stim._update_dotsXY()
+        unseeded.append(stim.verticesPix)
+    assert makeDots().rng is numpy.random
+    assert numpy.array_equal(unseeded[0], unseeded[1])
+
+
+def test_instanceOffsets():
+    stim = makeDots(fieldPos=(10, 20))
+    stim.element = FakeElement(stim.win)
+    offsets = stim._instanceOffsets()
+    assert offsets.dtype == numpy.float32 and offsets.shape == (100, 2)
+    # where the element would have been moved to, one dot at a time
+    assert numpy.allclose(offsets, stim.verticesPix + stim.fieldPos)
+    # which is in the units of the element
+    stim.element = FakeElement(stim.win, units='norm')
+    expected = (stim.verticesPix + stim.fieldPos) * stim.win.size / 2.0
+    assert numpy.allclose(stim._instanceOffsets(), expected)
+    # only GratingStims are drawn with instancing
+    assert not stim._canDrawInstanced(stim.win)
+
+
+def test_elementQuad():
+    element = FakeElement(FakeWin(), pos=(30, -40))
+    quad = _elementQuad(element)
+    assert quad.dtype == numpy.float32 and quad.shape == (4, 6)
+    # around the centre of the element, wherever that is
+    assert numpy.array_equal(quad[:, 0:2], element.verticesPix - element.pos)
+    # two cycles of the texture, shifted by the phase
+    assert numpy.allclose(quad[:, 2:4],
+                          [[1.25, -0.5], [-0.75, -0.5], [-0.75, 1.5],
+                           [1.25, 1.5]])
+    assert numpy.array_equal(quad[:, 4:6], [[1, 0], [0, 0], [0, 1], [1, 1]])
@@ -4,6 +4,7 @@
 from __future__ import division
 
 import os
+import time
 import pytest
 from pandas import DataFrame
 from psychopy.visual.window import Window
@@ -166,6 +167,45 @@ class Test_Form(object):
         assert all([item['rt'] is None for item in data])
         assert list(indices) == list(range(4))
 
+    @pytest.mark.benchmark
+    def test_vertex_updates_benchmark(self, monkeypatch, reportBenchmark):
+        """Count the text vertex updates per frame for a long form"""
+        items = [{"itemText": "Question {}".format(n),
+                  "type": "rating",
+                  "options": "Lots, some, Not a lot"}
+                 for n in range(200)]
+        survey = Form(self.win, items=items, size=(1.0, 0.7), autoLog=False)
+
+        nUpdates = [0]
+        updateVertices = TextBox2._updateVertices
+
+        def countingUpdateVertices(textbox):
+            nUpdates[0] += 1
+            return updateVertices(textbox)
+        monkeypatch.setattr(TextBox2, '_updateVertices', countingUpdateVertices)
+
+        def drawFrames(nFrames, scrollStep=0):
+            counts = []
+            t0 = time.perf_counter()
+            for frame in range(nFrames):
+                nUpdates[0] = 0
+                survey.scrollbar.markerPos -= scrollStep
+                survey.draw()
+                counts.append(nUpdates[0])
+                self.win.flip()
+            return counts, (time.perf_counter() - t0) / nFrames
+
+        drawFrames(1)  # the first frame positions the items in view
+        staticCounts, staticTime = drawFrames(20)
+        scrollCounts, scrollTime = drawFrames(20, scrollStep=0.01)
+        reportBenchmark("200 item form: {} vertex updates/frame ({:.1f}ms) "
+                        "static, {:.1f} ({:.1f}ms) scrolling".format(
+                            np.mean(staticCounts), staticTime * 1000,
+                            np.mean(scrollCounts), scrollTime * 1000))
+        # nothing should move unless we scroll, and then only what's in view
+        assert max(staticCounts) == 0
+        assert 0 < max(scrollCounts) < len(items) / 4
+
     def teardown_class(self):
         shutil.rmtree(self.temp_dir)
         self.win.close()
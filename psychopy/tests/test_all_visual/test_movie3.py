@@ -0,0 +1,186 @@
+"""Tests for MovieStim3 and the decode-ahead frame buffer it uses"""
+from __future__ import print_function
+
+import time
+import threading
+import numpy
+import pytest
+
+pytest.importorskip('moviepy')
+from psychopy.visual.movie3 import FrameDecoder
+
+
+class FakeMovie(object):
+    """Stands in for a VideoFileClip, each frame filled with its index"""
+
+    def __init__(self, fps=30, duration=1.0, decodeTime=0.0):
+        self.fps = fps
+        self.duration = duration
+        self.decodeTime = decodeTime
+        self.requested = []
+        self.threads = set()
+
+    def get_frame(self, t):
+        self.requested.append(t)
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.decodeTime)
+        frame = numpy.empty((4, 6, 3), dtype=float)
+        frame.fill(int(round(t * self.fps)))
+        return frame
+
+
+def frameIndex(frame):
+    return int(frame[0, 0, 0])
+
+
+class TestFrameDecoder(object):
+
+    def test_inOrder(self):
+        mov = FakeMovie(duration=0.5)
+        decoder = FrameDecoder(mov.get_frame, 1.0 / mov.fps, mov.duration)
+        t = 0.0
+        indices = []
+        while True:
+            frameT, frame = decoder.getFrame(t)
+            if frame is None:
+                break
+            assert frame.dtype == numpy.uint8
+            assert frame.flags['C_CONTIGUOUS']
+            indices.append(frameIndex(frame))
+            t = frameT + 1.0 / mov.fps
+        decoder.stop()
+        assert indices == list(range(16))  # 0 to 0.5s inclusive
+        assert decoder.nSkipped == 0
+        # decoding only ever happens in the background
+        assert mov.threads == {'FrameDecoder'}
+
+    def test_bufferIsBounded(self):
+        mov = FakeMovie(duration=10)
+        decoder = FrameDecoder(mov.get_frame, 1.0 / mov.fps, mov.duration,
+                               bufferSize=4)
+        time.sleep(0.2)
+        assert len(decoder._frames) == 4
+        assert len(mov.requested) == 4
+        decoder.getFrame(0)
+        time.sleep(0.1)
+        assert len(mov.requested) == 5  # one more to refill the buffer
+        decoder.stop()
+        assert not decoder._thread.is_alive()
+
+    def test_seekFlushes(self):
+        mov = FakeMovie(duration=10)
+        decoder = FrameDecoder(mov.get_frame, 1.0 / mov.fps, mov.duration)
+        frameT, frame = decoder.getFrame(0)
+        assert frameIndex(frame) == 0
+        decoder.seek(5.0)
+        frameT, frame = decoder.getFrame(5.0)
+        assert frameT == 5.0
+        assert frameIndex(frame) == 150
+        frameT, frame = decoder.getFrame(frameT + 1.0 / mov.fps)
+        assert frameIndex(frame) == 151
+        decoder.stop()
+
+    def test_skipLateFrames(self):
+        mov = FakeMovie(duration=10)
+        decoder = FrameDecoder(mov.get_frame, 1.0 / mov.fps, mov.duration)
+        time.sleep(0.2)  # let the buffer fill
+        # we wanted frame 0 but we're now at frame 3 so 0-2 are dropped
+        frameT, frame = decoder.getFrame(0, latest=3.5 / mov.fps)
+        assert frameIndex(frame) == 3
+        assert decoder.nSkipped == 3
+        decoder.stop()
+
+    def test_endOfMovie(self):
+        mov = FakeMovie(duration=0.1)
+        decoder = FrameDecoder(mov.get_frame, 1.0 / mov.fps, mov.duration)
+        assert decoder.getFrame(1.0) == (None, None)
+        decoder.stop()
+        assert decoder.getFrame(0) == (None, None)
+
+
+@pytest.mark.benchmark
+def test_decodeAhead_benchmark(reportBenchmark):
+    """Compares the render-thread time spent per frame with decoding done
+    synchronously versus by the FrameDecoder (when decoding is slower than
+    rendering, but faster than the frame rate)"""
+    mov = FakeMovie(fps=60, duration=1.0, decodeTime=0.005)
+    nFrames = 30
+    renderTime = 1.0 / mov.fps  # time spent drawing (here just sleeping)
+
+    blocked = 0
+    for n in range(nFrames):
+        t0 = time.perf_counter()
+        mov.get_frame(n / mov.fps)
+        blocked += time.perf_counter() - t0
+        time.sleep(renderTime)
+    synchronous = blocked / nFrames
+
+    decoder = FrameDecoder(mov.get_frame, 1.0 / mov.fps, mov.duration)
+    time.sleep(0.1)  # as if the movie was loaded before starting
+    blocked = 0
+    for n in range(nFrames):
+        t0 = time.perf_counter()
+        decoder.getFrame(n / mov.fps)
+        blocked += time.perf_counter() - t0
+        time.sleep(renderTime)
+    decoder.stop()
+    ahead = blocked / nFrames
+
+    reportBenchmark("waiting per frame: {:.2f}ms (synchronous), {:.2f}ms "
+                    "(decoded ahead, {} waits)".format(
+                        synchronous * 1000, ahead * 1000, decoder.nWaits))
+    assert ahead < synchronous
+
+
+class FakeWin(object):
+    """The parts of a Window a MovieStim3 uses, without opening one"""
+    units = 'pix'
+    useRetina = False
+    autoLog = False
+    _monitorFrameRate = 60.0
+
+    def __init__(self):
+        self.size = numpy.array([64, 64])
+        self.monitor = None
+
+    def logOnFlip(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def synthMovie(tmpdir):
+    """A 1 sec, 30fps silent clip, each frame filled with (its index * 8)"""
+    editor = pytest.importorskip('moviepy.editor')
+    frames = [numpy.full((16, 16, 3), i * 8, numpy.uint8) for i in range(30)]
+    path = str(tmpdir.join('synth.avi'))
+    editor.ImageSequenceClip(frames, fps=30).write_videofile(
+        path, codec='png', audio=False, logger=None)  # lossless
+    return path
+
+
+def test_movieStim3FirstFrame(synthMovie, monkeypatch):
+    """The frame decoded when the movie is loaded is the first one shown,
+    so starting playback doesn't count (or warn about) a dropped frame"""
+    import ctypes
+    from unittest import mock
+    from psychopy import logging
+    from psychopy.visual import movie3
+    monkeypatch.setattr(movie3, 'GL', mock.MagicMock(GLuint=ctypes.c_uint))
+    warnings = []
+    monkeypatch.setattr(logging, 'warning', warnings.append)
+    mov = movie3.MovieStim3(FakeWin(), synthMovie, noAudio=True,
+                            autoLog=False)
+    assert frameIndex(mov._numpyFrame) == 0
+    mov.play(log=False)
+    shown = []
+    t0 = time.time()
+    while mov.status == movie3.PLAYING and time.time() - t0 < 0.3:
+        mov._updateFrameTexture()
+        if not shown or mov._numpyFrameT != shown[-1][0]:
+            shown.append((mov._numpyFrameT, frameIndex(mov._numpyFrame) // 8))
+        time.sleep(0.002)
+    mov.stop(log=False)
+    assert shown[0] == (0.0, 0)
+    assert [index for t, index in shown[:5]] == [0, 1, 2, 3, 4]
+    assert mov.nDroppedFrames == 0
+    assert not [w for w in warnings if 'dropping' in w]
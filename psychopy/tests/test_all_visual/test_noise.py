@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import division
+
+import time
+import threading
+import pytest
+import numpy as np
+from numpy.fft import ifft2, fft2
+from PIL import Image
+
+from psychopy.visual.window import Window
+from psychopy.visual import noise
+from psychopy.visual.noise import NoiseStim
+
+
+def test_realIfft2():
+    # the real FFT shortcut gives the real part of the full inverse FFT
+    rng = np.random.RandomState(0)
+    for shape in [(16, 16), (15, 15), (32, 32)]:
+        amplitude = rng.uniform(0, 1, shape)
+        phase = rng.uniform(0, 2 * np.pi, shape)
+        expected = np.real(ifft2(amplitude * np.exp(1j * phase)))
+        assert np.allclose(noise._realIfft2(amplitude, phase), expected,
+                           atol=1e-6)
+        # and filtering a real image with any (full) kernel
+        image = rng.uniform(-1, 1, shape)
+        expected = np.real(ifft2(fft2(image) * amplitude))
+        filtered = np.fft.irfft2(np.fft.rfft2(image) *
+                                 noise._halfSpectrum(amplitude), s=shape)
+        assert np.allclose(filtered, expected)
+
+
+class Test_NoiseStim(object):
+
+    def setup_class(self):
+        self.win = Window([128, 128], units='pix', autoLog=False)
+
+    def teardown_class(self):
+        self.win.close()
+
+    def makeNoise(self, noiseType, **kwargs):
+        return NoiseStim(self.win, noiseType=noiseType, size=(128, 128),
+                         noiseElementSize=4, noiseBaseSf=32.0 / 128,
+                         noiseFilterLower=4.0 / 128,
+                         noiseFilterUpper=16.0 / 128,
+                         noiseFilterOrder=1, **kwargs)
+
+    def test_seed(self):
+        for noiseType in ['binary', 'normal', 'white', 'gabor']:
+            stims = [self.makeNoise(noiseType, seed=5) for ii in range(2)]
+            for stim in stims:
+                stim.updateNoise()
+            assert np.array_equal(stims[0].tex, stims[1].tex)
+            other = self.makeNoise(noiseType, seed=6)
+            other.updateNoise()
+            assert not np.array_equal(stims[0].tex, other.tex)
+
+    def test_seedImage(self, tmpdir):
+        # noise from an image's phase spectrum is drawn from the stim's own
+        # generator too, leaving numpy.random's state alone
+        imagePath = str(tmpdir.join('noise.png'))
+        pixels = np.random.RandomState(0).randint(0, 255, (64, 64))
+        Image.fromarray(pixels.astype(np.uint8)).save(imagePath)
+        np.random.seed(1)
+        expected = np.random.uniform()
+        np.random.seed(1)
+        stims = [self.makeNoise('image', noiseImage=imagePath,
+                                imageComponent='amplitude', seed=seed)
+                 for seed in [5, 5, 6]]
+        for stim in stims:
+            stim.updateNoise()
+        assert np.random.uniform() == expected
+        assert np.array_equal(stims[0].tex, stims[1].tex)
+        assert not np.array_equal(stims[0].tex, stims[2].tex)
+
+    def test_kernelCache(self):
+        stim = self.makeNoise('filtered', filter='butterworth')
+        nKernels = len(noise._kernelCache)
+        kernel = stim._filterKernel()
+        self.makeNoise('filtered', filter='butterworth').updateNoise()
+        assert stim._filterKernel() is kernel
+        assert len(noise._kernelCache) == nKernels
+        stim.noiseFilterUpper = 8.0 / 128
+        stim.buildNoise()
+        assert stim._filterKernel() is not kernel
+
+    def test_noiseBank(self):
+        stim = self.makeNoise('white', seed=1)
+        other = self.makeNoise('white', seed=1)
+        stim.makeNoiseBank(5)
+        other.makeNoiseBank(5)
+        # the bank is made from a copy of the parameters, so this doesn't
+        # change the samples already on their way
+        stim.noiseClip = 1.0
+        for ii in range(5):
+            stim.updateNoise()
+            other.updateNoise()
+            # repeatable, with the bank's own generator seeded from the stim's
+            assert np.array_equal(stim.tex, other.tex)
+        assert not stim._noiseBank
+        stim.updateNoise()  # bank is used up, so back to drawing them here
+        # rebuilding discards the samples made for the old parameters
+        stim.makeNoiseBank(5)
+        stim.noiseBW = 2.0
+        stim.buildNoise()
+        assert not stim._noiseBank
+
+
+def test_kernelCacheThreads():
+    """The kernel cache can be used from several threads at once"""
+    errors = []
+
+    def useCache(offset):
+        try:
+            for ii in range(200):
+                key = ('test', (ii + offset) % 50)
+                kernel = noise._cachedKernel(key, lambda: np.full((4, 4), ii),
+                                             half=ii % 2 == 0)
+                assert kernel.shape in [(4, 4), (4, 3)]
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=useCache, args=(ii,))
+               for ii in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(noise._kernelCache) <= noise._kernelCacheSize
+
+
+@pytest.mark.benchmark
+def test_noiseUpdate_benchmark(reportBenchmark):
+    """Noise updates per second for each noise type at 512x512"""
+    win = Window([128, 128], units='pix', autoLog=False)
+    rates = {}
+    for noiseType, filt in [('binary', None), ('normal', None),
+                            ('binary', 'butterworth'), ('white', None),
+                            ('filtered', None), ('gabor', None),
+                            ('isotropic', None)]:
+        stim = NoiseStim(win, noiseType=noiseType, filter=filt,
+                         size=(512, 512), noiseElementSize=4,
+                         noiseBaseSf=32.0 / 512, noiseFilterOrder=1,
+                         noiseFilterLower=4.0 / 512,
+                         noiseFilterUpper=64.0 / 512, seed=0)
+        nUpdates = 20
+        t0 = time.perf_counter()
+        for ii in range(nUpdates):
+            stim.updateNoise()
+        rates[(noiseType, filt)] = nUpdates / (time.perf_counter() - t0)
+    win.close()
+    for (noiseType, filt), rate in rates.items():
+        reportBenchmark("{} ({} filter): {:.0f} updates/s".format(
+            noiseType, filt, rate))
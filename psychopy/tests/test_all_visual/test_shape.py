@@ -0,0 +1,134 @@
+"""Tests for filling ShapeStim shapes with triangles (the tesselation, which
+doesn't need a window)"""
+from __future__ import print_function
+
+import time
+import numpy
+import pytest
+
+from psychopy.visual import shape
+from psychopy.visual.shape import GL, _tesselateLoops
+
+
+def makeStar(nVertices=1000, lobes=7, seed=0):
+    rng = numpy.random.RandomState(seed)
+    angles = numpy.linspace(0, 2 * numpy.pi, nVertices, endpoint=False)
+    radii = 1 + 0.4 * numpy.sin(lobes * angles) + \
+        rng.uniform(0, 0.05, nVertices)
+    return numpy.column_stack((radii * numpy.cos(angles),
+                               radii * numpy.sin(angles)))
+
+
+def transform(vertices, ori=30.0, size=(2.0, 0.5), pos=(0.3, -0.1)):
+    theta = numpy.radians(ori)
+    rot = numpy.array([[numpy.cos(theta), -numpy.sin(theta)],
+                       [numpy.sin(theta), numpy.cos(theta)]])
+    return numpy.dot(vertices * size, rot.T) + pos
+
+
+def area(triangleVerts):
+    tris = numpy.asarray(triangleVerts).reshape((-1, 3, 2))
+    return 0.5 * numpy.abs(
+        (tris[:, 1, 0] - tris[:, 0, 0]) * (tris[:, 2, 1] - tris[:, 0, 1]) -
+        (tris[:, 1, 1] - tris[:, 0, 1]) * (tris[:, 2, 0] - tris[:, 0, 0])
+    ).sum()
+
+
+def polygonArea(vertices):
+    x, y = vertices[:, 0], vertices[:, 1]
+    return 0.5 * abs(numpy.dot(x, numpy.roll(y, -1)) -
+                     numpy.dot(numpy.roll(x, -1), y))
+
+
+@pytest.fixture
+def countTesselations(monkeypatch):
+    shape._tesselationCache.clear()
+    calls = []
+    triangulateLoops = shape._triangulateLoops
+
+    def countingTriangulate(*args):
+        calls.append(args)
+        return triangulateLoops(*args)
+
+    monkeypatch.setattr(shape, '_triangulateLoops', countingTriangulate)
+    return calls
+
+
+@pytest.mark.parametrize('tesselator', ['glu', 'numpy'])
+def test_tesselators(tesselator):
+    star = makeStar(100)
+    tris = _tesselateLoops([star], tesselator=tesselator)
+    assert tris.shape == (3 * 98, 2)
+    assert numpy.isclose(area(tris), polygonArea(star))
+
+
+@pytest.mark.parametrize('tesselator', ['glu', 'numpy'])
+def test_transformsReuseTriangles(countTesselations, tesselator):
+    star = makeStar(200)
+    tris = _tesselateLoops([star], tesselator=tesselator)
+    for ori in range(0, 360, 45):
+        moved = transform(star, ori=ori)
+        movedTris = _tesselateLoops([moved], tesselator=tesselator)
+        # the same triangles, transformed
+        assert numpy.allclose(movedTris, transform(tris, ori=ori))
+    assert len(countTesselations) == 1
+
+    # changing the shape itself means it's tesselated again
+    morphed = star * numpy.linspace(1, 1.1, len(star))[:, numpy.newaxis]
+    tris = _tesselateLoops([morphed], tesselator=tesselator)
+    assert len(countTesselations) == 2
+    assert numpy.isclose(area(tris), polygonArea(morphed))
+
+
+def test_selfCrossingNotCached(countTesselations):
+    bowtie = [(0, 0), (1, 1), (1, 0), (0, 1)]
+    for tesselator in ['glu', 'numpy']:
+        # GLU adds a vertex where the edges cross
+        tris = _tesselateLoops([bowtie], tesselator=tesselator)
+        assert len(tris) == 6
+        assert numpy.isclose(area(tris), 0.5)
+    assert not shape._tesselationCache
+    # a pentagram has its middle filled or not depending on the winding rule
+    angles = numpy.arange(5) * 4 * numpy.pi / 5 + numpy.pi / 2
+    pentagram = numpy.column_stack((numpy.cos(angles), numpy.sin(angles)))
+    areas = {}
+    for windingRule in [None, GL.GLU_TESS_WINDING_NONZERO]:
+        for tesselator in ['glu', 'numpy']:
+            tris = _tesselateLoops([pentagram], windingRule, tesselator)
+            areas[windingRule, tesselator] = area(tris)
+        assert numpy.isclose(areas[windingRule, 'glu'],
+                             areas[windingRule, 'numpy'])
+    assert areas[None, 'numpy'] < areas[GL.GLU_TESS_WINDING_NONZERO, 'numpy']
+    # holes are left to GLU
+    outer = [(-1, -1), (1, -1), (1, 1), (-1, 1)]
+    hole = [(-0.5, -0.5), (0.5, -0.5), (0.5, 0.5), (-0.5, 0.5)]
+    tris = _tesselateLoops([outer, hole], tesselator='numpy')
+    assert numpy.isclose(area(tris), 3.0)
+    # and lines can't be filled
+    assert len(_tesselateLoops([[(0, 0), (1, 1)]], tesselator='numpy')) == 0
+
+
+@pytest.mark.benchmark
+def test_tesselation_benchmark(reportBenchmark):
+    """Time to tesselate a (concave) shape with 1000 vertices with GLU and
+    numpy, and to get the triangles again after rotating it"""
+    star = makeStar(1000)
+    nReps = 10
+    times = {}
+    for tesselator in ['glu', 'numpy']:
+        t0 = time.perf_counter()
+        for ii in range(nReps):
+            shape._tesselationCache.clear()
+            _tesselateLoops([star], tesselator=tesselator)
+        times[tesselator] = (time.perf_counter() - t0) / nReps
+
+    t0 = time.perf_counter()
+    for ori in range(nReps):
+        _tesselateLoops([transform(star, ori=ori)], tesselator='numpy')
+    times['cached'] = (time.perf_counter() - t0) / nReps
+
+    reportBenchmark("1000-vertex tesselation: {:.2f}ms (GLU), {:.2f}ms "
+                    "(numpy), {:.2f}ms (rotated, cached)".format(
+                        times['glu'] * 1000, times['numpy'] * 1000,
+                        times['cached'] * 1000))
+    assert times['cached'] < times['glu']
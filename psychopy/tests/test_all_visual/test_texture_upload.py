@@ -0,0 +1,75 @@
+"""Tests for uploading image textures that need to be -1:1 (floats) as
+ubyte data with GL pixel transfer scale and bias, with GL mocked so no
+window is needed
+"""
+import os
+from unittest import mock
+
+import numpy
+import pytest
+
+from psychopy.tools.imagetools import Image, imageCache
+from psychopy.visual import basevisual
+
+
+class FakeStim(object):
+    useShaders = True
+    interpolate = False
+    win = None
+
+
+@pytest.fixture
+def lumImage(tmpdir):
+    filename = os.path.join(str(tmpdir), 'lum.png')
+    pixels = numpy.arange(64, dtype=numpy.uint8).reshape(8, 8) * 4
+    Image.fromarray(pixels, 'L').save(filename)
+    yield filename
+    imageCache.clear()
+
+
+@pytest.fixture
+def mockGL(monkeypatch):
+    GL = mock.MagicMock()
+    monkeypatch.setattr(basevisual, 'GL', GL)
+    stim = FakeStim()
+    stim.win = mock.MagicMock(glVendor='fake')
+    return GL, stim
+
+
+def pixelTransfers(GL):
+    return [c[0] for c in GL.glPixelTransferf.call_args_list]
+
+
+def test_signedUpload(mockGL, lumImage):
+    GL, stim = mockGL
+    basevisual.TextureMixin._createTexture(
+        stim, lumImage, id=1, pixFormat=GL.GL_RGB, stim=stim,
+        dataType=GL.GL_FLOAT)
+    # the ubyte luminance is uploaded as is, for GL to map onto -1:1
+    args = GL.glTexImage2D.call_args[0]
+    assert args[1:6] == (0, GL.GL_RGB32F_ARB, 8, 8, 0)
+    assert args[6:8] == (GL.GL_LUMINANCE, GL.GL_UNSIGNED_BYTE)
+    transfers = pixelTransfers(GL)
+    assert len(transfers) == 16
+    assert (GL.GL_RED_SCALE, 2.0) in transfers[:8]
+    assert (GL.GL_ALPHA_BIAS, -1.0) in transfers[:8]
+    # and back to the defaults
+    assert (GL.GL_RED_SCALE, 1.0) in transfers[8:]
+    assert (GL.GL_ALPHA_BIAS, 0.0) in transfers[8:]
+
+
+def test_signedUploadFails(mockGL, lumImage):
+    """The pixel transfer is reset even if the upload fails"""
+    GL, stim = mockGL
+    GL.glTexImage2D.side_effect = RuntimeError('out of memory')
+    with pytest.raises(RuntimeError):
+        basevisual.TextureMixin._createTexture(
+            stim, lumImage, id=1, pixFormat=GL.GL_RGB, stim=stim,
+            dataType=GL.GL_FLOAT)
+    transfers = pixelTransfers(GL)
+    assert len(transfers) == 16
+    assert set(transfers[8:]) == {
+        (GL.GL_RED_SCALE, 1.0), (GL.GL_RED_BIAS, 0.0),
+        (GL.GL_GREEN_SCALE, 1.0), (GL.GL_GREEN_BIAS, 0.0),
+        (GL.GL_BLUE_SCALE, 1.0), (GL.GL_BLUE_BIAS, 0.0),
+        (GL.GL_ALPHA_SCALE, 1.0), (GL.GL_ALPHA_BIAS, 0.0)}
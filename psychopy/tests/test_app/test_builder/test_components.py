@@ -170,3 +170,90 @@ def test_flip_before_shutdown_in_settings_component():
     script = exp.writeScript()
 
     assert 'Flip one final time' in script
+
+
+def test_components_cache(tmpdir, monkeypatch):
+    from psychopy.experiment import components
+    monkeypatch.setattr(components, 'componentIndexFile',
+                        str(tmpdir.join('componentIndex.json')))
+    components.clearComponentsCache()
+
+    # a user folder (new-style, i.e. compts/compts) with one component in it
+    userFolder = tmpdir.mkdir('myCompsCache')
+    folder = userFolder.mkdir('myCompsCache')
+    folder.join('__init__.py').write('')
+    compCode = ("from psychopy.experiment.components import BaseComponent\n"
+                "class {0}Component(BaseComponent):\n"
+                "    pass\n")
+    folder.join('first.py').write(compCode.format('First'))
+    folder.join('notacomponent.py').write('x = 1\n')
+
+    builtins = components.getComponents(fetchIcons=False)
+    assert 'TextComponent' in builtins
+    # cached, but callers get their own copy to modify
+    builtins.pop('TextComponent')
+    assert 'TextComponent' in components.getComponents(fetchIcons=False)
+
+    userComps = components.getComponents(str(userFolder))
+    assert list(userComps) == ['FirstComponent']
+    # the on-disk index knows which modules provide components
+    index = components._loadComponentIndex()
+    assert index[str(folder)]['modules'] == ['first']
+    components._componentsCache.clear()
+    assert components.getComponents(str(userFolder)) == userComps
+
+    # adding a component changes the folder so it gets scanned again
+    newFile = folder.join('second.py')
+    newFile.write(compCode.format('Second'))
+    mtime = os.path.getmtime(str(folder)) + 10
+    os.utime(str(newFile), (mtime, mtime))
+    os.utime(str(folder), (mtime, mtime))
+    userComps = components.getComponents(str(userFolder))
+    assert sorted(userComps) == ['FirstComponent', 'SecondComponent']
+
+    components.clearComponentsCache()
+    assert not os.path.isfile(components.componentIndexFile)
+
+
+def test_components_cache_retries_failed(tmpdir, monkeypatch):
+    from psychopy.experiment import components
+    monkeypatch.setattr(components, 'componentIndexFile',
+                        str(tmpdir.join('componentIndex.json')))
+    components.clearComponentsCache()
+
+    userFolder = tmpdir.mkdir('myCompsRetry')
+    folder = userFolder.mkdir('myCompsRetry')
+    folder.join('__init__.py').write('')
+    # a component whose dependency isn't installed yet
+    folder.join('needsdep.py').write(
+        "import myCompsRetryDep\n"
+        "from psychopy.experiment.components import BaseComponent\n"
+        "class NeedsDepComponent(BaseComponent):\n"
+        "    pass\n")
+    assert components.getComponents(str(userFolder)) == {}
+    index = components._loadComponentIndex()
+    assert index[str(folder)]['failed'] == ['needsdep']
+
+    # installing the dependency doesn't change the folder
+    depFolder = tmpdir.mkdir('site')
+    depFolder.join('myCompsRetryDep.py').write('')
+    monkeypatch.syspath_prepend(str(depFolder))
+    assert 'NeedsDepComponent' in components.getComponents(str(userFolder))
+    index = components._loadComponentIndex()
+    assert index[str(folder)]['modules'] == ['needsdep']
+    assert index[str(folder)]['failed'] == []
+    # the index was replaced, not left half written
+    assert tmpdir.listdir(lambda p: p.ext == '.tmp') == []
+    components.clearComponentsCache()
+
+
+def test_components_signature_subfolders(tmpdir):
+    from psychopy.experiment import components
+    # a new-style component is a folder of its own
+    compFolder = tmpdir.mkdir('comps').mkdir('myComp')
+    compFile = compFolder.join('__init__.py')
+    compFile.write('x = 1\n')
+    signature = components._folderSignature(str(tmpdir.join('comps')))
+    assert components._folderSignature(str(tmpdir.join('comps'))) == signature
+    compFile.write('x = 12\n')
+    assert components._folderSignature(str(tmpdir.join('comps'))) != signature
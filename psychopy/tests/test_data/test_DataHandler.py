@@ -0,0 +1,130 @@
+"""Tests for psychopy.data.DataHandler"""
+from __future__ import print_function
+
+from builtins import range
+from builtins import object
+import os
+import io
+import copy
+import pickle
+import shutil
+import time
+from tempfile import mkdtemp
+import numpy as np
+import pytest
+
+from psychopy import data
+
+
+class TestDataHandler(object):
+    def setup_class(self):
+        self.temp_dir = mkdtemp(prefix='psychopy-tests-datahandler')
+
+    def teardown_class(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_extend_beyond_dataShape(self):
+        dat = data.DataHandler(dataTypes=['resp'], dataShape=[3, 2])
+        for col in range(50):
+            dat.add('resp', float(col), position=[1, col])
+        assert dat.dataShape == [3, 50]
+        assert dat['resp'].shape == (3, 50)
+        assert dat['resp'][1, 49] == 49
+        # entries that were never set are still missing
+        assert dat['resp'].mask[0].all()
+        assert dat['resp'].mask[2].all()
+
+    def test_extend_keeps_other_types_aligned(self):
+        dat = data.DataHandler(dataTypes=['a', 'b'], dataShape=[2, 1])
+        dat.add('a', 1.0, position=[0, 0])
+        dat.add('a', 2.0, position=[0, 4])
+        assert dat['a'].shape == dat['b'].shape == (2, 5)
+        assert dat['b'].mask.all()
+        assert list(dat['a'][0].compressed()) == [1.0, 2.0]
+
+    def test_extend_object_array(self):
+        dat = data.DataHandler(dataTypes=['key'], dataShape=[2, 2])
+        dat.add('key', 'left', position=[0, 0])
+        assert not dat.isNumeric['key']
+        dat.add('key', 'right', position=[1, 6])
+        assert dat['key'].shape == (2, 7)
+        assert dat['key'][0, 0] == 'left'
+        assert dat['key'][1, 6] == 'right'
+        assert dat['key'][1, 3] == '--'
+
+    def test_convert_after_extend(self):
+        dat = data.DataHandler(dataTypes=['resp'], dataShape=[1, 1])
+        dat.add('resp', 1.0, position=[0, 0])
+        dat.add('resp', 2.0, position=[0, 2])
+        dat.add('resp', 'a', position=[0, 5])
+        assert dat['resp'].shape == (1, 6)
+        assert list(dat['resp'][0]) == ['1.0', '--', '2.0', '--', '--', 'a']
+        dat.add('resp', 'b', position=[0, 8])
+        assert dat['resp'][0, 5] == 'a'
+        assert dat['resp'][0, 8] == 'b'
+
+    def test_repCount(self):
+        conds = data.createFactorialTrialList({'ori': [0, 90, 180]})
+        trials = data.TrialHandler(conds, nReps=4, method='random',
+                                   autoLog=False)
+        for trial in trials:
+            trials.addData('resp', 1)
+            counts = [trials.data.getRepCount(n) for n in range(len(conds))]
+            assert counts == list(np.sum(trials.data['ran'], axis=1))
+        assert trials.data.getRepCount(0) == 4
+        assert not trials.data['resp'].mask.any()
+
+    def test_pickle_and_copy(self):
+        dat = data.DataHandler(dataTypes=['resp'], dataShape=[2, 1])
+        dat.add('resp', 1.0, position=[0, 3])
+        for other in [copy.deepcopy(dat),
+                      pickle.loads(pickle.dumps(dat))]:
+            assert other == dat
+            assert other['resp'][0, 3] == 1.0
+            # bookkeeping is rebuilt so the copy can still grow
+            other.add('resp', 2.0, position=[1, 9])
+            assert other['resp'].shape == (2, 10)
+            assert other['resp'][0, 3] == 1.0
+
+    def test_saveAsText_after_extend(self):
+        trials = data.TrialHandler([{'a': 1}], nReps=1, method='sequential',
+                                   autoLog=False)
+        for trial in trials:
+            trials.addData('resp', 1.0)
+        # e.g. a late correction adds an extra repetition
+        trials.data.add('resp', 3.0, position=[0, 1])
+        trials.data.add('ran', 1, position=[0, 1])
+        fileName = os.path.join(self.temp_dir, 'extended')
+        trials.saveAsText(fileName, delim=',', dataOut=['n', 'resp_mean'])
+        with io.open(fileName + '.csv', 'r', encoding='utf-8-sig') as f:
+            lines = f.read().splitlines()
+        assert lines == ['a,n,resp_mean', '1,2.0,2.0']
+
+
+@pytest.mark.benchmark
+def test_addData_throughput(reportBenchmark):
+    """Benchmark adding data for 100k trials, with and without having to
+    extend the arrays as repetitions are added"""
+    nTrials = 100000
+    conds = [{'n': n} for n in range(1000)]
+    trials = data.TrialHandler(conds, nReps=nTrials // len(conds),
+                               method='random', autoLog=False, seed=1)
+    t0 = time.perf_counter()
+    for trial in trials:
+        trials.addData('resp', 1)
+        trials.addData('rt', 0.5)
+    inBounds = time.perf_counter() - t0
+
+    dat = data.DataHandler(dataTypes=['ran', 'resp'], dataShape=[10, 1])
+    t0 = time.perf_counter()
+    for n in range(nTrials):
+        dat.add('ran', 1, position=[n % 10, n // 10])
+        dat.add('resp', 0.5, position=[n % 10, n // 10])
+    extending = time.perf_counter() - t0
+    assert dat['resp'].shape == (10, nTrials // 10)
+
+    reportBenchmark("addData throughput: {:.0f} trials/s (preallocated), "
+                    "{:.0f} trials/s (extending)".format(
+                        nTrials / inBounds, nTrials / extending))
+    # the extending case shouldn't be dramatically slower (was quadratic)
+    assert extending < 10 * inBounds + 1
@@ -88,6 +88,68 @@ def test_logistic():
     if PLOTTING:
         plotFit(modResps, thresh, 'Logistic (thresh=%.2f, params=%s)' %(fit.inverse(0.75), fit.params))
 
+def _simulateTrials(nRepeats=40, seed=1):
+    """trial-by-trial yes/correct responses drawn from the cum norm"""
+    rng = numpy.random.RandomState(seed)
+    intensities = numpy.repeat(contrasts, nRepeats)
+    pCorrect = cumNorm(intensities, sd=sd, thresh=thresh)
+    trialResps = (rng.rand(len(intensities)) < pCorrect).astype(float)
+    return intensities, trialResps
+
+def test_bootStrapFit():
+    intensities, trialResps = _simulateTrials()
+    params = data.bootStrapFit(data.FitCumNormal, intensities, trialResps,
+                               n=50, seed=3)
+    assert params.shape == (50, 2)
+    # the same seed gives the same resamples
+    again = data.bootStrapFit(data.FitCumNormal, intensities, trialResps,
+                              n=50, seed=3)
+    assert numpy.allclose(params, again, equal_nan=True)
+    # resampled thresholds should surround the true one
+    centres = params[:, 0][numpy.isfinite(params[:, 0])]
+    assert len(centres) > 40
+    assert numpy.percentile(centres, 2.5) < thresh < numpy.percentile(centres, 97.5)
+    # chunking doesn't change the resamples
+    chunked = data.bootStrapFit(data.FitCumNormal, intensities, trialResps,
+                                n=50, seed=3, chunkSize=7)
+    assert numpy.allclose(params, chunked, equal_nan=True)
+
+def test_bootStrapFit_parallel():
+    intensities, trialResps = _simulateTrials()
+    serial = data.bootStrapFit(data.FitWeibull, intensities, trialResps,
+                               n=20, seed=5, guess=[0.2, 2.0])
+    parallel = data.bootStrapFit(data.FitWeibull, intensities, trialResps,
+                                 n=20, seed=5, guess=[0.2, 2.0], nJobs=2)
+    assert numpy.allclose(serial, parallel, equal_nan=True)
+
+def test_bootStrapFit_chunksBounded(monkeypatch):
+    """With several processes, only a few chunks of resamples are drawn
+    ahead of their fits, not all of them at once"""
+    from psychopy.data import fit
+    imapBounded = fit._imapBounded
+    taken = [0]
+    given = [0]
+    ahead = []
+
+    def countingImap(pool, func, items, nAhead):
+        def counted():
+            for item in items:
+                taken[0] += 1
+                ahead.append(taken[0] - given[0])
+                yield item
+        for result in imapBounded(pool, func, counted(), nAhead):
+            given[0] += 1
+            yield result
+
+    monkeypatch.setattr(fit, '_imapBounded', countingImap)
+    intensities, trialResps = _simulateTrials()
+    params = data.bootStrapFit(data.FitCumNormal, intensities, trialResps,
+                               n=60, seed=3, chunkSize=5, nJobs=2)
+    assert params.shape == (60, 2)
+    # 12 chunks, each shared between 2 processes
+    assert taken[0] == 24
+    assert max(ahead) <= 4
+
 def teardown():
     if PLOTTING:
         pylab.show()
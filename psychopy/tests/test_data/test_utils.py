@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+import json
 import pytest
 import numpy as np
 from psychopy.data import utils
@@ -114,6 +115,39 @@ class Test_utilsClass:
         assert utils.bootStraps(data, n = 1).size == 3
         assert utils.bootStraps(data, n=1).ndim == len(utils.bootStraps(data,n = 1).shape)
 
+    def test_bootStraps_resamples(self):
+        data = np.arange(20).reshape(2, 10)
+        out = utils.bootStraps(data, n=500, chunkSize=64)
+        assert out.shape == (2, 10, 500)
+        # each resample of a condition only contains values from that row
+        assert np.isin(out[0], data[0]).all()
+        assert np.isin(out[1], data[1]).all()
+        # and the trials are drawn with replacement across all trials
+        assert set(np.unique(out[0])) == set(data[0])
+
+    def test_iterBootStraps(self):
+        data = np.arange(10)
+        chunks = list(utils.iterBootStraps(data, n=25, chunkSize=10))
+        assert [chunk.shape for chunk in chunks] == [(1, 10, 10),
+                                                     (1, 10, 10),
+                                                     (1, 10, 5)]
+
+    def test_functionFromStaircase_values(self):
+        intensities = [0.1, 0.3, 0.2, 0.1, 0.3, 0.3, 0.2, 0.4]
+        responses = [0, 1, 0, 1, 1, 1, 1, 1]
+        inten, resp, n = utils.functionFromStaircase(intensities, responses,
+                                                     'unique')
+        assert np.allclose(inten, [0.1, 0.2, 0.3, 0.4])
+        assert np.allclose(resp, [0.5, 0.5, 1.0, 1.0])
+        assert list(n) == [2, 2, 3, 1]
+        inten, resp, n = utils.functionFromStaircase(intensities, responses, 3)
+        # sorted: 0.1 0.1 0.2 | 0.2 0.3 0.3 | 0.3 0.4  (bins of 8/3 points)
+        assert list(n) == [3, 2, 3]
+        assert np.allclose(inten, [0.4 / 3, 0.25, 1.0 / 3])
+        # plain Python numbers, e.g. for saving as json
+        for values in (inten, resp, n):
+            json.dumps(values)
+
     def test_functionFromStaircase(self):
         import numpy as np
         intensities = np.arange(0,1,.1)
@@ -132,6 +166,43 @@ class Test_utilsClass:
         assert len(utils.functionFromStaircase(intensities, responses, binUniq)[1]) == len(responses)
         assert len(utils.functionFromStaircase(intensities, responses, binUniq)[2]) == len([1]*bin10)
 
+    def test_importConditions_cache(self, tmpdir):
+        fileName = str(tmpdir.join('conds.csv'))
+        with open(fileName, 'w') as f:
+            f.write('ori,pos\n0,"[0, 1]"\n90,"[1, 0]"\n')
+        conds = utils.importConditions(fileName)
+        assert conds[1]['pos'] == [1, 0]
+        # modifying what we were given doesn't affect later imports
+        conds[0]['ori'] = 45
+        conds[0]['pos'].append(2)
+        again = utils.importConditions(fileName)
+        assert again[0]['ori'] == 0
+        assert again[0]['pos'] == [0, 1]
+        # selections are applied to the cached conditions
+        assert utils.importConditions(fileName, selection='1')[0]['ori'] == 90
+        # a changed file is read again
+        with open(fileName, 'w') as f:
+            f.write('ori,pos\n180,"[0, 0]"\n')
+        stat = os.stat(fileName)
+        os.utime(fileName, (stat.st_atime, stat.st_mtime + 10))
+        conds = utils.importConditions(fileName)
+        assert len(conds) == 1
+        assert conds[0]['ori'] == 180
+
+    def test_importConditions_conversions(self, tmpdir):
+        fileName = str(tmpdir.join('convert.csv'))
+        with open(fileName, 'w') as f:
+            f.write('a,b,c,d\n'
+                    '1,"0,5","[1, 2]",hello\\nworld\n'
+                    '2,abc,,"[1, 2*3]"\n')
+        conds = utils.importConditions(fileName)
+        assert conds[0]['b'] == 0.5
+        assert conds[1]['b'] == 'abc'
+        assert conds[0]['c'] == [1, 2]
+        assert conds[1]['c'] is None
+        assert conds[0]['d'] == 'hello\nworld'
+        assert conds[1]['d'] == [1, 6]
+
     def test_getDateStr(self):
         import time
         assert utils.getDateStr() == time.strftime("%Y_%b_%d_%H%M", time.localtime())
@@ -154,6 +225,72 @@ def test_listFromString():
     # this would create a syntax error in ast.literal_eval
     assert ["Don't", "Do"] == utils.listFromString("Don't, Do")
 
+@pytest.mark.benchmark
+def test_bootStraps_benchmark(reportBenchmark):
+    """Compare vectorized resampling with a per-resample Python loop"""
+    import time
+    dat = np.random.rand(20, 200)
+    nResamples = 10000
+
+    t0 = time.perf_counter()
+    looped = np.zeros(dat.shape + (nResamples,), dat.dtype)
+    for stimulusN in range(dat.shape[0]):
+        for sampleN in range(nResamples):
+            indices = np.random.randint(dat.shape[1], size=dat.shape[1])
+            looped[stimulusN, :, sampleN] = dat[stimulusN, indices]
+    loopTime = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    utils.bootStraps(dat, n=nResamples)
+    vectorTime = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for chunk in utils.iterBootStraps(dat, n=nResamples, chunkSize=1000):
+        chunk.mean(axis=1)
+    chunkTime = time.perf_counter() - t0
+
+    intensities = np.random.rand(20000)
+    responses = (np.random.rand(20000) < intensities).astype(float)
+    t0 = time.perf_counter()
+    for n in range(100):
+        utils.functionFromStaircase(intensities, responses, 'unique')
+    binTime = (time.perf_counter() - t0) / 100
+
+    reportBenchmark("bootStraps 20x200x{}: loop {:.3f}s, vectorized {:.3f}s, "
+                    "chunked {:.3f}s; unique binning of 20000 trials {:.2f}ms"
+                    .format(nResamples, loopTime, vectorTime, chunkTime,
+                            binTime * 1000))
+    assert vectorTime < loopTime
+
+
+@pytest.mark.benchmark
+def test_importConditions_benchmark(tmpdir, reportBenchmark):
+    """Time importing a 50k row conditions file, with and without cache"""
+    import time
+    nRows = 50000
+    fileName = str(tmpdir.join('bigConditions.csv'))
+    with open(fileName, 'w') as f:
+        f.write('ori,sf,word,pos,corrAns\n')
+        for n in range(nRows):
+            f.write('{},"{},5",word{},"[{}, 0]",{}\n'.format(
+                n % 360, n % 7, n % 100, n % 3, 'left' if n % 2 else 'right'))
+
+    utils.clearConditionsCache()
+    t0 = time.perf_counter()
+    conds = utils.importConditions(fileName)
+    uncached = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    utils.importConditions(fileName)
+    cached = time.perf_counter() - t0
+
+    assert len(conds) == nRows
+    assert conds[3]['sf'] == 3.5
+    assert conds[4]['pos'] == [1, 0]
+    reportBenchmark("importConditions {} rows: {:.3f}s (parsed), {:.3f}s "
+                    "(cached)".format(nRows, uncached, cached))
+    assert cached < uncached
+
+
 if __name__ == '__main__':
     pytest.main()
 
@@ -0,0 +1,228 @@
+""" Test saving TrialHandler records (condition variables) to the ioHub
+DataStore, one at a time and buffered, and benchmark saving 100000 trial
+records end to end.
+
+The ioHub Server's udpServer runs in a thread, saving to a DataStore file,
+so no ioHub Server process or devices are needed.
+"""
+from __future__ import print_function
+
+import threading
+import time
+
+import pytest
+
+gevent = pytest.importorskip('gevent')
+pytest.importorskip('tables')
+
+from psychopy.iohub.server import udpServer
+from psychopy.iohub.errors import ioHubError
+from psychopy.iohub.client import ioHubConnection
+from psychopy.iohub.net import UDPClientConnection
+from psychopy.iohub.datastore import DataStoreFile, conditionVariableDtype
+
+
+class Trials(object):
+    """Just the trialList of a TrialHandler"""
+
+    def __init__(self, trialList):
+        self.trialList = trialList
+
+
+class CountingUdpServer(udpServer):
+    def handle(self, request, replyTo):
+        self.iohub.request_count += 1
+        return udpServer.handle(self, request, replyTo)
+
+
+class FakeIoServer(object):
+    """The parts of ioServer used by udpServer to save condition variables,
+    with the udpServer run in a thread."""
+
+    def __init__(self, dsfile):
+        self.dsfile = dsfile
+        self.request_count = 0
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.start()
+        self._started.wait()
+
+    def log(self, text, level=None):
+        pass
+
+    def _run(self):
+        # gevent servers belong to the thread they're created in
+        self.udpService = CountingUdpServer(self, '127.0.0.1:0')
+        self.udpService.start()
+        self.port = self.udpService.server_port
+        self._started.set()
+        while self.udpService._running:
+            gevent.sleep(0.01)
+        self.udpService.stop()
+
+    def stop(self):
+        self.udpService._running = False
+        self._thread.join()
+
+
+@pytest.fixture
+def iohub(tmpdir):
+    dsfile = DataStoreFile('events.hdf5', str(tmpdir), 'a',
+                           dict(multiple_sessions=True, flush_interval=32))
+    experiment_id = dsfile.createOrUpdateExperimentEntry(
+        [0, 'test', 'Test', 'desc', 'v1.0', 0])
+    session_id = dsfile.createExperimentSessionEntry(
+        dict(code='s1', name='', comments='', user_variables='{}'))
+    server = FakeIoServer(dsfile)
+    hub = ioHubConnection.__new__(ioHubConnection)
+    hub.udp_client = UDPClientConnection(remote_port=server.port)
+    hub.udp_client.sock.settimeout(5.0)
+    hub._shutdown_attempted = True
+    hub.experimentID = experiment_id
+    hub.experimentSessionID = session_id
+    hub._cv_order = None
+    hub._cv_rows = []
+    hub._cv_rows_size = 0
+    yield hub, server, dsfile
+    server.stop()
+    hub.udp_client.close()
+    dsfile.close()
+
+
+def trialList(n):
+    return [dict(trial=i, ori=i * 22.5, condition=u'cond\xe9 %d' % (i % 4))
+            for i in range(n)]
+
+
+def savedRows(dsfile):
+    return dsfile.TABLES['EXP_CV'].read()
+
+
+def test_conditionVariableDtype():
+    # as msgpack gives them to the ioHub Server
+    fields = [[b'condition', b'S', 256], ['trial', 'i8'], ['pos', 'f8', [2]],
+              ['stim', [['name', 'S16'], ['size', 'f4']]]]
+    dtype = conditionVariableDtype(fields)
+    assert dtype.names == ('EXPERIMENT_ID', 'SESSION_ID', 'condition', 'trial',
+                           'pos', 'stim')
+    assert dtype['condition'].itemsize == 256
+    assert dtype['pos'].shape == (2,)
+    assert dtype['stim'].names == ('name', 'size')
+    # cached
+    assert conditionVariableDtype(fields) is dtype
+
+
+def test_records(iohub):
+    hub, server, dsfile = iohub
+    trials = Trials(trialList(10))
+    hub.createTrialHandlerRecordTable(trials, ['trial', 'ori', 'condition'])
+    request_count = server.request_count
+    hub.addTrialHandlerRecord(trials.trialList[0])
+    for trial in trials.trialList[1:8]:
+        assert hub.addTrialHandlerRecord(trial, buffered=True) is None
+    assert server.request_count == request_count + 1
+    assert len(savedRows(dsfile)) == 1
+    # buffered records are sent before one that isn't
+    hub.addTrialHandlerRecord(trials.trialList[8])
+    assert server.request_count == request_count + 3
+    hub.addTrialHandlerRecord(trials.trialList[9], buffered=True)
+    assert hub.flushTrialHandlerRecords() == 1
+    assert hub.flushTrialHandlerRecords() == 0
+    rows = savedRows(dsfile)
+    assert list(rows['trial']) == list(range(10))
+    assert list(rows['ori']) == [i * 22.5 for i in range(10)]
+    assert rows['condition'][5].decode('utf-8') == u'cond\xe9 1'
+    assert set(rows['SESSION_ID']) == {hub.experimentSessionID}
+
+
+def test_raggedRecords(iohub):
+    """Rows without a value for each variable aren't saved, rather than
+    saving whatever was in memory for the missing values"""
+    hub, server, dsfile = iohub
+    trials = Trials(trialList(3))
+    hub.createTrialHandlerRecordTable(trials, ['trial', 'ori', 'condition'])
+    exp_id, sess_id = hub.experimentID, hub.experimentSessionID
+    for rows in ([[0, 0.0, b'a'], [1, 22.5]],
+                 [[0, 0.0, b'a', 1]],
+                 [[0, 0.0]]):
+        with pytest.raises(ValueError):
+            dsfile.extendConditionVariableTableRows(exp_id, sess_id, rows)
+    with pytest.raises(ValueError):
+        dsfile.extendConditionVariableTable(exp_id, sess_id, [0, 0.0])
+    assert len(savedRows(dsfile)) == 0
+    assert dsfile.extendConditionVariableTableRows(
+        exp_id, sess_id, [[0, 0.0, b'a'], [1, 22.5, b'b']]) == 2
+    assert list(savedRows(dsfile)['condition']) == [b'a', b'b']
+
+
+def test_badRecordNotBuffered(iohub):
+    """A record without a value for each variable fails when it's added,
+    not when the buffered records are sent"""
+    hub, server, dsfile = iohub
+    trials = Trials(trialList(3))
+    hub.createTrialHandlerRecordTable(trials, ['trial', 'ori', 'condition'])
+    hub.addTrialHandlerRecord(trials.trialList[0], buffered=True)
+    for record in ([1, 22.5], [1, 22.5, b'a', 2]):
+        with pytest.raises(ValueError):
+            hub.addTrialHandlerRecord(record, buffered=True)
+    hub.addTrialHandlerRecord(trials.trialList[1], buffered=True)
+    assert hub.flushTrialHandlerRecords() == 2
+    assert list(savedRows(dsfile)['trial']) == [0, 1]
+
+
+def test_recordsKeptUntilSent(iohub, monkeypatch):
+    """Buffered records aren't lost if sending them fails"""
+    hub, server, dsfile = iohub
+    trials = Trials(trialList(5))
+    hub.createTrialHandlerRecordTable(trials, ['trial', 'ori', 'condition'])
+    for trial in trials.trialList:
+        hub.addTrialHandlerRecord(trial, buffered=True)
+
+    def fail(request):
+        raise ioHubError('no reply')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(hub, '_sendToHubServer', fail)
+        with pytest.raises(ioHubError):
+            hub.flushTrialHandlerRecords()
+    assert len(savedRows(dsfile)) == 0
+    assert hub.flushTrialHandlerRecords() == 5
+    assert list(savedRows(dsfile)['trial']) == list(range(5))
+    assert hub.flushTrialHandlerRecords() == 0
+
+
+def test_recordsSplitIntoPackets(iohub):
+    """Buffered records are sent when there's a UDP packet's worth"""
+    hub, server, dsfile = iohub
+    trials = Trials([dict(trial=i, text='x' * 200) for i in range(1000)])
+    hub.createTrialHandlerRecordTable(trials, ['trial', 'text'])
+    request_count = server.request_count
+    for trial in trials.trialList:
+        hub.addTrialHandlerRecord(trial, buffered=True)
+    hub.flushTrialHandlerRecords()
+    # ~210 bytes a record
+    assert server.request_count - request_count == 4
+    assert list(savedRows(dsfile)['trial']) == list(range(1000))
+
+
+@pytest.mark.benchmark
+def test_records_benchmark(iohub, reportBenchmark):
+    """Trial records saved per second, one at a time and buffered, including
+    100000 buffered records"""
+    hub, server, dsfile = iohub
+    trials = Trials(trialList(100000))
+    hub.createTrialHandlerRecordTable(trials, ['trial', 'ori', 'condition'])
+    results = {}
+    for mode, n in [('single', 5000), ('buffered', 100000)]:
+        request_count = server.request_count
+        stime = time.perf_counter()
+        for trial in trials.trialList[:n]:
+            hub.addTrialHandlerRecord(trial, buffered=mode == 'buffered')
+        hub.flushTrialHandlerRecords()
+        elapsed = time.perf_counter() - stime
+        results[mode] = (n, n / elapsed, server.request_count - request_count)
+    assert len(savedRows(dsfile)) == 105000
+    for mode, (n, rate, requests) in results.items():
+        reportBenchmark("{}: {} records in {} requests, {:.0f} records/sec"
+                        .format(mode, n, requests, rate))
+    assert results['buffered'][1] > 10 * results['single'][1]
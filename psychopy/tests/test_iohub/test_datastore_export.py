@@ -0,0 +1,202 @@
+""" Test exporting ioHub DataStore files to Parquet and Feather files, and
+benchmark the size and load time of the exported eye samples against the
+HDF5 file.
+"""
+from __future__ import print_function
+
+import os
+import time
+
+import numpy
+import pytest
+
+pytest.importorskip('tables')
+pandas = pytest.importorskip('pandas')
+
+from psychopy.iohub.datastore import DataStoreFile
+from psychopy.iohub.datastore.util import open_file
+from psychopy.iohub.datastore.export import (exportDataStore, TrialLookup,
+                                             iterEventTableFrames,
+                                             havePyarrow)
+from psychopy.iohub.devices.eyetracker import MonocularEyeSampleEvent
+from psychopy.iohub.devices.experiment import MessageEvent
+
+FILE_NAME = 'events.hdf5'
+SAMPLES = '/data_collection/events/eyetracker/MonocularEyeSampleEvent'
+MESSAGES = '/data_collection/events/experiment/MessageEvent'
+
+requiresPyarrow = pytest.mark.skipif(not havePyarrow,
+                                     reason='pyarrow is not installed')
+
+
+class FakeDevice(object):
+    pass
+
+
+def makeDataFile(folder, n_samples, n_trials=10, rate=1000.0):
+    """A DataStore file for two sessions of n_trials 1 sec trials, each
+    starting with a message and with a condition variable row, and
+    n_samples eye samples at rate Hz from the start of the session"""
+    settings = dict(multiple_sessions=True, flush_interval=-1)
+    datastore = DataStoreFile(FILE_NAME, str(folder), 'a', settings)
+    datastore.updateDataStoreStructure(
+        FakeDevice(), {'MonocularEyeSampleEvent': MonocularEyeSampleEvent,
+                       'MessageEvent': MessageEvent})
+    experiment_id = datastore.createOrUpdateExperimentEntry(
+        [0, 'test', 'Test', 'desc', 'v1.0', 0])
+    samples_table = datastore.TABLES[MonocularEyeSampleEvent.IOHUB_DATA_TABLE]
+    messages_table = datastore.TABLES[MessageEvent.IOHUB_DATA_TABLE]
+    for session in range(2):
+        session_id = datastore.createExperimentSessionEntry(
+            dict(code='s%d' % session, name='', comments='',
+                 user_variables='{}'))
+        datastore.initConditionVariableTable(
+            experiment_id, session_id,
+            [('trial', 'i4'), ('condition', 'S16'), ('trial_start', 'f8'),
+             ('trial_end', 'f8')])
+        messages = numpy.zeros(n_trials, dtype=MessageEvent.NUMPY_DTYPE)
+        messages['session_id'] = session_id
+        messages['type'] = MessageEvent.EVENT_TYPE_ID
+        messages['time'] = 10.0 + numpy.arange(n_trials) * 1.5
+        messages['text'] = [(u'trial %d \xe9' % (i % 3)).encode('utf-8')
+                            for i in range(n_trials)]
+        messages_table.append(messages)
+        for i in range(n_trials):
+            start = messages['time'][i]
+            datastore.extendConditionVariableTable(
+                experiment_id, session_id,
+                [i, ['easy', 'hard'][i % 2], start, start + 1.0])
+        for start in range(0, n_samples, 100000):
+            n = min(100000, n_samples - start)
+            samples = numpy.zeros(n, dtype=MonocularEyeSampleEvent.NUMPY_DTYPE)
+            samples['session_id'] = session_id
+            samples['event_id'] = numpy.arange(start, start + n)
+            samples['type'] = MonocularEyeSampleEvent.EVENT_TYPE_ID
+            samples['time'] = numpy.arange(start, start + n) / rate
+            samples['gaze_x'] = numpy.sin(samples['time'])
+            samples_table.append(samples)
+    datastore.close()
+    return os.path.join(str(folder), FILE_NAME)
+
+
+@pytest.fixture(scope='module')
+def dataFile(tmpdir_factory):
+    return makeDataFile(tmpdir_factory.mktemp('export'), 30000)
+
+
+def readTable(path, table_path):
+    hubFile = open_file(path, 'r')
+    try:
+        return hubFile.get_node(table_path).read()
+    finally:
+        hubFile.close()
+
+
+def conditionVariables(path):
+    hubFile = open_file(path, 'r')
+    try:
+        conditions = pandas.DataFrame(
+            hubFile.root.data_collection.condition_variables.EXP_CV_1.read())
+    finally:
+        hubFile.close()
+    conditions['condition'] = conditions['condition'].str.decode('utf-8')
+    return conditions
+
+
+def test_eventTableFrames(dataFile):
+    hubFile = open_file(dataFile, 'r')
+    try:
+        table = hubFile.get_node(MESSAGES)
+        frames = list(iterEventTableFrames(table, chunk_size=4))
+    finally:
+        hubFile.close()
+    assert [len(f) for f in frames] == [4, 4, 4, 4, 4]
+    texts = [f['text'] for f in frames]
+    # the same categories in every chunk, so they can be written together
+    assert all(t.dtype.name == 'category' for t in texts)
+    assert all(list(t.cat.categories) == [u'trial 0 \xe9', u'trial 1 \xe9',
+                                          u'trial 2 \xe9'] for t in texts)
+    frame = pandas.concat(frames, ignore_index=True)
+    expected = readTable(dataFile, MESSAGES)
+    assert list(frame['text']) == [t.decode('utf-8') for t in expected['text']]
+    assert numpy.array_equal(frame['time'].values, expected['time'])
+
+
+def test_trialLookup(dataFile):
+    trials = TrialLookup(conditionVariables(dataFile), 'trial_start',
+                         'trial_end')
+    session_ids = numpy.array([1, 1, 1, 2, 2, 3])
+    times = numpy.array([9.0, 10.0, 11.2, 11.0, 24.0, 10.5])
+    assert list(trials.trialRows(session_ids, times)) == [-1, 0, -1, 10, 19,
+                                                          -1]
+    frame = pandas.DataFrame(dict(session_id=session_ids, time=times,
+                                  trial=numpy.zeros(6)))
+    joined = trials.join(frame)
+    assert list(joined.columns) == ['session_id', 'time', 'trial', 'cv_trial',
+                                    'condition', 'trial_start', 'trial_end']
+    assert list(joined['cv_trial'].fillna(-1)) == [-1, 0, -1, 0, 9, -1]
+    assert list(joined['condition'].astype(object).fillna('')) == [
+        '', 'easy', '', 'easy', 'hard', '']
+    with pytest.raises(KeyError):
+        TrialLookup(conditionVariables(dataFile), 'trial_onset', 'trial_end')
+
+
+def test_noPyarrow(dataFile, tmpdir, monkeypatch):
+    from psychopy.iohub.datastore import export
+    monkeypatch.setattr(export, 'havePyarrow', False)
+    with pytest.raises(ImportError):
+        exportDataStore(dataFile, str(tmpdir))
+
+
+@requiresPyarrow
+@pytest.mark.parametrize('file_format', ['parquet', 'feather'])
+@pytest.mark.parametrize('processes', [1, 2])
+def test_roundTrip(dataFile, tmpdir, file_format, processes):
+    exported = exportDataStore(dataFile, str(tmpdir), file_format,
+                               trial_start='trial_start',
+                               trial_end='trial_end', chunk_size=7000,
+                               processes=processes)
+    assert sorted(exported) == ['EXP_CV_1', 'MessageEvent',
+                                'MonocularEyeSampleEvent',
+                                'session_meta_data']
+    read = getattr(pandas, 'read_' + file_format)
+    samples = read(exported['MonocularEyeSampleEvent'])
+    expected = readTable(dataFile, SAMPLES)
+    assert len(samples) == len(expected)
+    for name in expected.dtype.names:
+        assert numpy.array_equal(samples[name].values, expected[name]), name
+    in_trial = samples['trial'].notnull()
+    assert in_trial.sum() == 2 * 10 * 1001
+    assert (samples['time'][in_trial] >= samples['trial_start'][in_trial]).all()
+    assert list(samples['condition'].cat.categories) == ['easy', 'hard']
+
+    messages = read(exported['MessageEvent'])
+    assert messages['text'].dtype.name == 'category'
+    assert list(messages['condition']) == ['easy', 'hard'] * 10
+    conditions = read(exported['EXP_CV_1'])
+    assert len(conditions) == 20
+
+
+@pytest.mark.benchmark
+@requiresPyarrow
+def test_export_benchmark(tmpdir, reportBenchmark):
+    """Size and load time of 1M eye samples as HDF5, Parquet and Feather"""
+    path = makeDataFile(tmpdir.mkdir('hdf5'), 500000, n_trials=200)
+    results = {}
+    stime = time.perf_counter()
+    frame = pandas.DataFrame(readTable(path, SAMPLES))
+    results['hdf5'] = (os.path.getsize(path), time.perf_counter() - stime)
+    for file_format in ['parquet', 'feather']:
+        exported = exportDataStore(path, str(tmpdir.join(file_format)),
+                                   file_format, event_tables=[
+                                       'MonocularEyeSampleEvent'])
+        export_path = exported['MonocularEyeSampleEvent']
+        stime = time.perf_counter()
+        loaded = getattr(pandas, 'read_' + file_format)(export_path)
+        results[file_format] = (os.path.getsize(export_path),
+                                time.perf_counter() - stime)
+        assert len(loaded) == len(frame)
+    for file_format, (size, t) in results.items():
+        reportBenchmark("{}: {:.1f}MB, loaded in {:.0f}ms".format(
+            file_format, size / 1e6, t * 1000))
+    assert results['parquet'][0] < results['hdf5'][0]
@@ -0,0 +1,188 @@
+""" Test the indexes ioHub gives DataStore file event tables when it closes
+them, and reading the events of a set of time windows or chunks with the
+ExperimentDataAccessUtility, and benchmark getting the samples of each trial
+from a generated eye sample file.
+"""
+from __future__ import print_function
+
+import time
+
+import numpy
+import pytest
+
+pytest.importorskip('tables')
+
+from psychopy.iohub.datastore import DataStoreFile
+from psychopy.iohub.datastore.util import (ExperimentDataAccessUtility,
+                                           ExperimentDataAccessException,
+                                           read_where)
+from psychopy.iohub.devices.eyetracker import MonocularEyeSampleEvent
+
+SAMPLE = MonocularEyeSampleEvent.EVENT_TYPE_ID
+FILE_NAME = 'events.hdf5'
+
+
+class FakeEyeTracker(object):
+    pass
+
+
+def makeDataFile(folder, n_samples, n_sessions=2, rate=1000.0,
+                 index_on_close=True):
+    """A DataStore file with n_samples eye samples from each session,
+    recorded at rate Hz from 10 sec after the session's ioHub Server started,
+    so the sessions' times overlap"""
+    settings = dict(multiple_sessions=True, flush_interval=-1,
+                    index_on_close=index_on_close)
+    datastore = DataStoreFile(FILE_NAME, str(folder), 'a', settings)
+    datastore.updateDataStoreStructure(
+        FakeEyeTracker(), {'MonocularEyeSampleEvent': MonocularEyeSampleEvent})
+    datastore.createOrUpdateExperimentEntry(
+        [0, 'test', 'Test', 'desc', 'v1.0', 0])
+    table = datastore.TABLES[MonocularEyeSampleEvent.IOHUB_DATA_TABLE]
+    chunk_size = 100000
+    for session in range(n_sessions):
+        session_id = datastore.createExperimentSessionEntry(
+            dict(code='s%d' % session, name='', comments='',
+                 user_variables='{}'))
+        for start in range(0, n_samples, chunk_size):
+            n = min(chunk_size, n_samples - start)
+            samples = numpy.zeros(n, dtype=MonocularEyeSampleEvent.NUMPY_DTYPE)
+            samples['experiment_id'] = datastore.active_experiment_id
+            samples['session_id'] = session_id
+            samples['event_id'] = numpy.arange(start, start + n)
+            samples['type'] = SAMPLE
+            samples['time'] = 10.0 + numpy.arange(start, start + n) / rate
+            samples['device_time'] = samples['time'] + 1000.0
+            samples['gaze_x'] = samples['event_id'] % 1000
+            table.append(samples)
+    datastore.close()
+
+
+@pytest.fixture(scope='module')
+def dataFile(tmpdir_factory):
+    folder = tmpdir_factory.mktemp('datastore')
+    makeDataFile(folder, 20000)
+    return str(folder)
+
+
+@pytest.fixture
+def dataAccess(dataFile):
+    data = ExperimentDataAccessUtility(dataFile, FILE_NAME)
+    yield data
+    data.close()
+
+
+def trialWindows(n_trials, duration=1.5, iti=0.5, stime=10.2):
+    start_times = stime + numpy.arange(n_trials) * (duration + iti)
+    return start_times, start_times + duration
+
+
+def test_indexedOnClose(dataAccess):
+    table = dataAccess.getEventTable(SAMPLE)
+    assert table.nrows == 40000
+    for name in ['time', 'session_id', 'device_time']:
+        col = table.cols._f_col(name)
+        assert col.is_indexed and col.index.is_csi
+    assert not table.cols.gaze_x.is_indexed
+
+
+@pytest.mark.parametrize('session_id', [None, 1, 2])
+def test_eventWindows(dataAccess, session_id):
+    table = dataAccess.getEventTable(SAMPLE)
+    start_times, end_times = trialWindows(5)
+    # an empty window, and one past the last sample
+    start_times = numpy.append(start_times, [10.0001, 35.0])
+    end_times = numpy.append(end_times, [10.0002, 40.0])
+    windows = dataAccess.getEventWindows(SAMPLE, start_times, end_times,
+                                         session_id)
+    assert len(windows) == 7
+    for events, t1, t2 in zip(windows, start_times, end_times):
+        condition = '(time >= %r) & (time <= %r)' % (t1, t2)
+        if session_id is not None:
+            condition += ' & (session_id == %d)' % session_id
+        expected = getattr(table, read_where)(condition)
+        expected = expected[numpy.argsort(expected['time'], kind='mergesort')]
+        assert numpy.array_equal(events, expected)
+    assert len(windows[0]) == 1501 * (2 if session_id is None else 1)
+    assert len(windows[5]) == len(windows[6]) == 0
+    # the sorted times are reused
+    assert len(dataAccess._sortedTimes) == 1
+    dataAccess.getEventWindows(SAMPLE, start_times, end_times, session_id)
+    assert len(dataAccess._sortedTimes) == 1
+
+
+def test_eventWindowFields(dataAccess):
+    windows = dataAccess.getEventWindows(
+        SAMPLE, [1011.0], [1011.01], session_id=2, fields=['time', 'gaze_x'],
+        time_column='device_time')
+    assert windows[0].dtype.names == ('time', 'gaze_x')
+    assert list(windows[0]['gaze_x']) == list(range(0, 11))
+    with pytest.raises(ValueError):
+        dataAccess.getEventWindows(SAMPLE, [1.0, 2.0], [3.0])
+    with pytest.raises(ExperimentDataAccessException):
+        dataAccess.getEventWindows('NoSuchEvent', [1.0], [2.0])
+
+
+def test_chunkIterator(dataAccess):
+    chunks = list(dataAccess.getEventChunkIterator(SAMPLE, chunk_size=15000))
+    assert [len(c) for c in chunks] == [15000, 15000, 10000]
+    table = dataAccess.getEventTable(SAMPLE)
+    assert numpy.array_equal(numpy.concatenate(chunks), table.read())
+    chunks = list(dataAccess.getEventChunkIterator(
+        SAMPLE, chunk_size=15000, condition='session_id == 2',
+        fields=['gaze_x']))
+    assert [len(c) for c in chunks] == [0, 10000, 10000]
+    assert chunks[1].dtype.names == ('gaze_x',)
+
+
+def test_createIndexes(tmpdir):
+    makeDataFile(tmpdir, 1000, index_on_close=False)
+    data = ExperimentDataAccessUtility(str(tmpdir), FILE_NAME, mode='a')
+    try:
+        assert not data.getEventTable(SAMPLE).cols.time.is_indexed
+        assert data.createIndexes() == 3
+        assert data.getEventTable(SAMPLE).cols.time.index.is_csi
+        # already up to date
+        assert data.createIndexes() == 0
+    finally:
+        data.close()
+
+
+@pytest.mark.benchmark
+def test_eventWindows_benchmark(tmpdir, reportBenchmark):
+    """Time to get the samples of each of 200 trials of a session, querying
+    the table for each trial without and with indexes, and with
+    getEventWindows()"""
+    n_samples = 500000
+    results = {}
+    for indexed in [False, True]:
+        folder = tmpdir.mkdir('indexed' if indexed else 'not_indexed')
+        makeDataFile(folder, n_samples, index_on_close=indexed)
+        start_times, end_times = trialWindows(200)
+        data = ExperimentDataAccessUtility(str(folder), FILE_NAME)
+        try:
+            table = data.getEventTable(SAMPLE)
+            stime = time.perf_counter()
+            expected = [getattr(table, read_where)(
+                '(session_id == 2) & (time >= %r) & (time <= %r)' % (t1, t2))
+                for t1, t2 in zip(start_times, end_times)]
+            results['read_where' + (' indexed' if indexed else '')] = \
+                time.perf_counter() - stime
+            if indexed:
+                stime = time.perf_counter()
+                windows = data.getEventWindows(SAMPLE, start_times, end_times,
+                                               session_id=2)
+                results['windows'] = time.perf_counter() - stime
+                stime = time.perf_counter()
+                data.getEventWindows(SAMPLE, start_times, end_times,
+                                     session_id=2)
+                results['windows again'] = time.perf_counter() - stime
+                for w, e in zip(windows, expected):
+                    assert numpy.array_equal(w, e)
+        finally:
+            data.close()
+    for mode, t in results.items():
+        reportBenchmark("{}: {:.1f}ms for 200 trials of {} rows".format(
+            mode, t * 1000, 2 * n_samples))
+    assert results['windows'] < results['read_where']
+    assert results['windows again'] < results['read_where indexed']
@@ -0,0 +1,237 @@
+""" Test sending ioHub events to clients as numpy event batches (msgpack
+ExtTypes), and benchmark GET_EVENTS replies of 10000 events from a stand-in
+ioHub Server process.
+"""
+from __future__ import print_function
+
+import multiprocessing
+import socket
+import time
+from collections import deque
+
+import msgpack
+import pytest
+
+pytest.importorskip('gevent')
+
+from psychopy.iohub.net import (packEventBatches, unpackExtType,
+                                unpackEventBatches, UDPClientConnection)
+from psychopy.iohub.devices import DeviceEvent
+from psychopy.iohub.devices.keyboard import (KeyboardPressEvent,
+                                             KeyboardReleaseEvent)
+from psychopy.iohub.devices.experiment import MessageEvent
+from psychopy.iohub.constants import EventConstants
+
+event_classes = {EventConstants.KEYBOARD_PRESS: KeyboardPressEvent,
+                 EventConstants.KEYBOARD_RELEASE: KeyboardReleaseEvent,
+                 EventConstants.MESSAGE: MessageEvent}
+
+
+def makeEvent(event_class, hub_time, **attributes):
+    names = event_class.CLASS_ATTRIBUTE_NAMES
+    dtype = event_class.NUMPY_DTYPE
+    evt = []
+    for name in names:
+        kind = dtype.fields[name][0].kind
+        evt.append('' if kind == 'S' else 0.0 if kind == 'f' else 0)
+    evt[DeviceEvent.EVENT_TYPE_ID_INDEX] = event_class.EVENT_TYPE_ID
+    evt[DeviceEvent.EVENT_HUB_TIME_INDEX] = hub_time
+    for name, value in attributes.items():
+        evt[names.index(name)] = value
+    return evt
+
+
+def makeKeyEvents(n):
+    events = []
+    for i in range(n):
+        event_class = [KeyboardPressEvent, KeyboardReleaseEvent][i % 2]
+        events.append(makeEvent(event_class, 1.0 + i * 0.001, key='a',
+                                char='a', event_id=i, modifiers=2,
+                                duration=0.05 * (i % 2)))
+    return events
+
+
+def sendAndReceive(reply):
+    """reply packed by the server and unpacked by the client"""
+    unpacker = msgpack.Unpacker(use_list=True, ext_hook=unpackExtType)
+    unpacker.feed(msgpack.Packer().pack(reply))
+    return unpacker.unpack()
+
+
+def test_roundTrip():
+    events = makeKeyEvents(6)
+    events += [
+        # strings longer than the dtype, and not ascii
+        makeEvent(MessageEvent, 1.0025, text='x' * 300, category='trial'),
+        makeEvent(KeyboardPressEvent, 1.0035, key='eacute',
+                  char=u'é'),
+    ]
+    events.sort(key=lambda e: e[DeviceEvent.EVENT_HUB_TIME_INDEX])
+    packed = packEventBatches(events, event_classes.get)
+    # a batch for each type
+    assert len(packed) == 3
+    assert all(isinstance(e, msgpack.ExtType) for e in packed)
+    received = unpackEventBatches(sendAndReceive(packed))
+    assert received == events
+
+    # events that don't fit their dtype are sent as lists
+    events.append(makeEvent(MessageEvent, 1.0045, text='no offset')[:-2])
+    events.sort(key=lambda e: e[DeviceEvent.EVENT_HUB_TIME_INDEX])
+    packed = packEventBatches(events, event_classes.get)
+    assert len(packed) == 2 + 2
+    assert sum(isinstance(e, msgpack.ExtType) for e in packed) == 2
+
+    received = unpackEventBatches(sendAndReceive(packed))
+    assert received == events
+
+    # as are events of a type with a non-integer value of an integer field
+    # (rather than it being rounded)
+    events.append(makeEvent(KeyboardPressEvent, 1.0055, key='a',
+                            modifiers=2.5))
+    packed = packEventBatches(events, event_classes.get)
+    assert sum(isinstance(e, msgpack.ExtType) for e in packed) == 1
+    received = unpackEventBatches(sendAndReceive(packed))
+    assert received == events
+
+    # events of unknown types are sent as lists too
+    assert packEventBatches(events, lambda etype: None) is events
+
+
+@pytest.mark.parametrize('reply', [[], [[1, 2, 3]]])
+def test_noBatches(reply):
+    assert unpackEventBatches(reply) is reply
+
+
+def asType(events, as_type):
+    """events converted by their event classes, as the client did"""
+    if as_type == 'list':
+        return events
+    make = {'namedtuple': 'createEventAsNamedTuple',
+            'dict': 'createEventAsDict',
+            'object': 'createEventAsDict'}[as_type]
+    return [getattr(event_classes[e[DeviceEvent.EVENT_TYPE_ID_INDEX]],
+                    make)(list(e)) for e in events]
+
+
+class EventDevice(object):
+    """A device of the ioHub Server, with events to get"""
+
+    def __init__(self, events):
+        self.events = events
+
+    def getEvents(self, *args, **kwargs):
+        return list(self.events)
+
+
+@pytest.mark.parametrize('as_type', ['list', 'namedtuple', 'dict', 'object'])
+def test_deviceGetEvents(monkeypatch, as_type):
+    """Device getEvents() results are sent as event batches too, and made
+    into events of as_type straight from them"""
+    from psychopy.iohub.server import udpServer, ioServer, BatchReplies
+    from psychopy.iohub.client import DeviceRPC
+    monkeypatch.setattr(EventConstants, 'getClass',
+                        staticmethod(event_classes.get))
+    events = makeKeyEvents(6)
+    events.insert(3, makeEvent(MessageEvent, 1.0025, text=u'caf\xe9'))
+    monkeypatch.setattr(ioServer, 'deviceDict',
+                        {'Keyboard': EventDevice(events)})
+    server = udpServer(EventSource([]), '127.0.0.1:0')
+    replies = []
+
+    def sendToHub(request):
+        reply = BatchReplies(None)
+        server.handleRequest(sendAndReceive(request), reply)
+        replies.extend(reply)
+        return sendAndReceive(reply[0])
+
+    received = DeviceRPC(sendToHub, 'Keyboard', 'getEvents')(as_type=as_type)
+    assert replies[0][0] == 'DEV_RPC_RESULT'
+    assert len(replies[0][1]) == 3
+    assert all(isinstance(e, msgpack.ExtType) for e in replies[0][1])
+    if as_type == 'object':
+        names = KeyboardPressEvent.CLASS_ATTRIBUTE_NAMES
+        assert [type(e) for e in received] == [
+            event_classes[e[DeviceEvent.EVENT_TYPE_ID_INDEX]]
+            for e in events]
+        received = [dict((name, getattr(e, name)) for name in names)
+                    for e in received if not isinstance(e, MessageEvent)]
+        events = [e for e in events if len(e) == len(names)]
+    assert received == asType(events, as_type)
+
+
+class EventSource(object):
+    """The parts of ioServer used by udpServer to reply to GET_EVENTS, with
+    an event buffer that always has the same events."""
+
+    class EventBuffer(deque):
+        def clear(self):
+            pass
+
+    def __init__(self, events):
+        self.eventBuffer = self.EventBuffer(events)
+
+    def log(self, text, level=None):
+        pass
+
+    def processDeviceEvents(self):
+        pass
+
+
+def serveEvents(n_events, port_queue):
+    """Runs a stand-in ioHub Server process replying to GET_EVENTS"""
+    from psychopy.iohub.server import udpServer
+    EventConstants.addClassMappings(list(event_classes.keys()),
+                                    event_classes)
+    server = udpServer(EventSource(makeKeyEvents(n_events)), '127.0.0.1:0')
+    server.start()
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+@pytest.mark.benchmark
+def test_eventBatch_benchmark(monkeypatch, reportBenchmark):
+    """Time for a client to get 10000 events (as namedtuples) from another
+    process, sent as lists and as event batches"""
+    from psychopy.iohub.client import ioHubConnection
+    monkeypatch.setattr(EventConstants, 'getClass',
+                        staticmethod(event_classes.get))
+    n_events = 10000
+    ctx = multiprocessing.get_context('spawn')
+    port_queue = ctx.Queue()
+    proc = ctx.Process(target=serveEvents, args=(n_events, port_queue))
+    proc.daemon = True
+    proc.start()
+    hub = ioHubConnection.__new__(ioHubConnection)
+    hub._shutdown_attempted = True
+    hub.allEvents = []
+    hub.udp_client = UDPClientConnection(remote_port=port_queue.get(
+        timeout=60))
+    hub.udp_client.sock.settimeout(10.0)
+    # room for a whole reply, so no packets are dropped
+    hub.udp_client.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                   8 * 1024 * 1024)
+    try:
+        times = {}
+        results = {}
+        for mode in ['lists', 'batches', 'lists', 'batches']:
+            t0 = time.perf_counter()
+            for i in range(5):
+                if mode == 'lists':
+                    events = hub._convertEvents(
+                        hub._sendToHubServer(('GET_EVENTS',))[1],
+                        'namedtuple')
+                else:
+                    events = hub.getEvents()
+            times[mode] = (time.perf_counter() - t0) / 5
+            results[mode] = events
+    finally:
+        hub.udp_client.close()
+        proc.terminate()
+        proc.join()
+
+    assert len(results['lists']) == n_events
+    assert results['batches'] == results['lists']
+    for mode, t in times.items():
+        reportBenchmark("{}: {:.1f}ms per {} event reply ({:.0f} events/sec)"
+                        .format(mode, t * 1000, n_events, n_events / t))
+    assert times['batches'] < times['lists']
@@ -0,0 +1,246 @@
+""" Test that Keyboard.waitForKeys() is woken up by ioHub Server event
+notifications, rather than asking the server for events every few msec.
+
+The ioHub Server's udpServer and event processing run in a thread (with a
+stand-in keyboard device), so no ioHub Server process or real keyboard is
+needed.
+"""
+from __future__ import print_function
+
+import threading
+import time
+from collections import deque
+
+import pytest
+
+gevent = pytest.importorskip('gevent')
+
+from psychopy.iohub.server import (ioServer, udpServer, EventNotifier,
+                                   DevicePollScheduler)
+from psychopy.iohub.client import ioHubConnection
+from psychopy.iohub.client.keyboard import Keyboard
+from psychopy.iohub.net import UDPClientConnection, EventNotificationSocket
+from psychopy.iohub.devices import Computer, DeviceEvent
+from psychopy.iohub.devices.keyboard import KeyboardInputEvent
+from psychopy.iohub.constants import EventConstants
+
+getTime = Computer.getTime
+
+KEY_PRESS = EventConstants.KEYBOARD_PRESS
+KEY_RELEASE = EventConstants.KEYBOARD_RELEASE
+attrib_names = KeyboardInputEvent.CLASS_ATTRIBUTE_NAMES
+
+
+def makeKeyEvent(key, etype=KEY_PRESS):
+    evt = [0] * len(attrib_names)
+    evt[DeviceEvent.EVENT_TYPE_ID_INDEX] = etype
+    evt[DeviceEvent.EVENT_HUB_TIME_INDEX] = getTime()
+    evt[attrib_names.index('key')] = key
+    evt[attrib_names.index('char')] = key
+    evt[attrib_names.index('modifiers')] = 0
+    return evt
+
+
+class FakeKeyboard(object):
+    """Just enough of an ioHub Server keyboard device: key events appended to
+    native_events (from any thread) are processed by ioServer."""
+    name = 'keyboard'
+
+    def __init__(self):
+        self.native_events = deque()
+        self._iohub_event_buffer = dict()
+        self._filters = dict()
+
+    def _getNativeEventBuffer(self):
+        return self.native_events
+
+    def _getIOHubEventObjects(self, native_events):
+        return native_events
+
+    def _getEventListeners(self, event_type):
+        return [self]
+
+    def _handleEvent(self, evt):
+        etype = evt[DeviceEvent.EVENT_TYPE_ID_INDEX]
+        self._iohub_event_buffer.setdefault(etype, deque()).append(evt)
+
+    def _getRPCInterface(self):
+        return ['getCurrentDeviceState', 'isReportingEvents']
+
+    def isReportingEvents(self):
+        return True
+
+    def getCurrentDeviceState(self, clear_events=True):
+        events = {str(k): tuple(v)
+                  for k, v in self._iohub_event_buffer.items()}
+        if clear_events:
+            self._iohub_event_buffer.clear()
+        return dict(events=events, reporting_events=True, pressed_keys={})
+
+
+class FakeIoServer(ioServer):
+    """The parts of ioServer used to handle requests and process events,
+    run in a thread."""
+
+    def __init__(self, keyboard):
+        self.devices = [keyboard]
+        self._running = True
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.start()
+        self._started.wait()
+
+    def log(self, text, level=None):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def _run(self):
+        # gevent servers belong to the thread they're created in
+        self.udpService = udpServer(self, '127.0.0.1:0')
+        self.eventNotifier = EventNotifier(self.udpService.sendResponse)
+        self.pollScheduler = DevicePollScheduler(self.processDeviceEvents)
+        self.udpService.start()
+        self.port = self.udpService.server_port
+        self._started.set()
+        gevent.spawn(self.pollDevicesTasklet, 0.01).join()
+        self.udpService.stop()
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+
+
+@pytest.fixture
+def iohub(monkeypatch):
+    keyboard = FakeKeyboard()
+    monkeypatch.setitem(ioServer.deviceDict, 'Keyboard', keyboard)
+    server = FakeIoServer(keyboard)
+    hub = ioHubConnection.__new__(ioHubConnection)
+    hub.udp_client = UDPClientConnection(remote_port=server.port)
+    hub._shutdown_attempted = True
+    hub.rpc_count = 0
+    sendToHubServer = hub._sendToHubServer
+
+    def countingSendToHubServer(tx_data):
+        hub.rpc_count += 1
+        return sendToHubServer(tx_data)
+
+    hub._sendToHubServer = countingSendToHubServer
+    kb = Keyboard(hub, 'Keyboard', {'name': 'keyboard',
+                                    'event_buffer_length': 256})
+    yield hub, kb, keyboard, server
+    server.stop()
+    hub.udp_client.close()
+    if hub._event_notifier:
+        hub._event_notifier.close()
+
+
+def pressLater(keyboard, delay, *keys):
+    """Press keys (one every delay sec) from another thread"""
+    def press():
+        for key in keys:
+            time.sleep(delay)
+            keyboard.native_events.append(makeKeyEvent(key))
+
+    thread = threading.Thread(target=press)
+    thread.start()
+    return thread
+
+
+def test_notifier():
+    sent = []
+    notifier = EventNotifier(lambda data, address: sent.append(address))
+    assert notifier.arm(('a', 1), [KEY_PRESS], 1.0) is False
+    assert notifier.arm(('b', 1), [KEY_RELEASE], 0.0) is False
+    assert len(notifier) == 2
+    notifier.notify([])
+    assert len(notifier) == 1 and not sent  # 'b' expired
+    notifier.notify([KEY_RELEASE])
+    assert not sent
+    notifier.notify([KEY_PRESS, KEY_RELEASE])
+    assert sent == [('a', 1)] and len(notifier) == 0  # one shot
+    notifier.notify([KEY_PRESS])
+    assert sent == [('a', 1)]
+    # events that are already available are notified straight away
+    assert notifier.arm(('c', 1), [KEY_PRESS], 1.0, [KEY_PRESS]) is True
+    assert sent == [('a', 1), ('c', 1)] and len(notifier) == 0
+
+
+def test_notificationSocket():
+    sock = EventNotificationSocket()
+    sender = EventNotificationSocket()
+    try:
+        assert not sock.wait(0.01)
+        sender.sock.sendto(b'1', ('127.0.0.1', sock.port))
+        sender.sock.sendto(b'2', ('127.0.0.1', sock.port))
+        assert sock.wait(1.0)
+        assert sock.drain() == 0  # wait() drained both
+    finally:
+        sock.close()
+        sender.close()
+
+
+def test_waitForKeys(iohub):
+    hub, kb, keyboard, server = iohub
+    thread = pressLater(keyboard, 0.05, 'x', 'a')
+    stime = getTime()
+    presses = kb.waitForPresses(maxWait=5.0, keys=['a'])
+    thread.join()
+    assert [k.key for k in presses] == ['a']
+    assert getTime() - stime < 1.0
+    # the 'x' press didn't match, so is still there
+    assert [k.key for k in kb.getPresses()] == ['x']
+
+    # keys pressed before waiting are returned straight away
+    keyboard.native_events.append(makeKeyEvent('b'))
+    time.sleep(0.05)
+    assert [k.key for k in kb.waitForKeys(maxWait=5.0)] == ['b']
+
+    # and the wait times out
+    stime = getTime()
+    assert not kb.waitForKeys(maxWait=0.2)
+    assert 0.19 < getTime() - stime < 0.5
+    assert len(server.eventNotifier) <= 1  # left to expire
+
+
+def test_pollingFallback(iohub, monkeypatch):
+    hub, kb, keyboard, server = iohub
+    # an ioHub Server without notifications sends an error reply
+    monkeypatch.setattr(hub, '_armEventNotification',
+                        lambda *args: None)
+    thread = pressLater(keyboard, 0.05, 'a')
+    assert [k.key for k in kb.waitForKeys(maxWait=5.0)] == ['a']
+    thread.join()
+    assert hub.rpc_count > 5
+
+
+@pytest.mark.benchmark
+def test_waitForKeys_benchmark(iohub, monkeypatch, reportBenchmark):
+    """Requests sent to the ioHub Server, CPU time used and latency of
+    waitForKeys() with event notifications and with polling (the old way,
+    every 2 msec) while waiting 1 sec for a key"""
+    hub, kb, keyboard, server = iohub
+    results = {}
+    for mode in ['notify', 'poll']:
+        if mode == 'poll':
+            monkeypatch.setattr(hub, '_armEventNotification',
+                                lambda *args: None)
+        latencies = []
+        rpc_count = hub.rpc_count
+        cpu0 = time.process_time()
+        for ii in range(3):
+            thread = pressLater(keyboard, 1.0, 'a')
+            presses = kb.waitForKeys(maxWait=5.0)
+            latencies.append(getTime() - presses[0].time)
+            thread.join()
+        results[mode] = ((hub.rpc_count - rpc_count) / 3.0,
+                         (time.process_time() - cpu0) / 3.0,
+                         sum(latencies) / 3.0)
+    for mode, (rpcs, cpu, latency) in results.items():
+        reportBenchmark("{}: {:.0f} requests, {:.1f}ms CPU, {:.2f}ms latency "
+                        "per 1 sec wait".format(mode, rpcs, cpu * 1000,
+                                                latency * 1000))
+    assert results['notify'][0] < results['poll'][0] / 10
+    assert results['notify'][1] < results['poll'][1]
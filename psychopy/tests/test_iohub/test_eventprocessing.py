@@ -0,0 +1,307 @@
+""" Test the ioHub Server's processDeviceEvents() handing events to listeners
+a list of events of one type at a time, and benchmark it with a synthetic
+2 kHz eye sample device, so no ioHub Server process or devices are needed.
+"""
+from __future__ import print_function
+
+import copy
+import time
+from collections import deque
+
+import numpy
+import pytest
+
+pytest.importorskip('gevent')
+
+from psychopy.iohub.server import ioServer
+from psychopy.iohub.devices import Device, DeviceEvent
+from psychopy.iohub.devices.eventfilters import DeviceEventFilter
+from psychopy.iohub.devices.eyetracker import MonocularEyeSampleEvent
+from psychopy.iohub.devices.keyboard import (KeyboardPressEvent,
+                                             KeyboardReleaseEvent)
+from psychopy.iohub.constants import EventConstants
+
+SAMPLE = MonocularEyeSampleEvent.EVENT_TYPE_ID
+attrib_names = MonocularEyeSampleEvent.CLASS_ATTRIBUTE_NAMES
+gaze_x_index = attrib_names.index('gaze_x')
+
+
+class SampleDevice(Device):
+    """Stands in for an eye tracker, with native events of (time, x, y,
+    pupil size) tuples converted to MonocularEyeSampleEvents, or if
+    vectorized, native events that are arrays of those samples, as some eye
+    tracker interfaces give them."""
+
+    def __init__(self, vectorized=True):
+        self.event_buffer_length = 1024
+        self._native_event_buffer = deque()
+        self._iohub_event_buffer = dict()
+        self._event_listeners = dict()
+        self._filters = dict()
+        self.vectorized = vectorized
+        self.event_id = 0
+
+    def addSamples(self, n, stime=0.0, rate=2000.0):
+        times = stime + numpy.arange(n) / rate
+        samples = numpy.column_stack([times, 100.0 * times, -50.0 * times,
+                                      numpy.full(n, 4.0)])
+        if self.vectorized:
+            self._native_event_buffer.append(samples)
+        else:
+            self._native_event_buffer.extend(map(tuple, samples.tolist()))
+
+    def _getIOHubEventObject(self, native_event_data):
+        t, x, y, pupil = native_event_data
+        evt = [0] * len(attrib_names)
+        self.event_id += 1
+        evt[DeviceEvent.EVENT_ID_INDEX] = self.event_id
+        evt[DeviceEvent.EVENT_TYPE_ID_INDEX] = SAMPLE
+        evt[DeviceEvent.EVENT_HUB_TIME_INDEX] = t
+        evt[gaze_x_index] = x
+        evt[gaze_x_index + 1] = y
+        evt[attrib_names.index('pupil_measure1')] = pupil
+        return evt
+
+    def _getIOHubEventObjects(self, native_events):
+        if not self.vectorized:
+            return Device._getIOHubEventObjects(self, native_events)
+        samples = numpy.concatenate(native_events).T.tolist()
+        n = len(samples[0])
+        columns = [[0] * n] * len(attrib_names)
+        columns[DeviceEvent.EVENT_ID_INDEX] = range(self.event_id + 1,
+                                                    self.event_id + n + 1)
+        self.event_id += n
+        columns[DeviceEvent.EVENT_TYPE_ID_INDEX] = [SAMPLE] * n
+        columns[DeviceEvent.EVENT_HUB_TIME_INDEX] = samples[0]
+        columns[gaze_x_index] = samples[1]
+        columns[gaze_x_index + 1] = samples[2]
+        columns[attrib_names.index('pupil_measure1')] = samples[3]
+        return [list(e) for e in zip(*columns)]
+
+
+class KeyDevice(SampleDevice):
+    """Native events are ioHub keyboard events already"""
+
+    def _getIOHubEventObjects(self, native_events):
+        return Device._getIOHubEventObjects(self, native_events)
+
+    def _getIOHubEventObject(self, native_event_data):
+        return native_event_data
+
+
+class HalfGazeFilter(DeviceEventFilter):
+    """Outputs a sample with half the gaze x of each sample"""
+
+    def __init__(self):
+        DeviceEventFilter.__init__(self)
+        self.process_count = 0
+        self.enable = True
+
+    @property
+    def filter_id(self):
+        return 23
+
+    @property
+    def input_event_types(self):
+        return {SAMPLE: [0, ]}
+
+    def process(self):
+        self.process_count += 1
+        for evt in self.getInputEvents():
+            evt[gaze_x_index] /= 2.0
+            self.addOutputEvent(evt)
+        self.clearInputEvents()
+
+
+class EventListener(object):
+    """A listener that only handles events one at a time"""
+
+    def __init__(self):
+        self.events = []
+
+    def _handleEvent(self, event):
+        self.events.append(event)
+
+
+class FakeIoServer(ioServer):
+    def __init__(self, devices):
+        self.devices = devices
+        self.eventBuffer = deque(maxlen=100000)
+        self.eventNotifier = None
+        for device in devices:
+            event_ids = [SAMPLE, EventConstants.KEYBOARD_PRESS,
+                         EventConstants.KEYBOARD_RELEASE]
+            device._addEventListener(self, event_ids)
+            device._addEventListener(device, event_ids)
+
+    def shutdown(self):
+        pass
+
+
+def keyEvent(event_class, hub_time):
+    evt = [0] * len(event_class.CLASS_ATTRIBUTE_NAMES)
+    evt[DeviceEvent.EVENT_TYPE_ID_INDEX] = event_class.EVENT_TYPE_ID
+    evt[DeviceEvent.EVENT_HUB_TIME_INDEX] = hub_time
+    return evt
+
+
+def test_processEvents():
+    device = KeyDevice()
+    server = FakeIoServer([device])
+    listener = EventListener()
+    device._addEventListener(listener, [EventConstants.KEYBOARD_RELEASE])
+    for i in range(6):
+        event_class = [KeyboardPressEvent, KeyboardReleaseEvent][i % 2]
+        device._native_event_buffer.append(keyEvent(event_class, i))
+    device._native_event_buffer.append(None)  # not an event
+    server.processDeviceEvents()
+    assert not device._native_event_buffer
+    assert len(server.eventBuffer) == 6
+    presses = device._iohub_event_buffer[EventConstants.KEYBOARD_PRESS]
+    assert [e[DeviceEvent.EVENT_HUB_TIME_INDEX] for e in presses] == [0, 2, 4]
+    assert [e[DeviceEvent.EVENT_HUB_TIME_INDEX]
+            for e in listener.events] == [1, 3, 5]
+
+
+def test_conversionError():
+    """An event that can't be converted is dropped, but not the others
+    taken from the native event buffer with it"""
+    class BadKeyDevice(KeyDevice):
+        def _getIOHubEventObject(self, native_event_data):
+            if native_event_data == 'bad':
+                raise ValueError('not an event')
+            return native_event_data
+
+    device = BadKeyDevice()
+    server = FakeIoServer([device])
+    device._native_event_buffer.extend([
+        keyEvent(KeyboardPressEvent, 0), 'bad',
+        keyEvent(KeyboardReleaseEvent, 1)])
+    server.processDeviceEvents()
+    assert not device._native_event_buffer
+    assert [e[DeviceEvent.EVENT_HUB_TIME_INDEX]
+            for e in server.eventBuffer] == [0, 1]
+
+
+def test_filters():
+    device = SampleDevice()
+    server = FakeIoServer([device])
+    efilter = HalfGazeFilter()
+    device._filters['half'] = efilter
+    device.addSamples(10)
+    server.processDeviceEvents()
+    # all the samples processed together
+    assert efilter.process_count == 1
+    samples = list(server.eventBuffer)
+    assert len(samples) == 20
+    unfiltered = [e for e in samples
+                  if e[DeviceEvent.EVENT_FILTER_ID_INDEX] == 0]
+    filtered = [e for e in samples
+                if e[DeviceEvent.EVENT_FILTER_ID_INDEX] == 23]
+    assert len(unfiltered) == len(filtered) == 10
+    # the filter changed copies of the events
+    for u, f in zip(unfiltered, filtered):
+        assert u[gaze_x_index] == 2 * f[gaze_x_index]
+    # filtered samples aren't filtered again
+    server.processDeviceEvents()
+    assert efilter.process_count == 1
+
+
+def test_vectorizedConversion():
+    """A device converting all its native events at once gives the same
+    events as converting them one at a time"""
+    events = []
+    for vectorized in [True, False]:
+        device = SampleDevice(vectorized)
+        server = FakeIoServer([device])
+        device.addSamples(10)
+        device.addSamples(10, stime=0.005)
+        server.processDeviceEvents()
+        events.append(list(server.eventBuffer))
+    assert len(events[0]) == 20
+    assert events[0] == events[1]
+
+
+def test_handleEventOverride():
+    """Devices that override _handleEvent still get every event"""
+    class CountingDevice(SampleDevice):
+        count = 0
+
+        def _handleEvent(self, e):
+            self.count += 1
+
+    device = CountingDevice()
+    server = FakeIoServer([device])
+    device.addSamples(10)
+    server.processDeviceEvents()
+    assert device.count == 10
+
+
+def legacyProcessDeviceEvents(server):
+    """The previous ioServer.processDeviceEvents(), converting and handing
+    on each event in turn, with filters getting a deep copy of each event"""
+    for device in server.devices:
+        events = device._getNativeEventBuffer()
+        while events:
+            evt = device._getIOHubEventObject(events.popleft())
+            if evt:
+                etype = evt[DeviceEvent.EVENT_TYPE_ID_INDEX]
+                for l in device._getEventListeners(etype):
+                    if l is device:
+                        legacyHandleEvent(device, evt)
+                    else:
+                        l._handleEvent(evt)
+        filtered_events = []
+        for efilter in device._filters.values():
+            filtered_events.extend(efilter._removeOutputEvents())
+        for evt in filtered_events:
+            etype = evt[DeviceEvent.EVENT_TYPE_ID_INDEX]
+            for l in device._getEventListeners(etype):
+                l._handleEvent(evt)
+
+
+def legacyHandleEvent(device, e):
+    event_type_id = e[DeviceEvent.EVENT_TYPE_ID_INDEX]
+    device._iohub_event_buffer.setdefault(
+        event_type_id, deque(maxlen=device.event_buffer_length)).append(e)
+    input_evt_filter_id = e[DeviceEvent.EVENT_FILTER_ID_INDEX]
+    for event_filter in list(device._filters.values()):
+        if event_filter.enable is True:
+            if event_filter.filter_id != input_evt_filter_id:
+                evt_filter_ids = event_filter.input_event_types.get(
+                    event_type_id, [])
+                if input_evt_filter_id in evt_filter_ids:
+                    event_filter._addInputEvent(copy.deepcopy(e))
+
+
+@pytest.mark.benchmark
+def test_eventProcessing_benchmark(reportBenchmark):
+    """Events/sec processed from a 2 kHz eye sample device, one event at a
+    time as before and in blocks, with and without a filter"""
+    n_samples = 20000
+    results = {}
+    for with_filter in [False, True]:
+        for mode in ['legacy', 'blocks']:
+            device = SampleDevice(vectorized=False)
+            server = FakeIoServer([device])
+            if with_filter:
+                device._filters['half'] = HalfGazeFilter()
+            elapsed = 0.0
+            # 10 msec of samples between each processDeviceEvents()
+            for i in range(n_samples // 20):
+                device.addSamples(20, stime=i * 0.01)
+                stime = time.perf_counter()
+                if mode == 'legacy':
+                    legacyProcessDeviceEvents(server)
+                else:
+                    server.processDeviceEvents()
+                elapsed += time.perf_counter() - stime
+            expected = n_samples * (2 if with_filter else 1)
+            assert len(server.eventBuffer) == expected
+            results[(mode, with_filter)] = n_samples / elapsed
+    for (mode, with_filter), rate in results.items():
+        reportBenchmark("{}{}: {:.0f} samples/sec".format(
+            mode, ' with filter' if with_filter else '', rate))
+    for with_filter in [False, True]:
+        assert results[('blocks', with_filter)] > \
+            results[('legacy', with_filter)]
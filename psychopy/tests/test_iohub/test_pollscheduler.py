@@ -0,0 +1,258 @@
+""" Test the ioHub Server's DevicePollScheduler with mock polled devices, so
+no ioHub Server process or devices are needed.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+from collections import deque
+
+import pytest
+
+gevent = pytest.importorskip('gevent')
+
+from psychopy.iohub import server
+from psychopy.iohub.server import (DeviceMonitor, DevicePollScheduler,
+                                   DeadlineTimer)
+from psychopy.iohub.devices import Computer
+
+
+class MockDevice(object):
+    """A polled device that receives an event at each of event_times."""
+
+    def __init__(self, event_times=(), clock=Computer.getTime):
+        self.clock = clock
+        self.pending = deque(sorted(event_times))
+        self.poll_times = []
+        self._native_event_buffer = deque()
+
+    def _poll(self):
+        now = self.clock()
+        self.poll_times.append(now)
+        while self.pending and self.pending[0] <= now:
+            # (when the event happened, when it was polled)
+            self._native_event_buffer.append((self.pending.popleft(), now))
+
+    def _getNativeEventBuffer(self):
+        return self._native_event_buffer
+
+
+class EventProcessor(object):
+    """Stands in for ioServer.processDeviceEvents()"""
+
+    def __init__(self, devices, clock=Computer.getTime):
+        self.devices = devices
+        self.clock = clock
+        self.call_times = []
+        self.events = []  # (happened, polled, processed) times
+
+    def __call__(self):
+        now = self.clock()
+        self.call_times.append(now)
+        for device in self.devices:
+            events = device._getNativeEventBuffer()
+            while events:
+                self.events.append(events.popleft() + (now,))
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(server, 'getTime', fake_clock)
+    return fake_clock
+
+
+def runScheduler(clock, devices, monitors, duration, process_interval=0.01):
+    processor = EventProcessor(devices, clock)
+    scheduler = DevicePollScheduler(processor)
+    for monitor in monitors:
+        scheduler.add(monitor)
+    while clock.time < duration:
+        clock.time += scheduler.step(process_interval)
+    return scheduler, processor
+
+
+def test_sharedWakeups(clock):
+    devices = [MockDevice(clock=clock) for i in range(3)]
+    monitors = [DeviceMonitor(devices[0], 0.001),
+                DeviceMonitor(devices[1], 0.002),
+                DeviceMonitor(devices[2], 0.002)]
+    scheduler, processor = runScheduler(clock, devices, monitors, 0.1)
+    assert 99 <= len(devices[0].poll_times) <= 101
+    assert 49 <= len(devices[1].poll_times) <= 51
+    assert devices[1].poll_times == devices[2].poll_times
+    # devices due at the same time are polled in the same wake up, as is
+    # event processing
+    assert scheduler.wakeup_count <= 101
+    assert 10 <= len(processor.call_times) <= 11
+    stats = scheduler.getStats()
+    assert stats['devices']['MockDevice']['count'] > 0
+    assert stats['devices']['MockDevice']['max'] < 1e-9
+
+
+def test_eventsProcessedAfterPoll(clock):
+    device = MockDevice([0.0205, 0.0513], clock=clock)
+    monitor = DeviceMonitor(device, 0.001)
+    scheduler, processor = runScheduler(clock, [device], [monitor], 0.1)
+    assert len(processor.events) == 2
+    for happened, polled, processed in processor.events:
+        assert polled - happened <= 0.001 + 1e-9
+        assert processed == polled  # not 10 msec later
+
+
+def test_adaptiveInterval(clock):
+    device = MockDevice([0.2], clock=clock)
+    monitor = DeviceMonitor(device, 0.001, max_interval=0.008)
+    runScheduler(clock, [device], [monitor], 0.3)
+    intervals = [round(b - a, 6) for a, b in zip(device.poll_times[:-1],
+                                                 device.poll_times[1:])]
+    # backs off while idle...
+    assert intervals[:2] == [0.0015, 0.00225]
+    assert max(intervals) == 0.008
+    # ...and tightens up as soon as there's an event
+    ipoll = [i for i, t in enumerate(device.poll_times) if t >= 0.2][0]
+    assert intervals[ipoll] == 0.001
+    assert monitor.poll_count < 100
+    # without max_interval it's fixed
+    assert DeviceMonitor(device, 0.002, max_interval=0.001).max_interval == \
+        0.002
+
+
+def test_stoppedMonitor(clock):
+    devices = [MockDevice(clock=clock) for i in range(2)]
+    monitors = [DeviceMonitor(d, 0.001) for d in devices]
+    processor = EventProcessor(devices, clock)
+    scheduler = DevicePollScheduler(processor)
+    for monitor in monitors:
+        scheduler.add(monitor)
+    clock.time += scheduler.step(0.01)
+    monitors[0].running = False
+    while clock.time < 0.01:
+        clock.time += scheduler.step(0.01)
+    assert len(devices[0].poll_times) == 1
+    assert len(scheduler) == 1
+
+
+def test_jitterStats():
+    monitor = DeviceMonitor(MockDevice(), 0.001)
+    assert monitor.getJitterStats()['count'] == 0
+    for due, done in [(1.0, 1.001), (2.0, 2.003), (3.0, 3.002)]:
+        monitor.poll(due, done)
+    stats = monitor.getJitterStats()
+    assert stats['count'] == 3
+    assert stats['mean'] == pytest.approx(0.002)
+    assert stats['stdev'] == pytest.approx((2.0 / 3) ** 0.5 * 0.001)
+    assert stats['max'] == pytest.approx(0.003)
+
+
+def test_deadlineTimer():
+    """Sleeps end at the deadline, with other greenlets running meanwhile"""
+    getTime = Computer.getTime
+    timer = DeadlineTimer()
+    ticks = []
+
+    def ticker():
+        for i in range(5):
+            ticks.append(getTime())
+            gevent.sleep(0.001)
+
+    try:
+        glet = gevent.spawn(ticker)
+        deadline = getTime() + 0.01
+        timer.sleepUntil(deadline)
+        # not early, and (allowing for a busy machine) not very late
+        assert 0 <= getTime() - deadline < 0.5
+        assert ticks
+        glet.join()
+        # deadlines that have passed
+        stime = getTime()
+        timer.sleepUntil(stime - 1.0)
+        assert getTime() - stime < 0.5
+        for i in range(20):
+            deadline = getTime() + 0.0005
+            timer.sleepUntil(deadline)
+            assert getTime() >= deadline
+    finally:
+        timer.close()
+
+
+def test_importWithoutNonblock():
+    """The server module can be imported where os has no O_NONBLOCK (e.g.
+    on Windows), using sleeps rather than timerfd for DeadlineTimer"""
+    statement = ("import os; del os.O_NONBLOCK; "
+                 "from psychopy.iohub import server; "
+                 "assert server._libc is None")
+    root = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(server.__file__))))
+    subprocess.check_call([sys.executable, '-c', statement], cwd=root)
+
+
+def legacyPolling(devices, processor, duration, interval, process_interval):
+    """The previous ioHub Server polling: a greenlet per device sleeping
+    interval (at least 1 msec) between polls, and another one processing
+    events every process_interval. Returns the number of wake ups."""
+    getTime = Computer.getTime
+    end_time = getTime() + duration
+    wakeups = [0]
+
+    def every(func, sleep_interval):
+        while getTime() < end_time:
+            wakeups[0] += 1
+            stime = getTime()
+            func()
+            dur = sleep_interval - (getTime() - stime)
+            gevent.sleep(max(0.001, dur))
+
+    glets = [gevent.spawn(every, d._poll, interval) for d in devices]
+    glets.append(gevent.spawn(every, processor, process_interval))
+    gevent.joinall(glets)
+    return wakeups[0]
+
+
+@pytest.mark.benchmark
+def test_pollScheduler_benchmark(reportBenchmark):
+    """Wake ups per second and event latency polling 4 mostly idle devices
+    every msec for 2 sec, with a greenlet per device and with the scheduler
+    (with and without adaptive intervals)"""
+    getTime = Computer.getTime
+    duration = 2.0
+    results = {}
+    for mode in ['greenlets', 'scheduler', 'adaptive']:
+        stime = getTime()
+        # one device gets an event every 97 msec
+        event_times = [stime + 0.05 + i * 0.097 for i in range(20)]
+        devices = [MockDevice(event_times)] + [MockDevice() for i in range(3)]
+        processor = EventProcessor(devices)
+        if mode == 'greenlets':
+            wakeups = legacyPolling(devices, processor, duration, 0.001, 0.01)
+        else:
+            max_interval = 0.008 if mode == 'adaptive' else None
+            scheduler = DevicePollScheduler(processor)
+            for device in devices:
+                scheduler.add(DeviceMonitor(device, 0.001, max_interval))
+            while getTime() - stime < duration:
+                gevent.sleep(scheduler.step(0.01))
+            wakeups = scheduler.wakeup_count
+        elapsed = getTime() - stime
+        events = processor.events
+        results[mode] = (
+            wakeups / elapsed,
+            sum(p - t for t, _, p in events) / len(events),  # event latency
+            sum(p - t for _, t, p in events) / len(events))  # poll latency
+    for mode, (wakeups, latency, poll_latency) in results.items():
+        reportBenchmark("{}: {:.0f} wake ups/sec, event to available "
+                        "{:.2f}ms, poll to available {:.3f}ms".format(
+                            mode, wakeups, latency * 1000,
+                            poll_latency * 1000))
+    assert results['scheduler'][0] < results['greenlets'][0]
+    assert results['adaptive'][0] < results['scheduler'][0]
+    assert results['scheduler'][2] < results['greenlets'][2]
@@ -0,0 +1,231 @@
+""" Test sending several ioHub client calls in one request with
+ioHubConnection.batch(), and benchmark the round trips and time per trial
+with and without batching.
+
+The ioHub Server's udpServer runs in a thread, with stand-in devices, so no
+ioHub Server process or devices are needed.
+"""
+from __future__ import print_function
+
+import threading
+import time
+
+import pytest
+
+gevent = pytest.importorskip('gevent')
+
+from psychopy.iohub.server import ioServer, udpServer
+from psychopy.iohub.client import (ioHubConnection, ioHubDevices,
+                                   ioHubDeviceView, BatchedReply)
+from psychopy.iohub.errors import ioHubError
+from psychopy.iohub.net import UDPClientConnection
+from psychopy.iohub.devices import DeviceEvent
+from psychopy.iohub.devices.experiment import MessageEvent
+
+text_index = MessageEvent.CLASS_ATTRIBUTE_NAMES.index('text')
+
+
+class FakeDevice(object):
+    """Just enough of an ioHub Server device: events in its buffer are
+    returned by getEvents()."""
+
+    def __init__(self, events=()):
+        self.events = list(events)
+        self.clear_count = 0
+
+    def _getRPCInterface(self):
+        return ['getEvents', 'clearEvents', 'fail']
+
+    def getEvents(self, *args, **kwargs):
+        events, self.events = self.events, []
+        return events
+
+    def clearEvents(self, call_proc_events=True):
+        self.events = []
+        self.clear_count += 1
+
+    def fail(self):
+        raise RuntimeError('failed')
+
+
+class FakeExperiment(FakeDevice):
+    def _nativeEventCallback(self, event):
+        self.events.append(event)
+
+
+class CountingUdpServer(udpServer):
+    def handle(self, request, replyTo):
+        self.iohub.request_count += 1
+        return udpServer.handle(self, request, replyTo)
+
+
+class FakeIoServer(object):
+    """The parts of ioServer used by udpServer to handle requests, with the
+    udpServer run in a thread."""
+
+    def __init__(self, devices):
+        self.devices = devices
+        self.eventBuffer = []
+        self.request_count = 0
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.start()
+        self._started.wait()
+
+    def log(self, text, level=None):
+        pass
+
+    def processDeviceEvents(self):
+        pass
+
+    def clearEventBuffer(self, call_proc_events=True):
+        self.eventBuffer = []
+
+    def _run(self):
+        # gevent servers belong to the thread they're created in
+        self.udpService = CountingUdpServer(self, '127.0.0.1:0')
+        self.udpService.start()
+        self.port = self.udpService.server_port
+        self._started.set()
+        while self.udpService._running:
+            gevent.sleep(0.01)
+        self.udpService.stop()
+
+    def stop(self):
+        self.udpService._running = False
+        self._thread.join()
+
+
+@pytest.fixture
+def iohub(monkeypatch):
+    experiment = FakeExperiment()
+    keyboard = FakeDevice()
+    monkeypatch.setitem(ioServer.deviceDict, 'Experiment', experiment)
+    monkeypatch.setitem(ioServer.deviceDict, 'Keyboard', keyboard)
+    server = FakeIoServer([experiment, keyboard])
+    hub = ioHubConnection.__new__(ioHubConnection)
+    hub.udp_client = UDPClientConnection(remote_port=server.port)
+    hub.udp_client.sock.settimeout(5.0)
+    hub._shutdown_attempted = True
+    hub.allEvents = []
+    hub.devices = ioHubDevices(hub)
+    hub.devices.addDevice('keyboard', ioHubDeviceView(hub, 'Keyboard', {}))
+    yield hub, server, experiment, keyboard
+    server.stop()
+    hub.udp_client.close()
+
+
+def messageEvent(text, hub_time):
+    evt = list(MessageEvent._createAsList(text, sec_time=hub_time))
+    evt[DeviceEvent.EVENT_HUB_TIME_INDEX] = hub_time
+    return evt
+
+
+def waitFor(condition, timeout=2.0):
+    stime = time.time()
+    while not condition() and time.time() - stime < timeout:
+        time.sleep(0.001)
+    return condition()
+
+
+def test_batch(iohub):
+    hub, server, experiment, keyboard = iohub
+    keyboard.events = [messageEvent('key', 1.0)]
+    server.eventBuffer = [messageEvent('all', 2.0)]
+    with hub.batch() as batch:
+        batch.sendMessageEvent('start')
+        t = batch.getTime()
+        key_events = batch.call(hub.devices.keyboard.getEvents,
+                                asType='list')
+        all_events = batch.getEvents(as_type='list')
+        batch.clearEvents('keyboard')
+        assert len(batch) == 5
+        assert not t.received
+        with pytest.raises(RuntimeError):
+            t.result
+    assert len(batch) == 0
+    assert server.request_count == 2  # including GET_DEV_INTERFACE
+    assert isinstance(t, BatchedReply) and isinstance(t.result, float)
+    assert [e[text_index] for e in key_events.result] == ['key']
+    assert [e[text_index] for e in all_events.result] == ['all']
+    assert keyboard.clear_count == 1
+    # handled in order
+    assert [e[text_index] for e in experiment.events] == ['start']
+
+
+def test_fireAndForget(iohub):
+    hub, server, experiment, keyboard = iohub
+    batch = hub.batch()
+    for i in range(3):
+        batch.sendMessageEvent('msg %d' % i)
+    batch.clearEvents('all')
+    assert batch.send() == 4
+    assert batch.send() == 0
+    # nothing to wait for, so the server gets to it later
+    assert waitFor(lambda: keyboard.clear_count == 1)
+    assert [e[text_index] for e in experiment.events] == []
+    assert server.request_count == 2
+    # and no reply was sent, so the next request gets the right one
+    assert isinstance(hub.getTime(), float)
+
+
+def test_errors(iohub):
+    hub, server, experiment, keyboard = iohub
+    with hub.batch() as batch:
+        failed = batch.call(hub.devices.keyboard.fail)
+        t = batch.getTime()
+    with pytest.raises(ioHubError):
+        failed.result
+    assert isinstance(t.result, float)
+    with pytest.raises(TypeError):
+        batch.call(hub.getTime)
+    # nothing is sent if the with block raises
+    with pytest.raises(ValueError):
+        with hub.batch() as batch:
+            batch.clearEvents('all')
+            raise ValueError()
+    time.sleep(0.05)
+    assert keyboard.clear_count == 0
+
+
+def runTrial(hub, batch=None):
+    """Calls made by a typical trial, between frames"""
+    if batch is None:
+        hub.sendMessageEvent('TRIAL_START')
+        hub.sendMessageEvent('STIM_ON')
+        hub.getTime()
+        hub.getEvents()
+        hub.devices.keyboard.getEvents()
+        hub.sendMessageEvent('TRIAL_END')
+        hub.clearEvents('all')
+    else:
+        batch.sendMessageEvent('TRIAL_START')
+        batch.sendMessageEvent('STIM_ON')
+        batch.getTime()
+        batch.getEvents()
+        batch.call(hub.devices.keyboard.getEvents)
+        batch.sendMessageEvent('TRIAL_END')
+        batch.clearEvents('all')
+        batch.send()
+
+
+@pytest.mark.benchmark
+def test_requestBatch_benchmark(iohub, reportBenchmark):
+    """Round trips and time per trial, with and without batching"""
+    hub, server, experiment, keyboard = iohub
+    n_trials = 200
+    results = {}
+    for mode in ['single', 'batched']:
+        batch = hub.batch() if mode == 'batched' else None
+        request_count = server.request_count
+        stime = time.perf_counter()
+        for i in range(n_trials):
+            runTrial(hub, batch)
+        results[mode] = ((server.request_count - request_count) / n_trials,
+                         (time.perf_counter() - stime) / n_trials)
+    for mode, (requests, t) in results.items():
+        reportBenchmark("{}: {:.0f} requests, {:.3f}ms per trial".format(
+            mode, requests, t * 1000))
+    assert results['single'][0] == 7
+    assert results['batched'][0] == 1
+    assert results['batched'][1] < results['single'][1]
@@ -0,0 +1,158 @@
+""" Test the ioHub time sync offset and drift estimation with a simulated
+pair of clocks, and ioHubTimeSyncConnection.sync() with a stand-in ioHub
+Server.
+"""
+from __future__ import print_function
+
+import socket
+import threading
+
+import msgpack
+import numpy
+import pytest
+
+pytest.importorskip('gevent')
+
+from psychopy.iohub.net import TimeSyncState, ioHubTimeSyncConnection
+from psychopy.iohub.devices import Computer
+
+
+class SimulatedClocks(object):
+    """A local and a remote clock, remote = drift * local + offset, with sync
+    requests delayed a random time each way: usually around delay sec.msec,
+    but sometimes (with probability spike_rate) up to 20 times longer."""
+
+    def __init__(self, drift=1.0 + 50e-6, offset=1234.5, delay=0.0002,
+                 spike_rate=0.2, seed=0):
+        self.drift = drift
+        self.offset = offset
+        self.delay = delay
+        self.spike_rate = spike_rate
+        self.rng = numpy.random.RandomState(seed)
+
+    def remoteTime(self, local_time):
+        return self.drift * numpy.asarray(local_time) + self.offset
+
+    def _oneWayDelay(self):
+        d = self.delay * (0.5 + self.rng.exponential())
+        if self.rng.uniform() < self.spike_rate:
+            d *= self.rng.uniform(2, 20)
+        return d
+
+    def sync(self, local_time, batch_size=5):
+        """What ioHubTimeSyncConnection.sync() would return, starting at
+        local_time"""
+        best = None
+        for _ in range(batch_size):
+            there = local_time + self._oneWayDelay()
+            back = there + self._oneWayDelay()
+            rtt = back - local_time
+            if best is None or rtt < best[0]:
+                best = (rtt, (local_time + back) / 2.0,
+                        float(self.remoteTime(there)))
+            local_time = back
+        return best
+
+
+def syncFor(clocks, state, duration, start=5000.0, interval=0.2):
+    local_time = start
+    while local_time < start + duration:
+        state.addSample(*clocks.sync(local_time))
+        local_time += interval
+    return local_time
+
+
+@pytest.mark.parametrize('drift', [1.0, 1.0 + 50e-6, 1.0 - 200e-6])
+def test_driftAndOffset(drift):
+    clocks = SimulatedClocks(drift=drift)
+    state = TimeSyncState()
+    now = syncFor(clocks, state, 20.0)
+    assert state.getDrift() == pytest.approx(drift, abs=5e-6)
+    # times within the sync window are converted to within the accuracy
+    local_times = numpy.linspace(now - 10.0, now, 50)
+    remote_times = clocks.remoteTime(local_times)
+    errors = state.remote2LocalTime(remote_times) - local_times
+    assert isinstance(errors, numpy.ndarray) and errors.shape == (50,)
+    assert numpy.abs(errors).max() < state.getAccuracy()
+    assert state.getAccuracy() < 2 * clocks.delay
+    # and back again
+    assert numpy.allclose(state.local2RemoteTime(local_times), remote_times,
+                          atol=state.getAccuracy(), rtol=0)
+    # single times stay floats
+    assert isinstance(state.remote2LocalTime(float(remote_times[0])), float)
+
+
+def test_outliers():
+    """Samples with long round trips, or that don't fit, are left out"""
+    clocks = SimulatedClocks(spike_rate=0.0)
+    state = TimeSyncState(window_size=32)
+    now = syncFor(clocks, state, 6.0)
+    # a few samples 10 msec off (e.g. the remote computer was busy replying)
+    for i in range(4):
+        local_time = now + i * 0.2
+        state.addSample(0.0005, local_time,
+                        float(clocks.remoteTime(local_time)) + 0.01)
+    # and a slow round trip
+    state.addSample(0.5, now + 1.0, float(clocks.remoteTime(now + 1.0)) + 0.2)
+    assert state.getDrift() == pytest.approx(clocks.drift, abs=1e-5)
+    assert state.remote2LocalTime(clocks.remoteTime(now)) == \
+        pytest.approx(now, abs=2 * clocks.delay)
+    assert state.getAccuracy() < 2 * clocks.delay
+
+
+def test_fewSamples():
+    state = TimeSyncState()
+    with pytest.raises(ValueError):
+        state.getDrift()
+    state.addSample(0.001, 10.0, 110.0)
+    assert state.getDrift() == 1.0
+    assert state.getOffset() == 100.0
+    assert state.getAccuracy() == 0.0005
+    assert state.remote2LocalTime(111.0) == 11.0
+
+
+def test_estimatorAccuracy():
+    """The fitted clocks are much closer than the previous estimate (from the
+    last two sync samples), under load"""
+    clocks = SimulatedClocks(spike_rate=0.5, seed=3)
+    state = TimeSyncState()
+    now = syncFor(clocks, state, 20.0)
+    l1, l2 = state.L_times[-2], state.L_times[-1]
+    r1, r2 = state.R_times[-2], state.R_times[-1]
+    old_drift = (r2 - r1) / (l2 - l1)
+    old_offset = r2 - l2  # as it was, ignoring the drift
+
+    local_times = numpy.linspace(now - 10.0, now, 50)
+    remote_times = clocks.remoteTime(local_times)
+    old_errors = (remote_times - old_offset) / old_drift - local_times
+    new_errors = state.remote2LocalTime(remote_times) - local_times
+    assert numpy.abs(new_errors).max() * 10 < numpy.abs(old_errors).max()
+
+
+def test_syncConnection():
+    """sync() against a stand-in server whose clock is 100 sec ahead"""
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(('127.0.0.1', 0))
+    server.settimeout(5.0)
+
+    def reply():
+        unpacker = msgpack.Unpacker(use_list=True)
+        for _ in range(5):
+            data, address = server.recvfrom(1024)
+            unpacker.feed(data)
+            assert unpacker.unpack() == ['SYNC_REQ']
+            server.sendto(msgpack.packb(['SYNC_REPLY',
+                                         Computer.getTime() + 100.0]),
+                          address)
+
+    thread = threading.Thread(target=reply)
+    thread.start()
+    connection = ioHubTimeSyncConnection(server.getsockname())
+    try:
+        rtt, local_time, remote_time = connection.sync()
+    finally:
+        thread.join()
+        connection.close()
+        server.close()
+    assert 0 < rtt < 1.0
+    assert remote_time - local_time == pytest.approx(100.0, abs=rtt)
@@ -0,0 +1,117 @@
+""" Test the sleeps and waits of psychopy.clock, and benchmark how late
+wait() ends and the CPU time it uses.
+"""
+from __future__ import print_function
+from __future__ import division
+
+import time
+
+import numpy as np
+import pytest
+
+from psychopy import clock
+from psychopy.clock import (getTime, sleepUntil, wait, waitUntil,
+                            measureWakeLatency, StaticPeriod)
+
+
+# sleeps and waits mustn't end early, but on a busy machine can end late by
+# however long it takes to be scheduled again, so (outside the benchmark)
+# they're only checked to end within this
+lateLimit = 0.5
+
+
+def test_sleepUntil():
+    for duration in [0.0005, 0.002, 0.01]:
+        deadline = getTime() + duration
+        sleepUntil(deadline)
+        assert 0 <= getTime() - deadline < lateLimit
+    # deadlines that have passed
+    t0 = getTime()
+    sleepUntil(t0 - 1.0)
+    assert getTime() - t0 < lateLimit
+    # in another time base
+    deadline = time.time() + 0.005
+    sleepUntil(deadline, time.time)
+    assert time.time() >= deadline - 1e-6
+
+
+def test_wait():
+    for duration in [0.001, 0.005, 0.03]:
+        t0 = getTime()
+        wait(duration)
+        elapsed = getTime() - t0
+        assert duration <= elapsed < duration + lateLimit
+    # waitUntil isn't made late by time taken before it
+    deadline = getTime() + 0.02
+    time.sleep(0.01)
+    waitUntil(deadline)
+    assert 0 <= getTime() - deadline < lateLimit
+
+
+def test_measureWakeLatency():
+    latency = measureWakeLatency(samples=20)
+    assert 0 <= latency < lateLimit
+
+
+def test_staticPeriod(monkeypatch):
+    """complete() waits until start() + duration"""
+    deadlines = []
+    monkeypatch.setattr(clock, 'waitUntil', deadlines.append)
+    period = StaticPeriod()
+    t0 = getTime()
+    period.start(0.5)
+    time.sleep(0.01)
+    assert period.complete() == 1
+    assert t0 + 0.5 <= deadlines[0] < t0 + 0.5 + lateLimit
+
+
+def legacyWait(secs, hogCPUperiod=0.2):
+    """The previous wait(), without pyglet event pumping"""
+    if secs > hogCPUperiod:
+        time.sleep(secs - hogCPUperiod)
+        secs = hogCPUperiod
+    t0 = getTime()
+    while (getTime() - t0) < secs:
+        pass
+
+
+@pytest.mark.benchmark
+def test_wait_benchmark(reportBenchmark):
+    """How late waits end (median, 99th percentile and max) and the CPU time
+    they use, with the previous wait() and with absolute deadline sleeps"""
+    results = {}
+    for duration in [0.001, 0.005, 0.02, 0.1]:
+        n = max(10, int(0.5 / duration))
+        for mode in ['legacy', 'legacy no hog', 'deadline']:
+            overshoots = []
+            c0 = time.process_time()
+            for i in range(n):
+                t0 = getTime()
+                if mode == 'legacy':
+                    legacyWait(duration)
+                elif mode == 'legacy no hog':
+                    legacyWait(duration, 0.0)
+                else:
+                    wait(duration)
+                overshoots.append(getTime() - t0 - duration)
+            cpu = (time.process_time() - c0) / (n * duration)
+            results[(duration, mode)] = (np.percentile(overshoots, [50, 99]),
+                                         max(overshoots), cpu)
+    for (duration, mode), (percentiles, worst, cpu) in sorted(results.items()):
+        reportBenchmark("{:.0f}ms {}: late by {:.3f}ms (99%: {:.3f}ms, max "
+                        "{:.3f}ms), CPU {:.0f}%".format(
+                            duration * 1000, mode, percentiles[0] * 1000,
+                            percentiles[1] * 1000, worst * 1000, cpu * 100))
+    for duration in [0.02, 0.1]:
+        assert results[(duration, 'deadline')][2] < \
+            results[(duration, 'legacy')][2]
+
+
+@pytest.mark.benchmark
+def test_waitCPUTime_benchmark(reportBenchmark):
+    """Only the final waitSpinPeriod of the wait uses the CPU"""
+    if clock.waitSpinPeriod > 0.01:
+        pytest.skip('no absolute deadline sleeps on this platform')
+    c0 = time.process_time()
+    wait(0.1)
+    assert time.process_time() - c0 < 0.05
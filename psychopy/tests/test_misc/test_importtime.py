@@ -0,0 +1,91 @@
+"""Import-time benchmarks, using the interpreter's own `-X importtime` report
+
+The modules that are only loaded on demand (the stimuli, sound libs, hardware
+devices and the git sha lookup) are checked not to be imported along the way.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import subprocess
+import pytest
+
+from psychopy.tests.utils import TESTS_PATH
+
+# the directory containing the psychopy package we're testing
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(TESTS_PATH))
+
+
+def importTimes(statement):
+    """Runs `statement` in a fresh interpreter and returns a dict of the
+    cumulative import time (in seconds) of each module it imported
+    """
+    cmd = [sys.executable, '-X', 'importtime', '-c', statement]
+    proc = subprocess.Popen(cmd, cwd=PACKAGE_ROOT, universal_newlines=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = proc.communicate()
+    assert proc.returncode == 0, stderr
+    times = {}
+    # lines are "import time: self [us] | cumulative | imported package"
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(fields[1])
+        except (IndexError, ValueError):
+            continue  # the header line
+        times[fields[2].strip()] = cumulative / 1e6
+    return times
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason="-X importtime and lazy imports need Python 3.7+")
+@pytest.mark.parametrize('module', ['psychopy', 'psychopy.clock',
+                                    'psychopy.core', 'psychopy.data',
+                                    'psychopy.tools', 'psychopy.hardware',
+                                    'psychopy.sound'])
+def test_importTime(module, reportBenchmark):
+    times = importTimes('import {}'.format(module))
+    reportBenchmark("import {}: {:.3f}s".format(module, times[module]))
+    for name in sorted(times):
+        # none of these should be loaded until they're used
+        assert not name.startswith('psychopy.visual'), name
+        assert not name.startswith('psychopy.sound.backend_'), name
+        assert not name.startswith('psychopy.hardware.'), name
+        assert name != 'psychopy.tools.versionchooser', name
+    assert times[module] < 30  # loose, just make sure it finished
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason="lazy attributes need module __getattr__")
+def test_lazyAttributes():
+    # unless it was set by the build, the git sha shouldn't be looked up
+    # until it's needed (in a new process so nothing else has asked for it)
+    statement = ("import psychopy; "
+                 "assert psychopy.__build_platform__ != 'n/a' or "
+                 "'__git_sha__' not in vars(psychopy)")
+    subprocess.check_call([sys.executable, '-c', statement], cwd=PACKAGE_ROOT)
+
+    import psychopy
+    from psychopy import hardware
+    assert isinstance(psychopy.__git_sha__, str)
+    assert psychopy.__git_sha__ == getattr(psychopy, '__git_sha__')
+    assert 'useVersion' in dir(psychopy)
+    assert callable(psychopy.useVersion)
+    assert 'pr' in dir(hardware)
+    assert hardware.pr.PR650.longName == 'PR650'
+    with pytest.raises(AttributeError):
+        psychopy.notAnAttribute
+    with pytest.raises(AttributeError):
+        hardware.notAnAttribute
+
+
+def test_visualStarImport():
+    # a star import gives every stimulus, as when they were all imported
+    # eagerly
+    visual = pytest.importorskip('psychopy.visual')
+    assert set(visual._lazyAttribs) <= set(visual.__all__)
+    assert {'GratingStim', 'ShapeStim', 'DotStim', 'MovieStim3',
+            'event', 'PLAYING'} <= set(visual.__all__)
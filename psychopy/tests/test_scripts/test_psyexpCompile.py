@@ -36,6 +36,30 @@ class TestComponents(object):
             script = f.read()
             assert 'visual.TextStim' not in script
 
+    def test_compile_many_scripts(self):
+        names = ['TextComponent_not_disabled', 'TextComponent_disabled',
+                 'CodeComponent_eachtab']
+        infiles = [os.path.join(TESTS_DATA_PATH, name + '.psyexp')
+                   for name in names]
+        outfiles = [os.path.join(self.temp_dir, name + '.py')
+                    for name in names]
+        for nJobs in [1, 2]:
+            results = psyexpCompile.compileScripts(infiles, outfiles,
+                                                   nJobs=nJobs)
+            assert [res[0] for res in results] == infiles
+            for infile, outfile, secs, error in results:
+                assert error is None
+                assert secs >= 0
+                assert os.path.isfile(outfile)
+            with io.open(outfiles[0], mode='r', encoding='utf-8-sig') as f:
+                assert 'visual.TextStim' in f.read()
+            with io.open(outfiles[1], mode='r', encoding='utf-8-sig') as f:
+                assert 'visual.TextStim' not in f.read()
+        # a file that can't be compiled is reported rather than raising
+        badfile = os.path.join(self.temp_dir, 'missing.psyexp')
+        results = psyexpCompile.compileScripts([badfile])
+        assert results[0][3] is not None
+
     def test_all_code_component_tabs(self):
         psyexp_file = os.path.join(TESTS_DATA_PATH,
                                    'CodeComponent_eachtab.psyexp')
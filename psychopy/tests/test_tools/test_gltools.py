@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for loading OBJ files with psychopy.tools.gltools
+
+"""
+import os
+import time
+import numpy as np
+import pytest
+
+from psychopy.tools import gltools
+
+
+def makeObjText(nSide=4, faceFormat='{0}/{1}/{2}', quads=False,
+                materials=('matA', 'matB'), seed=0):
+    """The text of an OBJ file of a `nSide` by `nSide` grid of squares, each
+    square being two triangles (or one quad), cycling through `materials`
+    every few rows.
+    """
+    rng = np.random.RandomState(seed)
+    lines = ['# made for testing', 'mtllib test.mtl', 'o grid']
+    nVerts = (nSide + 1) ** 2
+    for x, y in np.ndindex(nSide + 1, nSide + 1):
+        lines.append('v {:.6f} {:.6f} {:.6f}'.format(x, y, rng.uniform()))
+    for x, y in np.ndindex(nSide + 1, nSide + 1):
+        lines.append('vt {:.6f} {:.6f}'.format(x / nSide, y / nSide))
+    for ii in range(nVerts):
+        lines.append('vn {:.6f} {:.6f} {:.6f}'.format(*rng.uniform(size=3)))
+
+    def vert(x, y):
+        idx = x * (nSide + 1) + y + 1
+        # normals are shared out differently to the positions
+        return faceFormat.format(idx, idx, (idx * 7) % nVerts + 1)
+
+    for x in range(nSide):
+        if x % 2 == 0:
+            lines.append('usemtl ' + materials[(x // 2) % len(materials)])
+        for y in range(nSide):
+            corners = [vert(x, y), vert(x + 1, y), vert(x + 1, y + 1),
+                       vert(x, y + 1)]
+            if quads:
+                lines.append('f ' + ' '.join(corners))
+            else:
+                lines.append('f ' + ' '.join(corners[:3]))
+                lines.append('f ' + ' '.join(corners[2:] + corners[:1]))
+    return '\n'.join(lines) + '\n'
+
+
+def assertSameMesh(mesh, expected):
+    assert mesh.vertexPos.shape == expected.vertexPos.shape
+    assert np.array_equal(mesh.vertexPos, expected.vertexPos)
+    assert np.array_equal(mesh.texCoords, expected.texCoords)
+    assert np.array_equal(mesh.normals, expected.normals)
+    assert list(mesh.faces.keys()) == list(expected.faces.keys())
+    for material, faces in expected.faces.items():
+        assert mesh.faces[material].dtype == faces.dtype
+        assert np.array_equal(mesh.faces[material], faces)
+    assert mesh.mtlFile == expected.mtlFile
+
+
+@pytest.mark.parametrize('faceFormat', ['{0}/{1}/{2}', '{0}//{2}',
+                                        '{0}/{1}', '{0}'])
+@pytest.mark.parametrize('quads', [False, True])
+def test_parseObjArrays(faceFormat, quads):
+    objText = makeObjText(faceFormat=faceFormat, quads=quads)
+    mesh = gltools._parseObjArrays(objText)
+    assert mesh is not None
+    assertSameMesh(mesh, gltools._parseObjLines(objText))
+
+
+def test_uniqueRows():
+    rng = np.random.RandomState(0)
+    for maxValue in [10, 2 ** 40]:  # packed into single numbers or not
+        rows = rng.randint(0, 10, size=(200, 3)) * (maxValue // 10)
+        _, firstIdx, inverse = np.unique(
+            rows, axis=0, return_index=True, return_inverse=True)
+        idx, inv = gltools._uniqueRows(rows)
+        assert np.array_equal(idx, firstIdx)
+        assert np.array_equal(inv, inverse.reshape(-1))
+
+
+def test_parseObjArrays_fallback():
+    # not handled by the fast parser, these are left to the line by line one
+    objText = makeObjText()
+    mixed = objText + 'f 1/1/1 2/2/2 3/3/3 4/4/4\n'
+    assert gltools._parseObjArrays(mixed) is None
+    relative = objText + 'f -1/-1/-1 -2/-2/-2 -3/-3/-3\n'
+    assert gltools._parseObjArrays(relative) is None
+    # but unused materials are fine, as are extra spaces (which the line by
+    # line parser doesn't manage)
+    objText += 'usemtl unused\n'
+    spaced = objText.replace('v ', 'v  ').replace(' 1/1/', '  1/1/')
+    mesh = gltools._parseObjArrays(spaced)
+    assertSameMesh(mesh, gltools._parseObjLines(objText))
+    assert mesh.faces['unused'].size == 0
+    with pytest.raises(RuntimeError):
+        gltools._parseObjArrays('mtllib test.mtl\nv 0 0 0\n')
+
+
+def test_loadObjFile(tmpdir):
+    objFile = str(tmpdir.join('grid.obj'))
+    with open(objFile, 'w') as f:
+        f.write(makeObjText(nSide=8))
+    mesh = gltools.loadObjFile(objFile)
+    assert mesh.mtlFile == os.path.join(str(tmpdir), 'test.mtl')
+    assert np.array_equal(mesh.extents[0], mesh.vertexPos.min(axis=0))
+    assert np.array_equal(mesh.extents[1], mesh.vertexPos.max(axis=0))
+
+
+def test_loadObjFile_cache(tmpdir, monkeypatch):
+    objFile = str(tmpdir.join('grid.obj'))
+    with open(objFile, 'w') as f:
+        f.write(makeObjText(nSide=8))
+    expected = gltools.loadObjFile(objFile)
+    assert not os.path.exists(objFile + '.npz')
+
+    mesh = gltools.loadObjFile(objFile, useCache=True)
+    assert os.path.exists(objFile + '.npz')
+    assertSameMesh(mesh, expected)
+
+    parsed = []
+    parseObjArrays = gltools._parseObjArrays
+
+    def parseAndCount(objText):
+        parsed.append(objText)
+        return parseObjArrays(objText)
+
+    monkeypatch.setattr(gltools, '_parseObjArrays', parseAndCount)
+    mesh = gltools.loadObjFile(objFile, useCache=True)
+    assert not parsed  # came from the cache
+    assertSameMesh(mesh, expected)
+    assert np.array_equal(mesh.extents[0], expected.extents[0])
+
+    # changing the file means it's parsed again
+    with open(objFile, 'w') as f:
+        f.write(makeObjText(nSide=4))
+    mesh = gltools.loadObjFile(objFile, useCache=True)
+    assert len(parsed) == 1
+    assert len(mesh.vertexPos) < len(expected.vertexPos)
+
+
+@pytest.mark.benchmark
+def test_loadObjFile_benchmark(tmpdir, reportBenchmark):
+    """Time to load a mesh of 200k triangles with each parser, and from the
+    cache"""
+    objFile = str(tmpdir.join('large.obj'))
+    with open(objFile, 'w') as f:
+        f.write(makeObjText(nSide=316, materials=['a', 'b', 'c']))
+    with open(objFile) as f:
+        objText = f.read()
+
+    t0 = time.perf_counter()
+    expected = gltools._parseObjLines(objText)
+    lineByLine = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    mesh = gltools._parseObjArrays(objText)
+    vectorized = time.perf_counter() - t0
+    assertSameMesh(mesh, expected)
+
+    gltools.loadObjFile(objFile, useCache=True)
+    t0 = time.perf_counter()
+    gltools.loadObjFile(objFile, useCache=True)
+    cached = time.perf_counter() - t0
+
+    reportBenchmark("OBJ load: {:.2f}s (line by line), {:.2f}s (vectorized), "
+                    "{:.3f}s (cached)".format(lineByLine, vectorized, cached))
+    assert vectorized < lineByLine
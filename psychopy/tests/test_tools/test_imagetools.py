@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for psychopy.tools.imagetools
+
+"""
+import os
+import time
+import numpy
+import pytest
+
+from psychopy.tools.imagetools import (Image, ImageCache, imageCache,
+                                       prepareImage, loadImageFile,
+                                       preloadImages)
+
+
+def makeImages(folder, n, size=(300, 200), mode='RGB'):
+    rng = numpy.random.RandomState(0)
+    filenames = []
+    for ii in range(n):
+        nChannels = 3 if mode == 'RGB' else 1
+        pixels = rng.randint(0, 256, size=(size[1], size[0], nChannels))
+        pixels = pixels.astype(numpy.uint8).squeeze()
+        filename = os.path.join(folder, 'img%i.png' % ii)
+        Image.fromarray(pixels, mode).save(filename)
+        filenames.append(filename)
+    return filenames
+
+
+def test_prepareImage():
+    pixels = numpy.arange(12, dtype=numpy.uint8).reshape(3, 4)
+    im = Image.fromarray(pixels, 'L')
+    prepared = prepareImage(im)
+    assert prepared['size'] == (4, 3)
+    assert prepared['notSqr'] and not prepared['resized']
+    # flipped so the first row is at the bottom
+    assert (prepared['data'] == pixels[::-1]).all()
+    assert not prepared['data'].flags.writeable
+
+    prepared = prepareImage(im.convert('RGB'), forcePOW2=True)
+    assert prepared['resized'] and not prepared['notSqr']
+    assert prepared['data'].shape == (4, 4, 4)  # now RGBA
+    assert prepared['data'].dtype == numpy.uint8
+
+    prepared = prepareImage(im.convert('RGB'), luminance=True)
+    assert prepared['data'].shape == (3, 4)
+
+
+def test_imageCache_bounded():
+    cache = ImageCache(maxBytes=100)
+    for ii in range(5):
+        cache.put(ii, str(ii), 30)
+    assert len(cache) == 3 and cache.nBytes == 90
+    assert cache.get(0) is None  # least recently used went first
+    assert cache.get(2) == '2'
+    cache.put(5, '5', 30)  # so now 3 is the oldest
+    assert 3 not in cache and 2 in cache
+    cache.put(6, '6', 1000)  # too big to keep
+    assert 6 not in cache
+    assert cache.hits == 1 and cache.misses == 1
+    cache.clear()
+    assert len(cache) == 0 and cache.nBytes == 0
+
+
+def test_loadImageFile(tmpdir):
+    imageCache.clear()
+    filename, = makeImages(str(tmpdir), 1)
+    first = loadImageFile(filename)
+    assert loadImageFile(filename) is first
+    # different settings are cached separately
+    lum = loadImageFile(filename, luminance=True)
+    assert lum['data'].ndim == 2
+    assert loadImageFile(filename) is first
+    # modifying the file means it's decoded again
+    Image.new('RGB', (8, 8)).save(filename)
+    stat = os.stat(filename)
+    os.utime(filename, (stat.st_atime, stat.st_mtime + 10))
+    assert loadImageFile(filename)['size'] == (8, 8)
+    with pytest.raises(IOError):
+        bad = str(tmpdir.join('notAnImage.png'))
+        with open(bad, 'w') as f:
+            f.write('hello')
+        loadImageFile(bad)
+
+
+def test_preloadImages(tmpdir):
+    imageCache.clear()
+    filenames = makeImages(str(tmpdir), 6)
+    futures = preloadImages(filenames + filenames + ['missing.png'])
+    assert len(futures) == 6
+    for future in futures:
+        future.result()
+    assert len(imageCache) == 6
+    assert not imageCache._pending
+    hits = imageCache.hits
+    for filename in filenames:
+        loadImageFile(filename)
+    assert imageCache.hits == hits + 6
+    assert preloadImages(filenames) == []  # all done already
+
+
+@pytest.mark.benchmark
+def test_imageLoad_benchmark(tmpdir, reportBenchmark):
+    """Time to decode and prepare an image file, the first time and when
+    it's been preloaded into the cache"""
+    imageCache.clear()
+    filenames = makeImages(str(tmpdir), 20, size=(1024, 768))
+
+    t0 = time.perf_counter()
+    for filename in filenames:
+        loadImageFile(filename, cache=False)
+    uncached = (time.perf_counter() - t0) / len(filenames)
+
+    for future in preloadImages(filenames):
+        future.result()
+    t0 = time.perf_counter()
+    for filename in filenames:
+        loadImageFile(filename)
+    cached = (time.perf_counter() - t0) / len(filenames)
+
+    reportBenchmark("image decode+prep: {:.2f}ms (uncached), {:.3f}ms "
+                    "(cached)".format(uncached * 1000, cached * 1000))
+    assert cached < uncached
@@ -509,5 +509,76 @@ def test_alignTo():
     assert np.allclose(out, target)
 
 
+@pytest.mark.mathtools
+def test_triangulatePolygon():
+    """Test splitting polygons into triangles with `triangulatePolygon`.
+
+    Tests are successful if the triangles cover the polygon once, which is
+    checked by their areas and by counting the triangles that points inside
+    the polygon fall into.
+
+    """
+    def signedAreas(tris):
+        return 0.5 * ((tris[:, 1, 0] - tris[:, 0, 0]) *
+                      (tris[:, 2, 1] - tris[:, 0, 1]) -
+                      (tris[:, 1, 1] - tris[:, 0, 1]) *
+                      (tris[:, 2, 0] - tris[:, 0, 0]))
+
+    def inTriangles(points, tris):
+        p = points[:, np.newaxis, :]
+        a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+        edgeSides = []
+        for v0, v1 in ((a, b), (b, c), (c, a)):
+            edgeSides.append((v1[:, 0] - v0[:, 0]) * (p[..., 1] - v0[:, 1]) -
+                             (v1[:, 1] - v0[:, 1]) * (p[..., 0] - v0[:, 0]))
+        edgeSides = np.sign(edgeSides) * np.sign(signedAreas(tris))
+        return (edgeSides > 0).all(axis=0).sum(axis=1)
+
+    np.random.seed(12345)
+    angles = np.linspace(0.0, 2.0 * np.pi, 200, endpoint=False)
+    polygons = [
+        [(0, 0), (2, 0), (2, -1), (4, 1), (2, 3), (2, 2), (0, 2)],  # arrow
+        [(0, 0), (1, 0), (2, 0), (2, 1), (0, 1)],  # a vertex with no area
+        np.column_stack((np.cos(angles), np.sin(angles))),  # convex
+    ]
+    for lobes in (3, 7, 25):  # star shapes, each way round
+        radii = 1.0 + 0.5 * np.sin(lobes * angles) + \
+            np.random.uniform(0.0, 0.2, angles.shape)
+        star = np.column_stack((radii * np.cos(angles),
+                                radii * np.sin(angles)))
+        polygons.extend([star, star[::-1]])
+
+    for polygon in polygons:
+        polygon = np.asarray(polygon, dtype=float)
+        tris = polygon[triangulatePolygon(polygon)]
+        x, y = polygon[:, 0], polygon[:, 1]
+        area = 0.5 * (np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+        areas = signedAreas(tris)
+        assert np.all(np.sign(areas) == np.sign(area))
+        assert np.isclose(areas.sum(), area)
+        # points inside the polygon (just off the centres of the triangles,
+        # so not on an edge) are in exactly one of them
+        points = tris.mean(axis=1) + 1e-9
+        assert np.all(inTriangles(points, tris) == 1)
+
+    with pytest.raises(ValueError):
+        triangulatePolygon([(0, 0), (1, 1), (2, 2)])  # no area
+    with pytest.raises(ValueError):
+        triangulatePolygon([(0, 0), (1, 1)])
+
+    # self-crossing, with and without area
+    angles = np.arange(5) * 4.0 * np.pi / 5.0 + np.pi / 2.0
+    pentagram = np.column_stack((np.cos(angles), np.sin(angles)))
+    for polygon in (pentagram, [(0, 0), (1, 1), (1, 0), (0, 1)],
+                    [(0, 0), (2, 0), (2, 2), (1, 0), (0, 2)]):  # touching
+        with pytest.raises(ValueError):
+            triangulatePolygon(polygon)
+
+    # a repeated vertex (e.g. closing the polygon) is just left out
+    square = [(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)]
+    tris = np.asarray(square, dtype=float)[triangulatePolygon(square)]
+    assert np.isclose(signedAreas(tris).sum(), 1.0)
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for psychopy.tools.movietools (with synthetic frames, so no window is
+needed)
+
+"""
+import os
+import sys
+import stat
+import threading
+import time
+import numpy
+import pytest
+
+from psychopy.tools.movietools import MovieFrameWriter, Image
+
+
+def makeFrames(n, size=(64, 48)):
+    """Frames that are each filled with their frame number"""
+    frames = numpy.zeros((n, size[1], size[0], 3), dtype=numpy.uint8)
+    frames += numpy.arange(n, dtype=numpy.uint8)[:, None, None, None]
+    frames[:, 0, :, 0] = 255  # so the top row is different
+    return frames
+
+
+def makeFakeFfmpeg(folder, exitCode=0):
+    """A stand-in for ffmpeg that saves what's piped to it (and its
+    arguments) to the output file"""
+    script = os.path.join(folder, 'fakeffmpeg.py')
+    with open(script, 'w') as f:
+        f.write("#!{}\n"
+                "import sys, json\n"
+                "data = sys.stdin.buffer.read()\n"
+                "with open(sys.argv[-1], 'wb') as f:\n"
+                "    f.write(json.dumps(sys.argv[1:]).encode() + b'\\n')\n"
+                "    f.write(data)\n"
+                "sys.exit({})\n".format(sys.executable, exitCode))
+    os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+    return script
+
+
+@pytest.mark.parametrize('ext', ['.png', '.npy'])
+def test_numberedFrames(tmpdir, ext):
+    frames = makeFrames(5)
+    fileName = str(tmpdir.join('frame' + ext))
+    with MovieFrameWriter(fileName) as writer:
+        for frame in frames:
+            writer.write(frame)
+    assert writer.nFramesWritten == 5
+    for ii, frame in enumerate(frames):
+        frameFile = str(tmpdir.join('frame%05d%s' % (ii + 1, ext)))
+        if ext == '.npy':
+            saved = numpy.load(frameFile)
+        else:
+            saved = numpy.asarray(Image.open(frameFile))
+        assert numpy.array_equal(saved, frame)
+
+
+needsShebang = pytest.mark.skipif(sys.platform == 'win32',
+                                  reason="fake ffmpeg is a python script")
+
+
+@needsShebang
+def test_movie(tmpdir):
+    frames = makeFrames(10)
+    fileName = str(tmpdir.join('movie.mp4'))
+    ffmpeg = makeFakeFfmpeg(str(tmpdir))
+    with MovieFrameWriter(fileName, fps=60, ffmpeg=ffmpeg) as writer:
+        for frame in frames:
+            # RGBA arrays and images are fine too
+            writer.write(numpy.dstack([frame, frame[:, :, :1]]))
+        writer.write(Image.fromarray(frames[0]))
+    with open(fileName, 'rb') as f:
+        args = f.readline()
+        data = f.read()
+    assert b'"64x48"' in args and b'"60"' in args and b'"libx264"' in args
+    piped = numpy.frombuffer(data, dtype=numpy.uint8).reshape((11, 48, 64, 3))
+    assert numpy.array_equal(piped[:10], frames)
+    assert numpy.array_equal(piped[10], frames[0])
+
+
+@needsShebang
+def test_errors(tmpdir):
+    ffmpeg = makeFakeFfmpeg(str(tmpdir), exitCode=1)
+    writer = MovieFrameWriter(str(tmpdir.join('movie.mp4')), ffmpeg=ffmpeg)
+    frames = makeFrames(3)
+    writer.write(frames[0])
+    with pytest.raises(ValueError):
+        writer.write(frames[1, :10])  # a different size
+    with pytest.raises(ValueError):
+        writer.write(frames[1, :, :, 0])
+    writer.write(frames[1])
+    with pytest.raises(RuntimeError):
+        writer.close()  # ffmpeg failed
+    with pytest.raises(RuntimeError):
+        writer.write(frames[2])
+
+
+def test_boundedQueue(tmpdir, monkeypatch):
+    gate = threading.Event()
+    writeFrame = MovieFrameWriter._writeFrame
+
+    def slowWriteFrame(self, frame):
+        gate.wait()
+        writeFrame(self, frame)
+
+    monkeypatch.setattr(MovieFrameWriter, '_writeFrame', slowWriteFrame)
+    frames = makeFrames(6)
+    writer = MovieFrameWriter(str(tmpdir.join('frame.npy')), maxQueued=2)
+    # one frame being written and two waiting fills it up
+    for frame in frames[:3]:
+        writer.write(frame)
+    while writer.nFramesQueued > 2:
+        time.sleep(0.01)
+
+    def writeRest():
+        for frame in frames[3:]:
+            writer.write(frame)
+
+    producer = threading.Thread(target=writeRest)
+    producer.start()
+    producer.join(0.2)
+    assert producer.is_alive()  # waiting for space
+    assert writer.nFramesQueued <= 2
+    gate.set()
+    producer.join()
+    writer.close()
+    assert writer.nFramesWritten == 6
+    assert len(tmpdir.listdir()) == 6
+
+
+@pytest.mark.benchmark
+def test_movieFrameWriter_benchmark(tmpdir, reportBenchmark):
+    """Time the experiment spends per frame saving 100 640x480 frames as
+    PNGs, straight away and with the writer thread"""
+    frames = makeFrames(100, size=(640, 480))
+
+    t0 = time.perf_counter()
+    for ii, frame in enumerate(frames):
+        Image.fromarray(frame).save(str(tmpdir.join('sync%05d.png' % ii)))
+    sync = (time.perf_counter() - t0) / len(frames)
+
+    writer = MovieFrameWriter(str(tmpdir.join('async.png')), maxQueued=200)
+    t0 = time.perf_counter()
+    for frame in frames:
+        writer.write(frame)
+    streamed = (time.perf_counter() - t0) / len(frames)
+    writer.close()
+
+    reportBenchmark("frame save: {:.2f}ms (synchronous), {:.3f}ms (writer "
+                    "thread)".format(sync * 1000, streamed * 1000))
+    assert streamed < sync
@@ -0,0 +1,122 @@
+"""Tests for the per-window cache of shader programs (using a stand-in for
+the GL module, so no window or display is needed)"""
+from __future__ import print_function
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+from psychopy.tools import shadertools
+from psychopy.tools.shadertools import ProgramCache
+
+
+class FakeGL(object):
+    """Counts the location lookups made (and stands in for gltools too)"""
+
+    def __init__(self):
+        self.lookups = []
+
+    def glGetUniformLocation(self, program, name):
+        self.lookups.append(('uniform', program, name))
+        return len(name)
+
+    def glGetAttribLocation(self, program, name):
+        self.lookups.append(('attrib', program, name))
+        return -1
+
+    @staticmethod
+    def embedShaderSourceDefs(shaderSrc, defs):
+        # as gltools does, after the #version line
+        lines = shaderSrc.splitlines(True)
+        return "".join(lines[:1] + ["#define %s %s\n" % item
+                                    for item in sorted(defs.items())] +
+                       lines[1:])
+
+
+@pytest.fixture
+def fakeGL(monkeypatch):
+    compiled = []
+
+    def compileProgram(vertexSource=None, fragmentSource=None):
+        compiled.append((vertexSource, fragmentSource))
+        return len(compiled)
+
+    gl = FakeGL()
+    gl.compiled = compiled
+    monkeypatch.setattr(shadertools, '_compileProgram', compileProgram)
+    monkeypatch.setattr(shadertools, '_gl', lambda: gl)
+    monkeypatch.setattr(shadertools, '_gltools', lambda: gl)
+    return gl
+
+
+def test_noDisplayNeeded():
+    """The cache can be imported without pyglet's GL (which needs a
+    display)"""
+    statement = ("import sys; import psychopy.tools.shadertools; "
+                 "assert 'pyglet.gl' not in sys.modules")
+    root = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(shadertools.__file__))))
+    subprocess.check_call([sys.executable, '-c', statement], cwd=root)
+
+
+def test_makeKey():
+    key = ProgramCache.makeKey('vert', 'frag', {'A': 1, 'B': True})
+    assert key == ProgramCache.makeKey('vert', 'frag', {'B': 1, 'A': 1})
+    assert key == ProgramCache.makeKey(b'vert', ['fr', 'ag'],
+                                       {'A': 1, 'B': True})
+    assert key != ProgramCache.makeKey('vert', 'frag', {'A': 1, 'B': 0})
+    assert key != ProgramCache.makeKey('vert', 'frag')
+    # the sources are kept apart
+    assert (ProgramCache.makeKey('ab', 'c') !=
+            ProgramCache.makeKey('a', 'bc'))
+
+
+def test_getProgram(fakeGL):
+    cache = ProgramCache()
+    vert = "#version 120\nvoid main() {}\n"
+    frag = "#version 120\nvoid main() {}\n"
+    prog = cache.getProgram(vert, frag)
+    assert cache.getProgram(vert, frag) == prog
+    assert cache.nCompiled == 1 and cache.nHits == 1
+    # definitions are embedded and make a different program
+    progDefs = cache.getProgram(vert, frag, defs={'MAX_LIGHTS': 2})
+    assert progDefs != prog
+    assert cache.getProgram(vert, frag, defs={'MAX_LIGHTS': 2}) == progDefs
+    assert len(cache) == 2 and len(fakeGL.compiled) == 2
+    for source in fakeGL.compiled[1]:
+        assert source.startswith("#version 120\n#define MAX_LIGHTS 2\n")
+
+
+def test_locations(fakeGL):
+    cache = ProgramCache()
+    prog = cache.getProgram('vert', 'frag')
+    for ii in range(3):
+        assert cache.getUniformLocation(prog, 'texture') == 7
+        assert cache.getUniformLocation(prog, b'texture') == 7
+        assert cache.getAttribLocation(prog, 'position') == -1
+    assert fakeGL.lookups == [('uniform', prog, b'texture'),
+                              ('attrib', prog, b'position')]
+    # each program has its own locations
+    other = cache.getProgram('vert', 'frag', defs={'A': 1})
+    cache.getUniformLocation(other, 'texture')
+    assert len(fakeGL.lookups) == 3
+
+
+def test_allLocations(fakeGL, monkeypatch):
+    calls = []
+
+    def getUniformLocations(program, builtins=False):
+        calls.append(program)
+        return {b'mask': 1, b'texture': 2}
+
+    fakeGL.getUniformLocations = getUniformLocations
+    cache = ProgramCache()
+    prog = cache.getProgram('vert', 'frag')
+    assert cache.getUniformLocations(prog) == {b'mask': 1, b'texture': 2}
+    assert cache.getUniformLocations(prog) == {b'mask': 1, b'texture': 2}
+    assert calls == [prog]
+    # and they're used for single lookups too
+    assert cache.getUniformLocation(prog, 'mask') == 1
+    assert not fakeGL.lookups
@@ -161,6 +161,17 @@ def shuffleArray(inArray, shuffleAxis=-1, seed=None):
     return numpy.take(inArray, newIndices)
 
 
+def _makeGenerator(seed):
+    """A numpy.random.Generator for the seed (or a RandomState if numpy is
+    too old to have Generators)
+    """
+    if hasattr(numpy.random, 'default_rng'):
+        return numpy.random.default_rng(seed)
+    if isinstance(seed, numpy.random.RandomState):
+        return seed
+    return numpy.random.RandomState(seed)
+
+
 def val2array(value, withNone=True, withScalar=True, length=2):
     """Helper function: converts different input to a numpy array.
 
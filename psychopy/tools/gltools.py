@@ -97,8 +97,12 @@ from contextlib import contextmanager
 from PIL import Image
 import numpy as np
 import os, sys
+import re
+import json
+import hashlib
 import warnings
 import psychopy.tools.mathtools as mt
+from psychopy import logging
 from psychopy.visual.helpers import setColor
 
 # create a query counter to get absolute GPU time
@@ -3609,7 +3613,7 @@ class ObjMeshInfo(object):
         self.mtlFile = mtlFile
 
 
-def loadObjFile(objFile):
+def loadObjFile(objFile, useCache=False):
     """Load a Wavefront OBJ file (*.obj).
 
     Loads vertex, normals, and texture coordinates from the provided *.obj file
@@ -3630,6 +3634,10 @@ def loadObjFile(objFile):
     ----------
     objFile : :obj:`str`
         Path to the *.OBJ file to load.
+    useCache : :obj:`bool`
+        Keep the parsed arrays in a binary file next to the OBJ file
+        (`objFile` + '.npz') and load those instead the next time, as long as
+        the OBJ file hasn't changed since.
 
     Returns
     -------
@@ -3646,6 +3654,9 @@ def loadObjFile(objFile):
        your model with Blender for best results, even if you used some other
        package to create it.
     2. The mesh cannot contain both triangles and quads.
+    3. Large meshes load much faster with `useCache=True` after the first
+       time. The cache is checked against a hash of the OBJ file's contents,
+       so editing the model updates it.
 
     Examples
     --------
@@ -3726,10 +3737,194 @@ def loadObjFile(objFile):
     with separate buffers.
 
     """
-    # open the file, read it into memory
-    with open(objFile, 'r') as f:
-        objBuffer = StringIO(f.read())
+    with open(objFile, 'rb') as f:
+        objData = f.read()
+
+    meshInfo = None
+    if useCache:
+        cacheFile = objFile + '.npz'
+        objHash = hashlib.sha1(objData).hexdigest()
+        meshInfo = _readObjCache(cacheFile, objHash)
+
+    if meshInfo is None:
+        objText = objData.decode('utf-8', 'replace')
+        meshInfo = _parseObjArrays(objText)
+        if meshInfo is None:  # something the fast parser doesn't handle
+            meshInfo = _parseObjLines(objText)
+        if useCache:
+            _writeObjCache(cacheFile, objHash, meshInfo)
+
+    # compute the extents of the model, needed for axis-aligned bounding boxes
+    vertexPos = meshInfo.vertexPos
+    meshInfo.extents = (vertexPos.min(axis=0), vertexPos.max(axis=0))
+
+    # resolve the path to the material file associated with the mesh
+    if meshInfo.mtlFile is not None:
+        meshInfo.mtlFile = os.path.join(
+            os.path.split(objFile)[0], meshInfo.mtlFile)
+
+    return meshInfo
+
+
+# the values of the lines of each type in an OBJ file (starting with a
+# newline rather than `^` so they're found quickly)
+_objLineRegex = {
+    tag: re.compile(r'\n{}[ \t]+([^\r\n]*)'.format(tag))
+    for tag in ('v', 'vt', 'vn', 'f', 'usemtl', 'mtllib')}
+
+
+def _parseObjArrays(objText):
+    """Parse the text of an OBJ file, converting each kind of data to an array
+    in one go rather than line by line.
+
+    Returns `None` if the file has something this doesn't handle (faces with
+    different numbers of vertices, negative indices etc.) so that it can be
+    given to `_parseObjLines` instead.
+
+    """
+    objText = re.sub(r'\n[ \t]+', '\n', '\n' + objText)  # no indents
+    positionDefs = _objLineRegex['v'].findall(objText)
+    texCoordDefs = _objLineRegex['vt'].findall(objText)
+    normalDefs = _objLineRegex['vn'].findall(objText)
+    mtlFiles = _objLineRegex['mtllib'].findall(objText)
+    mtlFile = mtlFiles[-1].strip() if mtlFiles else None
+
+    # faces belong to the last material named before them
+    sections = _objLineRegex['usemtl'].split(objText)
+    if _objLineRegex['f'].search(sections[0]):
+        return None  # faces before any material
+    faceDefs = []
+    faceMaterials = []  # index (in `materials`) of the material of each face
+    materials = {}  # material name: index, in the order they appear
+    for name, section in zip(sections[1::2], sections[2::2]):
+        materialIdx = materials.setdefault(name.strip(), len(materials))
+        sectionFaces = _objLineRegex['f'].findall(section)
+        faceDefs.extend(sectionFaces)
+        faceMaterials.extend([materialIdx] * len(sectionFaces))
+
+    # at the very least, we need vertices and facedefs
+    if not positionDefs or not faceDefs:
+        raise RuntimeError(
+            "Failed to load OBJ file, file contains no vertices or faces.")
+
+    positions = _objValuesToArray(positionDefs, float)
+    texCoords = _objValuesToArray(texCoordDefs, float)
+    normals = _objValuesToArray(normalDefs, float)
+    if positions is None or texCoords is None or normals is None:
+        return None
+
+    # faces are lists of vertices given as `v/vt/vn` indices, with the `vt`
+    # and `vn` being optional (and `vt` possibly empty, i.e. `v//vn`)
+    faceText = "\n".join(faceDefs)
+    nFields = faceDefs[0].split(None, 1)[0].count('/') + 1
+    nSlashes = faceText.count('/')
+    faceText = faceText.replace('//', '/0/').replace('/', ' ')
+    faceVerts = _objValuesToArray(faceDefs, np.int64, faceText)
+    if faceVerts is None or faceVerts.shape[1] % nFields or \
+            faceVerts.size // nFields * (nFields - 1) != nSlashes:
+        return None
+    vertDefs = faceVerts.reshape((-1, nFields))
+    if (vertDefs[:, 0] < 1).any() or (vertDefs[:, 1:] < 0).any():
+        return None
+
+    # each distinct combination of attributes becomes a vertex, numbered in
+    # the order they first appear
+    firstIdx, vertIdx = _uniqueRows(vertDefs)
+    order = np.argsort(firstIdx)
+    vertAttrs = vertDefs[firstIdx[order]]
+    newIdx = np.empty_like(order)
+    newIdx[order] = np.arange(len(order))
+    faces = newIdx[vertIdx].reshape((len(faceDefs), -1))
+
+    vertexPos = positions[vertAttrs[:, 0] - 1]
+    vertexTexCoord = np.asarray([])
+    vertexNormal = np.asarray([])
+    if nFields > 1 and len(texCoords):
+        # missing texture coordinates are filled with zeros
+        vertexTexCoord = np.zeros((len(vertAttrs), texCoords.shape[1]))
+        hasTexCoord = vertAttrs[:, 1] > 0
+        vertexTexCoord[hasTexCoord] = \
+            texCoords[vertAttrs[hasTexCoord, 1] - 1]
+    if nFields > 2:
+        if len(normals):
+            vertexNormal = normals[vertAttrs[:, 2] - 1]
+        else:
+            vertexNormal = np.zeros((len(vertAttrs), 3))
+
+    # group the faces by material
+    faceMaterials = np.asarray(faceMaterials)
+    byMaterial = np.argsort(faceMaterials, kind='stable')
+    counts = np.bincount(faceMaterials, minlength=len(materials))
+    groups = np.split(faces[byMaterial], np.cumsum(counts)[:-1])
+    materialGroups = {}
+    for name, idx in materials.items():
+        materialGroups[name] = \
+            groups[idx] if counts[idx] else np.asarray([], dtype=int)
+
+    return ObjMeshInfo(vertexPos,
+                       vertexTexCoord,
+                       vertexNormal,
+                       materialGroups,
+                       None,
+                       mtlFile)
+
+
+def _uniqueRows(rows):
+    """The indices of the first of each distinct row of a (non-negative)
+    integer array and the index of each row's value in those, as given by
+    ``np.unique(rows, axis=0, return_index=True, return_inverse=True)``.
+
+    Where they fit, each row is made into a single number first which is much
+    quicker to sort.
+
+    """
+    bases = [int(maxValue) + 1 for maxValue in rows.max(axis=0)]
+    if np.prod(bases, dtype=object) < 2 ** 63:
+        keys = rows[:, 0].astype(np.int64)
+        for col, base in zip(rows.T[1:], bases[1:]):
+            keys *= base
+            keys += col
+        _, firstIdx, inverse = np.unique(
+            keys, return_index=True, return_inverse=True)
+    else:
+        _, firstIdx, inverse = np.unique(
+            rows, axis=0, return_index=True, return_inverse=True)
+    return firstIdx, inverse.reshape(-1)
 
+
+def _objValuesToArray(lines, dtype, text=None):
+    """Convert lines of whitespace separated numbers to a 2D array with a row
+    per line, or `None` if the lines don't all have the same number of them.
+    `text` is the lines already joined by newlines (and preprocessed) if
+    that had to be done first.
+    """
+    if not lines:
+        return np.zeros((0, 0), dtype=dtype)
+    if text is None:
+        text = "\n".join(lines)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # reported below as a bad count
+        try:
+            values = np.fromstring(text, dtype=dtype, sep=' ')
+        except ValueError:
+            return None
+
+    # count the numbers on each line from where each one starts
+    chars = np.frombuffer(text.encode('utf-8'), dtype=np.uint8)
+    isSpace = chars <= ord(' ')
+    isStart = ~isSpace
+    isStart[1:] &= isSpace[:-1]
+    lineOfStart = np.searchsorted(
+        np.flatnonzero(chars == ord('\n')), np.flatnonzero(isStart))
+    counts = np.bincount(lineOfStart, minlength=len(lines))
+    if len(values) != len(lineOfStart) or (counts != counts[0]).any():
+        return None
+    return values.reshape((len(lines), -1))
+
+
+def _parseObjLines(objText):
+    """Parse the text of an OBJ file line by line (see `_parseObjArrays`)."""
+    objBuffer = StringIO(objText)
     mtlFile = None
 
     # unsorted attribute data lists
@@ -3784,7 +3979,7 @@ def loadObjFile(objFile):
 
     # convert indices for materials to numpy arrays
     for key, val in materialGroups.items():
-        materialGroups[key] = np.asarray(val, dtype=np.int)
+        materialGroups[key] = np.asarray(val, dtype=int)
 
     # indicate if file has any texture coordinates of normals
     hasTexCoords = nTextureCoords > 0
@@ -3816,21 +4011,64 @@ def loadObjFile(objFile):
     vertexTexCoord = np.asarray(vertexTexCoord)
     vertexNormal = np.asarray(vertexNormal)
 
-    # compute the extents of the model, needed for axis-aligned bounding boxes
-    extents = (vertexPos.min(axis=0), vertexPos.max(axis=0))
-
-    # resolve the path to the material file associated with the mesh
-    if mtlFile is not None:
-        mtlFile = os.path.join(os.path.split(objFile)[0], mtlFile)
-
     return ObjMeshInfo(vertexPos,
                        vertexTexCoord,
                        vertexNormal,
                        materialGroups,
-                       extents,
+                       None,
                        mtlFile)
 
 
+def _readObjCache(cacheFile, objHash):
+    """Load the `ObjMeshInfo` saved by `_writeObjCache`, or `None` if there
+    isn't one for this version of the OBJ file.
+    """
+    if not os.path.isfile(cacheFile):
+        return None
+    try:
+        with np.load(cacheFile) as cached:
+            info = json.loads(str(cached['info']))
+            if info['hash'] != objHash:
+                return None
+            materialGroups = {}
+            for idx, name in enumerate(info['materials']):
+                materialGroups[name] = cached['faces{}'.format(idx)]
+            return ObjMeshInfo(cached['vertexPos'],
+                               cached['texCoords'],
+                               cached['normals'],
+                               materialGroups,
+                               None,
+                               info['mtlFile'])
+    except Exception as err:
+        logging.warning(
+            "Couldn't read the OBJ cache file {}: {}".format(cacheFile, err))
+        return None
+
+
+def _writeObjCache(cacheFile, objHash, meshInfo):
+    """Save the arrays of `meshInfo` for `_readObjCache`."""
+    info = {'hash': objHash,
+            'materials': list(meshInfo.faces.keys()),
+            'mtlFile': meshInfo.mtlFile}
+    arrays = {'faces{}'.format(idx): faces
+              for idx, faces in enumerate(meshInfo.faces.values())}
+    # write to another file first so nothing reads it half written
+    tmpFile = '{}.{}.tmp.npz'.format(cacheFile[:-4], os.getpid())
+    try:
+        np.savez(tmpFile,
+                 info=np.array(json.dumps(info)),
+                 vertexPos=meshInfo.vertexPos,
+                 texCoords=meshInfo.texCoords,
+                 normals=meshInfo.normals,
+                 **arrays)
+        os.replace(tmpFile, cacheFile)
+    except (OSError, IOError) as err:
+        logging.warning(
+            "Couldn't write the OBJ cache file {}: {}".format(cacheFile, err))
+        if os.path.exists(tmpFile):
+            os.remove(tmpFile)
+
+
 def loadMtlFile(mtllib, texParams=None):
     """Load a material library file (*.mtl).
 
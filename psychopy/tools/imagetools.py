@@ -14,6 +14,9 @@ try:
 except ImportError:
     import Image
 
+import os
+import threading
+from collections import OrderedDict
 import numpy
 
 from psychopy.tools.typetools import float_uint8
@@ -67,3 +70,171 @@ def makeImageAuto(inarray):
     ie. scales a numeric array from -1:1 to 0:255 and
     converts to PIL image format"""
     return image2array(float_uint8(inarray))
+
+
+class ImageCache(object):
+    """A thread-safe cache of decoded images, bounded by the number of bytes
+    it holds (the least recently used images are dropped first).
+
+    Values are stored under whatever (hashable) key they are given, which
+    should include anything that affects the decoded data.
+    """
+
+    def __init__(self, maxBytes=256 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.nBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key: (value, nBytes)
+        self._pending = {}  # key: future for images being decoded
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, nBytes = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries[key] = (value, nBytes)  # now most recently used
+            self.hits += 1
+            return value
+
+    def put(self, key, value, nBytes):
+        with self._lock:
+            if key in self._entries:
+                self.nBytes -= self._entries.pop(key)[1]
+            if nBytes > self.maxBytes:
+                return  # would push everything else out
+            self._entries[key] = (value, nBytes)
+            self.nBytes += nBytes
+            while self.nBytes > self.maxBytes:
+                self.nBytes -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nBytes = 0
+
+
+# the process-wide cache used by the visual stimuli for image files
+imageCache = ImageCache()
+
+
+def prepareImage(im, luminance=False, forcePOW2=False):
+    """Converts a PIL image into the array uploaded as a texture: flipped so
+    the first row is at the bottom, resized to a square power of two (if
+    `forcePOW2`) and converted to 'L' (if `luminance`) or 'RGBA'.
+
+    Returns a dict with the (read-only, contiguous) uint8 array as 'data',
+    the original 'size', and flags for whether it was 'resized' or is
+    'notSqr' (not a square power of two, and not resized).
+    """
+    origSize = im.size
+    im = im.transpose(Image.FLIP_TOP_BOTTOM)
+    resized = notSqr = False
+    if im.size[0] > 1 and im.size[1] > 1:
+        powerOf2 = int(2**numpy.ceil(numpy.log2(max(im.size))))
+        if im.size[0] != powerOf2 or im.size[1] != powerOf2:
+            if forcePOW2:
+                im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
+                resized = True
+            else:
+                notSqr = True
+    if luminance:
+        if im.mode != 'L':
+            im = im.convert('L')  # force to intensity (need if was rgb)
+    elif im.mode != 'L':
+        im = im.convert('RGBA')  # might be CMYK, palette etc.
+    data = numpy.ascontiguousarray(numpy.asarray(im), dtype=numpy.uint8)
+    data.flags.writeable = False  # it may be shared through the cache
+    return {'data': data, 'size': origSize, 'resized': resized,
+            'notSqr': notSqr}
+
+
+def _imageKey(filename, luminance, forcePOW2):
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+    return (filename, stat.st_mtime, stat.st_size, bool(luminance),
+            bool(forcePOW2))
+
+
+def _decodeImageFile(filename, luminance, forcePOW2):
+    im = Image.open(filename)
+    try:
+        return prepareImage(im, luminance, forcePOW2)
+    finally:
+        im.close()
+
+
+def loadImageFile(filename, luminance=False, forcePOW2=False, cache=True):
+    """Decodes an image file with :func:`prepareImage`, reusing the copy in
+    `imageCache` if the file has been loaded (or preloaded) before and hasn't
+    changed since. Raises IOError if the file can't be read as an image.
+    """
+    if not cache:
+        return _decodeImageFile(filename, luminance, forcePOW2)
+    key = _imageKey(filename, luminance, forcePOW2)
+    prepared = imageCache.get(key)
+    if prepared is not None:
+        return prepared
+    pending = imageCache._pending.get(key)
+    if pending is not None:
+        # being preloaded right now so wait rather than decode it twice
+        try:
+            return pending.result()
+        except Exception:
+            pass  # try for ourselves (and raise the error here if need be)
+    prepared = _decodeImageFile(filename, luminance, forcePOW2)
+    imageCache.put(key, prepared, prepared['data'].nbytes)
+    return prepared
+
+
+_preloadExecutor = None
+
+
+def preloadImages(filenames, luminance=False, forcePOW2=False, nThreads=4):
+    """Decodes image files in background threads ahead of time, so that
+    setting them as the image of a stimulus later just uploads them, e.g.::
+
+        trials = data.TrialHandler(conditions, nReps=5)
+        preloadImages([cond['image'] for cond in conditions])
+
+    The defaults match the settings `ImageStim` uses for its image. Files
+    that don't exist (or aren't images) are skipped here and reported when
+    they are actually used. Returns a list of `concurrent.futures.Future`
+    objects, one for each file that is being loaded.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    global _preloadExecutor
+    if _preloadExecutor is None:
+        _preloadExecutor = ThreadPoolExecutor(max_workers=nThreads)
+
+    def load(key, filename):
+        try:
+            prepared = _decodeImageFile(filename, luminance, forcePOW2)
+            imageCache.put(key, prepared, prepared['data'].nbytes)
+            return prepared
+        finally:
+            with imageCache._lock:
+                del imageCache._pending[key]
+
+    futures = []
+    for filename in filenames:
+        try:
+            key = _imageKey(filename, luminance, forcePOW2)
+        except (OSError, TypeError):
+            continue  # not a file
+        with imageCache._lock:
+            if key in imageCache._entries or key in imageCache._pending:
+                continue
+            future = _preloadExecutor.submit(load, key, filename)
+            imageCache._pending[key] = future
+        futures.append(future)
+    return futures
@@ -64,7 +64,8 @@ __all__ = ['normalize',
            'articulate',
            'forwardProject',
            'reverseProject',
-           'lensCorrectionSpherical']
+           'lensCorrectionSpherical',
+           'triangulatePolygon']
 
 
 import numpy as np
@@ -1660,6 +1661,188 @@ def intersectRayTriangle(rayOrig, rayDir, tri, dtype=None):
     return (rayDir * dist) + rayOrig, dist, baryPos
 
 
+def _polygonCrossesItself(verts):
+    """Whether any edges of the polygon with (Nx2 array) vertices `verts`
+    cross or touch, other than neighbouring edges at the vertex they share.
+    """
+    nVerts = len(verts)
+    starts, ends = verts, np.roll(verts, -1, axis=0)
+    lo, hi = np.minimum(starts, ends), np.maximum(starts, ends)
+
+    # only test pairs of edges whose x ranges overlap, found by sorting the
+    # edges by the lower end of their range
+    order = np.argsort(lo[:, 0], kind='mergesort')
+    first = np.arange(1, nVerts + 1)
+    last = np.searchsorted(lo[order, 0], hi[order, 0], 'right')
+    nTests = np.maximum(last - first, 0)
+    i = np.repeat(np.arange(nVerts), nTests)
+    j = np.arange(nTests.sum()) + np.repeat(
+        first - np.cumsum(nTests) + nTests, nTests)
+    i, j = order[i], order[j]
+
+    # not neighbours, and their y ranges overlap too
+    gap = np.abs(i - j)
+    keep = (gap != 1) & (gap != nVerts - 1) & \
+        (lo[i, 1] <= hi[j, 1]) & (lo[j, 1] <= hi[i, 1])
+    i, j = i[keep], j[keep]
+    if not len(i):
+        return False
+
+    def side(a, b, p):
+        return ((b[:, 0] - a[:, 0]) * (p[:, 1] - a[:, 1]) -
+                (b[:, 1] - a[:, 1]) * (p[:, 0] - a[:, 0]))
+
+    a, b, c, d = starts[i], ends[i], starts[j], ends[j]
+    # the ends of each edge aren't both on the same side of the other (edges
+    # in a line with overlapping ranges touch, so count too)
+    crosses = (side(a, b, c) * side(a, b, d) <= 0.0) & \
+        (side(c, d, a) * side(c, d, b) <= 0.0)
+
+    return bool(crosses.any())
+
+
+def triangulatePolygon(vertices, dtype=None):
+    """Split a simple polygon into triangles.
+
+    This uses ear clipping, where triangles made by a vertex and its two
+    neighbours (an 'ear') are cut off the polygon until only one is left. All
+    the ears which don't share a tip are cut at once, so the work is done by
+    array operations over the whole polygon rather than per vertex. This is an
+    alternative to the GLU tesselator which doesn't need an OpenGL context.
+
+    Parameters
+    ----------
+    vertices : array_like
+        Nx2 array of the vertices of the polygon, in order (either clockwise
+        or anti-clockwise). The polygon must be simple, that is its edges
+        mustn't cross each other and it can't have holes.
+    dtype : dtype or str, optional
+        Data type for computations can either be 'float32' or 'float64'. If
+        `None` is specified, 'float64' is used by default.
+
+    Returns
+    -------
+    ndarray
+        Indices of the vertices of each triangle as an Mx3 array, which are
+        given in the same winding order as the polygon. `M` is usually
+        `N` - 2, but vertices which make no area (e.g. in the middle of a
+        straight edge) are left out.
+
+    Raises
+    ------
+    ValueError
+        If the polygon has no area, or isn't simple (any of its edges cross
+        or touch, other than neighbouring edges at their shared vertex).
+
+    Examples
+    --------
+    Triangulate a concave polygon and get the vertices of each triangle::
+
+        arrow = [(0, 0), (2, 0), (2, -1), (4, 1), (2, 3), (2, 2), (0, 2)]
+        triangles = np.asarray(arrow)[triangulatePolygon(arrow)]
+
+    """
+    dtype = np.float64 if dtype is None else np.dtype(dtype).type
+
+    verts = np.asarray(vertices, dtype=dtype)
+    if verts.ndim != 2 or verts.shape[1] != 2 or len(verts) < 3:
+        raise ValueError("Polygon vertices must be an Nx2 array with N >= 3.")
+
+    # twice the signed area, positive if the vertices are anti-clockwise
+    x, y = verts[:, 0], verts[:, 1]
+    area = np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)
+    if area == 0.0:
+        raise ValueError("Polygon has no area.")
+    winding = 1.0 if area > 0.0 else -1.0
+
+    # repeated vertices (which make no area) touch both their edges
+    distinct = np.any(verts != np.roll(verts, -1, axis=0), axis=1)
+    if _polygonCrossesItself(verts[distinct]):
+        raise ValueError("Polygon isn't simple, its edges cross.")
+
+    def turn(a, b, c):
+        # > 0 where a, b, c turn the same way as the polygon
+        return winding * ((b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1]) -
+                          (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0]))
+
+    nVerts = len(verts)
+    remaining = np.arange(nVerts)  # vertices still in the polygon, in order
+    prevIdx = np.roll(remaining, 1)  # neighbours of each vertex
+    nextIdx = np.roll(remaining, -1)
+    turns = np.zeros((nVerts,), dtype=dtype)
+    isEar = np.zeros((nVerts,), dtype=bool)
+    triangles = []
+    update = remaining  # vertices whose neighbours have changed
+    while len(remaining) > 3:
+        a, b, c = verts[prevIdx[update]], verts[update], verts[nextIdx[update]]
+        turns[update] = turn(a, b, c)
+
+        # an ear's tip is convex and no other (reflex) vertex is inside it,
+        # which only changes when a neighbour is cut off
+        isEar[update] = turns[update] > 0.0
+        tips = np.flatnonzero(isEar[update])
+        reflex = remaining[turns[remaining] <= 0.0]
+        if len(reflex) and len(tips):
+            # only test the vertices within the x range of each triangle
+            reflex = reflex[np.argsort(verts[reflex, 0])]
+            ta, tb, tc = a[tips], b[tips], c[tips]
+            xs = np.stack((ta[:, 0], tb[:, 0], tc[:, 0]))
+            lo = np.searchsorted(verts[reflex, 0], xs.min(axis=0), 'left')
+            hi = np.searchsorted(verts[reflex, 0], xs.max(axis=0), 'right')
+            nTests = hi - lo
+            tested = np.repeat(np.arange(len(tips)), nTests)
+            points = reflex[np.arange(nTests.sum()) + np.repeat(
+                lo - np.cumsum(nTests) + nTests, nTests)]
+            p = verts[points]
+            ta, tb, tc = ta[tested], tb[tested], tc[tested]
+            inside = ((turn(ta, tb, p) >= 0.0) & (turn(tb, tc, p) >= 0.0) &
+                      (turn(tc, ta, p) >= 0.0))
+            # not counting the corners of the triangle itself
+            tipIdx = update[tips][tested]
+            inside &= (points != prevIdx[tipIdx]) & (points != nextIdx[tipIdx])
+            isEar[update[tips][tested[inside]]] = False
+
+        ears = isEar[remaining]
+        if ears.any():
+            cut = ears
+        else:
+            # drop vertices that make no area, or give up
+            cut = turns[remaining] == 0.0
+            if not cut.any():
+                raise ValueError(
+                    "Polygon can't be triangulated, is it self-crossing?")
+
+        # cut every other vertex in each run of them, so none are neighbours
+        idx = np.arange(len(remaining))
+        runStarts = cut & ~np.roll(cut, 1)
+        runStart = np.maximum.accumulate(np.where(runStarts, idx, 0))
+        cut = cut & ((idx - runStart) % 2 == 0)
+        if cut[0] and cut[-1]:  # the first and last are neighbours
+            cut[-1] = False
+        cut = remaining[cut][:len(remaining) - 3]  # leaving a triangle
+        if ears.any():
+            triangles.append(
+                np.column_stack((prevIdx[cut], cut, nextIdx[cut])))
+
+        # join up the neighbours of the vertices cut off
+        before, after = prevIdx[cut], nextIdx[cut]
+        nextIdx[before] = after
+        prevIdx[after] = before
+        isRemaining = np.ones((nVerts,), dtype=bool)
+        isRemaining[cut] = False
+        remaining = remaining[isRemaining[remaining]]
+        update = np.unique(np.concatenate((before, after)))
+        update = update[isRemaining[update]]
+
+    if len(remaining) == 3 and turn(*verts[remaining]) != 0.0:
+        triangles.append(remaining[np.newaxis, :])
+
+    if not triangles:
+        return np.zeros((0, 3), dtype=int)
+
+    return np.concatenate(triangles)
+
+
 def ortho3Dto2D(p, orig, normal, up, right=None, dtype=None):
     """Get the planar coordinates of an orthogonal projection of a 3D point onto
     a 2D plane.
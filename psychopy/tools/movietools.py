@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019-2021 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+"""Classes and functions for writing movies (and sequences of frames)"""
+
+from __future__ import absolute_import, division, print_function
+
+__all__ = ["MovieFrameWriter",
+           "findFfmpeg"]
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+try:
+    import queue
+except ImportError:  # python 2
+    import Queue as queue
+
+import numpy
+
+try:
+    from PIL import Image
+except ImportError:
+    import Image
+
+from psychopy import logging
+
+# extensions written as a movie by ffmpeg, the rest as numbered frames
+movieExtensions = ('.mp4', '.mov', '.mkv', '.avi', '.mpg', '.mpeg', '.gif')
+
+_endOfFrames = object()  # queued by close() to stop the writer thread
+
+
+def findFfmpeg():
+    """Path of an ffmpeg executable, either the one that comes with
+    `imageio_ffmpeg` (a dependency of moviepy) or one on the PATH.
+
+    Raises
+    ------
+    RuntimeError
+        If there isn't one.
+
+    """
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        pass
+    which = getattr(shutil, 'which', None)  # not in python 2
+    ffmpeg = which('ffmpeg') if which is not None else None
+    if ffmpeg is None:
+        raise RuntimeError("Writing movies needs ffmpeg, either install the "
+                           "imageio-ffmpeg package or put ffmpeg on the "
+                           "PATH")
+    return ffmpeg
+
+
+class MovieFrameWriter(object):
+    """Writes frames to a movie file or to numbered image files as they are
+    captured, from a background thread.
+
+    Frames wait in a queue of at most `maxQueued` frames, and `write()`
+    blocks while it's full, so memory use is bounded however long the
+    recording is (unlike collecting the frames with `Window.getMovieFrame()`
+    and then saving them all).
+
+    Movies (.mp4, .mov, .mkv, .avi, .mpg, .mpeg and .gif files) are made by
+    piping the raw frames to an ffmpeg process. Any other extension is
+    written as a numbered file for each frame, using Pillow for images (e.g.
+    frame00001.png, frame00002.png, ...) or numpy for .npy files.
+
+    Parameters
+    ----------
+    fileName : str
+        Name of the movie, or of the frames (the frame numbers are added
+        before the extension).
+    fps : float
+        Frame rate of the movie.
+    codec : str or None
+        Video codec for ffmpeg to use (not needed for .gif files). If `None`,
+        ffmpeg picks one for the file type.
+    maxQueued : int
+        Number of frames that can be waiting to be written.
+    ffmpeg : str or None
+        Path of the ffmpeg executable. If `None`, :func:`findFfmpeg` is
+        used.
+
+    Examples
+    --------
+    Writing frames, given as RGB arrays with the top row first::
+
+        with MovieFrameWriter('stimuli.mp4', fps=60) as writer:
+            for frame in frames:
+                writer.write(frame)
+
+    """
+
+    def __init__(self, fileName, fps=30, codec='libx264', maxQueued=16,
+                 ffmpeg=None):
+        self.fileName = fileName
+        self.fps = fps
+        self.codec = codec
+        self.ffmpeg = ffmpeg
+        fileRoot, fileExt = os.path.splitext(fileName)
+        self.isMovie = fileExt.lower() in movieExtensions
+        self._frameNameFormat = "%s%%05d%s" % (fileRoot, fileExt)
+        self.nFramesWritten = 0
+        self.frameSize = None  # (width, height) of the frames, when known
+
+        self._queue = queue.Queue(maxsize=maxQueued)
+        self._process = None
+        self._processLog = None
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._writeFrames,
+                                        name='MovieFrameWriter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    @property
+    def nFramesQueued(self):
+        """Number of frames waiting to be written."""
+        return self._queue.qsize()
+
+    def write(self, frame):
+        """Queue a frame to be written, waiting for space in the queue if
+        it's full.
+
+        Parameters
+        ----------
+        frame : ndarray or Image
+            HxWx3 (RGB) or HxWx4 (RGBA, the alpha is dropped for movies)
+            `uint8` array, with the top row first, or a PIL image. Frames
+            must all be the same size.
+
+        """
+        if self._closed:
+            raise RuntimeError("Can't write frames after the writer is "
+                               "closed.")
+        self._checkError()
+        if isinstance(frame, Image.Image):
+            frame = numpy.asarray(frame.convert('RGB'))
+        frame = numpy.asarray(frame)
+        if frame.ndim != 3 or frame.shape[2] not in (3, 4):
+            raise ValueError("Frames must be HxWx3 or HxWx4 arrays.")
+        frameSize = (frame.shape[1], frame.shape[0])
+        if self.frameSize is None:
+            self.frameSize = frameSize
+        elif frameSize != self.frameSize:
+            raise ValueError("Frame size {} is not the size of the first "
+                             "frame {}.".format(frameSize, self.frameSize))
+        # no waiting forever if the writer fails while we wait
+        while True:
+            try:
+                self._queue.put(frame, timeout=0.1)
+                return
+            except queue.Full:
+                self._checkError()
+
+    def close(self):
+        """Write any frames still waiting and finish the file(s).
+
+        Raises
+        ------
+        RuntimeError
+            If the frames could not be written.
+
+        """
+        if not self._closed:
+            self._closed = True
+            while self._thread.is_alive():
+                try:
+                    self._queue.put(_endOfFrames, timeout=0.1)
+                    break
+                except queue.Full:  # try again, unless the writer has stopped
+                    pass
+            self._thread.join()
+        self._checkError()
+
+    def _checkError(self):
+        if self._error is not None:
+            raise RuntimeError("Writing frames to {} failed: {}".format(
+                self.fileName, self._error))
+
+    def _writeFrames(self):
+        """Runs in the writer thread, taking frames from the queue until
+        `close()` is called.
+        """
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is _endOfFrames:
+                    break
+                self._writeFrame(frame)
+                self.nFramesWritten += 1
+            self._finish()
+        except Exception as err:
+            self._error = err
+            logging.error("Writing frames to {} failed: {}".format(
+                self.fileName, err))
+            self._stopProcess()
+            # drain the queue so writers waiting for space can carry on
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def _writeFrame(self, frame):
+        if self.isMovie:
+            if self._process is None:
+                self._startProcess()
+            self._process.stdin.write(
+                numpy.ascontiguousarray(frame[:, :, :3]).tobytes())
+        else:
+            fileName = self._frameNameFormat % (self.nFramesWritten + 1)
+            if fileName.lower().endswith('.npy'):
+                numpy.save(fileName, frame)
+            else:
+                mode = 'RGBA' if frame.shape[2] == 4 else 'RGB'
+                Image.fromarray(numpy.ascontiguousarray(frame), mode).save(
+                    fileName)
+
+    def _startProcess(self):
+        """Start ffmpeg reading raw frames of the first frame's size."""
+        ffmpeg = self.ffmpeg or findFfmpeg()
+        width, height = self.frameSize
+        cmd = [ffmpeg, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-vcodec', 'rawvideo', '-pix_fmt', 'rgb24',
+               '-s', '%dx%d' % (width, height), '-r', str(self.fps),
+               '-i', '-', '-an']
+        if not self.fileName.lower().endswith('.gif'):
+            if self.codec is not None:
+                cmd += ['-vcodec', self.codec]
+            # most players need yuv420p, which needs an even size
+            cmd += ['-pix_fmt', 'yuv420p',
+                    '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        cmd.append(self.fileName)
+        self._processLog = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                         stdout=self._processLog,
+                                         stderr=subprocess.STDOUT)
+
+    def _finish(self):
+        if self._process is None:
+            return
+        self._process.stdin.close()
+        returnCode = self._process.wait()
+        if returnCode != 0:
+            self._processLog.seek(0)
+            output = self._processLog.read().decode('utf-8', 'replace')
+            raise RuntimeError("ffmpeg exited with code {}: {}".format(
+                returnCode, output.strip()))
+        self._processLog.close()
+        logging.info("Wrote {} frames to {}".format(self.nFramesWritten,
+                                                    self.fileName))
+
+    def _stopProcess(self):
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+        except Exception:
+            pass
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Caching compiled shader programs and their uniform and attribute
+locations.
+
+Unlike :mod:`psychopy.tools.gltools`, this module doesn't import pyglet's GL
+(which needs a display) until a program is compiled or a location is looked
+up, so it can be imported (and tested) without one.
+
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019-2021 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+from __future__ import absolute_import, print_function
+
+__all__ = ['ProgramCache']
+
+import hashlib
+
+
+def _gl():
+    """pyglet's GL module, imported when it's first needed."""
+    import pyglet.gl as GL
+    return GL
+
+
+def _gltools():
+    """:mod:`psychopy.tools.gltools`, imported when it's first needed."""
+    import psychopy.tools.gltools as gltools
+    return gltools
+
+
+def _compileProgram(vertexSource, fragmentSource):
+    from psychopy.visual.shaders import compileProgram
+    return compileProgram(vertexSource, fragmentSource)
+
+
+class ProgramCache(object):
+    """Shader programs compiled for a window, so that each combination of
+    sources and preprocessor definitions is only compiled once, along with
+    the locations of their uniforms and attributes (looking those up stalls
+    the GL pipeline).
+
+    Programs belong to the GL context they were made in, so each `Window`
+    has its own cache (`win._programCache`).
+
+    Examples
+    --------
+    Getting a program with ``#define`` statements embedded in its sources
+    and setting one of its uniforms::
+
+        prog = win._programCache.getProgram(
+            vertSrc, fragSrc, defs={'MAX_LIGHTS': 2})
+        GL.glUseProgram(prog)
+        GL.glUniform1i(win._programCache.getUniformLocation(prog, 'mask'), 1)
+
+    """
+
+    def __init__(self):
+        self._programs = {}  # key: program handle
+        self._uniforms = {}  # program: {name: location}
+        self._attribs = {}  # program: {name: location}
+        self.nCompiled = 0
+        self.nHits = 0
+
+    def __len__(self):
+        return len(self._programs)
+
+    @staticmethod
+    def makeKey(vertexSource=None, fragmentSource=None, defs=None):
+        """The key (a hash of the sources and the definitions) used to look
+        up a program.
+        """
+        sha = hashlib.sha1()
+        for source in (vertexSource, fragmentSource):
+            if isinstance(source, (list, tuple)):
+                source = "".join(source)
+            if source is None:
+                source = ""
+            if not isinstance(source, bytes):
+                source = source.encode('utf-8')
+            sha.update(source)
+            sha.update(b'\0')
+        if defs:
+            # the order doesn't matter and bools are embedded as ints
+            items = sorted(
+                (name, int(value) if isinstance(value, bool) else value)
+                for name, value in defs.items())
+            sha.update(repr(items).encode('utf-8'))
+        return sha.hexdigest()
+
+    def getProgram(self, vertexSource=None, fragmentSource=None, defs=None):
+        """Get the program for these sources (with `defs` embedded as
+        ``#define`` statements, see
+        :func:`psychopy.tools.gltools.embedShaderSourceDefs`), compiling it if
+        it isn't in the cache already.
+        """
+        key = self.makeKey(vertexSource, fragmentSource, defs)
+        try:
+            program = self._programs[key]
+        except KeyError:
+            pass
+        else:
+            self.nHits += 1
+            return program
+        if defs:
+            if vertexSource:
+                vertexSource = _gltools().embedShaderSourceDefs(
+                    vertexSource, defs)
+            if fragmentSource:
+                fragmentSource = _gltools().embedShaderSourceDefs(
+                    fragmentSource, defs)
+        program = _compileProgram(vertexSource, fragmentSource)
+        self._programs[key] = program
+        self.nCompiled += 1
+        return program
+
+    def getUniformLocation(self, program, name):
+        """The location of the uniform `name` in `program` (looked up on
+        first use only).
+        """
+        if not isinstance(name, bytes):
+            name = name.encode('utf-8')
+        locations = self._uniforms.setdefault(program, {})
+        try:
+            return locations[name]
+        except KeyError:
+            loc = locations[name] = _gl().glGetUniformLocation(
+                program, name)
+            return loc
+
+    def getAttribLocation(self, program, name):
+        """The location of the attribute `name` in `program` (looked up on
+        first use only).
+        """
+        if not isinstance(name, bytes):
+            name = name.encode('utf-8')
+        locations = self._attribs.setdefault(program, {})
+        try:
+            return locations[name]
+        except KeyError:
+            loc = locations[name] = _gl().glGetAttribLocation(
+                program, name)
+            return loc
+
+    def getUniformLocations(self, program):
+        """All the (active, non-builtin) uniform locations of `program`, as
+        given by :func:`psychopy.tools.gltools.getUniformLocations`.
+        """
+        locations = self._uniforms.setdefault(program, {})
+        if None not in locations:  # (marks that we've got all of them)
+            locations.update(_gltools().getUniformLocations(program) or {})
+            locations[None] = None
+        return {name: loc for name, loc in locations.items()
+                if name is not None and loc != -1}
+
+    def getAttribLocations(self, program):
+        """All the (active, non-builtin) attribute locations of `program`,
+        as given by :func:`psychopy.tools.gltools.getAttribLocations`.
+        """
+        locations = self._attribs.setdefault(program, {})
+        if None not in locations:
+            locations.update(_gltools().getAttribLocations(program) or {})
+            locations[None] = None
+        return {name: loc for name, loc in locations.items()
+                if name is not None and loc != -1}
+
+    def clear(self, delete=True):
+        """Forget all the programs (deleting them from the GL context unless
+        `delete` is False, e.g. if the context has already gone).
+        """
+        if delete:
+            for program in self._programs.values():
+                _gltools().deleteObjectARB(program)
+        self._programs.clear()
+        self._uniforms.clear()
+        self._attribs.clear()
@@ -11,6 +11,7 @@
 from __future__ import absolute_import, print_function
 
 import sys
+import importlib
 if sys.platform == 'win32':
     from pyglet.libs import win32  # pyglet patch for ANACONDA install
     from ctypes import *
@@ -27,93 +28,122 @@ if sys.platform == 'win32':
                 pass
 
 from psychopy import event  # import before visual or
-from psychopy.visual import filters
-from psychopy.visual.backends import gamma
-# absolute essentials (nearly all experiments will need these)
-from .basevisual import BaseVisualStim
-# non-private helpers
-from .helpers import pointInPolygon, polygonsOverlap
-from .image import ImageStim
-from .text import TextStim
-from .form import Form
-from .button import ButtonStim
-from .brush import Brush
-from .textbox2.textbox2 import TextBox2
-# window, should always be loaded first
-from .window import Window, getMsPerFrame, openWindows
-
-# needed for backwards-compatibility
-
-# need absolute imports within lazyImports
-
-# A newer alternative lib is apipkg but then we have to specify all the vars
-# that will be included, not just the lazy ones? Syntax is:
-# import apipkg
-# apipkg.initpkg(__name__, {
-#        'GratingStim': "psychopy.visual.grating:GratingStim",
-# })
 
 from psychopy.constants import STOPPED, FINISHED, PLAYING, NOT_STARTED
 
-lazyImports = """
-# stimuli derived from object or MinimalStim
-from psychopy.visual.aperture import Aperture  # uses BaseShapeStim, ImageStim
-from psychopy.visual.custommouse import CustomMouse
-from psychopy.visual.elementarray import ElementArrayStim
-from psychopy.visual.ratingscale import RatingScale
-from psychopy.visual.slider import Slider
-from psychopy.visual.simpleimage import SimpleImageStim
-
-# stimuli derived from BaseVisualStim
-from psychopy.visual.dot import DotStim
-from psychopy.visual.grating import GratingStim
-from psychopy.visual.secondorder import EnvelopeGrating
-from psychopy.visual.movie import MovieStim
-from psychopy.visual.movie2 import MovieStim2
-from psychopy.visual.movie3 import MovieStim3
-from psychopy.visual.vlcmoviestim import VlcMovieStim
-from psychopy.visual.shape import BaseShapeStim
-
-# stimuli derived from GratingStim
-from psychopy.visual.bufferimage import BufferImageStim
-from psychopy.visual.patch import PatchStim
-from psychopy.visual.radial import RadialStim
-from psychopy.visual.noise import NoiseStim
-
-# stimuli derived from BaseShapeStim
-from psychopy.visual.shape import ShapeStim
-
-# stimuli derived from ShapeStim
-from psychopy.visual.line import Line
-from psychopy.visual.polygon import Polygon
-from psychopy.visual.rect import Rect
-from psychopy.visual.pie import Pie
-
-# stimuli derived from Polygon
-from psychopy.visual.circle import Circle
-
-from psychopy.visual.textbox import TextBox
-
-# rift support 
-from psychopy.visual.rift import Rift
-
-# VisualSystemHD support
-from psychopy.visual.nnlvs import VisualSystemHD
-
-# 3D stimuli support
-from psychopy.visual.stim3d import LightSource
-from psychopy.visual.stim3d import SceneSkybox
-from psychopy.visual.stim3d import BlinnPhongMaterial
-from psychopy.visual.stim3d import RigidBodyPose
-from psychopy.visual.stim3d import BoundingBox
-from psychopy.visual.stim3d import SphereStim
-from psychopy.visual.stim3d import BoxStim
-from psychopy.visual.stim3d import PlaneStim
-from psychopy.visual.stim3d import ObjMeshStim
-
-"""
-try:
-    from psychopy.contrib.lazy_import import lazy_import
-    lazy_import(globals(), lazyImports)
-except Exception:
-    exec(lazyImports)
+# Everything else is only imported when it is first used, so that importing
+# visual doesn't pull in every stimulus (and their dependencies, like the movie
+# backends) when an experiment only needs a few of them. Each name maps to the
+# (module, attribute) it comes from, or (module, None) for a module itself.
+_lazyAttribs = {
+    'filters': ('psychopy.visual.filters', None),
+    'gamma': ('psychopy.visual.backends.gamma', None),
+    # absolute essentials (nearly all experiments will need these)
+    'BaseVisualStim': ('psychopy.visual.basevisual', 'BaseVisualStim'),
+    # non-private helpers
+    'pointInPolygon': ('psychopy.visual.helpers', 'pointInPolygon'),
+    'polygonsOverlap': ('psychopy.visual.helpers', 'polygonsOverlap'),
+    'ImageStim': ('psychopy.visual.image', 'ImageStim'),
+    'TextStim': ('psychopy.visual.text', 'TextStim'),
+    'Form': ('psychopy.visual.form', 'Form'),
+    'ButtonStim': ('psychopy.visual.button', 'ButtonStim'),
+    'Brush': ('psychopy.visual.brush', 'Brush'),
+    'TextBox2': ('psychopy.visual.textbox2.textbox2', 'TextBox2'),
+    # window
+    'Window': ('psychopy.visual.window', 'Window'),
+    'getMsPerFrame': ('psychopy.visual.window', 'getMsPerFrame'),
+    'openWindows': ('psychopy.visual.window', 'openWindows'),
+
+    # stimuli derived from object or MinimalStim
+    'Aperture': ('psychopy.visual.aperture', 'Aperture'),
+    'CustomMouse': ('psychopy.visual.custommouse', 'CustomMouse'),
+    'ElementArrayStim': ('psychopy.visual.elementarray', 'ElementArrayStim'),
+    'RatingScale': ('psychopy.visual.ratingscale', 'RatingScale'),
+    'Slider': ('psychopy.visual.slider', 'Slider'),
+    'SimpleImageStim': ('psychopy.visual.simpleimage', 'SimpleImageStim'),
+
+    # stimuli derived from BaseVisualStim
+    'DotStim': ('psychopy.visual.dot', 'DotStim'),
+    'GratingStim': ('psychopy.visual.grating', 'GratingStim'),
+    'EnvelopeGrating': ('psychopy.visual.secondorder', 'EnvelopeGrating'),
+    'MovieStim': ('psychopy.visual.movie', 'MovieStim'),
+    'MovieStim2': ('psychopy.visual.movie2', 'MovieStim2'),
+    'MovieStim3': ('psychopy.visual.movie3', 'MovieStim3'),
+    'VlcMovieStim': ('psychopy.visual.vlcmoviestim', 'VlcMovieStim'),
+    'BaseShapeStim': ('psychopy.visual.shape', 'BaseShapeStim'),
+
+    # stimuli derived from GratingStim
+    'BufferImageStim': ('psychopy.visual.bufferimage', 'BufferImageStim'),
+    'PatchStim': ('psychopy.visual.patch', 'PatchStim'),
+    'RadialStim': ('psychopy.visual.radial', 'RadialStim'),
+    'NoiseStim': ('psychopy.visual.noise', 'NoiseStim'),
+
+    # stimuli derived from BaseShapeStim
+    'ShapeStim': ('psychopy.visual.shape', 'ShapeStim'),
+
+    # stimuli derived from ShapeStim
+    'Line': ('psychopy.visual.line', 'Line'),
+    'Polygon': ('psychopy.visual.polygon', 'Polygon'),
+    'Rect': ('psychopy.visual.rect', 'Rect'),
+    'Pie': ('psychopy.visual.pie', 'Pie'),
+
+    # stimuli derived from Polygon
+    'Circle': ('psychopy.visual.circle', 'Circle'),
+
+    'TextBox': ('psychopy.visual.textbox', 'TextBox'),
+
+    # rift support
+    'Rift': ('psychopy.visual.rift', 'Rift'),
+
+    # VisualSystemHD support
+    'VisualSystemHD': ('psychopy.visual.nnlvs', 'VisualSystemHD'),
+
+    # 3D stimuli support
+    'LightSource': ('psychopy.visual.stim3d', 'LightSource'),
+    'SceneSkybox': ('psychopy.visual.stim3d', 'SceneSkybox'),
+    'BlinnPhongMaterial': ('psychopy.visual.stim3d', 'BlinnPhongMaterial'),
+    'RigidBodyPose': ('psychopy.visual.stim3d', 'RigidBodyPose'),
+    'BoundingBox': ('psychopy.visual.stim3d', 'BoundingBox'),
+    'SphereStim': ('psychopy.visual.stim3d', 'SphereStim'),
+    'BoxStim': ('psychopy.visual.stim3d', 'BoxStim'),
+    'PlaneStim': ('psychopy.visual.stim3d', 'PlaneStim'),
+    'ObjMeshStim': ('psychopy.visual.stim3d', 'ObjMeshStim'),
+}
+
+
+# names exported by `from psychopy.visual import *`, which (as before they were
+# loaded lazily) includes every stimulus, so a star import loads them all
+__all__ = ['event', 'STOPPED', 'FINISHED', 'PLAYING', 'NOT_STARTED'] + \
+    list(_lazyAttribs)
+
+
+def __getattr__(name):
+    """Import the lazily-loaded classes and modules on first access
+    """
+    try:
+        modName, attrib = _lazyAttribs[name]
+    except KeyError:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    value = importlib.import_module(modName)
+    if attrib is not None:
+        value = getattr(value, attrib)
+    globals()[name] = value  # so we only come through here once
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazyAttribs))
+
+
+if sys.version_info < (3, 7):
+    # no module __getattr__ (PEP 562) so fall back to lazy_import
+    lazyImports = "\n".join(
+        "import {} as {}".format(modName, name) if attrib is None
+        else "from {} import {} as {}".format(modName, attrib, name)
+        for name, (modName, attrib) in _lazyAttribs.items())
+    try:
+        from psychopy.contrib.lazy_import import lazy_import
+        lazy_import(globals(), lazyImports)
+    except Exception:
+        exec(lazyImports)
@@ -46,6 +46,7 @@ from psychopy.visual.helpers import (pointInPolygon, polygonsOverlap,
                                      setColor, findImageFile)
 from psychopy.tools.typetools import float_uint8
 from psychopy.tools.arraytools import makeRadialMatrix
+from psychopy.tools.imagetools import loadImageFile, prepareImage
 from psychopy.tools.colorspacetools import dkl2rgb, lms2rgb  # pylint: disable=W0611
 
 from . import globalVars
@@ -730,6 +731,18 @@ class ContainerMixin(object):
         return polygonsOverlap(self, polygon)
 
 
+def _setPixelTransfer(scale, bias):
+    """Set the GL pixel-transfer scale and bias of all four channels (applied
+    to texture data as they're uploaded)
+    """
+    for scaleParam, biasParam in ((GL.GL_RED_SCALE, GL.GL_RED_BIAS),
+                                  (GL.GL_GREEN_SCALE, GL.GL_GREEN_BIAS),
+                                  (GL.GL_BLUE_SCALE, GL.GL_BLUE_BIAS),
+                                  (GL.GL_ALPHA_SCALE, GL.GL_ALPHA_BIAS)):
+        GL.glPixelTransferf(scaleParam, scale)
+        GL.glPixelTransferf(biasParam, bias)
+
+
 class TextureMixin(object):
     """Mixin class for visual stim that have textures.
 
@@ -768,6 +781,7 @@ class TextureMixin(object):
         # Create an intensity texture, ranging -1:1.0
         notSqr = False  # most of the options will be creating a sqr texture
         wasImage = False  # change this if image loading works
+        signedUpload = False  # map ubyte 0:255 onto -1:1 as it's uploaded
         useShaders = stim.useShaders
         interpolate = stim.interpolate
         if dataType is None:
@@ -928,6 +942,7 @@ class TextureMixin(object):
             intensity[artifactIdx] = 0
 
         else:
+            luminance = pixFormat == GL.GL_ALPHA
             if isinstance(tex, (basestring, Path)):
                 # maybe tex is the name of a file:
                 filename = findImageFile(tex)
@@ -937,8 +952,8 @@ class TextureMixin(object):
                     logging.flush()
                     raise IOError(msg % (tex, os.path.abspath(tex)))
                 try:
-                    im = Image.open(filename)
-                    im = im.transpose(Image.FLIP_TOP_BOTTOM)
+                    # decoded images are cached (and can be preloaded)
+                    prepared = loadImageFile(filename, luminance, forcePOW2)
                 except IOError:
                     msg = "Found file '%s', failed to load as an image"
                     logging.error(msg % (filename))
@@ -947,56 +962,39 @@ class TextureMixin(object):
                     raise IOError(msg % (tex, os.path.abspath(tex)))
             else:
                 # can't be a file; maybe its an image already in memory?
-                try:
-                    im = tex.copy().transpose(Image.FLIP_TOP_BOTTOM)
-                except AttributeError:  # nope, not an image in memory
+                if not hasattr(tex, 'transpose'):
+                    # nope, not an image in memory
                     msg = "Couldn't make sense of requested image."
                     logging.error(msg)
                     logging.flush()
                     raise AttributeError(msg)
-            # at this point we have a valid im
-            stim._origSize = im.size
+                prepared = prepareImage(tex, luminance, forcePOW2)
+            # at this point we have a valid image
+            stim._origSize = prepared['size']
             wasImage = True
+            notSqr = prepared['notSqr']
             # is it 1D?
-            if im.size[0] == 1 or im.size[1] == 1:
+            if min(prepared['size']) == 1:
                 logging.error("Only 2D textures are supported at the moment")
-            else:
-                maxDim = max(im.size)
-                powerOf2 = int(2**numpy.ceil(numpy.log2(maxDim)))
-                if im.size[0] != powerOf2 or im.size[1] != powerOf2:
-                    if not forcePOW2:
-                        notSqr = True
-                    elif globalVars.nImageResizes < reportNImageResizes:
-                        msg = ("Image '%s' was not a square power-of-two ' "
-                               "'image. Linearly interpolating to be %ix%i")
-                        logging.warning(msg % (tex, powerOf2, powerOf2))
-                        globalVars.nImageResizes += 1
-                        im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
-                    elif globalVars.nImageResizes == reportNImageResizes:
-                        logging.warning("Multiple images have needed resizing"
-                                        " - I'll stop bothering you!")
-                        im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
-            # is it Luminance or RGB?
-            if pixFormat == GL.GL_ALPHA and im.mode != 'L':
-                # we have RGB and need Lum
-                wasLum = True
-                im = im.convert("L")  # force to intensity (need if was rgb)
-            elif im.mode == 'L':  # we have lum and no need to change
-                wasLum = True
-                if useShaders:
-                    dataType = GL.GL_FLOAT
-            elif pixFormat == GL.GL_RGB:
-                # we want RGB and might need to convert from CMYK or Lm
-                # texture = im.tostring("raw", "RGB", 0, -1)
-                im = im.convert("RGBA")
-                wasLum = False
-            if dataType == GL.GL_FLOAT:
-                # convert from ubyte to float
-                # much faster to avoid division 2/255
-                intensity = numpy.array(im).astype(
-                    numpy.float32) * 0.0078431372549019607 - 1.0
-            else:
-                intensity = numpy.array(im)
+            elif prepared['resized']:
+                if globalVars.nImageResizes < reportNImageResizes:
+                    powerOf2 = prepared['data'].shape[0]
+                    msg = ("Image '%s' was not a square power-of-two ' "
+                           "'image. Linearly interpolating to be %ix%i")
+                    logging.warning(msg % (tex, powerOf2, powerOf2))
+                elif globalVars.nImageResizes == reportNImageResizes:
+                    logging.warning("Multiple images have needed resizing"
+                                    " - I'll stop bothering you!")
+                globalVars.nImageResizes += 1
+            # is it Luminance or RGB(A)? (luminance is always 'L')
+            intensity = prepared['data']
+            wasLum = intensity.ndim == 2
+            if pixFormat == GL.GL_RGB and wasLum and useShaders:
+                dataType = GL.GL_FLOAT
+            if pixFormat == GL.GL_RGB and dataType == GL.GL_FLOAT:
+                # upload the ubyte values directly and have GL rescale them
+                # to -1:1, rather than converting the array to float here
+                signedUpload = True
         if pixFormat == GL.GL_RGB and wasLum and dataType == GL.GL_FLOAT:
             # grating stim on good machine
             # keep as float32 -1:1
@@ -1010,12 +1008,17 @@ class TextureMixin(object):
                 # 32bit float textures
                 # could use GL_LUMINANCE32F_ARB here but check shader code?
                 internalFormat = GL.GL_RGB32F_ARB
-            # initialise data array as a float
-            data = numpy.ones((intensity.shape[0], intensity.shape[1], 3),
-                              numpy.float32)
-            data[:, :, 0] = intensity  # R
-            data[:, :, 1] = intensity  # G
-            data[:, :, 2] = intensity  # B
+            if signedUpload:
+                # GL copies the luminance into RGB for us
+                data = intensity
+                pixFormat = GL.GL_LUMINANCE
+            else:
+                # initialise data array as a float
+                data = numpy.ones((intensity.shape[0], intensity.shape[1], 3),
+                                  numpy.float32)
+                data[:, :, 0] = intensity  # R
+                data[:, :, 1] = intensity  # G
+                data[:, :, 2] = intensity  # B
         elif (pixFormat == GL.GL_RGB and
                 wasLum and
                 dataType != GL.GL_FLOAT and
@@ -1073,52 +1076,63 @@ class TextureMixin(object):
                 internalFormat = GL.GL_RGBA
             elif internalFormat == GL.GL_RGB32F_ARB:
                 internalFormat = GL.GL_RGBA32F_ARB
-        texture = data.ctypes  # serialise
-
-        # bind the texture in openGL
-        GL.glEnable(GL.GL_TEXTURE_2D)
-        GL.glBindTexture(GL.GL_TEXTURE_2D, id)  # bind that name to the target
-        # makes the texture map wrap (this is actually default anyway)
-        if wrapping:
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_REPEAT)
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_REPEAT)
-        else:
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP)
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP)
-        # data from PIL/numpy is packed, but default for GL is 4 bytes
-        GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
-        # important if using bits++ because GL_LINEAR
-        # sometimes extrapolates to pixel vals outside range
-        if interpolate:
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
-            if useShaders:
-                # GL_GENERATE_MIPMAP was only available from OpenGL 1.4
+        if signedUpload:
+            # the data are ubyte (still 0:255) but need to be -1:1 in the
+            # (float) texture so scale and shift them on the way in
+            dataType = GL.GL_UNSIGNED_BYTE
+            _setPixelTransfer(2.0, -1.0)
+        try:
+            texture = data.ctypes  # serialise
+
+            # bind the texture in openGL
+            GL.glEnable(GL.GL_TEXTURE_2D)
+            # bind that name to the target
+            GL.glBindTexture(GL.GL_TEXTURE_2D, id)
+            # makes the texture map wrap (this is actually default anyway)
+            if wrapping:
+                GL.glTexParameteri(
+                    GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_REPEAT)
+                GL.glTexParameteri(
+                    GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_REPEAT)
+            else:
+                GL.glTexParameteri(
+                    GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP)
+                GL.glTexParameteri(
+                    GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP)
+            # data from PIL/numpy is packed, but default for GL is 4 bytes
+            GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+            # important if using bits++ because GL_LINEAR
+            # sometimes extrapolates to pixel vals outside range
+            if interpolate:
+                GL.glTexParameteri(
+                    GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
+                if useShaders:
+                    # GL_GENERATE_MIPMAP was only available from OpenGL 1.4
+                    GL.glTexParameteri(GL.GL_TEXTURE_2D,
+                                       GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
+                    GL.glTexParameteri(GL.GL_TEXTURE_2D,
+                                       GL.GL_GENERATE_MIPMAP, GL.GL_TRUE)
+                    GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, internalFormat,
+                                    data.shape[1], data.shape[0], 0,
+                                    pixFormat, dataType, texture)
+                else:  # use glu
+                    GL.glTexParameteri(GL.GL_TEXTURE_2D,
+                                       GL.GL_TEXTURE_MIN_FILTER,
+                                       GL.GL_LINEAR_MIPMAP_NEAREST)
+                    GL.gluBuild2DMipmaps(GL.GL_TEXTURE_2D, internalFormat,
+                                         data.shape[1], data.shape[0],
+                                         pixFormat, dataType, texture)
+            else:
                 GL.glTexParameteri(
-                    GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
-                GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_GENERATE_MIPMAP,
-                                   GL.GL_TRUE)
+                    GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_NEAREST)
+                GL.glTexParameteri(
+                    GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_NEAREST)
                 GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, internalFormat,
                                 data.shape[1], data.shape[0], 0,
                                 pixFormat, dataType, texture)
-            else:  # use glu
-                GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER,
-                                   GL.GL_LINEAR_MIPMAP_NEAREST)
-                GL.gluBuild2DMipmaps(GL.GL_TEXTURE_2D, internalFormat,
-                                     data.shape[1], data.shape[0],
-                                     pixFormat, dataType, texture)
-        else:
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_NEAREST)
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_NEAREST)
-            GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, internalFormat,
-                            data.shape[1], data.shape[0], 0,
-                            pixFormat, dataType, texture)
+        finally:
+            if signedUpload:  # back to the defaults, even if GL failed
+                _setPixelTransfer(1.0, 0.0)
         GL.glTexEnvi(GL.GL_TEXTURE_ENV, GL.GL_TEXTURE_ENV_MODE,
                      GL.GL_MODULATE)  # ?? do we need this - think not!
         # unbind our texture so that it doesn't affect other rendering
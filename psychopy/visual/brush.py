@@ -10,16 +10,142 @@ Inspired by rockNroll87q - https://github.com/rockNroll87q/pyDrawing
 # Distributed under the terms of the GNU General Public License (GPL).
 
 from __future__ import absolute_import, print_function
+
+import ctypes
+import numpy
+import pyglet
+GL = pyglet.gl
+
 from psychopy import event, logging
+from psychopy.colors import Color
+from psychopy.tools.monitorunittools import convertToPix
 from .shape import ShapeStim
 from .basevisual import MinimalStim
 
 __author__ = 'David Bridges'
 
 
+class _BrushStrokes(MinimalStim):
+    """All the strokes drawn with a `Brush`, kept in one array of vertices
+    (which grows as needed) and drawn together, with a draw call for each
+    run of strokes with the same line width rather than a stimulus for each
+    stroke.
+    """
+    def __init__(self, win, closeShape=False, depth=0):
+        super(_BrushStrokes, self).__init__(name='strokes', autoLog=False)
+        self.win = win
+        self.depth = depth
+        self.closeShape = closeShape
+        self.clear()
+
+    def clear(self):
+        """Remove all the strokes."""
+        self._vertices = numpy.zeros((64, 2))
+        self._verticesPix = numpy.zeros((64, 2))
+        self._colors = numpy.zeros((64, 4))  # rgba1 of each vertex
+        self.nVertices = 0
+        self.strokeStarts = []  # index of the first vertex of each stroke
+        self.strokeWidths = []
+        self._color = None
+
+    def startStroke(self, lineWidth, color):
+        """Start a new stroke, with vertices added by `addVertex`.
+
+        Parameters
+        ----------
+        lineWidth : float
+            Width of the stroke in pixels.
+        color : array_like
+            Color of the stroke as rgba1.
+        """
+        self.strokeStarts.append(self.nVertices)
+        self.strokeWidths.append(lineWidth)
+        self._color = color
+
+    def addVertex(self, pos):
+        """Add a vertex (in the window's units) to the current stroke."""
+        if self.nVertices == len(self._vertices):
+            newSize = 2 * len(self._vertices)
+            for name in ('_vertices', '_verticesPix', '_colors'):
+                array = getattr(self, name)
+                grown = numpy.zeros((newSize, array.shape[1]))
+                grown[:self.nVertices] = array[:self.nVertices]
+                setattr(self, name, grown)
+        idx = self.nVertices
+        self._vertices[idx] = pos
+        self._verticesPix[idx] = convertToPix(
+            self._vertices[idx:idx + 1], (0, 0), self.win.units, self.win)
+        self._colors[idx] = self._color
+        self.nVertices += 1
+
+    def getStrokes(self):
+        """The vertices of each stroke as a list of Nx2 arrays."""
+        ends = self.strokeStarts[1:] + [self.nVertices]
+        return [self._vertices[start:end].copy()
+                for start, end in zip(self.strokeStarts, ends)]
+
+    def draw(self, win=None):
+        """Draw all the strokes."""
+        if win is None:
+            win = self.win
+        if not self.strokeStarts:
+            return
+        win._setCurrent()
+        GL.glPushMatrix()
+        win.setScale('pix')
+        if win._haveShaders:
+            GL.glUseProgram(win._progSignedFrag)
+
+        # load Null textures into multitexteureARB - or they modulate glColor
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glActiveTexture(GL.GL_TEXTURE1)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glEnable(GL.GL_LINE_SMOOTH)
+        GL.glEnable(GL.GL_MULTISAMPLE)
+
+        GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glEnableClientState(GL.GL_COLOR_ARRAY)
+        GL.glVertexPointer(2, GL.GL_DOUBLE, 0, self._verticesPix.ctypes)
+        GL.glColorPointer(4, GL.GL_DOUBLE, 0, self._colors.ctypes)
+        if self.closeShape:
+            mode = GL.GL_LINE_LOOP
+        else:
+            mode = GL.GL_LINE_STRIP
+
+        starts = numpy.array(self.strokeStarts + [self.nVertices],
+                             dtype=numpy.int32)
+        counts = numpy.diff(starts)
+        widths = numpy.asarray(self.strokeWidths)
+        # one draw call for each run of strokes the same width
+        runStarts = numpy.flatnonzero(numpy.diff(widths)) + 1
+        for first, last in zip(numpy.r_[0, runStarts],
+                               numpy.r_[runStarts, len(widths)]):
+            GL.glLineWidth(float(widths[first]))
+            runFirsts = numpy.ascontiguousarray(starts[first:last])
+            runCounts = numpy.ascontiguousarray(counts[first:last])
+            GL.glMultiDrawArrays(
+                mode,
+                runFirsts.ctypes.data_as(ctypes.POINTER(GL.GLint)),
+                runCounts.ctypes.data_as(ctypes.POINTER(GL.GLsizei)),
+                int(last - first))
+
+        GL.glDisableClientState(GL.GL_COLOR_ARRAY)
+        GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+        if win._haveShaders:
+            GL.glUseProgram(0)
+        GL.glPopMatrix()
+
+
 class Brush(MinimalStim):
     """A class for creating a freehand drawing tool.
 
+    All the strokes are kept together in one array of vertices and drawn in
+    one go (see :meth:`getStrokes` to get them), so drawing doesn't get
+    slower with each new stroke.
+
     """
     def __init__(self,
                  win,
@@ -48,7 +174,9 @@ class Brush(MinimalStim):
         self.closeShape = closeShape
         self.buttonRequired = buttonRequired
         self.pointer = event.Mouse(win=self.win)
-        self.shapes = []
+        self._strokes = _BrushStrokes(win, closeShape=closeShape, depth=depth)
+        self._strokeStyles = []  # (lineWidth, lineColor, opacity) of each
+        self._shapes = []  # (nVertices, ShapeStim) of each, made by .shapes
         self.brushPos = []
         self.strokeIndex = -1
         self.atStartPoint = False
@@ -62,7 +190,7 @@ class Brush(MinimalStim):
 
     def _resetVertices(self):
         """
-        Resets list of vertices passed to ShapeStim.
+        Resets the list of positions in the current stroke.
         """
         if self.autoLog:
             logging.exp("Resetting {name} parameter: brushPos.".format(name=self.name))
@@ -70,20 +198,18 @@ class Brush(MinimalStim):
 
     def _createStroke(self):
         """
-        Creates ShapeStim for each stroke.
+        Starts a new stroke, drawn with the current line width and color.
         """
         if self.autoLog:
-            logging.exp("Creating ShapeStim for {name}".format(name=self.name))
-
-        self.shapes.append(ShapeStim(self.win,
-                                     vertices=[[0, 0]],
-                                     closeShape=self.closeShape,
-                                     lineWidth=self.lineWidth,
-                                     lineColor=self.lineColor,
-                                     colorSpace=self.lineColorSpace,
-                                     opacity=self.opacity,
-                                     autoLog=False,
-                                     autoDraw=True))
+            logging.exp("Creating stroke for {name}".format(name=self.name))
+
+        color = Color(self.lineColor, self.lineColorSpace)
+        color.alpha = self.opacity
+        self._strokes.startStroke(self.lineWidth, color.render('rgba1'))
+        self._strokeStyles.append((self.lineWidth, color, self.opacity))
+        # the strokes are drawn on every flip (until reset), like stimuli
+        # with autoDraw
+        self._strokes.setAutoDraw(True, log=False)
 
     @property
     def currentShape(self):
@@ -92,9 +218,48 @@ class Brush(MinimalStim):
         Returns
         -------
         Int
-            The index as length of shapes attribute - 1.
+            The index as number of strokes - 1.
+        """
+        return len(self._strokes.strokeStarts) - 1
+
+    @property
+    def shapes(self):
+        """A `ShapeStim` for each stroke.
+
+        These are made when first accessed and kept until :meth:`reset`, with
+        the current stroke's made again if it has grown since. That's still
+        a new stimulus on each access while drawing, so use
+        :meth:`getStrokes` if only the vertices are needed.
+        """
+        strokes = self.getStrokes()
+        for idx, (vertices, style) in enumerate(zip(strokes,
+                                                    self._strokeStyles)):
+            # only the current stroke can have changed since they were made
+            if idx < len(self._shapes) and \
+                    self._shapes[idx][0] == len(vertices):
+                continue
+            lineWidth, lineColor, opacity = style
+            shape = ShapeStim(self.win,
+                              vertices=vertices if len(vertices) else [[0, 0]],
+                              closeShape=self.closeShape,
+                              lineWidth=lineWidth,
+                              lineColor=lineColor,
+                              opacity=opacity,
+                              autoLog=False)
+            del self._shapes[idx:]
+            self._shapes.append((len(vertices), shape))
+        return [shape for nVertices, shape in self._shapes]
+
+    def getStrokes(self):
+        """The vertices of the strokes drawn so far.
+
+        Returns
+        -------
+        list
+            An Nx2 array of the vertices (in the window's units) of each
+            stroke.
         """
-        return len(self.shapes) - 1
+        return self._strokes.getStrokes()
 
     @property
     def brushDown(self):
@@ -125,8 +290,9 @@ class Brush(MinimalStim):
         Check whether the brush is down. If brushDown is True, the brush path is drawn on screen.
         """
         if self.brushDown:
-            self.brushPos.append(self.pointer.getPos())
-            self.shapes[self.currentShape].setVertices(self.brushPos)
+            pos = self.pointer.getPos()
+            self.brushPos.append(pos)
+            self._strokes.addVertex(pos)
         else:
             self.atStartPoint = False
 
@@ -139,16 +305,16 @@ class Brush(MinimalStim):
 
     def reset(self):
         """
-        Clear ShapeStim objects from shapes attribute.
+        Clear all the strokes.
         """
         if self.autoLog:
             logging.exp("Resetting {name}".format(name=self.name))
 
-        if len(self.shapes):
-            for shape in self.shapes:
-                shape.setAutoDraw(False)
+        self._strokes.setAutoDraw(False, log=False)
+        self._strokes.clear()
+        self._strokeStyles = []
+        self._shapes = []
         self.atStartPoint = False
-        self.shapes = []
 
     def setLineColor(self, value):
         """
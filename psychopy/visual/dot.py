@@ -31,6 +31,7 @@ from builtins import range
 import pyglet
 pyglet.options['debug_gl'] = False
 import ctypes
+import warnings
 GL = pyglet.gl
 
 import psychopy  # so we can get the __path__
@@ -39,9 +40,13 @@ from psychopy import logging
 # tools must only be imported *after* event or MovieStim breaks on win32
 # (JWP has no idea why!)
 from psychopy.tools.attributetools import attributeSetter, setAttribute
-from psychopy.tools.arraytools import val2array
+from psychopy.tools.arraytools import val2array, _makeGenerator
+from psychopy.tools.monitorunittools import convertToPix
+from psychopy.tools import gltools
+from psychopy.visual import shaders as _shaders
 from psychopy.visual.basevisual import (BaseVisualStim, ColorMixin,
                                         ContainerMixin)
+from psychopy.visual.grating import GratingStim
 
 import numpy as np
 
@@ -148,7 +153,8 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
                  signalDots='same',
                  noiseDots='direction',
                  name=None,
-                 autoLog=None):
+                 autoLog=None,
+                 seed=None):
         """
         Parameters
         ----------
@@ -227,6 +233,12 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             Optional name to use for logging.
         autoLog : bool
             Enable automatic logging.
+        seed : int, numpy.random.Generator or None
+            Seed for the random positions, lives and directions of the dots.
+            If `None`, they are drawn using `numpy.random` (so
+            `numpy.random.seed()` makes them repeatable), otherwise from a
+            separate `numpy.random.Generator`, available as the `rng`
+            attribute.
 
         """
         # what local vars are defined (these are the init params) for use by
@@ -237,6 +249,10 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         super(DotStim, self).__init__(win, units=units, name=name,
                                       autoLog=False)  # set at end of init
 
+        # where the random numbers come from (needed by the setters below)
+        self.seed = seed
+        self.rng = np.random if seed is None else _makeGenerator(seed)
+
         self.nDots = nDots
         # pos and size are ambiguous for dots so DotStim explicitly has
         # fieldPos = pos, fieldSize=size and then dotSize as additional param
@@ -278,13 +294,17 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         # all dots have the same speed
         self._dotsSpeed = np.ones(self.nDots, dtype=float) * self.speed
         # abs() means we can ignore the -1 case (no life)
-        self._dotsLife = np.abs(dotLife) * np.random.rand(self.nDots)
+        self._dotsLife = np.abs(dotLife) * self.rng.uniform(
+            0., 1., self.nDots)
         # pre-allocate array for flagging dead dots
         self._deadDots = np.zeros(self.nDots, dtype=bool)
         # set directions (only used when self.noiseDots='direction')
-        self._dotsDir = np.random.rand(self.nDots) * _2pi
+        self._dotsDir = self.rng.uniform(0., 1., self.nDots) * _2pi
         self._dotsDir[self._signalDots] = self.dir * _piOver180
 
+        # buffers for drawing copies of the element in one go (see draw)
+        self._instanceBuffers = None
+
         self._update_dotsXY()
 
         # set autoLog now that params have been initialised
@@ -323,7 +343,8 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         :ref:`operations <attrib-operations>` are supported.
         """
         self.__dict__['dotLife'] = dotLife
-        self._dotsLife = abs(self.dotLife) * np.random.rand(self.nDots)
+        self._dotsLife = abs(self.dotLife) * self.rng.uniform(
+            0., 1., self.nDots)
 
     @attributeSetter
     def signalDots(self, signalDots):
@@ -355,7 +376,10 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         DotStim assumes that the element uses pixels as units.
         ``None`` defaults to dots.
 
-        See `ElementArrayStim` for a faster implementation of this idea.
+        A `GratingStim` element is drawn at all the dots in one (instanced)
+        draw call where OpenGL 3.3 is available, other elements are drawn
+        once per dot. See `ElementArrayStim` for a faster implementation of
+        this idea.
         """
         self.__dict__['element'] = element
 
@@ -429,7 +453,7 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         # otherwise would be signal dots adopt random directions when the become
         # sinal dots in later trails
         if self.noiseDots in ('direction', 'position', 'walk'):
-            self._dotsDir = np.random.rand(self.nDots) * _2pi
+            self._dotsDir = self.rng.uniform(0., 1., self.nDots) * _2pi
             self._dotsDir[self._signalDots] = self.dir * _piOver180
 
     def setFieldCoherence(self, val, op='', log=None):
@@ -512,6 +536,9 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
             GL.glDrawArrays(GL.GL_POINTS, 0, self.nDots)
             GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+        elif self._canDrawInstanced(win):
+            # all the copies of the element in one draw call
+            self._drawInstanced(win)
         else:
             # we don't want to do the screen scaling twice so for each dot
             # subtract the screen centre
@@ -524,7 +551,138 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             self.element.setDepth(initialDepth)
         GL.glPopMatrix()
 
-    def _newDotsXY(self, nDots):
+    def _canDrawInstanced(self, win):
+        """Whether the element can be drawn at every dot with one instanced
+        draw call, rather than one `draw()` per dot. That needs a
+        `GratingStim` (not a subclass, they draw themselves differently)
+        using shaders, and OpenGL 3.3 for the instanced attribute.
+        """
+        element = self.element
+        if type(element) is not GratingStim or not element.useShaders:
+            return False
+        return GL.gl_info.have_version(3, 3)
+
+    def _instanceOffsets(self):
+        """Where each copy of the element goes, as an Nx2 `float32` array of
+        pixel positions (the per-instance attribute for instanced drawing).
+        These are the positions the element is moved to with `setPos()` when
+        the dots are drawn one at a time.
+        """
+        element = self.element
+        pos = self.verticesPix + self.fieldPos
+        offsets = convertToPix(vertices=np.zeros_like(pos), pos=pos,
+                               units=element.units, win=element.win)
+        return np.asarray(offsets, dtype=np.float32)
+
+    def _drawInstanced(self, win):
+        """Draw the element at all the dots at once, using its texture and
+        mask with an offset for each copy. Called by `draw()`, which has
+        checked `_canDrawInstanced()`.
+        """
+        element = self.element
+        saveBlendMode = win.blendMode
+        win.setBlendMode(element.blendmode, log=False)
+        if element._needTextureUpdate:
+            element.setTex(value=element.tex, log=False)
+
+        if win.blendMode == 'add':
+            fragSource = _shaders.fragSignedColorTexMask_adding
+        else:
+            fragSource = _shaders.fragSignedColorTexMask
+        prog = win._programCache.getProgram(
+            _shaders.vertInstancedTexMask, fragSource)
+        offsets = self._instanceOffsets()
+        vao = self._updateInstanceBuffers(
+            win, prog, _elementQuad(element), offsets)
+
+        win.setScale('pix')
+        GL.glColor4f(*element._foreColor.render('rgba1'))
+        GL.glUseProgram(prog)
+        uniformLoc = win._programCache.getUniformLocation
+        GL.glUniform1i(uniformLoc(prog, b"texture"), 0)
+        GL.glUniform1i(uniformLoc(prog, b"mask"), 1)
+        GL.glActiveTexture(GL.GL_TEXTURE1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, element._maskID)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, element._texID)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+
+        gltools.drawVAO(vao, GL.GL_TRIANGLE_FAN, instanceCount=len(offsets))
+
+        GL.glActiveTexture(GL.GL_TEXTURE1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisable(GL.GL_TEXTURE_2D)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisable(GL.GL_TEXTURE_2D)
+        GL.glUseProgram(0)
+        win.setBlendMode(saveBlendMode, log=False)
+
+    def _updateInstanceBuffers(self, win, prog, quad, offsets):
+        """Upload the element's quad and the offsets of the dots, returning
+        the VAO to draw. The buffers are kept between frames, so usually
+        only the offsets are written.
+        """
+        buffers = self._instanceBuffers
+        if (buffers is None or buffers['win'] is not win or
+                buffers['program'] != prog or
+                buffers['offsets'].shape != offsets.shape):
+            self._deleteInstanceBuffers()
+            buffers = None
+        elif not np.array_equal(buffers['quadData'], quad):
+            gltools.deleteVBO(buffers['quad'])
+            buffers['quad'] = gltools.createVBO(quad)
+            buffers['quadData'] = quad
+            gltools.deleteVAO(buffers['vao'])
+            buffers['vao'] = None
+
+        if buffers is None:
+            buffers = self._instanceBuffers = {
+                'win': win,
+                'program': prog,
+                'quad': gltools.createVBO(quad),
+                'quadData': quad,
+                'offsets': gltools.createVBO(offsets,
+                                             usage=GL.GL_STREAM_DRAW),
+                'vao': None}
+        else:
+            mapped = gltools.mapBuffer(buffers['offsets'], read=False)
+            mapped[:] = offsets
+            gltools.unmapBuffer(buffers['offsets'])
+            gltools.unbindVBO(buffers['offsets'])
+
+        if buffers['vao'] is None:
+            attribLoc = win._programCache.getAttribLocation
+            quadVBO = buffers['quad']
+            offsetLoc = attribLoc(prog, b'offset')
+            with warnings.catch_warnings():
+                # the buffers are meant to have different lengths
+                warnings.simplefilter('ignore')
+                buffers['vao'] = gltools.createVAO(
+                    {attribLoc(prog, b'position'): (quadVBO, 2, 0),
+                     attribLoc(prog, b'texCoord'): (quadVBO, 2, 2),
+                     attribLoc(prog, b'maskCoord'): (quadVBO, 2, 4),
+                     offsetLoc: buffers['offsets']},
+                    attribDivisors={offsetLoc: 1})
+            buffers['vao'].count = len(quad)  # not the number of dots
+
+        return buffers['vao']
+
+    def _deleteInstanceBuffers(self):
+        """Free the buffers used for instanced drawing of the element (they
+        belong to the window's GL context, so only when it's current).
+        """
+        buffers = self._instanceBuffers
+        self._instanceBuffers = None
+        if buffers is None:
+            return
+        if buffers['vao'] is not None:
+            gltools.deleteVAO(buffers['vao'])
+        gltools.deleteVBO(buffers['quad'])
+        gltools.deleteVBO(buffers['offsets'])
+
+    def _newDotsXY(self, nDots, rng=None):
         """Returns a uniform spread of dots, according to the `fieldShape` and
         `fieldSize`.
 
@@ -532,6 +690,9 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         ----------
         nDots : int
             Number of dots to sample.
+        rng : numpy.random.Generator, optional
+            Where to draw the positions from. If `None`, the `rng` of the
+            stimulus is used.
 
         Returns
         -------
@@ -545,9 +706,11 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             dots = self._newDots(nDots)
 
         """
+        if rng is None:
+            rng = self.rng
         if self.fieldShape == 'circle':
-            length = np.sqrt(np.random.uniform(0, 1, (nDots,)))
-            angle = np.random.uniform(0., _2pi, (nDots,))
+            length = np.sqrt(rng.uniform(0, 1, (nDots,)))
+            angle = rng.uniform(0., _2pi, (nDots,))
 
             newDots = np.zeros((nDots, 2))
             newDots[:, 0] = length * np.cos(angle)
@@ -555,7 +718,7 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
 
             newDots *= self.fieldSize * .5
         else:
-            newDots = np.random.uniform(-0.5, 0.5, size = (nDots, 2)) * self.fieldSize
+            newDots = rng.uniform(-0.5, 0.5, size = (nDots, 2)) * self.fieldSize
 
         return newDots
 
@@ -568,9 +731,18 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         if self.nDots != len(self._deadDots):
             self._deadDots = np.zeros(self.nDots, dtype=bool)
 
-    def _update_dotsXY(self):
+    def _update_dotsXY(self, rng=None):
         """The user shouldn't call this - its gets done within draw().
+
+        Parameters
+        ----------
+        rng : numpy.random.Generator, optional
+            Where to draw the random numbers for this update from. If `None`,
+            the `rng` of the stimulus is used.
+
         """
+        if rng is None:
+            rng = self.rng
         # Find dead dots, update positions, get new positions for
         # dead and out-of-bounds
         # renew dead dots
@@ -589,7 +761,7 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             #  **up to version 1.70.00 this was the other way around,
             # not in keeping with Scase et al**
             # noise and signal dots change identity constantly
-            np.random.shuffle(self._dotsDir)
+            rng.shuffle(self._dotsDir)
             # and then update _signalDots from that
             self._signalDots = (self._dotsDir == (self.dir * _piOver180))
 
@@ -597,7 +769,7 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         reshape = np.reshape
         if self.noiseDots == 'walk':
             # noise dots are ~self._signalDots
-            sig = np.random.rand(np.sum(~self._signalDots))
+            sig = rng.uniform(0., 1., np.sum(~self._signalDots))
             self._dotsDir[~self._signalDots] = sig * _2pi
             # then update all positions from dir*speed
             cosDots = reshape(np.cos(self._dotsDir), (self.nDots,))
@@ -637,14 +809,37 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         # update any dead dots
         nDead = self._deadDots.sum()
         if nDead:
-            self._verticesBase[self._deadDots, :] = self._newDotsXY(nDead)
+            self._verticesBase[self._deadDots, :] = self._newDotsXY(nDead, rng)
 
         # Reposition any dots that have gone out of bounds. Net effect is to
         # place dot one step inside the boundary on the other side of the
         # aperture.
         nOutOfBounds = outofbounds.sum()
         if nOutOfBounds:
-            self._verticesBase[outofbounds, :] = self._newDotsXY(nOutOfBounds)
+            self._verticesBase[outofbounds, :] = self._newDotsXY(
+                nOutOfBounds, rng)
 
         # update the pixel XY coordinates in pixels (using _BaseVisual class)
         self._updateVertices()
+
+
+def _elementQuad(element):
+    """The quad a `GratingStim` draws, as a 4x6 `float32` array with a row
+    for each vertex (in triangle fan order) of its position relative to the
+    centre of the stimulus (in pixels), texture coordinates and mask
+    coordinates. These are the per-vertex attributes for drawing copies of
+    the stimulus with instancing, and match `GratingStim._updateListShaders`.
+    """
+    centre = convertToPix(vertices=np.zeros((1, 2)), pos=element.pos,
+                          units=element.units, win=element.win)
+    quad = np.zeros((4, 6), dtype=np.float32)
+    quad[:, 0:2] = element.verticesPix - centre
+
+    Ltex = (-element._cycles[0] / 2) - element.phase[0] + 0.5
+    Rtex = (+element._cycles[0] / 2) - element.phase[0] + 0.5
+    Ttex = (+element._cycles[1] / 2) - element.phase[1] + 0.5
+    Btex = (-element._cycles[1] / 2) - element.phase[1] + 0.5
+    # right bottom, left bottom, left top, right top
+    quad[:, 2:4] = [(Rtex, Btex), (Ltex, Btex), (Ltex, Ttex), (Rtex, Ttex)]
+    quad[:, 4:6] = [(1., 0.), (0., 0.), (0., 1.), (1., 1.)]
+    return quad
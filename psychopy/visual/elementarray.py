@@ -538,10 +538,12 @@ class ElementArrayStim(MinimalStim, TextureMixin, ColorMixin):
         # setup the shaderprogram
         _prog = self.win._progSignedTexMask
         GL.glUseProgram(_prog)
+        # (the uniform locations are looked up once per program)
+        uniformLoc = self.win._programCache.getUniformLocation
         # set the texture to be texture unit 0
-        GL.glUniform1i(GL.glGetUniformLocation(_prog, b"texture"), 0)
+        GL.glUniform1i(uniformLoc(_prog, b"texture"), 0)
         # mask is texture unit 1
-        GL.glUniform1i(GL.glGetUniformLocation(_prog, b"mask"), 1)
+        GL.glUniform1i(uniformLoc(_prog, b"mask"), 1)
 
         # bind textures
         GL.glActiveTexture(GL.GL_TEXTURE1)
@@ -7,6 +7,7 @@
 # Distributed under the terms of the GNU General Public License (GPL).
 from __future__ import division
 import copy
+from bisect import bisect_left, bisect_right
 import psychopy
 from .text import TextStim
 from psychopy.data.utils import importConditions, listFromString
@@ -143,6 +144,10 @@ class Form(BaseVisualStim, ContainerMixin, ColorMixin):
         self.topEdge = None
         self._currentVirtualY = 0  # Y position in the virtual sheet
         self._decorations = []
+        # controls sorted top to bottom (and their -baseY for bisecting) so
+        # that only the visible ones need to be positioned and drawn
+        self._ctrls = []
+        self._ctrlKeys = []
         # Check units - only works with height units for now
         if self.win.units != 'height':
             logging.warning(
@@ -732,6 +737,22 @@ class Form(BaseVisualStim, ContainerMixin, ColorMixin):
                 self._currentVirtualY -= respHeight + self.itemPadding
 
         self._setDecorations()  # choose whether show/hide scroolbar
+        self._indexCtrls()
+
+    def _indexCtrls(self):
+        """Sorts the controls by their position on the virtual sheet so that
+        the ones in view can be found by bisection rather than checking each
+        """
+        ctrls = []
+        for item in self.items:
+            for ctrl in [item['itemCtrl'], item['responseCtrl']]:
+                if ctrl is None:  # e.g. because this has no resp obj
+                    continue
+                ctrl._scrollOffset = None  # needs (re)positioning
+                ctrls.append(ctrl)
+        ctrls.sort(key=lambda ctrl: -ctrl._baseY)  # stable, so keeps order
+        self._ctrls = ctrls
+        self._ctrlKeys = [-ctrl._baseY for ctrl in ctrls]
 
     def _setDecorations(self):
         """Sets Form decorations i.e., Border and scrollbar"""
@@ -762,23 +783,38 @@ class Form(BaseVisualStim, ContainerMixin, ColorMixin):
         """Draw decorations on form."""
         [decoration.draw() for decoration in self._decorations]
 
-    def _drawCtrls(self):
-        """Draw elements on form within border range.
+    def _visibleCtrls(self, offset):
+        """Get the controls within border range (see `_inRange`) for the given
+        scroll offset
 
         Parameters
         ----------
-        items : List
-            List of TextStim or Slider item from survey
+        offset : float
+            The scroll offset, from `_getScrollOffset`
+
+        Returns
+        -------
+        list
+            The TextBox2 or Slider objects in view, from top to bottom
         """
-        for idx, item in enumerate(self.items):
-            for element in [item['itemCtrl'], item['responseCtrl']]:
-                if element is None:  # e.g. because this has no resp obj
-                    continue
+        # in range if offset - size[1] < ctrl._baseY < offset + size[1]
+        first = bisect_right(self._ctrlKeys, -(offset + self.size[1]))
+        last = bisect_left(self._ctrlKeys, self.size[1] - offset)
+        return self._ctrls[first:last]
 
-                element.pos = (element.pos[0],
-                               element._baseY - self._getScrollOffset())
-                if self._inRange(element):
-                    element.draw()
+    def _drawCtrls(self):
+        """Draw elements on form within border range.
+
+        Controls are only moved when the scroll offset has changed since they
+        were last drawn, because setting their position means updating their
+        vertices, and those out of range aren't touched at all.
+        """
+        offset = self._getScrollOffset()
+        for element in self._visibleCtrls(offset):
+            if element._scrollOffset != offset:
+                element.pos = (element.pos[0], element._baseY - offset)
+                element._scrollOffset = offset
+            element.draw()
 
     def draw(self):
         """Draw all form elements"""
@@ -44,6 +44,9 @@ from psychopy.visual.basevisual import BaseVisualStim, ContainerMixin, TextureMi
 from moviepy.video.io.VideoFileClip import VideoFileClip
 
 import ctypes
+import time
+import threading
+from collections import deque
 import numpy
 from psychopy.clock import Clock
 from psychopy.constants import FINISHED, NOT_STARTED, PAUSED, PLAYING, STOPPED
@@ -51,6 +54,143 @@ from psychopy.constants import FINISHED, NOT_STARTED, PAUSED, PLAYING, STOPPED
 import pyglet.gl as GL
 
 
+class FrameDecoder(object):
+    """Decodes video frames ahead of time in a background thread.
+
+    Frames are read (in order, one frame interval apart) into a ring buffer
+    of at most `bufferSize` contiguous uint8 arrays, each stored with its
+    presentation time, so that the render thread only has to upload frames
+    rather than wait for them to be decoded.
+
+    Only the decoding thread calls `getFrame` (movie readers aren't
+    thread-safe) so use `seek()` to move to a new position.
+
+    :Parameters:
+
+        getFrame : callable
+            Function returning the frame (a height x width x 3 array) at a
+            given time, e.g. `VideoFileClip.get_frame`
+        frameInterval : float
+            Time between frames, i.e. 1/fps
+        duration : float
+            Duration of the movie (no frames are read beyond this)
+        bufferSize : int
+            The maximum number of frames decoded ahead
+    """
+
+    def __init__(self, getFrame, frameInterval, duration, bufferSize=8):
+        self._getFrame = getFrame
+        self.frameInterval = frameInterval
+        self.duration = duration
+        self.bufferSize = max(1, int(bufferSize))
+        self._frames = deque()  # (t, frame) pairs in presentation order
+        self._nextT = 0.0  # time of the next frame to decode
+        self._seekCount = 0  # so frames decoded before a seek are discarded
+        self._cond = threading.Condition()
+        self._running = True
+        # statistics
+        self.nDecoded = 0  # frames read from the file
+        self.nSkipped = 0  # frames decoded but never shown (dropped)
+        self.nWaits = 0  # times a frame was needed before it was decoded
+        self.nErrors = 0  # frames that couldn't be read
+        self._thread = threading.Thread(target=self._run,
+                                        name='FrameDecoder')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        """The decoding loop (runs in the background thread)"""
+        while True:
+            with self._cond:
+                while self._running and (
+                        len(self._frames) >= self.bufferSize or
+                        self._nextT > self.duration):
+                    self._cond.wait()
+                if not self._running:
+                    return
+                t = self._nextT
+                seekCount = self._seekCount
+            try:
+                frame = numpy.ascontiguousarray(self._getFrame(t),
+                                                dtype=numpy.uint8)
+            except (OSError, IOError):
+                frame = None
+            with self._cond:
+                if seekCount != self._seekCount:
+                    continue  # we've been moved elsewhere in the meantime
+                if frame is None:
+                    self.nErrors += 1
+                    logging.warning("Frame {} not found, moving one frame "
+                                    "and trying again".format(t))
+                else:
+                    self._frames.append((t, frame))
+                    self.nDecoded += 1
+                self._nextT = t + self.frameInterval
+                self._cond.notify_all()
+
+    def seek(self, t):
+        """Discard the decoded frames and continue decoding from time `t`
+        """
+        with self._cond:
+            self._frames.clear()
+            self._nextT = max(0.0, t)
+            self._seekCount += 1
+            self._cond.notify_all()
+
+    def getFrame(self, t, latest=None, timeout=5.0):
+        """Get the next decoded frame at or after time `t`.
+
+        If `latest` is given then frames due before it are skipped (counted
+        in `nSkipped`) so that playback can catch up, and the most recent
+        decoded frame no later than `latest` is returned.
+
+        Returns a (presentation time, frame) tuple, or (None, None) if there
+        are no more frames (e.g. at the end of the movie).
+        """
+        if latest is None:
+            latest = t
+        waited = False
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                # drop frames before the one we need
+                while self._frames and self._frames[0][0] < t - 1e-9:
+                    self._frames.popleft()
+                # and frames that are now too late to show
+                while (len(self._frames) > 1 and
+                       self._frames[1][0] <= latest + 1e-9):
+                    self._frames.popleft()
+                    self.nSkipped += 1
+                if self._frames and (self._frames[0][0] <= latest + 1e-9 or
+                                     self._nextT > latest + 1e-9):
+                    frameT, frame = self._frames.popleft()
+                    self._cond.notify_all()  # there's space to decode more
+                    return frameT, frame
+                if self._nextT > self.duration or not self._running:
+                    return None, None
+                # the frame we need hasn't been decoded yet
+                if not waited:
+                    self.nWaits += 1
+                    waited = True
+                self._cond.notify_all()  # in case we freed up space
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    logging.warning("Timed out waiting for movie frame {}"
+                                    .format(t))
+                    return None, None
+                self._cond.wait(remaining)
+
+    def stop(self):
+        """Stop the decoding thread (e.g. before closing the movie file)
+        """
+        with self._cond:
+            self._running = False
+            self._frames.clear()
+            self._cond.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+
 class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
     """A stimulus class for playing movies (mpeg, avi, etc...) in PsychoPy
     that does not require avbin. Instead it requires the cv2 python package
@@ -81,7 +221,8 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
                  noAudio=False,
                  vframe_callback=None,
                  fps=None,
-                 interpolate=True):
+                 interpolate=True,
+                 decodeAhead=8):
         """
         :Parameters:
 
@@ -96,6 +237,9 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
             loop : bool, optional
                 Whether to start the movie over from the beginning if draw is
                 called and the movie is done.
+            decodeAhead : int, optional
+                The number of frames to decode ahead of time (in a
+                background thread) so that drawing doesn't wait for them.
 
         """
         # what local vars are defined (these are the init params) for use
@@ -124,6 +268,8 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
         self.noAudio = noAudio
         self._audioStream = None
         self.useTexSubImage2D = True
+        self.decodeAhead = decodeAhead
+        self._decoder = None
 
         if noAudio:  # to avoid dependency problems in silent movies
             self.sound = None
@@ -152,6 +298,7 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
 
     def reset(self):
         self._numpyFrame = None
+        self._numpyFrameT = None
         self._nextFrameT = None
         self._texID = None
         self.status = NOT_STARTED
@@ -180,6 +327,7 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
 
         # Create Video Stream stuff
         if os.path.isfile(filename):
+            self._stopDecoder()
             self._mov = VideoFileClip(filename, audio=(1 - self.noAudio))
             if (not self.noAudio) and (self._mov.audio is not None):
                 sound = self.sound
@@ -208,6 +356,9 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
         self._frameInterval = 1.0/self._mov.fps
         self.duration = self._mov.duration
         self.filename = filename
+        self._decoder = FrameDecoder(self._mov.get_frame, self._frameInterval,
+                                     self.duration,
+                                     bufferSize=self.decodeAhead)
         self._updateFrameTexture()
         logAttrib(self, log, 'movie', filename)
 
@@ -312,18 +463,43 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
         # only advance if next frame (half of next retrace rate)
         if self._nextFrameT > self.duration:
             self._onEos()
+            if self._decoder is None:
+                return None  # stopped at the end
         elif self._numpyFrame is not None:
             if self._nextFrameT > (self._videoClock.getTime() -
                                    self._retraceInterval/2.0):
                 return None
-        try:
-            self._numpyFrame = self._mov.get_frame(self._nextFrameT) 
-        except OSError:
-            if self.autoLog:
-                logging.warning("Frame {} not found, moving one frame and trying again" 
-                    .format(self._nextFrameT), obj=self)
-            self._nextFrameT += self._frameInterval
-            self._updateFrameTexture()
+            if self._numpyFrameT == self._nextFrameT:
+                # we already have this frame (e.g. we're paused, or it's the
+                # first one, uploaded when the movie was loaded) so keep
+                # showing it rather than taking the next one from the decoder
+                if self.status == PLAYING:
+                    self._nextFrameT += self._frameInterval
+                return None
+
+        # frames are decoded ahead of time so this should just be a handover
+        # (if we're playing, skip any frames we're now too late to show)
+        latest = None
+        if self.status == PLAYING:
+            latest = max(self._nextFrameT, self._videoClock.getTime() -
+                         self._retraceInterval/2.0)
+        frameT, frame = self._decoder.getFrame(self._nextFrameT, latest)
+        if frame is None:  # no more frames to be had
+            self._onEos()
+            return None
+        nSkipped = int(round((frameT - self._nextFrameT) /
+                             self._frameInterval))
+        if nSkipped > 0:
+            self.nDroppedFrames += nSkipped
+            if self.nDroppedFrames < reportNDroppedFrames:
+                logging.warning("MovieStim3 dropping {} video frame(s) at "
+                                "{:.3f}s".format(nSkipped, self._nextFrameT))
+            elif self.nDroppedFrames - nSkipped < reportNDroppedFrames:
+                logging.warning("Multiple Movie frames have occurred - "
+                                "I'll stop bothering you about them!")
+        self._numpyFrame = frame
+        self._numpyFrameT = self._nextFrameT = frameT
+
         useSubTex = self.useTexSubImage2D
         if self._texID is None:
             self._texID = GL.GLuint()
@@ -448,6 +624,8 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
         """
         # video is easy: set both times to zero and update the frame texture
         self._nextFrameT = t
+        if self._decoder is not None:
+            self._decoder.seek(t)
         self._videoClock.reset(t)
         self._audioSeek(t)
 
@@ -471,9 +649,15 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
     def _getAudioStreamTime(self):
         return self._audio_stream_clock.getTime()
 
+    def _stopDecoder(self):
+        if getattr(self, '_decoder', None) is not None:
+            self._decoder.stop()
+        self._decoder = None
+
     def _unload(self):
         # remove textures from graphics card to prevent crash
         self.clearTextures()
+        self._stopDecoder()  # before closing the file it's reading from
         if self._mov is not None:
             self._mov.close()
         self._mov = None
@@ -29,12 +29,15 @@ except ImportError:
 import psychopy  # so we can get the __path__
 from psychopy import logging
 from psychopy.visual import filters
-from psychopy.tools.arraytools import val2array
+from psychopy.tools.arraytools import val2array, _makeGenerator
 from psychopy.tools.attributetools import attributeSetter
 from .grating import GratingStim
+import threading
+from types import SimpleNamespace
+from collections import OrderedDict, deque
 import numpy
 from numpy import exp, sin, cos
-from numpy.fft import fft2, ifft2, fftshift, ifftshift
+from numpy.fft import fft2, ifft2, fftshift, ifftshift, rfft2, irfft2
 
 from . import shaders as _shaders
 
@@ -109,6 +112,8 @@ class NoiseStim(GratingStim):
     Both buildNoise and updateNoise can be slow for large samples. 
     Samples of Binary, Normal or Uniform noise can usually be made at frame rate using noiseUpdate. 
     Updating or building other noise types at frame rate may result in dropped frames. 
+    To avoid that, makeNoiseBank(n) draws the next n samples in a background thread (e.g. during the ITI) and updateNoise() then just uses the next one.
+    The filters are only calculated once for each size and set of filter parameters.
     An alternative is to build a large sample of noise at the start of the routien and place it off the screen then cut a samples out of this at random locations and feed that as a numpy array into the texture of a visible gratingStim.
 
     **Notes on size**
@@ -133,6 +138,9 @@ class NoiseStim(GratingStim):
     The dominant orientation for Gabor noise is determined by ori at render time, not before.
     
     The phase parameter similarly shifts the sample around within the display window at render time and will not choose new random phases for the noise sample.
+
+    **Random numbers**
+    By default samples are drawn using numpy.random (so numpy.random.seed() makes them repeatable). Give a seed to use a separate numpy.random.Generator instead, available as the rng attribute.
     """
 
     def __init__(self,
@@ -173,7 +181,8 @@ class NoiseStim(GratingStim):
                  name=None,
                  autoLog=None,
                  autoDraw=False,
-                 maskParams=None):
+                 maskParams=None,
+                 seed=None):
         """ """  # Empty docstring. All doc is in attributes
         # what local vars are defined (these are the init params) for use by
         # __repr__
@@ -232,6 +241,13 @@ class NoiseStim(GratingStim):
         else:
             self.noiseClip=noiseClip
         self.filter = filter
+        # where the random samples come from (see 'Random numbers' above)
+        self.seed = seed
+        self.rng = numpy.random if seed is None else _makeGenerator(seed)
+        self._noiseBank = deque()
+        self._noiseBankThread = None
+        self._noiseBankCond = threading.Condition()
+        self._noiseBankGen = 0  # incremented to discard samples in progress
         self.local = numpy.ones((texRes, texRes), dtype=numpy.ubyte)
         self.local_p = self.local.ctypes
         self._sideLength=1.0   
@@ -490,10 +506,28 @@ class NoiseStim(GratingStim):
         """ Helper function to apply Butterworth filter in 
             frequensy domain.
         """
+        return FT * self._filterKernel()
+
+    def _filterKernel(self, half=False):
+        """The (centred) Butterworth filter, with the fractal power spectrum,
+            for the current parameters (or for a real FFT if `half`, see
+            _halfSpectrum).
+        """
+        filterSize = numpy.max(self._size)
+        if (self.noiseFilterOrder > 0.01 and self._lowsf > 0 and
+                self._lowsf > filterSize/2):
+            msg = ('Lower cut off frequency for filtered '
+            'noise is too high (exceeds Nyquist limit).')
+            raise Warning(msg)
+        key = ('butterworth', int(filterSize), self.noiseFractalPower,
+               self.noiseFilterOrder, self._upsf, self._lowsf)
+        return _cachedKernel(key, self._makeFilterKernel, half)
+
+    def _makeFilterKernel(self):
         filterSize = numpy.max(self._size)
         pin=filters.makeRadialMatrix(matrixSize=filterSize, center=(0,0), radius=1.0)
         pin[int(filterSize / 2)][int(filterSize / 2)] = 0.00000001  # Prevents divide by zero error. This is DC and is set to zero later anyway.
-        FT = numpy.multiply(FT,(pin) ** self.noiseFractalPower)
+        kernel = (pin) ** self.noiseFractalPower
         if self.noiseFilterOrder > 0.01:
             if self._upsf<(filterSize/2.0):
                 filter = filters.butter2d_lp_elliptic(size = [filterSize,filterSize], 
@@ -506,10 +540,6 @@ class NoiseStim(GratingStim):
             else:
                 filter = numpy.ones((int(filterSize),int(filterSize)))
             if self._lowsf > 0:
-                if self._lowsf > filterSize/2:
-                    msg = ('Lower cut off frequency for filtered '
-                    'noise is too high (exceeds Nyquist limit).')
-                    raise Warning(msg)
                 filter = filter-filters.butter2d_lp_elliptic(size = [filterSize,filterSize], 
                                                                 cutoff_x = self._lowsf / filterSize, 
                                                                 cutoff_y = self._lowsf / filterSize, 
@@ -517,18 +547,24 @@ class NoiseStim(GratingStim):
                                                                 alpha = 0, 
                                                                 offset_x = 0.5/filterSize, #becuase FFTs are slightly off centred.
                                                                 offset_y = 0.5/filterSize)
-            return FT * filter
-        else:
-            return FT
+            kernel = kernel * filter
+        return kernel
             
     def _isotropic(self, FT):
         """ Helper function to apply isotropic filter in 
             frequensy domain.
         """
+        return FT * self._isotropicKernel()
+
+    def _isotropicKernel(self, half=False):
         if self._sf > self._size / 2:
             msg = ('Base frequency for isotropic '
                   'noise is  too high (exceeds Nyquist limit).')
             raise Warning(msg)
+        key = ('isotropic', int(self._size), self._sf, self.noiseBW)
+        return _cachedKernel(key, self._makeIsotropicKernel, half)
+
+    def _makeIsotropicKernel(self):
         localf = self._sf / self._size
         linbw = 2 ** self.noiseBW
         lowf = 2.0 * localf / (linbw+1.0)
@@ -536,17 +572,24 @@ class NoiseStim(GratingStim):
         FWF = highf - lowf
         sigmaF = FWF / (2*numpy.sqrt(2*numpy.log(2)))
         pin = filters.makeRadialMatrix(matrixSize=self._size, center=(0,0), radius=2)
-        filter = filters.makeGauss(pin, mean=localf, sd=sigmaF)
-        return FT*filter
+        return filters.makeGauss(pin, mean=localf, sd=sigmaF)
         
     def _gabor(self, FT):
         """ Helper function to apply Gabor filter in 
             frequensy domain.
         """
+        return FT * self._gaborKernel()
+
+    def _gaborKernel(self, half=False):
         if self._sf > self._size / 2:
             msg = ('Base frequency for Gabor '
                   'noise is  too high (exceeds Nyquist limit).')
             raise Warning(msg)
+        key = ('gabor', int(self._size), self._sf, self.noiseBW,
+               self.noiseBWO, self.noiseOri)
+        return _cachedKernel(key, self._makeGaborKernel, half)
+
+    def _makeGaborKernel(self):
         localf = self._sf / self._size
         linbw = 2 ** self.noiseBW
         lowf = 2.0 * localf / (linbw + 1.0)
@@ -566,87 +609,194 @@ class NoiseStim(GratingStim):
                         Image.BICUBIC
                 )
         )
-        return FT*filter
+        return filter
+
+    def _filterSpectrumKernel(self):
+        """The current filter (if any) as a kernel for the half spectrum of
+            a real FFT (i.e. in the order given by rfft2, and symmetric so
+            that irfft2 gives the real part of what ifft2 would).
+        """
+        if self.filter in ['butterworth','Butterworth']:
+            return self._filterKernel(half=True)
+        elif self.filter in ['isotropic','Isotropic']:
+            return self._isotropicKernel(half=True)
+        elif self.filter in ['gabor','Gabor']:
+            return self._gaborKernel(half=True)
+        return None
 
     def updateNoise(self):
         """Updates the noise sample. Does not change any of the noise parameters 
             but choses a new random sample given the previously set parameters.
+            If there is a bank of samples (see makeNoiseBank()) the next one
+            of those is used instead.
         """
-
-        if not(self.noiseType in ['binary','Binary','normal','Normal','uniform','Uniform']):
-            if (self.noiseType in ['image', 'Image']) and (self.imageComponent in ['amplitude','Amplitude']):
-                self.noiseTex = numpy.random.uniform(0,1,int(self._size**2))
-                self.noiseTex = numpy.reshape(self.noiseTex,(int(self._size),int(self._size)))
-                if self.filter in ['Butterworth','butterworth']:
-                    self.noiseTex = fftshift(self._filter(self.noiseTex))
-                elif self.filter in ['Gabor','gabor']:
-                    self.noiseTex = fftshift(self._gabor(self.noiseTex))
-                elif self.filter in ['Isotropic','isotropic']:
-                    self.noiseTex = fftshift(self._isotropic(self.noiseTex))
-                self.noiseTex[0][0] = 0
-                In = self.noiseTex * exp(1j*self.noisePh)
-                Im = numpy.real(ifft2(In))
+        sample = self._nextBankSample()
+        if sample is None:
+            sample = self._makeSample(self.rng)
+        self.tex = sample
+
+    def _sampleParams(self, copy=False):
+        """Everything _makeSample() needs from the stimulus (including the
+            filter kernels, so the kernel cache isn't needed to make a
+            sample). With `copy` these are copies, so that samples can be made
+            in another thread while the stimulus is changed.
+        """
+        isPixelNoise = self.noiseType in ['binary', 'Binary', 'normal',
+                                          'Normal', 'uniform', 'Uniform']
+        params = SimpleNamespace(
+            noiseType=self.noiseType, imageComponent=self.imageComponent,
+            filter=self.filter, noiseClip=self.noiseClip, units=self.units,
+            size=self._size, sideLength=self._sideLength,
+            noiseTex=getattr(self, 'noiseTex', None),
+            noisePh=getattr(self, 'noisePh', None),
+            kernel=None, halfKernel=None)
+        if isPixelNoise:
+            params.halfKernel = self._filterSpectrumKernel()
+        elif (self.noiseType in ['image', 'Image'] and
+                self.imageComponent in ['amplitude', 'Amplitude']):
+            if self.filter in ['Butterworth', 'butterworth']:
+                params.kernel = self._filterKernel()
+            elif self.filter in ['Gabor', 'gabor']:
+                params.kernel = self._gaborKernel()
+            elif self.filter in ['Isotropic', 'isotropic']:
+                params.kernel = self._isotropicKernel()
+        if copy:
+            for name in ['size', 'sideLength', 'noiseTex', 'noisePh']:
+                value = getattr(params, name)
+                if isinstance(value, numpy.ndarray):
+                    setattr(params, name, value.copy())
+        return params
+
+    def _makeSample(self, rng, params=None):
+        """Returns a new noise sample drawn using `rng` (numpy.random or a
+            Generator) for the current parameters, or for `params` from
+            _sampleParams().
+        """
+        p = self._sampleParams() if params is None else params
+        if not(p.noiseType in ['binary','Binary','normal','Normal','uniform','Uniform']):
+            size = int(p.size)
+            if (p.noiseType in ['image', 'Image']) and (p.imageComponent in ['amplitude','Amplitude']):
+                amplitude = rng.uniform(0,1,size**2)
+                amplitude = numpy.reshape(amplitude,(size,size))
+                if p.kernel is not None:
+                    amplitude = fftshift(amplitude * p.kernel)
+                amplitude[0][0] = 0
+                Im = _realIfft2(amplitude, p.noisePh)
             else:
-                Ph = numpy.random.uniform(0,2*numpy.pi,int(self._size**2))
-                Ph = numpy.reshape(Ph,(int(self._size),int(self._size)))
-                In = self.noiseTex * exp(1j*Ph)
-                Im = numpy.real(ifft2(In))
+                Ph = rng.uniform(0,2*numpy.pi,size**2)
+                Ph = numpy.reshape(Ph,(size,size))
+                Im = _realIfft2(p.noiseTex, Ph)
                 Im = ifftshift(Im)
             gsd = filters.getRMScontrast(Im)
-            factor = gsd*self.noiseClip
+            factor = gsd*p.noiseClip
             numpy.clip(Im, -factor, factor, Im)
-            self.tex = Im / factor
-        elif self.noiseType in ['normal','Normal']:
-            self.noiseTex = numpy.random.randn(int(self._sideLength[1]),int(self._sideLength[0])) / self.noiseClip
-        elif self.noiseType in ['uniform','Uniform']:
-            self.noiseTex = 2.0 * numpy.random.rand(int(self._sideLength[1]),int(self._sideLength[0])) - 1.0
+            return Im / factor
+        shape = (int(p.sideLength[1]),int(p.sideLength[0]))
+        if p.noiseType in ['normal','Normal']:
+            noise = rng.standard_normal(shape) / p.noiseClip
+        elif p.noiseType in ['uniform','Uniform']:
+            noise = 2.0 * rng.uniform(0,1,shape) - 1.0
         else:
-            numpy.random.shuffle(self.noiseTex)  # pick random noise sample by shuffleing values
-            self.noiseTex = numpy.reshape(self.noiseTex,(int(self._sideLength[1]),int(self._sideLength[0])))
-        if self.noiseType in ['binary','Binary','normal','Normal','uniform','Uniform']:
-            if self.filter in ['butterworth', 'Butterworth', 'Gabor','gabor','Isotropic','isotropic']:
-                if self.units == 'pix':
-                    if self._size[0] == self._size[1]:
-                        baseImage = numpy.array(
-                                Image.fromarray(self.noiseTex).resize(
-                                        (int(self._size[0]), int(self._size[1])),
-                                        Image.NEAREST
-                                )
-                        )
-                    else:
-                        msg = ('NoiseStim can only apply filters to square noise images')
-                        raise ValueError(msg)
-                else:
-                    baseImage = numpy.array(
-                            Image.fromarray(self.noiseTex).resize(
-                                    (int(self._size), int(self._size)),
-                                    Image.NEAREST
-                            )
-                    )
-                baseImage = numpy.array(baseImage).astype(
-                        numpy.float32) * 0.0078431372549019607 - 1.0
-                FT = fft2(baseImage)
-                spectrum = numpy.absolute(fftshift(FT))
-                angle = numpy.angle(FT)
-                if self.filter in ['butterworth','Butterworth']:
-                    spectrum = fftshift(self._filter(spectrum))
-                elif self.filter in ['isotropic','Isotropic']:
-                    spectrum = fftshift(self._isotropic(spectrum))
-                elif self.filter in ['gabor','Gabor']:
-                    spectrum = fftshift(self._gabor(spectrum))
-                spectrum[0][0] = 0 # set DC to zero
-                FT = spectrum * exp(1j*angle)
-                
-                Im = numpy.real(ifft2(FT))
-                gsd = filters.getRMScontrast(Im)
-                factor = gsd*self.noiseClip
-                numpy.clip(Im, -factor, factor, Im)
-                self.tex = Im / factor
+            noise = p.noiseTex.copy()
+            rng.shuffle(noise)  # pick random noise sample by shuffleing values
+            noise = numpy.reshape(noise,shape)
+        kernel = p.halfKernel
+        if kernel is None:
+            return noise
+        if p.units == 'pix':
+            if p.size[0] == p.size[1]:
+                size = int(p.size[0])
             else:
-                if not(self.noiseType in ['image','Image']):
-                    self.tex = self.noiseTex
-                
-    
+                msg = ('NoiseStim can only apply filters to square noise images')
+                raise ValueError(msg)
+        else:
+            size = int(p.size)
+        # nearest neighbour upsampling (as PIL would, but without the copies)
+        rows = _nearestIndices(noise.shape[0], size)
+        cols = _nearestIndices(noise.shape[1], size)
+        baseImage = noise.astype(numpy.float32)[rows[:, None], cols]
+        baseImage = baseImage * 0.0078431372549019607 - 1.0
+        # filter the amplitude spectrum, keeping the phase spectrum
+        FT = rfft2(baseImage) * kernel
+        FT[0][0] = 0 # set DC to zero
+        Im = irfft2(FT, s=baseImage.shape)
+        gsd = filters.getRMScontrast(Im)
+        factor = gsd*p.noiseClip
+        numpy.clip(Im, -factor, factor, Im)
+        return Im / factor
+
+    def makeNoiseBank(self, nSamples):
+        """Starts drawing the next `nSamples` noise samples in a background
+            thread, so that the following calls to updateNoise() only need to
+            upload them (e.g. call this during an ITI when the noise needs to
+            be updated every frame during the trial).
+
+            Any samples still in the bank are discarded when the noise is
+            rebuilt (e.g. after changing a noise parameter).
+
+            The samples are made from a copy of the current parameters, using
+            a Generator of their own, seeded from the stimulus' rng (so the
+            bank is repeatable when the stimulus has a seed, or after
+            numpy.random.seed()).
+        """
+        if self._needBuild:
+            self.buildNoise()
+        self.clearNoiseBank()
+        with self._noiseBankCond:
+            gen = self._noiseBankGen
+        params = self._sampleParams(copy=True)
+        if hasattr(self.rng, 'integers'):
+            bankSeed = self.rng.integers(2**32)
+        else:  # numpy.random or a RandomState
+            bankSeed = self.rng.randint(2**31)
+        thread = threading.Thread(target=self._fillNoiseBank,
+                                  args=(gen, int(nSamples), params,
+                                        _makeGenerator(bankSeed)),
+                                  name='NoiseBank')
+        thread.daemon = True
+        self._noiseBankThread = thread
+        thread.start()
+
+    def _fillNoiseBank(self, gen, nSamples, params, rng):
+        for ii in range(nSamples):
+            with self._noiseBankCond:
+                if gen != self._noiseBankGen:
+                    return  # the noise was rebuilt so this is out of date
+            try:
+                sample = self._makeSample(rng, params)
+            except Exception:
+                logging.warning("Failed to make noise bank for %s" % self.name)
+                break
+            with self._noiseBankCond:
+                if gen != self._noiseBankGen:
+                    return  # the noise was rebuilt so this is out of date
+                self._noiseBank.append(sample)
+                self._noiseBankCond.notify_all()
+        with self._noiseBankCond:
+            if self._noiseBankThread is threading.current_thread():
+                self._noiseBankThread = None
+            self._noiseBankCond.notify_all()
+
+    def _nextBankSample(self):
+        """The next sample from the bank, waiting for it if it's still being
+            made, or None if there is no bank (or it has been used up).
+        """
+        with self._noiseBankCond:
+            while not self._noiseBank and self._noiseBankThread is not None:
+                self._noiseBankCond.wait()
+            if self._noiseBank:
+                return self._noiseBank.popleft()
+        return None
+
+    def clearNoiseBank(self):
+        """Discards any noise samples drawn by makeNoiseBank() that haven't
+            been used.
+        """
+        with self._noiseBankCond:
+            self._noiseBankGen += 1
+            self._noiseBank.clear()
+            self._noiseBankThread = None
+            self._noiseBankCond.notify_all()
             
     def buildNoise(self):
         """build a new noise sample. Required to act on changes to any noise parameters or texRes.
@@ -700,7 +850,7 @@ class NoiseStim(GratingStim):
                     self.noiseTex = numpy.absolute(fftshift(fft2(intensity))) # fftshift here is undone later
                 elif self.imageComponent in ['amplitude', 'Amplitude']:
                     self.noisePh = numpy.angle((fft2(intensity))) # fftshift here is undone later
-                    self.noiseTex = numpy.random.uniform(0,1,int(self._size**2))
+                    self.noiseTex = self.rng.uniform(0,1,int(self._size**2))
                     self.noiseTex = numpy.reshape(self.noiseTex,(int(self._size),int(self._size)))
                 else:
                     raise ValueError("Unknown value for imageComponent in noiseStim")
@@ -721,5 +871,78 @@ class NoiseStim(GratingStim):
             self.noiseTex[0][0] = 0 # Set DC to zero
   
         self._needBuild = False # prevent noise from being re-built at next draw() unless a parameter is changed in the mean time.
+        self.clearNoiseBank()  # any samples in it were for the old parameters
         self.updateNoise()  # now choose the initial random sample.
 
+
+# filter kernels (which are slow to make) for recently used parameters
+_kernelCache = OrderedDict()
+_kernelCacheSize = 32
+_kernelCacheLock = threading.Lock()
+
+
+def _cachedKernel(key, makeKernel, half=False):
+    """Returns the kernel for `key` from the cache, calling `makeKernel()`
+    to make it if needed. If `half` then it's returned (uncentred) for use
+    with a real FFT.
+    """
+    if half:
+        key = ('half',) + key
+        makeFull = makeKernel
+        makeKernel = lambda: _halfSpectrum(
+            fftshift(_cachedKernel(key[1:], makeFull)))
+    with _kernelCacheLock:
+        kernel = _kernelCache.pop(key, None)
+        if kernel is not None:
+            _kernelCache[key] = kernel  # now the most recently used
+            return kernel
+    # made without the lock (as it may need another kernel from the cache)
+    kernel = numpy.asarray(makeKernel())
+    kernel.flags.writeable = False  # shared between stimuli
+    with _kernelCacheLock:
+        while len(_kernelCache) >= _kernelCacheSize:
+            _kernelCache.popitem(last=False)
+        _kernelCache[key] = kernel  # now the most recently used
+    return kernel
+
+
+def _mirrorIndices(shape):
+    """Indices of the frequencies (-ky, -kx) for the half spectrum of a real
+    FFT, i.e. the conjugates of the values in the half spectrum.
+    """
+    nRows, nCols = shape
+    rows = (-numpy.arange(nRows)) % nRows
+    cols = (-numpy.arange(nCols // 2 + 1)) % nCols
+    return rows[:, None], cols
+
+
+def _halfSpectrum(kernel):
+    """The half of a (full, uncentred) spectral filter that a real FFT needs,
+    made symmetric so that filtering a real image gives what the real part of
+    the full inverse FFT would.
+    """
+    rows, cols = _mirrorIndices(kernel.shape)
+    return 0.5 * (kernel[:, :cols.size] + kernel[rows, cols])
+
+
+def _realIfft2(amplitude, phase):
+    """Same as numpy.real(ifft2(amplitude * exp(1j * phase))) but using a real
+    inverse FFT (about twice as fast) on the Hermitian part of the spectrum.
+    """
+    rows, cols = _mirrorIndices(amplitude.shape)
+    nCols = cols.size
+    # a complex exp is much slower than a cos and a sin, and these are much
+    # faster still in single precision (which is plenty for an 8-bit texture)
+    phase = phase.astype(numpy.float32)
+    amp, ph = amplitude[:, :nCols], phase[:, :nCols]
+    ampMirror, phMirror = amplitude[rows, cols], phase[rows, cols]
+    spectrum = numpy.empty(amp.shape, numpy.complex128)
+    spectrum.real = amp * cos(ph) + ampMirror * cos(phMirror)
+    spectrum.imag = amp * sin(ph) - ampMirror * sin(phMirror)
+    spectrum *= 0.5
+    return irfft2(spectrum, s=amplitude.shape)
+
+
+def _nearestIndices(nIn, nOut):
+    """Indices for nearest neighbour resizing of an axis from nIn to nOut"""
+    return numpy.floor((numpy.arange(nOut) + 0.5) * nIn / nOut).astype(int)
@@ -408,10 +408,12 @@ class RadialStim(GratingStim):
             # setup the shaderprogram
             prog = self.win._progSignedTexMask1D
             GL.glUseProgram(prog)
+            # (the uniform locations are looked up once per program)
+            uniformLoc = self.win._programCache.getUniformLocation
             # set the texture to be texture unit 0
-            GL.glUniform1i(GL.glGetUniformLocation(prog, b"texture"), 0)
+            GL.glUniform1i(uniformLoc(prog, b"texture"), 0)
             # mask is texture unit 1
-            GL.glUniform1i(GL.glGetUniformLocation(prog, b"mask"), 1)
+            GL.glUniform1i(uniformLoc(prog, b"mask"), 1)
 
             # set pointers to visible textures
             GL.glClientActiveTexture(GL.GL_TEXTURE0)
@@ -526,12 +528,13 @@ class RadialStim(GratingStim):
         GL.glVertexPointer(2, GL.GL_FLOAT, 0, arrPointer)
 
         # setup the shaderprogram
-        GL.glUseProgram(self.win._progSignedTexMask1D)
+        prog = self.win._progSignedTexMask1D
+        GL.glUseProgram(prog)
+        # (the uniform locations are looked up once per program)
+        uniformLoc = self.win._programCache.getUniformLocation
         # set the texture to be texture unit 0
-        GL.glUniform1i(GL.glGetUniformLocation(
-            self.win._progSignedTexMask1D, b"texture"), 0)
-        GL.glUniform1i(GL.glGetUniformLocation(
-            self.win._progSignedTexMask1D, b"mask"), 1)  # mask is texture unit 1
+        GL.glUniform1i(uniformLoc(prog, b"texture"), 0)
+        GL.glUniform1i(uniformLoc(prog, b"mask"), 1)  # mask is texture unit 1
 
         # set pointers to visible textures
         GL.glClientActiveTexture(GL.GL_TEXTURE0)
@@ -204,9 +204,10 @@ class EnvelopeGrating(GratingStim):
             self.beat = bool(beat)
         self._needUpdate = True
         self.blendmode=blendmode
-        self._shaderProgBeat = _shaders.compileProgram(
+        # (compiled once per window rather than for every stimulus)
+        self._shaderProgBeat = win._programCache.getProgram(
             _shaders.vertSimple, carrierEnvelopeMaskFrag)
-        self._shaderProgPow = _shaders.compileProgram(
+        self._shaderProgPow = win._programCache.getProgram(
             _shaders.vertSimple, carrierEnvelopeMaskFragPow)
 
         self.local = numpy.ones((texRes, texRes), dtype=numpy.ubyte)
@@ -519,31 +520,33 @@ class EnvelopeGrating(GratingStim):
         self._needUpdate = False
         GL.glNewList(self._listID, GL.GL_COMPILE)
         GL.glUseProgram(self._shaderProg)
+        # (the uniform locations are looked up once per program)
+        uniformLoc = self.win._programCache.getUniformLocation
 
         # set the carrier to be texture unit 0
-        GL.glUniform1i(GL.glGetUniformLocation(self._shaderProg, b"carrier"),
+        GL.glUniform1i(uniformLoc(self._shaderProg, b"carrier"),
                        0)
         # set the envelope to be texture unit 1
-        GL.glUniform1i(GL.glGetUniformLocation(
+        GL.glUniform1i(uniformLoc(
             self._shaderProg, b"envelope"), 1)
-        GL.glUniform1i(GL.glGetUniformLocation(
+        GL.glUniform1i(uniformLoc(
             self._shaderProg, b"mask"), 2)  # mask is texture unit 2
-        GL.glUniform1i(GL.glGetUniformLocation(
+        GL.glUniform1i(uniformLoc(
             self._shaderProg, b"power"), 3)  # power is texture unit 3
-        GL.glUniform1f(GL.glGetUniformLocation(
+        GL.glUniform1f(uniformLoc(
             self._shaderProg, b"moddepth"), self.moddepth)
-        GL.glUniform1f(GL.glGetUniformLocation(
+        GL.glUniform1f(uniformLoc(
             self._shaderProg, b"ori"), envrad)
         # CM envelopes use (modedepth*envelope+1.0)*carrier. If beat is True
         # this becomes (moddepth*envelope)*carrier thus maing a second order
         # 'beat' pattern.
         if self.beat:
-            GL.glUniform1f(GL.glGetUniformLocation(
+            GL.glUniform1f(uniformLoc(
                 self._shaderProg, b"offset"),0.0)
         else:
-            GL.glUniform1f(GL.glGetUniformLocation(
+            GL.glUniform1f(uniformLoc(
                 self._shaderProg, b"offset"), 1.0)
-        GL.glUniform1f(GL.glGetUniformLocation(
+        GL.glUniform1f(uniformLoc(
             self._shaderProg, b"add"), addvalue)
 
         # mask
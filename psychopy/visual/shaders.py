@@ -13,6 +13,8 @@ from __future__ import absolute_import, print_function
 import pyglet.gl as GL
 import psychopy.tools.gltools as gltools
 from ctypes import c_int, c_char_p, c_char, cast, POINTER, byref
+# (ProgramCache lives in tools, so it can be used without a display)
+from psychopy.tools.shadertools import ProgramCache  # noqa
 
 
 class Shader:
@@ -284,6 +286,19 @@ vertSimple = """
             gl_Position =  ftransform();
     }
     """
+# draws many copies of a textured quad, each moved by its own offset (an
+# instanced attribute), e.g. DotStim elements. Use with the signedTexMask
+# fragment shaders
+vertInstancedTexMask = """
+    attribute vec2 position, texCoord, maskCoord, offset;
+    void main() {
+            gl_FrontColor = gl_Color;
+            gl_TexCoord[0] = vec4(texCoord, 0.0, 1.0);
+            gl_TexCoord[1] = vec4(maskCoord, 0.0, 1.0);
+            gl_Position = gl_ModelViewProjectionMatrix *
+                vec4(position + offset, 0.0, 1.0);
+    }
+    """
 
 vertPhongLighting = """
 // Vertex shader for the Phong Shading Model
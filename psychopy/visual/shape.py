@@ -34,9 +34,11 @@ from psychopy.tools.attributetools import (attributeSetter, logAttrib,
 from psychopy.tools.arraytools import val2array
 from psychopy.visual.basevisual import (BaseVisualStim, ColorMixin,
                                         ContainerMixin)
+from psychopy.tools.mathtools import triangulatePolygon
 from psychopy.visual.helpers import setColor
 import psychopy.visual
 from psychopy.contrib import tesselate
+from collections import OrderedDict
 import copy
 import numpy
 
@@ -383,6 +385,90 @@ class BaseShapeStim(BaseVisualStim, ColorMixin, ContainerMixin):
             GL.glPopMatrix()
 
 
+# triangles of recently tesselated shapes, as indices into their vertices
+_tesselationCache = OrderedDict()
+_tesselationCacheSize = 64
+
+
+def _tesselateLoops(loops, windingRule=None, tesselator='glu'):
+    """Triangles filling the shape made by `loops` (a list of lists of
+    vertices), as an array of their vertices (which is empty if the shape
+    can't be filled, e.g. if it's a line).
+
+    The triangles are cached as indices into the vertices, keyed by the
+    number of vertices in each loop, and used again if the vertices change
+    by an affine transform (moving, rotating, scaling etc.), which doesn't
+    change how they join up.
+    """
+    loops = [numpy.asarray(loop, dtype=float) for loop in loops]
+    vertices = numpy.concatenate(loops)
+    key = (tuple(len(loop) for loop in loops), windingRule, tesselator)
+    try:
+        cachedVertices, triangles = _tesselationCache.pop(key)
+    except KeyError:
+        triangles = None
+    else:
+        if not _isAffineTransform(cachedVertices, vertices):
+            triangles = None
+    if triangles is None:
+        tessVertices, triangles = _triangulateLoops(
+            loops, vertices, windingRule, tesselator)
+        if triangles is None:
+            return tessVertices  # these can't be cached
+        while len(_tesselationCache) >= _tesselationCacheSize:
+            _tesselationCache.popitem(last=False)
+    _tesselationCache[key] = (vertices, triangles)
+    return vertices[triangles.reshape(-1)]
+
+
+def _triangulateLoops(loops, vertices, windingRule, tesselator):
+    """Tesselate `loops`, returning the vertices of the triangles and their
+    indices in `vertices` (the loops joined together) or `None` if there
+    aren't any for all of them (e.g. GLU adds vertices where edges cross).
+    """
+    # ear clipping fills the inside of a simple loop, as the (default) ODD
+    # winding rule does, but the other rules might not
+    oddWinding = windingRule in (None, GL.GLU_TESS_WINDING_ODD)
+    if tesselator == 'numpy' and len(loops) == 1 and oddWinding:
+        try:
+            triangles = triangulatePolygon(vertices)
+            return vertices[triangles.reshape(-1)], triangles
+        except ValueError:
+            pass  # not simple (or a line), which GLU can handle
+
+    if windingRule:
+        GL.gluTessProperty(tesselate.tess, GL.GLU_TESS_WINDING_RULE,
+                           windingRule)
+    tessVertices = tesselate.tesselate(loops)
+    if windingRule:
+        GL.gluTessProperty(tesselate.tess, GL.GLU_TESS_WINDING_RULE,
+                           tesselate.default_winding_rule)
+    if len(tessVertices) % 3:
+        return tessVertices, None
+
+    # GLU gives the vertices themselves, so look up where they came from
+    indices = {vertex: idx for idx, vertex in
+               enumerate(map(tuple, vertices.tolist()))}
+    try:
+        triangles = numpy.array([indices[vertex] for vertex in tessVertices],
+                                dtype=int)
+    except KeyError:
+        return tessVertices, None
+    return tessVertices, triangles.reshape((-1, 3))
+
+
+def _isAffineTransform(vertices, newVertices):
+    """Whether `newVertices` are (to within rounding error) `vertices` after
+    an invertible affine transform."""
+    points = numpy.column_stack((vertices, numpy.ones(len(vertices))))
+    transform, _, rank, _ = numpy.linalg.lstsq(points, newVertices,
+                                               rcond=None)
+    if rank < 3 or numpy.linalg.det(transform[:2]) == 0.0:
+        return False  # the vertices are all in a line (or a point)
+    error = numpy.abs(numpy.dot(points, transform) - newVertices).max()
+    return error <= 1e-9 * max(numpy.ptp(newVertices), 1e-300)
+
+
 class ShapeStim(BaseShapeStim):
     """A class for arbitrary shapes defined as lists of vertices (x,y).
 
@@ -407,6 +493,16 @@ class ShapeStim(BaseShapeStim):
     tessellator winding rule (default: GLU_TESS_WINDING_ODD). This is relevant
     only for self-crossing or multi-loop shapes. Cannot be set dynamically.
 
+    `tesselator` can be 'numpy' to fill simple (single loop, not
+    self-crossing) shapes by ear clipping (see
+    :func:`~psychopy.tools.mathtools.triangulatePolygon`) instead of with the
+    GLU tessellator, which is still used for other shapes and if a
+    `windingRule` other than GLU_TESS_WINDING_ODD is given.
+
+    The triangles are reused when new vertices are only the old ones moved,
+    rotated or scaled, so animating a shape by changing its vertices in
+    these ways doesn't need it to be tesselated every frame.
+
     See Coder demo > stimuli > shapes.py
 
     Changed Nov 2015: v1.84.00. Now allows filling of complex shapes. This
@@ -437,7 +533,8 @@ class ShapeStim(BaseShapeStim):
                  interpolate=True,
                  name=None,
                  autoLog=None,
-                 autoDraw=False):
+                 autoDraw=False,
+                 tesselator='glu'):
         """
         """
         # what local vars are defined (init params, for use by __repr__)
@@ -467,6 +564,7 @@ class ShapeStim(BaseShapeStim):
 
         self.closeShape = closeShape
         self.windingRule = windingRule
+        self.tesselator = tesselator
         self.vertices = vertices
         # Appearance
         self.colorSpace = colorSpace
@@ -494,20 +592,15 @@ class ShapeStim(BaseShapeStim):
             # convert original vertices to triangles (= tesselation) if
             # possible. (not possible if closeShape is False, don't even try)
             GL.glPushMatrix()  # seemed to help at one point, superfluous?
-            if self.windingRule:
-                GL.gluTessProperty(tesselate.tess, GL.GLU_TESS_WINDING_RULE,
-                                   self.windingRule)
             if hasattr(newVertices[0][0], '__iter__'):
                 loops = newVertices
             else:
                 loops = [newVertices]
-            tessVertices = tesselate.tesselate(loops)
+            tessVertices = _tesselateLoops(loops, self.windingRule,
+                                           self.tesselator)
             GL.glPopMatrix()
-            if self.windingRule:
-                GL.gluTessProperty(tesselate.tess, GL.GLU_TESS_WINDING_RULE,
-                                   tesselate.default_winding_rule)
 
-        if not self.closeShape or tessVertices == []:
+        if not self.closeShape or len(tessVertices) == 0:
             # probably got a line if tesselate returned []
             initVertices = newVertices
             self.closeShape = False
@@ -522,7 +615,8 @@ class ShapeStim(BaseShapeStim):
         """A list of lists or a numpy array (Nx2) specifying xy positions of
         each vertex, relative to the center of the field.
 
-        Assigning to vertices can be slow if there are many vertices.
+        Assigning to vertices can be slow if there are many vertices (unless
+        they're the same vertices transformed, see `ShapeStim`).
 
         :ref:`Operations <attrib-operations>` supported with `.setVertices()`.
         """
@@ -317,7 +317,7 @@ class SceneSkybox(object):
             legacy=True)
 
         # shader for the skybox
-        self._shaderProg = _shaders.compileProgram(
+        self._shaderProg = self.win._programCache.getProgram(
             _shaders.vertSkyBox, _shaders.fragSkyBox)
 
         # store the skybox transformation matrix, this is not to be updated
@@ -814,7 +814,8 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
             #       desiredRGB.ctypes.data_as(ctypes.POINTER(ctypes.c_float)))
             #  # set the texture to be texture unit 0
             GL.glUniform3f(
-                GL.glGetUniformLocation(self.win._progSignedTexFont, b"rgb"),
+                self.win._programCache.getUniformLocation(
+                    self.win._progSignedTexFont, b"rgb"),
                 *self._foreColor.render('rgb1'))
 
         else:  # color is set in texture, so set glColor to white
@@ -86,6 +86,7 @@ from psychopy.tools.arraytools import val2array
 from psychopy.tools.monitorunittools import convertToPix
 import psychopy.tools.viewtools as viewtools
 import psychopy.tools.gltools as gltools
+from psychopy.tools.movietools import MovieFrameWriter
 from .text import TextStim
 from .grating import GratingStim
 from .helpers import setColor
@@ -526,6 +527,9 @@ class Window(object):
         self.frameClock = core.Clock()  # from psycho/core
         self.frames = 0  # frames since last fps calc
         self.movieFrames = []  # list of captured frames (Image objects)
+        # or, when streaming them to a file (see startMovieCapture)
+        self._movieWriter = None
+        self._movieReader = None
 
         self.recordFrameIntervals = False
         # Be able to omit the long timegap that follows each time turn it off
@@ -2127,21 +2131,115 @@ class Window(object):
         buffer : str, optional
             Buffer to capture.
 
+        If :py:attr:`~Window.startMovieCapture()` has been called, the frame
+        is streamed to the file instead of being kept in memory, and `None`
+        is returned.
+
         Returns
         -------
-        Image
+        Image or None
             Buffer pixel contents as a PIL/Pillow image object.
 
         """
+        if self._movieWriter is not None:
+            self._captureMovieFrame(buffer)
+            return None
         im = self._getFrame(buffer=buffer)
         self.movieFrames.append(im)
         return im
 
-    def _getFrame(self, rect=None, buffer='front'):
-        """Return the current Window as an image.
+    def startMovieCapture(self, fileName, fps=30, codec='libx264',
+                          maxQueued=16):
+        """Start streaming the frames captured with
+        :py:attr:`~Window.getMovieFrame()` to a file, rather than keeping
+        them in memory for :py:attr:`~Window.saveMovieFrames()`, so long
+        recordings don't run out of memory.
+
+        The pixels are copied into a pair of pixel buffers in turn, so
+        reading a frame doesn't wait for the copy to finish (the previous
+        frame is collected instead). Frames are written by a background
+        thread, either piped to ffmpeg for a movie or as numbered image (or
+        .npy) files. Call :py:attr:`~Window.stopMovieCapture()` to finish.
+
+        Parameters
+        ----------
+        fileName : str
+            Name of the movie (.mp4, .mov, .mkv, .avi, .mpg, .mpeg or .gif)
+            or of the frames (e.g. 'frame.png' gives frame00001.png,
+            frame00002.png, ...).
+        fps : float, optional
+            Frame rate of the movie.
+        codec : str, optional
+            Video codec for ffmpeg to use.
+        maxQueued : int, optional
+            Frames that can be waiting to be written before
+            :py:attr:`~Window.getMovieFrame()` waits for the writer.
+
+        Examples
+        --------
+        Recording a movie of the stimulus as it's shown::
+
+            win.startMovieCapture('stimuli.mp4', fps=60)
+            for frameN in range(nFrames):
+                stim.draw()
+                win.flip()
+                win.getMovieFrame()
+            win.stopMovieCapture()
+
         """
-        # GL.glLoadIdentity()
-        # do the reading of the pixels
+        if self._movieWriter is not None:
+            raise RuntimeError("Movie capture has already started, call "
+                               "stopMovieCapture() first.")
+        self._movieWriter = MovieFrameWriter(fileName, fps=fps, codec=codec,
+                                             maxQueued=maxQueued)
+
+    def stopMovieCapture(self):
+        """Write the last frames captured since
+        :py:attr:`~Window.startMovieCapture()` and finish the file(s).
+
+        Returns
+        -------
+        int
+            Number of frames written.
+
+        """
+        writer = self._movieWriter
+        if writer is None:
+            return 0
+        reader = self._movieReader
+        self._movieWriter = self._movieReader = None
+        try:
+            if reader is not None:
+                frame = reader.finish()
+                if frame is not None:
+                    writer.write(frame)
+                reader.delete()
+        finally:
+            writer.close()
+        return writer.nFramesWritten
+
+    def _captureMovieFrame(self, buffer='front'):
+        """Read the window for the movie being written, passing the frame
+        read last time to the writer.
+        """
+        self._setReadBuffer(buffer)
+        w, h = self.size
+        if self._movieReader is None:
+            glInfo = getattr(GL, 'gl_info', None)  # pyglet only
+            if glInfo is not None and glInfo.have_version(2, 1):
+                self._movieReader = _AsyncFrameReader(w, h)
+            else:
+                self._movieReader = False  # so read synchronously
+        if self._movieReader:
+            frame = self._movieReader.read(0, 0)
+        else:
+            frame = _readPixels(0, 0, w, h)[::-1, :, :3]
+        self._restoreReadBuffer(buffer)
+        if frame is not None:
+            self._movieWriter.write(frame)
+
+    def _setReadBuffer(self, buffer='front'):
+        """Select the buffer for reading the window's pixels from."""
         if buffer == 'back' and self.useFBO:
             GL.glReadBuffer(GL.GL_COLOR_ATTACHMENT0_EXT)
         elif buffer == 'back':
@@ -2154,6 +2252,20 @@ class Window(object):
             raise ValueError("Requested read from buffer '{}' but should be "
                              "'front' or 'back'".format(buffer))
 
+    def _restoreReadBuffer(self, buffer='front'):
+        """Undo `_setReadBuffer()`, binding the window's framebuffer again
+        if it was unbound to read the front buffer.
+        """
+        if self.useFBO and buffer == 'front':
+            GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, self.frameBuffer)
+
+    def _getFrame(self, rect=None, buffer='front'):
+        """Return the current Window as an image.
+        """
+        # GL.glLoadIdentity()
+        # do the reading of the pixels
+        self._setReadBuffer(buffer)
+
         if rect:
             x, y = self.size  # of window, not image
             imType = 'RGBA'  # not tested with anything else
@@ -2181,8 +2293,7 @@ class Window(object):
         im = im.transpose(Image.FLIP_TOP_BOTTOM)
         im = im.convert('RGB')
 
-        if self.useFBO and buffer == 'front':
-            GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, self.frameBuffer)
+        self._restoreReadBuffer(buffer)
         return im
 
     def saveMovieFrames(self, fileName, codec='libx264',
@@ -2219,6 +2330,9 @@ class Window(object):
             Set this to `False` if you want the frames to be kept for
             additional calls to ``saveMovieFrames``. Default is `True`.
 
+        See :py:attr:`~Window.startMovieCapture()` for writing frames as
+        they are captured instead, which is better for long recordings.
+
         Examples
         --------
         Writes a series of static frames as frame001.tif, frame002.tif etc.::
@@ -2300,6 +2414,12 @@ class Window(object):
         """
         self._closed = True
 
+        if self._movieWriter is not None:
+            try:
+                self.stopMovieCapture()
+            except Exception as err:
+                logging.error("Movie capture failed: {}".format(err))
+
         self.backend.close()  # moved here, dereferencing the window prevents
                               # backend specific actions to take place
 
@@ -2762,6 +2882,8 @@ class Window(object):
         self.glVendor = GL.gl_info.get_vendor().lower()
 
         requestedFBO = self.useFBO
+        # shader programs (and their uniform locations) for this context
+        self._programCache = _shaders.ProgramCache()
         if self._haveShaders:  # do this after setting up FrameBufferObject
             self._setupShaders()
         else:
@@ -2779,30 +2901,31 @@ class Window(object):
             self.blendMode = 'avg'
 
     def _setupShaders(self):
-        self._progSignedTexFont = _shaders.compileProgram(
+        getProgram = self._programCache.getProgram
+        self._progSignedTexFont = getProgram(
             _shaders.vertSimple, _shaders.fragSignedColorTexFont)
-        self._progFBOtoFrame = _shaders.compileProgram(
+        self._progFBOtoFrame = getProgram(
             _shaders.vertSimple, _shaders.fragFBOtoFrame)
         self._shaders = {}
-        self._shaders['signedColor'] = _shaders.compileProgram(
+        self._shaders['signedColor'] = getProgram(
             _shaders.vertSimple, _shaders.fragSignedColor)
-        self._shaders['signedColor_adding'] = _shaders.compileProgram(
+        self._shaders['signedColor_adding'] = getProgram(
             _shaders.vertSimple, _shaders.fragSignedColor_adding)
-        self._shaders['signedTex'] = _shaders.compileProgram(
+        self._shaders['signedTex'] = getProgram(
             _shaders.vertSimple, _shaders.fragSignedColorTex)
-        self._shaders['signedTexMask'] = _shaders.compileProgram(
+        self._shaders['signedTexMask'] = getProgram(
             _shaders.vertSimple, _shaders.fragSignedColorTexMask)
-        self._shaders['signedTexMask1D'] = _shaders.compileProgram(
+        self._shaders['signedTexMask1D'] = getProgram(
             _shaders.vertSimple, _shaders.fragSignedColorTexMask1D)
-        self._shaders['signedTex_adding'] = _shaders.compileProgram(
+        self._shaders['signedTex_adding'] = getProgram(
             _shaders.vertSimple, _shaders.fragSignedColorTex_adding)
-        self._shaders['signedTexMask_adding'] = _shaders.compileProgram(
+        self._shaders['signedTexMask_adding'] = getProgram(
             _shaders.vertSimple, _shaders.fragSignedColorTexMask_adding)
-        self._shaders['signedTexMask1D_adding'] = _shaders.compileProgram(
+        self._shaders['signedTexMask1D_adding'] = getProgram(
             _shaders.vertSimple, _shaders.fragSignedColorTexMask1D_adding)
-        self._shaders['imageStim'] = _shaders.compileProgram(
+        self._shaders['imageStim'] = getProgram(
             _shaders.vertSimple, _shaders.fragImageStim)
-        self._shaders['imageStim_adding'] = _shaders.compileProgram(
+        self._shaders['imageStim_adding'] = getProgram(
             _shaders.vertSimple, _shaders.fragImageStim_adding)
         self._shaders['stim3d_phong'] = {}
 
@@ -2822,29 +2945,11 @@ class Window(object):
             if flag[1]:  # has diffuse texture map
                 srcDefs['DIFFUSE_TEXTURE'] = 1
 
-            # embed #DEFINE statements in GLSL source code
-            vertSrc = gltools.embedShaderSourceDefs(
-                _shaders.vertPhongLighting, srcDefs)
-            fragSrc = gltools.embedShaderSourceDefs(
-                _shaders.fragPhongLighting, srcDefs)
-
-            # build a shader program
-            prog = gltools.createProgramObjectARB()
-            vertexShader = gltools.compileShaderObjectARB(
-                vertSrc, GL.GL_VERTEX_SHADER_ARB)
-            fragmentShader = gltools.compileShaderObjectARB(
-                fragSrc, GL.GL_FRAGMENT_SHADER_ARB)
-
-            gltools.attachObjectARB(prog, vertexShader)
-            gltools.attachObjectARB(prog, fragmentShader)
-            gltools.linkProgramObjectARB(prog)
-            gltools.detachObjectARB(prog, vertexShader)
-            gltools.detachObjectARB(prog, fragmentShader)
-            gltools.deleteObjectARB(vertexShader)
-            gltools.deleteObjectARB(fragmentShader)
-
-            # set the flag
-            self._shaders['stim3d_phong'][flag] = prog
+            # build a shader program (#DEFINE statements are embedded in the
+            # GLSL source code)
+            self._shaders['stim3d_phong'][flag] = getProgram(
+                _shaders.vertPhongLighting, _shaders.fragPhongLighting,
+                defs=srcDefs)
 
     def _setupFrameBuffer(self):
 
@@ -3188,3 +3293,70 @@ def getMsPerFrame(myWin, nFrames=60, showVisual=False, msg='', msDelay=0.):
     return myWin.getMsPerFrame(nFrames=60, showVisual=showVisual, msg=msg,
                                msDelay=0.)
 
+
+
+def _readPixels(left, bottom, width, height):
+    """Read RGBA pixels from the current read buffer, waiting for them, as
+    an array with the bottom row first.
+    """
+    frame = numpy.empty((height, width, 4), dtype=numpy.uint8)
+    GL.glReadPixels(left, bottom, width, height, GL.GL_RGBA,
+                    GL.GL_UNSIGNED_BYTE, frame.ctypes.data_as(
+                        ctypes.POINTER(GL.GLubyte)))
+    return frame
+
+
+class _AsyncFrameReader(object):
+    """Reads frames into two pixel pack buffers in turn, so `glReadPixels`
+    returns without waiting for the pixels. Each frame is collected when the
+    next one is read, by which time the copy has (usually) finished.
+    """
+
+    def __init__(self, width, height):
+        self.size = (width, height)
+        self._buffers = (GL.GLuint * 2)()
+        GL.glGenBuffers(2, self._buffers)
+        for pbo in self._buffers:
+            GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, pbo)
+            GL.glBufferData(GL.GL_PIXEL_PACK_BUFFER, width * height * 4,
+                            None, GL.GL_STREAM_READ)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+        self._pending = [False, False]
+        self._index = 0  # buffer to read into next
+
+    def read(self, left, bottom):
+        """Start reading a frame and return the one read last time (or
+        `None` for the first frame), as an RGB array with the top row first.
+        """
+        index = self._index
+        width, height = self.size
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, self._buffers[index])
+        # with a pack buffer bound the pointer is an offset into it
+        GL.glReadPixels(left, bottom, width, height, GL.GL_RGBA,
+                        GL.GL_UNSIGNED_BYTE, None)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+        self._pending[index] = True
+        self._index = 1 - index
+        return self._collect(self._index)
+
+    def finish(self):
+        """Return the last frame read (or `None` if it has been returned)."""
+        return self._collect(1 - self._index)
+
+    def delete(self):
+        GL.glDeleteBuffers(2, self._buffers)
+
+    def _collect(self, index):
+        if not self._pending[index]:
+            return None
+        self._pending[index] = False
+        width, height = self.size
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, self._buffers[index])
+        ptr = GL.glMapBuffer(GL.GL_PIXEL_PACK_BUFFER, GL.GL_READ_ONLY)
+        frame = numpy.ctypeslib.as_array(
+            ctypes.cast(ptr, ctypes.POINTER(GL.GLubyte)),
+            shape=(height, width, 4)).copy()
+        GL.glUnmapBuffer(GL.GL_PIXEL_PACK_BUFFER)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+        # the writer does the copying of the flipped RGB view
+        return frame[::-1, :, :3]